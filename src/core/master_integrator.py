@@ -34,6 +34,7 @@ from src.systems.trading.trading_system import TradingSystem
 from src.systems.social.social_system import SocialSystem
 from src.systems.world.world_manager import WorldManager
 from src.systems.world.navigation_system import NavigationSystem
+from src.systems.world.flow_field import FlowFieldService
 from src.systems.world.weather_system import WeatherSystem
 from src.systems.world.day_night_cycle import DayNightCycle
 from src.systems.world.season_system import SeasonSystem
@@ -192,6 +193,20 @@ class MasterIntegrator(BaseComponent):
             if self.integration_config.auto_integrate_attributes:
                 self._integrate_systems_with_attributes()
             
+            # Связи систем мира с рендерингом
+            self._connect_world_lighting()
+            self._connect_world_terrain()
+            self._connect_world_weather()
+            
+            # Карты чанков и подземелий для поиска пути навигации
+            self._connect_navigation_maps()
+            
+            # Восприятие AI следит за перемещением игрока
+            self._connect_player_tracking()
+            
+            # Поля потока AI строятся по картам сервиса поиска пути навигации
+            self._connect_flow_fields()
+            
             self.system_state = LifecycleState.READY
             logger.info("MasterIntegrator инициализирован успешно")
             return True
@@ -546,6 +561,84 @@ class MasterIntegrator(BaseComponent):
         except Exception as e:
             logger.error(f"Ошибка интеграции систем с атрибутами: {e}")
     
+    def _connect_world_lighting(self):
+        """Передача освещения DayNightCycle в систему рендеринга"""
+        try:
+            day_night_cycle = self.systems.get('day_night_cycle')
+            rendering_system = self.systems.get('rendering_system')
+            if day_night_cycle and rendering_system and hasattr(rendering_system, 'apply_environment_lighting'):
+                day_night_cycle.add_lighting_callback(rendering_system.apply_environment_lighting)
+                logger.info("Освещение DayNightCycle подключено к системе рендеринга")
+            
+        except Exception as e:
+            logger.error(f"Ошибка подключения освещения: {e}")
+    
+    def _connect_world_terrain(self):
+        """Построение мешей ландшафта при загрузке и выгрузке чанков WorldManager"""
+        try:
+            world_manager = self.systems.get('world_manager')
+            rendering_system = self.systems.get('rendering_system')
+            if world_manager and rendering_system and hasattr(rendering_system, 'attach_world'):
+                if rendering_system.attach_world(world_manager):
+                    logger.info("Ландшафт WorldManager подключен к системе рендеринга")
+        
+        except Exception as e:
+            logger.error(f"Ошибка подключения ландшафта: {e}")
+    
+    def _connect_world_weather(self):
+        """Генераторы погоды от seed мира WorldManager"""
+        try:
+            world_manager = self.systems.get('world_manager')
+            weather_system = self.systems.get('weather_system')
+            if world_manager and weather_system and hasattr(weather_system, 'set_seed'):
+                weather_system.set_seed(world_manager.settings.world_seed)
+                logger.info(f"Погода использует seed мира {world_manager.settings.world_seed}")
+        
+        except Exception as e:
+            logger.error(f"Ошибка подключения seed погоды: {e}")
+    
+    def _connect_navigation_maps(self):
+        """Регистрация карт чанков и подземелий WorldManager в поиске пути навигации"""
+        try:
+            world_manager = self.systems.get('world_manager')
+            navigation_system = self.systems.get('navigation_system')
+            if world_manager and navigation_system and hasattr(navigation_system, 'attach_world'):
+                if navigation_system.attach_world(world_manager):
+                    logger.info("Карты WorldManager подключены к поиску пути навигации")
+        
+        except Exception as e:
+            logger.error(f"Ошибка подключения карт навигации: {e}")
+    
+    def _connect_player_tracking(self):
+        """Передача позиции игрока из NavigationSystem в хеш восприятия AI"""
+        try:
+            navigation_system = self.systems.get('navigation_system')
+            ai_system = self.systems.get('ai_system')
+            if navigation_system and ai_system and hasattr(navigation_system, 'add_player_moved_callback'):
+                navigation_system.add_player_moved_callback(ai_system.update_player_position)
+                ai_system.update_player_position(*navigation_system.player_position)
+                logger.info("Позиция игрока подключена к AI системе")
+        
+        except Exception as e:
+            logger.error(f"Ошибка подключения позиции игрока: {e}")
+    
+    def _connect_flow_fields(self):
+        """Сервис полей потока на картах навигации для преследования и бегства AI"""
+        try:
+            navigation_system = self.systems.get('navigation_system')
+            ai_system = self.systems.get('ai_system')
+            pathfinding = getattr(navigation_system, 'pathfinding', None)
+            if ai_system and pathfinding is not None and hasattr(ai_system, 'set_flow_field_service'):
+                ai_system.set_flow_field_service(FlowFieldService(pathfinding))
+                
+                # Игрок - общая цель преследования на карте, где он находится
+                navigation_system.add_player_map_callback(ai_system.set_player_map)
+                ai_system.set_player_map(navigation_system.player_map_id)
+                logger.info("Поля потока подключены к AI системе")
+        
+        except Exception as e:
+            logger.error(f"Ошибка подключения полей потока: {e}")
+    
     def _start_all_systems(self) -> bool:
         """Запуск всех систем"""
         try:
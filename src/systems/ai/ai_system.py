@@ -36,6 +36,8 @@ except ImportError:
     logging.info("Scikit-learn не установлен - некоторые AI функции будут недоступны")
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.spatial_index import DynamicSpatialHash
+from src.systems.world.flow_field import FlowFieldService
 from src.core.constants import AIState, AIBehavior, constants_manager, TIME_CONSTANTS
 
 # = ТИПЫ AI
@@ -145,6 +147,8 @@ class AIEntity:
     speed: float = 1.0
     detection_range: float = 10.0
     attack_range: float = 2.0
+    entity_type: str = "npc"  # Тип в пространственном хеше
+    target_types: List[str] = field(default_factory=list)  # Типы, на которые сущность агрится
     memory: Dict[str, Any] = field(default_factory=dict)
     behavior_data: Dict[str, Any] = field(default_factory=dict)
     learning_data: Dict[str, Any] = field(default_factory=dict)
@@ -182,6 +186,7 @@ class AIDecision:
     action: str
     target: Optional[str] = None
     position: Optional[Tuple[float, float, float]] = None
+    direction: Optional[Tuple[float, float]] = None  # Направление движения по полю потока
     confidence: float = 1.0
     timestamp: float = field(default_factory=time.time)
     learning_data: Dict[str, Any] = field(default_factory=dict)
@@ -219,6 +224,11 @@ class AISettings:
     model_save_frequency: int = 10000
     memory_decay_rate: float = 0.95
     personality_adaptation_rate: float = 0.01
+    spatial_cell_size: float = 16.0  # Размер ячейки хеша восприятия
+
+# Идентификатор и тип игрока в хеше восприятия
+PLAYER_ENTITY_ID = "player"
+PLAYER_ENTITY_TYPE = "player"
 
 # = ЕДИНАЯ AI СИСТЕМА
 class AISystem(BaseComponent):
@@ -238,6 +248,13 @@ class AISystem(BaseComponent):
         self.ai_entities: Dict[str, AIEntity] = {}
         self.entity_behaviors: Dict[str, List[AIBehavior]] = {}
         
+        # Пространственный хеш всех отслеживаемых сущностей (AI и внешних)
+        self.spatial_hash = DynamicSpatialHash(self.settings.spatial_cell_size)
+        
+        # Общие поля потока к преследуемым целям: цель -> карта
+        self.flow_fields: Optional[FlowFieldService] = None
+        self.flow_targets: Dict[str, str] = {}
+        
         # Поведения и решения
         self.behaviors: Dict[str, AIBehavior] = {}
         self.decisions: List[AIDecision] = []
@@ -468,6 +485,7 @@ class AISystem(BaseComponent):
             
             self.ai_entities[entity_id] = entity
             self.entity_behaviors[entity_id] = []
+            self.spatial_hash.update(entity_id, position[0], position[1], entity.entity_type)
             
             # Добавление поведений
             for behavior in self.behaviors.values():
@@ -486,6 +504,153 @@ class AISystem(BaseComponent):
             self.logger.error(f"Ошибка регистрации AI сущности {entity_id}: {e}")
             return False
     
+    def unregister_entity(self, entity_id: str) -> bool:
+        """Удаление сущности из системы и пространственного хеша"""
+        try:
+            removed = self.spatial_hash.remove(entity_id)
+            self.untrack_flow_target(entity_id)
+            if self.ai_entities.pop(entity_id, None) is not None:
+                self.entity_behaviors.pop(entity_id, None)
+                self.stats["active_entities"] = max(0, self.stats["active_entities"] - 1)
+                removed = True
+            
+            # Сущности, преследовавшие удаленную, теряют цель
+            for entity in self.ai_entities.values():
+                if entity.target_entity == entity_id:
+                    entity.target_entity = None
+            
+            return removed
+            
+        except Exception as e:
+            self.logger.error(f"Ошибка удаления AI сущности {entity_id}: {e}")
+            return False
+    
+    def update_entity_position(self, entity_id: str, position: Tuple[float, float, float],
+                               entity_type: Optional[str] = None) -> bool:
+        """Обновление позиции сущности в хеше восприятия
+        
+        Принимает как AI сущности, так и внешние (игрок, союзники): для
+        внешних нужно указать тип при первом обновлении."""
+        try:
+            entity = self.ai_entities.get(entity_id)
+            if entity is not None:
+                entity.position = position
+                if entity_type is not None:
+                    entity.entity_type = entity_type
+                entity_type = entity.entity_type
+            elif entity_type is None:
+                entity_type = self.spatial_hash.get_type(entity_id)
+                if entity_type is None:
+                    self.logger.warning(f"Не указан тип для новой сущности {entity_id}")
+                    return False
+            
+            self.spatial_hash.update(entity_id, position[0], position[1], entity_type)
+            
+            self._refresh_flow_target(entity_id, position)
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Ошибка обновления позиции сущности {entity_id}: {e}")
+            return False
+    
+    def update_player_position(self, x: float, y: float, z: float = 0.0) -> bool:
+        """Позиция игрока в хеше восприятия (колбэк перемещения NavigationSystem)"""
+        return self.update_entity_position(PLAYER_ENTITY_ID, (x, y, z), entity_type=PLAYER_ENTITY_TYPE)
+    
+    def set_flow_field_service(self, flow_fields: FlowFieldService):
+        """Подключение сервиса полей потока для преследования и бегства"""
+        self.flow_fields = flow_fields
+    
+    def track_flow_target(self, entity_id: str, map_id: str) -> bool:
+        """Ведение поля потока к сущности (игрок, босс) на карте map_id
+        
+        Все преследующие эту цель сущности читают одно поле, которое
+        обновляется при перемещении цели."""
+        if self.flow_fields is None:
+            return False
+        self.flow_targets[entity_id] = map_id
+        position = self.spatial_hash.get_position(entity_id)
+        if position is not None:
+            self.flow_fields.set_goal(entity_id, map_id, position[0], position[1])
+        return True
+    
+    def set_player_map(self, map_id: Optional[str]):
+        """Поле потока к игроку на карте под ним (колбэк смены карты NavigationSystem)"""
+        if map_id is None:
+            self.untrack_flow_target(PLAYER_ENTITY_ID)
+        else:
+            self.track_flow_target(PLAYER_ENTITY_ID, map_id)
+    
+    def untrack_flow_target(self, entity_id: str):
+        if self.flow_targets.pop(entity_id, None) is not None and self.flow_fields is not None:
+            self.flow_fields.remove_goal(entity_id)
+    
+    def _refresh_flow_target(self, entity_id: str, position: Tuple[float, ...]):
+        """Перенос цели поля потока за сдвинувшейся сущностью
+        
+        Сдвиг в пределах клетки пропускается сервисом, небольшой сдвиг
+        обновляет поле инкрементально."""
+        map_id = self.flow_targets.get(entity_id)
+        if map_id is not None and self.flow_fields is not None:
+            self.flow_fields.set_goal(entity_id, map_id, position[0], position[1])
+    
+    def get_movement_direction(self, entity: AIEntity, flee: bool = False) -> Optional[Tuple[float, float]]:
+        """Направление к цели (или от нее) по общему полю потока"""
+        if self.flow_fields is None or entity.target_entity not in self.flow_targets:
+            return None
+        if flee:
+            return self.flow_fields.get_flee_direction(entity.target_entity, entity.position[0], entity.position[1])
+        return self.flow_fields.get_direction(entity.target_entity, entity.position[0], entity.position[1])
+    
+    def get_entities_in_range(self, position: Tuple[float, ...], radius: float,
+                              entity_types: Optional[List[str]] = None,
+                              exclude: Optional[str] = None) -> List[str]:
+        """Идентификаторы сущностей в радиусе (по плоскости XY)"""
+        return self.spatial_hash.query_radius(position[0], position[1], radius, entity_types, exclude)
+    
+    def get_nearest_entities(self, position: Tuple[float, ...], count: int = 1,
+                             max_distance: Optional[float] = None,
+                             entity_types: Optional[List[str]] = None,
+                             exclude: Optional[str] = None) -> List[Tuple[float, str]]:
+        """Ближайшие сущности в виде списка (расстояние, идентификатор)"""
+        return self.spatial_hash.nearest(position[0], position[1], count, max_distance,
+                                         entity_types, exclude)
+    
+    def _get_tracked_position(self, entity_id: str) -> Optional[Tuple[float, float, float]]:
+        """Позиция отслеживаемой сущности (высота известна только у AI сущностей)"""
+        entity = self.ai_entities.get(entity_id)
+        if entity is not None:
+            return entity.position
+        position = self.spatial_hash.get_position(entity_id)
+        return (position[0], position[1], 0.0) if position is not None else None
+    
+    def _update_perception(self, entity: AIEntity):
+        """Обновление цели сущности через пространственный хеш"""
+        # Позиция могла быть изменена напрямую (entity.position): хеш догоняет ее
+        self.spatial_hash.update(entity.entity_id, entity.position[0], entity.position[1], entity.entity_type)
+        
+        if entity.target_entity and entity.target_entity in self.spatial_hash:
+            target_position = self._get_tracked_position(entity.target_entity)
+            # Поле к цели следует за ней, даже если позиция менялась в обход update_entity_position
+            self._refresh_flow_target(entity.target_entity, target_position)
+            if not entity.target_types or \
+                    self._calculate_distance(entity.position[:2], target_position[:2]) <= entity.detection_range:
+                entity.target_position = target_position
+                return
+            # Цель вышла из зоны обнаружения: последняя позиция остается для поиска
+            entity.target_position = target_position
+            entity.target_entity = None
+        
+        if not entity.target_types:
+            return
+        
+        nearest = self.spatial_hash.nearest(entity.position[0], entity.position[1], 1,
+                                            entity.detection_range, entity.target_types,
+                                            entity.entity_id)
+        if nearest:
+            entity.target_entity = nearest[0][1]
+            entity.target_position = self._get_tracked_position(entity.target_entity)
+    
     def _create_entity_neural_network(self):
         """Создание нейронной сети для сущности"""
         if not TORCH_AVAILABLE:
@@ -512,6 +677,9 @@ class AISystem(BaseComponent):
             entity = self.ai_entities[entity_id]
             behaviors = self.entity_behaviors.get(entity_id, [])
             
+            # Восприятие: захват и потеря цели по хешу
+            self._update_perception(entity)
+            
             # Получение состояния сущности
             state = self._get_entity_state_vector(entity)
             
@@ -529,6 +697,7 @@ class AISystem(BaseComponent):
                 entity_id=entity_id,
                 behavior_id=best_behavior.behavior_id,
                 action=action,
+                target=entity.target_entity,
                 confidence=confidence,
                 learning_data={
                     'state': state,
@@ -538,6 +707,10 @@ class AISystem(BaseComponent):
                 personality_influence=entity.personality_traits.copy()
             )
             
+            # Движение толпы к цели и от нее - по общему полю потока
+            if best_behavior.behavior_id in ("chase", "flee"):
+                decision.direction = self.get_movement_direction(entity, best_behavior.behavior_id == "flee")
+            
             # Обновление времени выполнения
             best_behavior.last_execution = time.time()
             
@@ -650,9 +823,11 @@ class AISystem(BaseComponent):
                 elif condition == "health_low" and entity.health > entity.max_health * 0.3:
                     return False
                 elif condition == "threat_detected":
-                    # Проверка наличия угроз в памяти
+                    # Угроза - враждебная сущность в зоне обнаружения или запись в памяти
                     threats = self.global_memory.get("threats", {})
-                    if not threats:
+                    if not threats and not (entity.target_types and self.spatial_hash.nearest(
+                            entity.position[0], entity.position[1], 1, entity.detection_range,
+                            entity.target_types, entity.entity_id)):
                         return False
                 elif condition == "lost_target" and entity.target_entity:
                     return False
@@ -1066,6 +1241,10 @@ class AISystem(BaseComponent):
         
         self.ai_entities.clear()
         self.entity_behaviors.clear()
+        self.spatial_hash.clear()
+        self.flow_targets.clear()
+        if self.flow_fields is not None:
+            self.flow_fields.clear()
         self.behaviors.clear()
         self.decisions.clear()
         self.global_memory.clear()
@@ -31,6 +31,7 @@ except ImportError:
     Task = None
 
 from src.core.architecture import BaseComponent, ComponentType, Priority, LifecycleState
+from src.systems.rendering.terrain_mesher import TerrainMesher
 
 logger = logging.getLogger(__name__)
 
@@ -159,6 +160,14 @@ class RenderSystem(BaseComponent):
         self.lod_manager: Optional[LODManager] = None
         self.occlusion_culler: Optional[OcclusionCuller] = None
         
+        # Меши ландшафта чанков мира: строятся в рабочем потоке,
+        # подключаются к сцене в update()
+        self.terrain_mesher = TerrainMesher()
+        self.terrain_nodes: Dict[str, NodePath] = {}
+        self._pending_terrain: Dict[str, Tuple[Any, Any]] = {}  # chunk_id -> (чанк, Future)
+        self._removed_terrain: List[str] = []
+        self._terrain_lock = threading.Lock()
+        
         # Callbacks
         self.on_camera_change: Optional[Callable] = None
         self.on_quality_change: Optional[Callable] = None
@@ -489,6 +498,121 @@ class RenderSystem(BaseComponent):
             logger.error(f"Ошибка настройки освещения: {e}")
             return False
     
+    def apply_environment_lighting(self, lighting, sky_color: Tuple[float, float, float]):
+        """Применение освещения цикла дня и ночи (LightingData) к сцене"""
+        try:
+            ambient = lighting.ambient_intensity
+            ambient_settings = self.lighting_settings.get("ambient")
+            if ambient_settings:
+                ambient_settings.intensity = ambient
+                ambient_settings.color = (ambient, ambient, ambient)
+            if "ambient" in self.lights:
+                self.lights["ambient"].setColor((ambient, ambient, ambient, 1))
+            
+            # Днем направленный свет дает солнце, ночью - луна
+            direct = max(lighting.sun_intensity, lighting.moon_intensity)
+            directional_settings = self.lighting_settings.get("directional")
+            if directional_settings:
+                directional_settings.intensity = direct
+                base_color = (0.8, 0.8, 0.7)
+                directional_settings.color = tuple(channel * direct for channel in base_color)
+                if "directional" in self.lights:
+                    self.lights["directional"].setColor((*directional_settings.color, 1))
+            
+            if self.showbase is not None and hasattr(self.showbase, 'setBackgroundColor'):
+                self.showbase.setBackgroundColor(*sky_color)
+            
+        except Exception as e:
+            logger.error(f"Ошибка применения освещения окружения: {e}")
+    
+    # = ЛАНДШАФТ МИРА
+    def attach_world(self, world_manager) -> bool:
+        """Подписка на загрузку, уточнение и выгрузку чанков WorldManager
+        
+        Колбэки приходят из рабочих потоков менеджера мира, поэтому здесь
+        только ставится задача построения меша; граф сцены меняется в update()."""
+        try:
+            height_generator = getattr(world_manager, 'height_generator', None)
+            if height_generator is not None:
+                self.terrain_mesher.set_biome_labels(height_generator.biome_classifier.labels)
+            
+            world_manager.add_chunk_loaded_callback(self.on_chunk_loaded)
+            world_manager.add_chunk_refined_callback(self.on_chunk_loaded)
+            world_manager.add_chunk_unloaded_callback(self.on_chunk_unloaded)
+            
+            for chunk in list(world_manager.chunks.values()):
+                if chunk.height_map is not None:
+                    self.on_chunk_loaded(chunk)
+            return True
+        
+        except Exception as e:
+            logger.error(f"Ошибка подключения ландшафта мира к рендерингу: {e}")
+            return False
+    
+    def on_chunk_loaded(self, chunk):
+        """Постановка чанка в очередь построения меша (также после уточнения LOD)"""
+        try:
+            if chunk.height_map is None or chunk.biome_map is None:
+                return
+            future = self.terrain_mesher.build_chunk_mesh_async(chunk)
+            with self._terrain_lock:
+                previous = self._pending_terrain.get(chunk.chunk_id)
+                if previous is not None:
+                    previous[1].cancel()
+                self._pending_terrain[chunk.chunk_id] = (chunk, future)
+        
+        except Exception as e:
+            logger.error(f"Ошибка постановки меша чанка {chunk.chunk_id}: {e}")
+    
+    def on_chunk_unloaded(self, chunk):
+        """Снятие меша выгруженного чанка"""
+        try:
+            with self._terrain_lock:
+                pending = self._pending_terrain.pop(chunk.chunk_id, None)
+                if pending is not None:
+                    pending[1].cancel()
+                self._removed_terrain.append(chunk.chunk_id)
+        
+        except Exception as e:
+            logger.error(f"Ошибка снятия меша чанка {chunk.chunk_id}: {e}")
+    
+    def _process_terrain_meshes(self):
+        """Подключение готовых мешей и удаление мешей выгруженных чанков (основной поток)"""
+        try:
+            with self._terrain_lock:
+                removed, self._removed_terrain = self._removed_terrain, []
+                ready = [(chunk_id, chunk, future)
+                         for chunk_id, (chunk, future) in self._pending_terrain.items()
+                         if future.done()]
+                for chunk_id, _, _ in ready:
+                    del self._pending_terrain[chunk_id]
+            
+            for chunk_id in removed:
+                node_path = self.terrain_nodes.pop(chunk_id, None)
+                if node_path is not None:
+                    node_path.removeNode()
+            
+            for chunk_id, chunk, future in ready:
+                if future.cancelled():
+                    continue
+                try:
+                    node = future.result()
+                except Exception as e:
+                    logger.error(f"Ошибка построения меша чанка {chunk_id}: {e}")
+                    continue
+                
+                old_node = self.terrain_nodes.pop(chunk_id, None)
+                if old_node is not None:
+                    old_node.removeNode()
+                if self.render is None:
+                    continue
+                node_path = self.render.attachNewNode(node)
+                node_path.setPos(chunk.chunk_x * chunk.chunk_size, chunk.chunk_y * chunk.chunk_size, 0)
+                self.terrain_nodes[chunk_id] = node_path
+        
+        except Exception as e:
+            logger.error(f"Ошибка обновления мешей ландшафта: {e}")
+    
     def _load_materials(self) -> bool:
         """Загрузка материалов"""
         try:
@@ -746,6 +870,9 @@ class RenderSystem(BaseComponent):
                     angle_y = math.pi / 4  # Фиксированный угол
                     self.orbit_camera(camera_id, angle_x, angle_y)
             
+            # Подключаем готовые меши ландшафта
+            self._process_terrain_meshes()
+            
             # Обновляем Panda3D
             if hasattr(self, 'showbase'):
                 self.showbase.graphicsEngine.renderFrame()
@@ -2121,6 +2248,17 @@ class RenderSystem(BaseComponent):
             for light in self.lights.values():
                 light.removeNode()
             
+            # Очистка мешей ландшафта
+            with self._terrain_lock:
+                for _, future in self._pending_terrain.values():
+                    future.cancel()
+                self._pending_terrain.clear()
+                self._removed_terrain.clear()
+            for node_path in self.terrain_nodes.values():
+                node_path.removeNode()
+            self.terrain_nodes.clear()
+            self.terrain_mesher.shutdown()
+            
             # Очистка данных
             self.cameras.clear()
             self.camera_settings.clear()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Построение мешей ландшафта из карт высот
+Вершинные и индексные буферы заполняются массивами NumPy прямо в памяти
+Panda3D через buffer protocol, без построчной записи GeomVertexWriter"""
+
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+
+# Panda3D нужен только для создания узлов сцены
+try:
+    from panda3d.core import (
+        Geom, GeomEnums, GeomNode, GeomTriangles, GeomVertexArrayFormat,
+        GeomVertexData, GeomVertexFormat, InternalName
+    )
+    PANDA3D_AVAILABLE = True
+except ImportError:
+    PANDA3D_AVAILABLE = False
+    logging.info("Panda3D недоступен - меши ландшафта строятся только как массивы NumPy")
+
+logger = logging.getLogger(__name__)
+
+# Раскладка вершины: позиция, нормаль (float32) и цвет (RGBA uint8) в одном массиве
+TERRAIN_VERTEX_DTYPE = np.dtype([
+    ("vertex", "<f4", (3,)),
+    ("normal", "<f4", (3,)),
+    ("color", "u1", (4,)),
+])
+
+# Цвета биомов по значению метки (TerrainType.value или имя биома)
+DEFAULT_BIOME_COLORS: Dict[str, Tuple[int, int, int, int]] = {
+    "water": (40, 90, 170, 255),
+    "beach": (220, 205, 150, 255),
+    "grassland": (110, 170, 70, 255),
+    "forest": (40, 115, 50, 255),
+    "hills": (125, 140, 80, 255),
+    "mountains": (125, 115, 105, 255),
+    "snow": (240, 245, 250, 255),
+    "desert": (225, 190, 120, 255),
+}
+UNKNOWN_BIOME_COLOR: Tuple[int, int, int, int] = (160, 160, 160, 255)
+
+# = ДАТАКЛАССЫ
+@dataclass
+class TerrainMeshSettings:
+    """Настройки построения мешей"""
+    vertical_scale: float = 0.01  # Перевод высот генератора в единицы сцены
+    biome_colors: Dict[str, Tuple[int, int, int, int]] = field(
+        default_factory=lambda: dict(DEFAULT_BIOME_COLORS)
+    )
+    worker_threads: int = 1
+
+# = ЧИСТАЯ ЧАСТЬ НА NUMPY
+def build_terrain_indices(resolution: int) -> np.ndarray:
+    """Индексы треугольников регулярной сетки resolution x resolution"""
+    cells = resolution - 1
+    rows, cols = np.meshgrid(np.arange(cells), np.arange(cells), indexing="ij")
+    top_left = (rows * resolution + cols).ravel()
+    top_right = top_left + 1
+    bottom_left = top_left + resolution
+    bottom_right = bottom_left + 1
+
+    dtype = np.uint16 if resolution * resolution <= 0xFFFF else np.uint32
+    indices = np.empty((top_left.size, 6), dtype=dtype)
+    # Обход против часовой стрелки при взгляде сверху (ось Z вверх)
+    indices[:, 0] = top_left
+    indices[:, 1] = top_right
+    indices[:, 2] = bottom_left
+    indices[:, 3] = top_right
+    indices[:, 4] = bottom_right
+    indices[:, 5] = bottom_left
+    return indices.ravel()
+
+def fill_terrain_vertices(target: np.ndarray, height_map: np.ndarray, biome_map: np.ndarray,
+                          chunk_size: float, palette: np.ndarray, vertical_scale: float) -> np.ndarray:
+    """Заполнение массива вершин (dtype TERRAIN_VERTEX_DTYPE) по картам чанка
+
+    Координаты локальные: чанк занимает [0, chunk_size] по X и Y, строки
+    карты идут вдоль Y. Нормали считаются центральными разностями; вдоль
+    оси из одного узла (самый грубый LOD) уклон считается нулевым."""
+    rows, cols = height_map.shape
+    step_y = chunk_size / max(rows - 1, 1)
+    step_x = chunk_size / max(cols - 1, 1)
+    heights = np.asarray(height_map, dtype=np.float32) * np.float32(vertical_scale)
+
+    grid = target.reshape(rows, cols)
+    vertices = grid["vertex"]
+    vertices[..., 0] = (np.arange(cols, dtype=np.float32) * step_x)[None, :]
+    vertices[..., 1] = (np.arange(rows, dtype=np.float32) * step_y)[:, None]
+    vertices[..., 2] = heights
+
+    slope_y = np.gradient(heights, step_y, axis=0) if rows > 1 else np.zeros_like(heights)
+    slope_x = np.gradient(heights, step_x, axis=1) if cols > 1 else np.zeros_like(heights)
+    normals = grid["normal"]
+    normals[..., 0] = -slope_x
+    normals[..., 1] = -slope_y
+    normals[..., 2] = 1.0
+    normals /= np.sqrt(np.einsum("...i,...i->...", normals, normals))[..., None]
+
+    codes = np.clip(np.asarray(biome_map, dtype=np.intp), 0, len(palette) - 1)
+    grid["color"] = palette[codes]
+    return target
+
+# = ПОСТРОИТЕЛЬ МЕШЕЙ
+class TerrainMesher:
+    """Построитель мешей ландшафта для чанков мира
+
+    Один индексный буфер разделяется всеми чанками одного разрешения,
+    поэтому на чанк создаются только вершинные данные. Построение
+    потокобезопасно; узел подключается к сцене в основном потоке."""
+
+    def __init__(self, settings: Optional[TerrainMeshSettings] = None,
+                 biome_labels: Optional[List[Any]] = None):
+        self.settings = settings or TerrainMeshSettings()
+        self.palette = self._build_palette(biome_labels or list(DEFAULT_BIOME_COLORS))
+
+        self._index_arrays: Dict[int, np.ndarray] = {}
+        self._primitives: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+        self._vertex_format = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+        self.stats = {
+            "meshes_built": 0,
+            "build_time": 0.0,
+            "shared_index_buffers": 0
+        }
+
+    # Палитра
+    def set_biome_labels(self, biome_labels: List[Any]):
+        """Обновление палитры под коды биомов классификатора"""
+        self.palette = self._build_palette(biome_labels)
+
+    def _build_palette(self, biome_labels: List[Any]) -> np.ndarray:
+        palette = np.empty((max(len(biome_labels), 1), 4), dtype=np.uint8)
+        palette[:] = UNKNOWN_BIOME_COLOR
+        for code, label in enumerate(biome_labels):
+            key = getattr(label, "value", label)
+            palette[code] = self.settings.biome_colors.get(str(key), UNKNOWN_BIOME_COLOR)
+        return palette
+
+    # Буферы
+    def get_index_array(self, resolution: int) -> np.ndarray:
+        """Общий массив индексов для разрешения"""
+        with self._lock:
+            indices = self._index_arrays.get(resolution)
+            if indices is None:
+                indices = build_terrain_indices(resolution)
+                self._index_arrays[resolution] = indices
+            return indices
+
+    def build_vertex_array(self, height_map: np.ndarray, biome_map: np.ndarray,
+                           chunk_size: float) -> np.ndarray:
+        """Вершины чанка в виде массива NumPy (без Panda3D)"""
+        target = np.empty(height_map.size, dtype=TERRAIN_VERTEX_DTYPE)
+        return fill_terrain_vertices(target, height_map, biome_map, chunk_size,
+                                     self.palette, self.settings.vertical_scale)
+
+    def _get_vertex_format(self):
+        if self._vertex_format is None:
+            array_format = GeomVertexArrayFormat()
+            array_format.addColumn(InternalName.getVertex(), 3, GeomEnums.NT_float32, GeomEnums.C_point)
+            array_format.addColumn(InternalName.getNormal(), 3, GeomEnums.NT_float32, GeomEnums.C_normal)
+            array_format.addColumn(InternalName.getColor(), 4, GeomEnums.NT_uint8, GeomEnums.C_color)
+            if array_format.getStride() != TERRAIN_VERTEX_DTYPE.itemsize:
+                raise RuntimeError("Раскладка вершин Panda3D не совпадает с TERRAIN_VERTEX_DTYPE")
+            self._vertex_format = GeomVertexFormat.registerFormat(array_format)
+        return self._vertex_format
+
+    def _get_primitive(self, resolution: int):
+        """Общий GeomTriangles для разрешения"""
+        indices = self.get_index_array(resolution)
+        with self._lock:
+            primitive = self._primitives.get(resolution)
+            if primitive is None:
+                primitive = GeomTriangles(Geom.UHStatic)
+                primitive.setIndexType(GeomEnums.NT_uint16 if indices.dtype == np.uint16
+                                       else GeomEnums.NT_uint32)
+                index_data = primitive.modifyVertices()
+                index_data.uncleanSetNumRows(indices.size)
+                np.frombuffer(memoryview(index_data).cast("B"), dtype=indices.dtype)[:] = indices
+                self._primitives[resolution] = primitive
+                self.stats["shared_index_buffers"] = len(self._primitives)
+            return primitive
+
+    # Построение
+    def build_mesh(self, height_map: np.ndarray, biome_map: np.ndarray,
+                   chunk_size: float, name: str = "terrain"):
+        """Построение GeomNode чанка
+
+        Вершины вычисляются сразу в буфере GeomVertexArrayData."""
+        if not PANDA3D_AVAILABLE:
+            raise RuntimeError("Panda3D недоступен")
+
+        try:
+            start_time = time.time()
+            rows, cols = height_map.shape
+            if rows != cols:
+                raise ValueError(f"Ожидается квадратная карта высот, получено {height_map.shape}")
+
+            vertex_data = GeomVertexData(name, self._get_vertex_format(), Geom.UHStatic)
+            vertex_data.uncleanSetNumRows(rows * cols)
+            buffer = memoryview(vertex_data.modifyArray(0)).cast("B")
+            fill_terrain_vertices(np.frombuffer(buffer, dtype=TERRAIN_VERTEX_DTYPE),
+                                  height_map, biome_map, chunk_size,
+                                  self.palette, self.settings.vertical_scale)
+            del buffer
+
+            geom = Geom(vertex_data)
+            geom.addPrimitive(self._get_primitive(rows))
+            node = GeomNode(name)
+            node.addGeom(geom)
+
+            self.stats["meshes_built"] += 1
+            self.stats["build_time"] += time.time() - start_time
+            return node
+
+        except Exception as e:
+            logger.error(f"Ошибка построения меша ландшафта {name}: {e}")
+            raise
+
+    def build_chunk_mesh(self, chunk) -> Any:
+        """Построение меша для WorldChunk"""
+        return self.build_mesh(chunk.height_map, chunk.biome_map, chunk.chunk_size,
+                               name=f"terrain_{chunk.chunk_id}")
+
+    def build_chunk_mesh_async(self, chunk) -> Future:
+        """Построение меша в рабочем потоке; Future разрешается в GeomNode"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.settings.worker_threads,
+                                               thread_name_prefix="terrain_mesher")
+        return self.executor.submit(self.build_chunk_mesh, chunk)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики построителя"""
+        return {
+            **self.stats,
+            "average_build_time": self.stats["build_time"] / max(1, self.stats["meshes_built"])
+        }
+
+    def shutdown(self):
+        """Остановка рабочих потоков и освобождение общих буферов"""
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        with self._lock:
+            self._primitives.clear()
+            self._index_arrays.clear()
@@ -11,6 +11,7 @@ import time
 import math
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.generation_cache import BoundedCache
 
 # = БАЗОВЫЕ ТИПЫ
 class GeneratorType(Enum):
@@ -63,8 +64,9 @@ class BaseGenerator(BaseComponent):
         if self.settings.seed:
             self.rng.seed(self.settings.seed)
         
-        # Кэш и статистика
-        self.generation_cache: Dict[str, Any] = {}
+        # Кэш (LRU в общем бюджете памяти) и статистика
+        self.generation_cache = BoundedCache(f"{generator_type.value}.generation",
+                                             max_entries=self.settings.max_cache_size)
         self.generation_stats = {
             "total_generations": 0,
             "cache_hits": 0,
@@ -100,6 +102,7 @@ class BaseGenerator(BaseComponent):
     def _initialize_cache(self):
         """Инициализация кэша"""
         self.generation_cache.clear()
+        self.generation_cache.max_entries = self.settings.max_cache_size
         self.logger.info("Кэш генератора инициализирован")
     
     def _initialize_generator(self) -> bool:
@@ -115,11 +118,12 @@ class BaseGenerator(BaseComponent):
             cache_key = self._create_cache_key(parameters)
             
             # Проверка кэша
-            if self.settings.enable_caching and cache_key in self.generation_cache:
-                self.generation_stats["cache_hits"] += 1
-                result = self.generation_cache[cache_key]
-                self.logger.debug(f"Кэш-хит для {cache_key}")
-                return result
+            if self.settings.enable_caching:
+                result = self.generation_cache.get(cache_key)
+                if result is not None:
+                    self.generation_stats["cache_hits"] += 1
+                    self.logger.debug(f"Кэш-хит для {cache_key}")
+                    return result
             
             # Генерация нового контента
             self.generation_stats["cache_misses"] += 1
@@ -159,17 +163,8 @@ class BaseGenerator(BaseComponent):
         raise NotImplementedError("Метод _generate_content должен быть переопределен")
     
     def _add_to_cache(self, key: str, content: Any):
-        """Добавление в кэш"""
-        if len(self.generation_cache) >= self.settings.max_cache_size:
-            # Удаление старых записей
-            oldest_key = min(self.generation_cache.keys(), 
-                           key=lambda k: self.generation_cache[k].get('timestamp', 0))
-            del self.generation_cache[oldest_key]
-        
-        self.generation_cache[key] = {
-            'content': content,
-            'timestamp': time.time()
-        }
+        """Добавление в кэш (вытеснение LRU за O(1))"""
+        self.generation_cache.put(key, content)
     
     def clear_cache(self):
         """Очистка кэша"""
@@ -181,6 +176,8 @@ class BaseGenerator(BaseComponent):
         return {
             "cache_size": len(self.generation_cache),
             "max_cache_size": self.settings.max_cache_size,
+            "cache_memory_mb": self.generation_cache.size_bytes / (1024 * 1024),
+            "cache_evictions": self.generation_cache.stats["evictions"],
             "cache_hits": self.generation_stats["cache_hits"],
             "cache_misses": self.generation_stats["cache_misses"],
             "hit_rate": (self.generation_stats["cache_hits"] / 
@@ -230,7 +227,7 @@ class BaseGenerator(BaseComponent):
     
     def _on_destroy(self):
         """Уничтожение базового генератора"""
-        self.generation_cache.clear()
+        self.generation_cache.close()
         self.generation_callbacks.clear()
         self.error_callbacks.clear()
         
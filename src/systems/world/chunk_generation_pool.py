@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Пул процессов для генерации ландшафта чанков
+Генерация высот и биомов выполняется вне GIL основного процесса,
+массивы возвращаются через multiprocessing.shared_memory без pickle"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+import logging
+import multiprocessing
+import random
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from src.systems.world.height_map_generator import (
+    HeightMapGenerator, HeightMapSettings, BiomeSettings, ErosionSettings, BiomeLookupTable
+)
+
+logger = logging.getLogger(__name__)
+
+# Порядок массивов в блоке разделяемой памяти
+TERRAIN_LAYERS: Tuple[str, ...] = ("height_map", "biome_map", "temperature_map", "humidity_map")
+
+# = ДЕТЕРМИНИРОВАННЫЕ СИДЫ
+def derive_chunk_seed(world_seed: int, chunk_x: int, chunk_y: int) -> int:
+    """Сид чанка, не зависящий от порядка генерации и процесса"""
+    packed = struct.pack("<qqq", world_seed, chunk_x, chunk_y)
+    return zlib.crc32(packed, world_seed & 0xFFFFFFFF)
+
+def seed_generator_for_chunk(generator: HeightMapGenerator, world_seed: int,
+                             chunk_x: int, chunk_y: int) -> int:
+    """Сброс случайного состояния генератора на сид чанка"""
+    seed = derive_chunk_seed(world_seed, chunk_x, chunk_y)
+    generator.seed = seed
+    generator.random_generator = random.Random(seed)
+    random.seed(seed)
+    np.random.seed(seed)
+    return seed
+
+# = ДАТАКЛАССЫ
+@dataclass
+class ChunkTerrain:
+    """Сгенерированный ландшафт чанка"""
+    chunk_x: int
+    chunk_y: int
+    chunk_size: int
+    seed: int
+    height_map: np.ndarray
+    biome_map: np.ndarray
+    temperature_map: np.ndarray
+    humidity_map: np.ndarray
+    lod: int = 0
+    generation_time: float = 0.0
+
+@dataclass
+class ChunkPoolSettings:
+    """Настройки пула генерации"""
+    world_seed: int
+    workers: int = 4
+    start_method: str = "spawn"
+    height_settings: HeightMapSettings = field(default_factory=HeightMapSettings)
+    biome_settings: BiomeSettings = field(default_factory=BiomeSettings)
+    erosion_settings: ErosionSettings = field(default_factory=ErosionSettings)
+    biome_table: Optional[BiomeLookupTable] = None
+
+# = КОД РАБОЧЕГО ПРОЦЕССА
+_worker_generator: Optional[HeightMapGenerator] = None
+_worker_world_seed: int = 0
+
+def _initialize_worker(settings: ChunkPoolSettings):
+    """Создание генератора высот в рабочем процессе"""
+    global _worker_generator, _worker_world_seed
+
+    generator = HeightMapGenerator()
+    generator.settings = settings.height_settings
+    generator.biome_settings = settings.biome_settings
+    generator.erosion_settings = settings.erosion_settings
+    generator.biome_classifier.settings = settings.height_settings
+    generator.biome_classifier.set_lookup_table(settings.biome_table)
+    generator.initialize()
+    generator.set_noise_seed(settings.world_seed)
+
+    _worker_generator = generator
+    _worker_world_seed = settings.world_seed
+
+def _generate_in_worker(chunk_x: int, chunk_y: int, chunk_size: int, lod: int = 0) -> Dict[str, Any]:
+    """Генерация чанка и запись массивов в разделяемую память"""
+    start_time = time.time()
+    generator = _worker_generator
+
+    # Состояние генератора зависит только от сида чанка
+    seed = seed_generator_for_chunk(generator, _worker_world_seed, chunk_x, chunk_y)
+
+    try:
+        height_map = generator.generate_height_map(chunk_x, chunk_y, chunk_size, lod)
+        biome_map = generator.generate_biome_map(height_map, chunk_x, chunk_y, chunk_size)
+        rows, cols = height_map.shape
+        layers = {
+            "height_map": height_map,
+            "biome_map": biome_map,
+            "temperature_map": generator._generate_temperature_map(chunk_x, chunk_y, rows, cols, chunk_size),
+            "humidity_map": generator._generate_humidity_map(chunk_x, chunk_y, rows, cols, chunk_size),
+        }
+    finally:
+        # Рабочий процесс не держит кэш: результат живет в основном процессе
+        generator.clear_cache()
+
+    arrays = [np.ascontiguousarray(layers[name]) for name in TERRAIN_LAYERS]
+    total_size = sum(array.nbytes for array in arrays)
+    block = shared_memory.SharedMemory(create=True, size=max(total_size, 1))
+
+    layout = []
+    offset = 0
+    for name, array in zip(TERRAIN_LAYERS, arrays):
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, offset=offset)
+        target[...] = array
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += array.nbytes
+    del target
+    block.close()
+
+    return {
+        "chunk_x": chunk_x,
+        "chunk_y": chunk_y,
+        "chunk_size": chunk_size,
+        "lod": lod,
+        "seed": seed,
+        "shm_name": block.name,
+        "layout": layout,
+        "generation_time": time.time() - start_time,
+    }
+
+def _read_terrain(descriptor: Dict[str, Any]) -> ChunkTerrain:
+    """Чтение массивов из разделяемой памяти с освобождением блока"""
+    block = shared_memory.SharedMemory(name=descriptor["shm_name"])
+    try:
+        layers = {}
+        for name, dtype, shape, offset in descriptor["layout"]:
+            view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+            layers[name] = view.copy()
+            del view
+    finally:
+        block.close()
+        block.unlink()
+
+    return ChunkTerrain(
+        chunk_x=descriptor["chunk_x"],
+        chunk_y=descriptor["chunk_y"],
+        chunk_size=descriptor["chunk_size"],
+        seed=descriptor["seed"],
+        lod=descriptor["lod"],
+        generation_time=descriptor["generation_time"],
+        **layers
+    )
+
+# = ПУЛ ГЕНЕРАЦИИ
+class ChunkGenerationPool:
+    """Пул процессов для генерации ландшафта чанков"""
+
+    def __init__(self, settings: ChunkPoolSettings):
+        self.settings = settings
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "worker_time": 0.0
+        }
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> bool:
+        """Запуск рабочих процессов"""
+        try:
+            context = multiprocessing.get_context(self.settings.start_method)
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.settings.workers,
+                mp_context=context,
+                initializer=_initialize_worker,
+                initargs=(self.settings,)
+            )
+            self.logger.info(f"Пул генерации чанков запущен: {self.settings.workers} процессов")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка запуска пула генерации чанков: {e}")
+            self.executor = None
+            return False
+
+    def submit(self, chunk_x: int, chunk_y: int, chunk_size: int, lod: int = 0) -> Future:
+        """Постановка чанка в очередь генерации
+
+        Возвращаемый Future разрешается в ChunkTerrain в основном процессе."""
+        result: Future = Future()
+        if self.executor is None:
+            result.set_exception(RuntimeError("Пул генерации чанков не запущен"))
+            return result
+
+        self.stats["submitted"] += 1
+        worker_future = self.executor.submit(_generate_in_worker, chunk_x, chunk_y, chunk_size, lod)
+        worker_future.add_done_callback(lambda f: self._resolve(f, result))
+        return result
+
+    def _resolve(self, worker_future: Future, result: Future):
+        """Перенос результата рабочего процесса в Future вызывающего"""
+        try:
+            terrain = _read_terrain(worker_future.result())
+            self.stats["completed"] += 1
+            self.stats["worker_time"] += terrain.generation_time
+            result.set_result(terrain)
+
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.logger.error(f"Ошибка генерации чанка в пуле процессов: {e}")
+            result.set_exception(e)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики пула"""
+        return {
+            **self.stats,
+            "workers": self.settings.workers,
+            "average_worker_time": self.stats["worker_time"] / max(1, self.stats["completed"])
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Остановка рабочих процессов"""
+        if self.executor:
+            self.executor.shutdown(wait=wait, cancel_futures=not wait)
+            self.executor = None
+            self.logger.info("Пул генерации чанков остановлен")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Постоянное хранилище чанков на диске
+Массивы ландшафта хранятся в формате, пригодном для memory-map,
+поэтому повторно посещенные области загружаются почти без затрат CPU"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+import json
+import logging
+import os
+import struct
+import threading
+
+import numpy as np
+
+# = ФОРМАТ ФАЙЛА
+# [magic 4 байта][версия формата uint16][длина заголовка uint32][JSON заголовок][данные]
+# Данные начинаются с границы DATA_ALIGNMENT после заголовка, смещения слоев
+# в заголовке отсчитываются от начала данных и тоже выровнены
+STORE_MAGIC = b"WCHK"
+STORE_FORMAT_VERSION = 1
+DATA_ALIGNMENT = 64
+_PREFIX = struct.Struct("<4sHI")
+
+STORED_LAYERS: Tuple[str, ...] = ("height_map", "biome_map", "temperature_map", "humidity_map")
+
+# = ДАТАКЛАССЫ
+@dataclass
+class StoredChunk:
+    """Чанк, загруженный из хранилища"""
+    chunk_x: int
+    chunk_y: int
+    layers: Dict[str, np.ndarray] = field(default_factory=dict)
+    structures: List[Dict[str, Any]] = field(default_factory=list)
+
+# = ХРАНИЛИЩЕ
+class ChunkStore:
+    """Хранилище чанков по ключу (world_seed, chunk_x, chunk_y, версия генератора)
+
+    Файл ландшафта (.terrain) записывается один раз и далее только
+    отображается в память. Метаданные структур лежат рядом в .json и
+    могут перезаписываться, пока файл ландшафта открыт. Файл метаданных
+    служит записью индекса: он заменяется последним, и чанк без него
+    считается отсутствующим. Оба файла пишутся во временный файл и
+    атомарно переименовываются через os.replace."""
+
+    def __init__(self, root: str, world_seed: int, generator_version: str):
+        self.root = Path(root)
+        self.world_seed = world_seed
+        self.generator_version = generator_version
+        self.directory = self.root / f"seed_{world_seed}" / f"gen_{generator_version}"
+        self.write_lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "errors": 0
+        }
+        self.logger = logging.getLogger(__name__)
+
+    def _terrain_path(self, chunk_x: int, chunk_y: int) -> Path:
+        return self.directory / f"{chunk_x}_{chunk_y}.terrain"
+
+    def _metadata_path(self, chunk_x: int, chunk_y: int) -> Path:
+        return self.directory / f"{chunk_x}_{chunk_y}.json"
+
+    def contains(self, chunk_x: int, chunk_y: int) -> bool:
+        """Проверка наличия чанка в хранилище"""
+        return (self._metadata_path(chunk_x, chunk_y).exists()
+                and self._terrain_path(chunk_x, chunk_y).exists())
+
+    def load(self, chunk_x: int, chunk_y: int) -> Optional[StoredChunk]:
+        """Загрузка чанка с отображением массивов в память"""
+        path = self._terrain_path(chunk_x, chunk_y)
+        metadata_path = self._metadata_path(chunk_x, chunk_y)
+        if not metadata_path.exists() or not path.exists():
+            self.stats["misses"] += 1
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                magic, version, header_size = _PREFIX.unpack(f.read(_PREFIX.size))
+                if magic != STORE_MAGIC or version != STORE_FORMAT_VERSION:
+                    raise ValueError(f"Неподдерживаемый формат файла чанка: {magic!r} v{version}")
+                header = json.loads(f.read(header_size).decode("utf-8"))
+            data_start = _align(_PREFIX.size + header_size)
+
+            stored = StoredChunk(chunk_x=chunk_x, chunk_y=chunk_y)
+            for layer in header["layers"]:
+                stored.layers[layer["name"]] = np.memmap(
+                    path, dtype=np.dtype(layer["dtype"]), mode="r",
+                    offset=data_start + layer["offset"], shape=tuple(layer["shape"])
+                )
+
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                stored.structures = json.load(f).get("structures", [])
+
+            self.stats["hits"] += 1
+            return stored
+
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.logger.error(f"Ошибка загрузки чанка {chunk_x}, {chunk_y} из хранилища: {e}")
+            return None
+
+    def save_terrain(self, chunk_x: int, chunk_y: int, layers: Dict[str, np.ndarray]) -> bool:
+        """Запись массивов ландшафта (существующий файл не перезаписывается)"""
+        path = self._terrain_path(chunk_x, chunk_y)
+        if path.exists():
+            return True
+        temp_path = path.with_name(f"{path.name}.tmp{threading.get_ident()}")
+
+        try:
+            arrays = [(name, np.ascontiguousarray(layers[name]))
+                      for name in STORED_LAYERS if layers.get(name) is not None]
+
+            header = {"seed": self.world_seed, "generator_version": self.generator_version, "layers": []}
+            offset = 0
+            for name, array in arrays:
+                header["layers"].append({
+                    "name": name,
+                    "dtype": array.dtype.str,
+                    "shape": list(array.shape),
+                    "offset": offset
+                })
+                offset = _align(offset + array.nbytes)
+            header_bytes = json.dumps(header).encode("utf-8")
+            data_start = _align(_PREFIX.size + len(header_bytes))
+
+            with self.write_lock:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with open(temp_path, "wb") as f:
+                    f.write(_PREFIX.pack(STORE_MAGIC, STORE_FORMAT_VERSION, len(header_bytes)))
+                    f.write(header_bytes)
+                    for (name, array), layer in zip(arrays, header["layers"]):
+                        f.write(b"\0" * (data_start + layer["offset"] - f.tell()))
+                        f.write(array.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+                self.stats["writes"] += 1
+
+            return True
+
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.logger.error(f"Ошибка записи чанка {chunk_x}, {chunk_y} в хранилище: {e}")
+            _remove_quietly(temp_path)
+            return False
+
+    def save_metadata(self, chunk_x: int, chunk_y: int, structures: List[Dict[str, Any]]) -> bool:
+        """Запись метаданных структур чанка"""
+        path = self._metadata_path(chunk_x, chunk_y)
+        temp_path = path.with_name(f"{path.name}.tmp{threading.get_ident()}")
+        try:
+            with self.write_lock:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump({"structures": structures}, f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+            return True
+
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.logger.error(f"Ошибка записи метаданных чанка {chunk_x}, {chunk_y}: {e}")
+            _remove_quietly(temp_path)
+            return False
+
+    def save_chunk(self, chunk_x: int, chunk_y: int, layers: Optional[Dict[str, np.ndarray]],
+                   structures: List[Dict[str, Any]]) -> bool:
+        """Запись чанка: ландшафт, затем метаданные
+
+        Если ландшафт записать не удалось, метаданные не трогаются и
+        чанк остается отсутствующим в хранилище."""
+        if layers is not None and not self.save_terrain(chunk_x, chunk_y, layers):
+            return False
+        return self.save_metadata(chunk_x, chunk_y, structures)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики хранилища"""
+        return {
+            **self.stats,
+            "directory": str(self.directory),
+            "generator_version": self.generator_version
+        }
+
+def _remove_quietly(path: Path):
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+def _align(offset: int) -> int:
+    return (offset + DATA_ALIGNMENT - 1) // DATA_ALIGNMENT * DATA_ALIGNMENT
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Планировщик потоковой загрузки чанков
+Приоритет загрузки - прогнозируемое время до того, как чанк понадобится
+игроку, с учетом позиции и скорости движения"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple, Set, TYPE_CHECKING
+import heapq
+import logging
+import math
+import time
+
+if TYPE_CHECKING:
+    from src.systems.world.world_manager import WorldManager
+
+ChunkKey = Tuple[int, int]
+
+# = ДАТАКЛАССЫ
+@dataclass
+class StreamingSettings:
+    """Настройки потоковой загрузки"""
+    prefetch_time: float = 2.0             # Горизонт прогноза движения, секунды
+    unload_hysteresis: int = 2             # Запас в чанках сверх дальности обзора до выгрузки
+    max_requests_per_update: int = 4       # Запросов загрузки за обновление
+    max_unloads_per_update: int = 2        # Выгрузок за обновление
+    idle_approach_speed: float = 16.0      # Скорость сближения для неподвижного игрока, ед./с
+    unload_scan_interval: float = 1.0      # Период повторного сбора кандидатов на выгрузку, секунды
+
+@dataclass
+class StreamingStats:
+    """Статистика планировщика"""
+    requests_dispatched: int = 0
+    requests_cancelled: int = 0
+    prefetched: int = 0
+    unloads: int = 0
+    queue_size: int = 0
+
+# = ПЛАНИРОВЩИК
+class ChunkStreamScheduler:
+    """Планировщик загрузки и выгрузки чанков по позиции и скорости игрока
+
+    Очередь запросов - куча по прогнозируемому времени до необходимости.
+    Запросы, не подтвержденные последним обновлением, считаются
+    устаревшими и отбрасываются при извлечении. Выгрузка идет порциями
+    и только за пределами полосы гистерезиса; кандидаты собираются при
+    смене чанка игрока и повторно по таймеру, чтобы чанки, загруженные
+    упреждающе или без движения игрока, тоже выгружались. Чанки,
+    нужные последнему обновлению (обзор и прогноз), не выгружаются."""
+
+    def __init__(self, world: "WorldManager", settings: Optional[StreamingSettings] = None):
+        self.world = world
+        self.settings = settings or StreamingSettings()
+        self.stats = StreamingStats()
+
+        self._heap: List[Tuple[float, int, ChunkKey]] = []
+        self._requested: Dict[ChunkKey, int] = {}  # чанк -> поколение запроса
+        self._generation = 0
+        self._sequence = 0
+
+        self.view_chunks: Set[ChunkKey] = set()
+        self.wanted_chunks: Set[ChunkKey] = set()
+        self._player_chunk: Optional[ChunkKey] = None
+        self._unload_candidates: List[Tuple[float, ChunkKey]] = []
+        self._last_unload_scan = 0.0
+
+        self.logger = logging.getLogger(__name__)
+
+    # Планирование
+    def update(self, position: Tuple[float, float],
+               velocity: Tuple[float, float] = (0.0, 0.0)) -> Set[ChunkKey]:
+        """Пересчет приоритетов загрузки; возвращает чанки в зоне видимости"""
+        world_settings = self.world.settings
+        size = world_settings.chunk_size
+        view = world_settings.view_distance
+
+        player_chunk = (int(position[0] // size), int(position[1] // size))
+        self.view_chunks = self._square(player_chunk, view)
+
+        # Чанки вокруг прогнозируемой позиции загружаются заранее
+        predicted = (position[0] + velocity[0] * self.settings.prefetch_time,
+                     position[1] + velocity[1] * self.settings.prefetch_time)
+        predicted_chunk = (int(predicted[0] // size), int(predicted[1] // size))
+        wanted = self.view_chunks | self._square(predicted_chunk, view)
+        self.wanted_chunks = wanted
+
+        self._generation += 1
+        heap = []
+        for key in wanted:
+            if self.world.is_chunk_resident(*key):
+                continue
+            if key not in self.view_chunks and key not in self._requested:
+                self.stats.prefetched += 1
+            self._requested[key] = self._generation
+            self._sequence += 1
+            heap.append((self._time_to_need(key, position, velocity), self._sequence, key))
+
+        # Запросы вне новой области отменяются
+        stale = [key for key, generation in self._requested.items() if generation != self._generation]
+        for key in stale:
+            del self._requested[key]
+        self.stats.requests_cancelled += len(stale)
+
+        heapq.heapify(heap)
+        self._heap = heap
+        self.stats.queue_size = len(heap)
+
+        if player_chunk != self._player_chunk:
+            self._player_chunk = player_chunk
+            self._collect_unload_candidates(player_chunk, view + self.settings.unload_hysteresis)
+
+        return self.view_chunks
+
+    @property
+    def player_chunk(self) -> Optional[ChunkKey]:
+        """Чанк игрока на момент последнего обновления"""
+        return self._player_chunk
+
+    def _time_to_need(self, key: ChunkKey, position: Tuple[float, float],
+                      velocity: Tuple[float, float]) -> float:
+        """Прогнозируемое время до попадания чанка в зону видимости"""
+        size = self.world.settings.chunk_size
+        radius = (self.world.settings.view_distance + 0.5) * size
+
+        dx = (key[0] + 0.5) * size - position[0]
+        dy = (key[1] + 0.5) * size - position[1]
+        excess = max(abs(dx), abs(dy)) - radius
+        distance = math.hypot(dx, dy)
+        if excess <= 0:
+            # Уже нужен: ближние чанки раньше дальних
+            return distance / (size * 1e6)
+
+        approach = (velocity[0] * dx + velocity[1] * dy) / max(distance, 1e-6)
+        return excess / max(approach, self.settings.idle_approach_speed)
+
+    def dispatch(self) -> int:
+        """Отправка самых срочных запросов в менеджер мира"""
+        dispatched = 0
+        while self._heap and dispatched < self.settings.max_requests_per_update:
+            _, _, key = heapq.heappop(self._heap)
+            if self._requested.pop(key, None) is None:
+                continue  # Запрос отменен
+            if self.world.is_chunk_resident(*key):
+                continue
+            if self.world.load_chunk(key[0], key[1], priority=key in self.view_chunks) is not None:
+                dispatched += 1
+
+        self.stats.requests_dispatched += dispatched
+        self.stats.queue_size = len(self._heap)
+        return dispatched
+
+    # Выгрузка
+    def _collect_unload_candidates(self, center: ChunkKey, keep_radius: int):
+        """Сбор чанков за полосой гистерезиса, кроме нужных прогнозу"""
+        candidates = []
+        for chunk in list(self.world.chunks.values()):
+            distance = max(abs(chunk.chunk_x - center[0]), abs(chunk.chunk_y - center[1]))
+            if distance > keep_radius and (chunk.chunk_x, chunk.chunk_y) not in self.wanted_chunks:
+                candidates.append((-distance, (chunk.chunk_x, chunk.chunk_y)))
+        heapq.heapify(candidates)
+        self._unload_candidates = candidates
+        self._last_unload_scan = time.time()
+
+    def process_unloads(self) -> int:
+        """Порционная выгрузка дальних чанков"""
+        unloaded = 0
+        keep_radius = self.world.settings.view_distance + self.settings.unload_hysteresis
+        if self._player_chunk is not None and \
+                time.time() - self._last_unload_scan >= self.settings.unload_scan_interval:
+            self._collect_unload_candidates(self._player_chunk, keep_radius)
+        while self._unload_candidates and unloaded < self.settings.max_unloads_per_update:
+            _, key = heapq.heappop(self._unload_candidates)
+            if key in self.wanted_chunks:
+                continue
+            if self._player_chunk is not None and \
+                    max(abs(key[0] - self._player_chunk[0]), abs(key[1] - self._player_chunk[1])) <= keep_radius:
+                continue
+            if self.world.unload_chunk(*key):
+                unloaded += 1
+
+        self.stats.unloads += unloaded
+        return unloaded
+
+    def clear(self):
+        """Сброс очередей"""
+        self._heap.clear()
+        self._requested.clear()
+        self._unload_candidates.clear()
+        self.view_chunks.clear()
+        self.wanted_chunks.clear()
+        self._player_chunk = None
+        self._last_unload_scan = 0.0
+
+    @staticmethod
+    def _square(center: ChunkKey, radius: int) -> Set[ChunkKey]:
+        return {(center[0] + dx, center[1] + dy)
+                for dx in range(-radius, radius + 1)
+                for dy in range(-radius, radius + 1)}
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""Фоновая предгенерация подземелий, башен и поселений
+Контент рядом с игроком генерируется заранее в рабочих процессах с
+детерминированными сидами и ждет в ограниченном пуле готовых результатов,
+так что вход в локацию не останавливает кадр"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Any, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+import logging
+import multiprocessing
+import random
+import threading
+import zlib
+
+import numpy as np
+
+from src.systems.world.dungeon_generator import DungeonGenerator, DungeonType
+from src.systems.world.dungeon_serialization import GRID_ENCODING_RAW, decode_dungeon, encode_dungeon
+from src.systems.world.generation_cache import BoundedCache
+from src.systems.world.settlement_generator import SettlementGenerator, SettlementType
+from src.systems.world.spatial_index import SpatialGridIndex
+from src.systems.world.tower_system import TowerSystem, TowerType
+
+logger = logging.getLogger(__name__)
+
+# = ТИПЫ КОНТЕНТА
+class ContentKind(Enum):
+    """Виды предгенерируемого контента"""
+    DUNGEON = "dungeon"
+    TOWER = "tower"
+    SETTLEMENT = "settlement"
+
+# Перечисление подтипов для каждого вида контента
+CONTENT_TYPES: Dict[ContentKind, Any] = {
+    ContentKind.DUNGEON: DungeonType,
+    ContentKind.TOWER: TowerType,
+    ContentKind.SETTLEMENT: SettlementType,
+}
+
+# = ДЕТЕРМИНИРОВАННЫЕ СИДЫ
+def derive_content_seed(world_seed: int, kind: ContentKind, key: str) -> int:
+    """Сид локации, не зависящий от порядка и процесса генерации"""
+    return zlib.crc32(f"{kind.value}:{key}".encode("utf-8"), world_seed & 0xFFFFFFFF)
+
+def location_key(chunk_x: int, chunk_y: int, index: int) -> str:
+    """Ключ локации по чанку и номеру структуры в нем
+
+    Идентификаторы структур содержат время создания, поэтому ключ и сид
+    строятся только из координат чанка и порядкового номера."""
+    return f"{chunk_x}_{chunk_y}_{index}"
+
+# = ДАТАКЛАССЫ
+@dataclass
+class ContentRequest:
+    """Локация, контент которой можно сгенерировать заранее"""
+    key: str
+    kind: ContentKind
+    content_type: str
+    seed: int
+    position: Tuple[float, float] = (0.0, 0.0)
+    settings: Any = None
+
+@dataclass
+class PregenerationSettings:
+    """Настройки предгенерации"""
+    world_seed: int = 0
+    workers: int = 2
+    start_method: str = "spawn"
+    ready_pool_entries: int = 32
+    prediction_radius: float = 256.0  # Локации ближе этого расстояния генерируются заранее
+    max_in_flight: int = 4
+    location_cell_size: float = 128.0
+    acquire_timeout: float = 0.0  # Ожидание запущенной генерации при входе (0 - не ждать)
+
+# = ГЕНЕРАТОРЫ
+class ContentGenerators:
+    """Генераторы контента одного процесса"""
+
+    def __init__(self, dungeon_generator: Optional[DungeonGenerator] = None,
+                 tower_system: Optional[TowerSystem] = None,
+                 settlement_generator: Optional[SettlementGenerator] = None):
+        self.dungeon_generator = dungeon_generator or DungeonGenerator()
+        self.settlement_generator = settlement_generator or SettlementGenerator()
+        self.tower_system = tower_system
+        if self.tower_system is None:
+            # Шаблоны башен создаются только при инициализации системы
+            self.tower_system = TowerSystem()
+            self.tower_system.initialize()
+
+    def select_content_type(self, kind: ContentKind, seed: int) -> str:
+        """Подтип контента, выбранный по сиду локации среди поддерживаемых генератором"""
+        if kind == ContentKind.TOWER:
+            types = list(self.tower_system.tower_templates.keys())
+        else:
+            types = list(CONTENT_TYPES[kind])
+        return types[seed % len(types)].value
+
+    def generate(self, kind: ContentKind, content_type: str, seed: int, settings: Any = None) -> Any:
+        """Генерация контента; результат зависит только от сида"""
+        random.seed(seed)
+        np.random.seed(seed & 0xFFFFFFFF)
+
+        if kind == ContentKind.DUNGEON:
+            content = self.dungeon_generator.generate_dungeon(DungeonType(content_type), settings)
+        elif kind == ContentKind.TOWER:
+            content = self.tower_system.generate_tower(TowerType(content_type), world_seed=seed)
+        else:
+            content = self.settlement_generator.generate_settlement(SettlementType(content_type), settings)
+
+        if content is None:
+            raise RuntimeError(f"Генерация {kind.value} {content_type} не удалась")
+        return content
+
+    def release(self, kind: ContentKind, content: Any):
+        """Удаление результата из кэшей генераторов (рабочий процесс не хранит контент)"""
+        if kind == ContentKind.DUNGEON:
+            self.dungeon_generator.dungeon_cache.pop(content.dungeon_id)
+        elif kind == ContentKind.TOWER:
+            self.tower_system.generated_towers.pop(content.tower_id, None)
+        else:
+            self.settlement_generator.settlement_cache.pop(content.settlement_id)
+
+    def adopt(self, kind: ContentKind, content: Any):
+        """Регистрация готового контента в системах основного процесса"""
+        if kind == ContentKind.DUNGEON:
+            self.dungeon_generator.dungeon_cache[content.dungeon_id] = content
+        elif kind == ContentKind.TOWER:
+            self.tower_system.generated_towers[content.tower_id] = content
+        else:
+            self.settlement_generator.settlement_cache[content.settlement_id] = content
+
+# = КОД РАБОЧЕГО ПРОЦЕССА
+_worker_generators: Optional[ContentGenerators] = None
+
+def _initialize_worker():
+    """Создание генераторов в рабочем процессе"""
+    global _worker_generators
+    _worker_generators = ContentGenerators()
+
+def _generate_in_worker(kind_value: str, content_type: str, seed: int, settings: Any) -> Any:
+    """Генерация контента в рабочем процессе"""
+    kind = ContentKind(kind_value)
+    content = _worker_generators.generate(kind, content_type, seed, settings)
+    _worker_generators.release(kind, content)
+    if kind == ContentKind.DUNGEON:
+        # Подземелье уходит компактным буфером вместо pickle графа объектов
+        return encode_dungeon(content, GRID_ENCODING_RAW)
+    return content
+
+def _unpack_content(kind: ContentKind, payload: Any) -> Any:
+    """Восстановление контента, пришедшего из рабочего процесса"""
+    if kind == ContentKind.DUNGEON and isinstance(payload, (bytes, bytearray, memoryview)):
+        return decode_dungeon(payload, copy_grid=True)
+    return payload
+
+# = СЕРВИС ПРЕДГЕНЕРАЦИИ
+class ContentPregenerationService:
+    """Предсказание и фоновая генерация контента локаций
+
+    Локации регистрируются при появлении в загруженных чанках; update()
+    отправляет в пул процессов ближайшие к игроку, acquire() при входе
+    берет готовый результат из пула, а без него генерирует синхронно с тем
+    же сидом - результат совпадает с фоновым. Счетчики stats меняются
+    только под _lock: колбэки пула приходят из служебного потока."""
+
+    def __init__(self, settings: PregenerationSettings,
+                 dungeon_generator: Optional[DungeonGenerator] = None,
+                 tower_system: Optional[TowerSystem] = None,
+                 settlement_generator: Optional[SettlementGenerator] = None):
+        self.settings = settings
+        self.generators = ContentGenerators(dungeon_generator, tower_system, settlement_generator)
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+        self.locations: Dict[str, ContentRequest] = {}
+        self.location_index = SpatialGridIndex(settings.location_cell_size)
+        self.ready_pool = BoundedCache("world.pregenerated", max_entries=settings.ready_pool_entries)
+        self.pending: Dict[str, Future] = {}
+        self.adopted: Dict[str, Any] = {}  # key -> контент, уже зарегистрированный в системах
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "hits": 0,
+            "waited": 0,
+            "misses": 0
+        }
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> bool:
+        """Запуск рабочих процессов"""
+        try:
+            context = multiprocessing.get_context(self.settings.start_method)
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.settings.workers,
+                mp_context=context,
+                initializer=_initialize_worker
+            )
+            self.logger.info(f"Пул предгенерации контента запущен: {self.settings.workers} процессов")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка запуска пула предгенерации: {e}")
+            self.executor = None
+            return False
+
+    # Локации
+    def register_location(self, key: str, kind: ContentKind, position: Tuple[float, float],
+                          content_type: Optional[str] = None, settings: Any = None) -> ContentRequest:
+        """Регистрация локации; подтип по умолчанию выбирается по сиду"""
+        seed = derive_content_seed(self.settings.world_seed, kind, key)
+        request = ContentRequest(
+            key=key,
+            kind=kind,
+            content_type=content_type or self.generators.select_content_type(kind, seed),
+            seed=seed,
+            position=(float(position[0]), float(position[1])),
+            settings=settings
+        )
+
+        with self._lock:
+            self.locations[key] = request
+            self.location_index.insert(key, request.position[0], request.position[1], request)
+        return request
+
+    def unregister_location(self, key: str) -> bool:
+        """Удаление локации; еще не начатая генерация отменяется"""
+        with self._lock:
+            request = self.locations.pop(key, None)
+            self.location_index.remove(key)
+            future = self.pending.get(key)
+            if future is not None and future.cancel():
+                del self.pending[key]
+        return request is not None
+
+    # Предсказание
+    def update(self, position: Tuple[float, float]) -> int:
+        """Постановка в очередь ближайших к игроку локаций без готового контента
+
+        Возвращает число отправленных в пул запросов."""
+        if self.executor is None:
+            return 0
+
+        try:
+            x, y = float(position[0]), float(position[1])
+            candidates = self.location_index.query_radius(x, y, self.settings.prediction_radius)
+            candidates.sort(key=lambda request: (request.position[0] - x) ** 2 + (request.position[1] - y) ** 2)
+
+            submitted = 0
+            for request in candidates:
+                if len(self.pending) >= self.settings.max_in_flight:
+                    break
+                if self._submit(request):
+                    submitted += 1
+            return submitted
+
+        except Exception as e:
+            self.logger.error(f"Ошибка предсказания контента: {e}")
+            return 0
+
+    def prefetch(self, key: str) -> bool:
+        """Явная предгенерация локации (например, следующей башни)"""
+        request = self.locations.get(key)
+        if request is None or self.executor is None:
+            return False
+        return self._submit(request)
+
+    def _submit(self, request: ContentRequest) -> bool:
+        """Отправка локации в пул, если ее контент еще не готов и не генерируется"""
+        with self._lock:
+            if request.key in self.pending or request.key in self.ready_pool:
+                return False
+
+            future = self.executor.submit(
+                _generate_in_worker, request.kind.value, request.content_type, request.seed, request.settings
+            )
+            self.pending[request.key] = future
+            self.stats["submitted"] += 1
+
+        future.add_done_callback(lambda f, key=request.key: self._on_generated(key, f))
+        return True
+
+    def _on_generated(self, key: str, future: Future):
+        """Перенос результата рабочего процесса в пул готового контента"""
+        with self._lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+        if future.cancelled():
+            return
+
+        try:
+            payload = future.result()
+            request = self.locations.get(key)
+            # acquire мог уже забрать результат или сгенерировать его сам
+            if key not in self.ready_pool and request is not None:
+                self.ready_pool.put(key, _unpack_content(request.kind, payload))
+            self._count("completed")
+
+        except Exception as e:
+            self._count("failed")
+            self.logger.error(f"Ошибка предгенерации контента {key}: {e}")
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    # Вход в локацию
+    def is_ready(self, key: str) -> bool:
+        return key in self.ready_pool
+
+    def acquire(self, key: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """Контент локации: из пула готовых, из завершенной генерации или синхронно
+
+        Незавершенная фоновая генерация по умолчанию не ожидается: контент
+        с тем же сидом строится синхронно. Ожидание включается параметром
+        timeout или настройкой acquire_timeout."""
+        try:
+            request = self.locations.get(key)
+            content = self.ready_pool.get(key)
+            wait = self.settings.acquire_timeout if timeout is None else timeout
+
+            if content is not None:
+                self._count("hits")
+            else:
+                future = self.pending.get(key)
+                if future is not None and request is not None and (future.done() or wait > 0):
+                    try:
+                        payload = future.result(timeout=wait)
+                        content = self.ready_pool.get(key) or _unpack_content(request.kind, payload)
+                        self._count("waited")
+                    except Exception as e:
+                        self.logger.warning(f"Фоновая генерация {key} не дождалась: {e}")
+                        content = None
+                elif future is not None:
+                    future.cancel()  # Еще не начатая задача больше не нужна
+
+                if content is None:
+                    if request is None:
+                        return None
+                    content = self._generate_local(request)
+                    self._count("misses")
+                self.ready_pool.put(key, content)
+
+            if request is not None and self.adopted.get(key) is not content:
+                self.generators.adopt(request.kind, content)
+                self.adopted[key] = content
+            return content
+
+        except Exception as e:
+            self.logger.error(f"Ошибка получения контента {key}: {e}")
+            return None
+
+    def _generate_local(self, request: ContentRequest) -> Any:
+        """Синхронная генерация с тем же сидом без порчи глобального состояния random"""
+        random_state = random.getstate()
+        numpy_state = np.random.get_state()
+        try:
+            return self.generators.generate(request.kind, request.content_type, request.seed, request.settings)
+        finally:
+            random.setstate(random_state)
+            np.random.set_state(numpy_state)
+
+    # Обслуживание
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики предгенерации"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["waited"] + stats["misses"]
+        return {
+            **stats,
+            "locations": len(self.locations),
+            "pending": len(self.pending),
+            "ready": len(self.ready_pool),
+            "ready_memory_mb": self.ready_pool.size_bytes / (1024 * 1024),
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "workers": self.settings.workers if self.executor else 0
+        }
+
+    def clear(self):
+        """Сброс локаций и готового контента"""
+        with self._lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+            self.locations.clear()
+            self.location_index.clear()
+            self.adopted.clear()
+        self.ready_pool.clear()
+
+    def shutdown(self, wait: bool = True):
+        """Остановка рабочих процессов и освобождение пула"""
+        self.clear()
+        if self.executor:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
+            self.logger.info("Пул предгенерации контента остановлен")
+        self.ready_pool.close()
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """Система дня и ночи для игрового мира
-Включает реалистичный цикл дня и ночи, изменение освещения и поведение существ"""
+Включает реалистичный цикл дня и ночи, изменение освещения и поведение существ.
+Освещение берется из предрасчитанных таблиц по минутам суток и дням года"""
 
+from bisect import bisect_left
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Dict, List, Optional, Any, Tuple
@@ -10,6 +12,8 @@ import random
 import time
 import math
 
+import numpy as np
+
 from src.core.architecture import BaseComponent, ComponentType, Priority
 
 # = ТИПЫ ВРЕМЕНИ СУТОК
@@ -36,6 +40,10 @@ class MoonPhase(Enum):
     LAST_QUARTER = "last_quarter"        # Последняя четверть
     WANING_CRESCENT = "waning_crescent"  # Убывающий серп
 
+# Отсчетов таблицы освещения на игровой час и дней в году
+LIGHTING_SAMPLES_PER_HOUR = 60
+DAYS_PER_YEAR = 365
+
 # = НАСТРОЙКИ ЦИКЛА
 @dataclass
 class DayNightSettings:
@@ -85,6 +93,93 @@ class BehaviorModifier:
     value: float
     description: str
 
+# = ТАБЛИЦА ОСВЕЩЕНИЯ
+MOON_PHASES: Tuple[MoonPhase, ...] = tuple(MoonPhase)
+
+class LightingTable:
+    """Предрасчитанное освещение как функция (время суток, день года)
+    
+    Величины зависят либо только от времени суток, либо только от дня
+    года (плюс линейные углы), поэтому вместо таблицы минуты x дни
+    хранятся два набора столбцов: по минутам суток и по дням года.
+    
+    Свет и интенсивность солнца кусочно-линейны, но прыгают на рассвете
+    и закате, поэтому для каждого узла хранится значение в узле и
+    пределы справа и слева: внутри отрезка интерполяция идет от предела
+    справа до предела слева следующего узла. Ступенчатые величины (фаза
+    суток, луна, тени, туман, цвет) хранятся по точным границам ступеней:
+    значение в самой границе и на интервале до следующей."""
+    
+    MINUTE_COLUMNS = ("sun_light", "sun_intensity")
+    
+    # Столбцы массивов minute_columns: значение в узле, пределы справа и слева
+    AT_KNOT, RIGHT_LIMIT, LEFT_LIMIT = range(3)
+    
+    def __init__(self, key: Tuple[Any, ...], samples_per_hour: int,
+                 minute_columns: Dict[str, np.ndarray], step_edges: List[float],
+                 step_values: List[Tuple[Any, ...]], season_offset: np.ndarray,
+                 moon_phase_codes: np.ndarray, moon_illumination: np.ndarray, moon_speed: float):
+        self.key = key
+        self.samples_per_hour = samples_per_hour
+        self.columns = minute_columns
+        self.step_edges = step_edges
+        self.step_values = step_values
+        self.season_offset = season_offset
+        self.moon_phase_codes = moon_phase_codes
+        self.moon_illumination = moon_illumination
+        self.moon_speed = moon_speed
+        
+        # Поэлементное чтение из списков быстрее, чем из ndarray
+        self._sun_light = [column.tolist() for column in minute_columns["sun_light"].T]
+        self._sun_intensity = [column.tolist() for column in minute_columns["sun_intensity"].T]
+        self._season_offset = season_offset.tolist()
+        self._moon_phases = [MOON_PHASES[code] for code in moon_phase_codes.tolist()]
+        self._moon_illumination = moon_illumination.tolist()
+        self._last_sample = len(self._sun_light[self.AT_KNOT]) - 1
+    
+    @staticmethod
+    def _interpolate(column: List[List[float]], index: int, fraction: float) -> float:
+        if fraction == 0.0:
+            return column[LightingTable.AT_KNOT][index]
+        start = column[LightingTable.RIGHT_LIMIT][index]
+        return start + (column[LightingTable.LEFT_LIMIT][index + 1] - start) * fraction
+    
+    def steps_at(self, current_time: float) -> Tuple[Any, ...]:
+        """Ступенчатые величины: (фаза суток, доля луны, тени, туман, температура, цвет неба)"""
+        edge = bisect_left(self.step_edges, current_time)
+        if edge < len(self.step_edges) and self.step_edges[edge] == current_time:
+            return self.step_values[2 * edge + 1]
+        return self.step_values[2 * edge]
+    
+    def apply(self, time_data: TimeData, lighting: Optional[LightingData]):
+        """Запись значений для time_data.current_time/day_of_year на месте"""
+        current_time = time_data.current_time
+        day = min(max(time_data.day_of_year, 0), DAYS_PER_YEAR)
+        
+        position = current_time * self.samples_per_hour
+        index = min(max(int(position), 0), self._last_sample - 1)
+        fraction = position - index
+        sun_light = self._interpolate(self._sun_light, index, fraction)
+        sun_intensity = self._interpolate(self._sun_intensity, index, fraction)
+        time_of_day, moon_factor, shadow, fog, temperature, sky_color = self.steps_at(current_time)
+        
+        moon_illumination = self._moon_illumination[day]
+        time_data.time_of_day = time_of_day
+        time_data.moon_phase = self._moon_phases[day]
+        time_data.moon_illumination = moon_illumination
+        time_data.sun_angle = ((current_time / 24.0) * 360.0 + self._season_offset[day]) % 360.0
+        time_data.moon_angle = ((current_time / 24.0) * self.moon_speed + day * self.moon_speed) % 360.0
+        time_data.ambient_light = min(1.0, max(0.0, sun_light + moon_illumination * moon_factor))
+        time_data.sky_color = sky_color
+        
+        if lighting is not None:
+            lighting.sun_intensity = sun_intensity
+            lighting.moon_intensity = moon_illumination * moon_factor
+            lighting.ambient_intensity = time_data.ambient_light
+            lighting.shadow_strength = shadow
+            lighting.fog_density = fog
+            lighting.color_temperature = temperature
+
 # = СИСТЕМА ДНЯ И НОЧИ
 class DayNightCycle(BaseComponent):
     """Система дня и ночи"""
@@ -100,6 +195,7 @@ class DayNightCycle(BaseComponent):
         self.settings = DayNightSettings()
         self.current_time_data: Optional[TimeData] = None
         self.lighting_data: Optional[LightingData] = None
+        self.lighting_table: Optional[LightingTable] = None
         
         # Поведенческие модификаторы
         self.behavior_modifiers: Dict[str, List[BehaviorModifier]] = {}
@@ -117,6 +213,7 @@ class DayNightCycle(BaseComponent):
         self.time_changed_callbacks: List[callable] = []
         self.phase_changed_callbacks: List[callable] = []
         self.day_changed_callbacks: List[callable] = []
+        self.lighting_callbacks: List[callable] = []
         
         self.logger = logging.getLogger(__name__)
     
@@ -124,6 +221,7 @@ class DayNightCycle(BaseComponent):
         """Инициализация системы дня и ночи"""
         try:
             # Инициализация времени
+            self.lighting_table = self._build_lighting_table()
             self.current_time_data = self._create_initial_time()
             self.lighting_data = self._create_initial_lighting()
             
@@ -166,6 +264,98 @@ class DayNightCycle(BaseComponent):
             sky_color=sky_color
         )
     
+    def _lighting_table_key(self) -> Tuple[Any, ...]:
+        return tuple(vars(self.settings).values())
+    
+    def _build_lighting_table(self) -> LightingTable:
+        """Расчет таблицы освещения по формулам цикла
+        
+        Отсчеты берутся теми же функциями, что считают освещение
+        поточечно, так что таблица совпадает с ними и в узлах, и на
+        границах ступеней, и между ними."""
+        samples_per_hour = LIGHTING_SAMPLES_PER_HOUR
+        step = 1.0 / samples_per_hour
+        sample_times = np.arange(24 * samples_per_hour + 1) / samples_per_hour
+        
+        # Между узлами функции линейны, поэтому пределы на концах отрезка
+        # восстанавливаются по точкам на его четверти и трех четвертях
+        minute_functions = {
+            "sun_light": lambda current_time: self._calculate_ambient_light(current_time, 0.0),
+            "sun_intensity": self._calculate_sun_intensity
+        }
+        minute_columns = {}
+        for name in LightingTable.MINUTE_COLUMNS:
+            function = minute_functions[name]
+            values = np.array([function(t) for t in sample_times.tolist()], dtype=np.float64)
+            quarter = np.array([function(t) for t in (sample_times + step / 4).tolist()], dtype=np.float64)
+            three_quarters = np.array([function(t) for t in (sample_times + 3 * step / 4).tolist()],
+                                      dtype=np.float64)
+            
+            column = np.empty((len(values), 3), dtype=np.float64)
+            column[:, LightingTable.AT_KNOT] = values
+            column[:, LightingTable.RIGHT_LIMIT] = (3.0 * quarter - three_quarters) / 2.0
+            column[1:, LightingTable.LEFT_LIMIT] = (3.0 * three_quarters[:-1] - quarter[:-1]) / 2.0
+            column[0, LightingTable.LEFT_LIMIT] = values[0]
+            column[-1, LightingTable.RIGHT_LIMIT] = values[-1]
+            minute_columns[name] = column
+        
+        # Ступени: значение в каждой границе и в середине интервала перед ней
+        step_edges = self._lighting_step_edges()
+        step_values = []
+        previous_edge = step_edges[0] - 1.0
+        for edge in step_edges:
+            step_values.append(self._calculate_lighting_steps((previous_edge + edge) / 2.0))
+            step_values.append(self._calculate_lighting_steps(edge))
+            previous_edge = edge
+        step_values.append(self._calculate_lighting_steps(previous_edge + 0.5))
+        
+        moon_phase_index = {phase: code for code, phase in enumerate(MOON_PHASES)}
+        days = range(DAYS_PER_YEAR + 1)
+        moon_phases = [self._calculate_moon_phase(day) for day in days]
+        season_offset = np.array([self._calculate_sun_angle(0.0, day) for day in days], dtype=np.float64)
+        
+        return LightingTable(
+            key=self._lighting_table_key(),
+            samples_per_hour=samples_per_hour,
+            minute_columns=minute_columns,
+            step_edges=step_edges,
+            step_values=step_values,
+            season_offset=season_offset,
+            moon_phase_codes=np.array([moon_phase_index[phase] for phase in moon_phases], dtype=np.int8),
+            moon_illumination=np.array([self._calculate_moon_illumination(phase) for phase in moon_phases],
+                                       dtype=np.float64),
+            moon_speed=360.0 / self.settings.moon_cycle_days
+        )
+    
+    def _lighting_step_edges(self) -> List[float]:
+        """Часы, в которые меняется хотя бы одна ступенчатая величина"""
+        settings = self.settings
+        edges = {
+            0.0, 4.0, 6.0, 7.0, 8.0, 12.0, 14.0, 16.0, 17.0, 18.0, 22.0, 24.0,
+            settings.dawn_start_hour, settings.dawn_start_hour + settings.dawn_duration_hours,
+            settings.dusk_start_hour, settings.dusk_start_hour + settings.dusk_duration_hours,
+            settings.night_start_hour
+        }
+        return sorted(float(edge) for edge in edges)
+    
+    def _calculate_lighting_steps(self, current_time: float) -> Tuple[Any, ...]:
+        """Ступенчатые величины освещения в момент current_time"""
+        night = current_time < 6.0 or current_time > 18.0
+        return (
+            self._get_time_of_day(current_time),
+            0.3 if night else 0.0,
+            0.8 if night else 0.5,
+            0.3 if current_time < 7.0 or current_time > 17.0 else 0.0,
+            3000.0 if current_time < 8.0 or current_time > 16.0 else 5500.0,
+            self._calculate_sky_color(current_time, 0.0)
+        )
+    
+    def _get_lighting_table(self) -> LightingTable:
+        """Таблица освещения, перестроенная при изменении настроек"""
+        if self.lighting_table is None or self.lighting_table.key != self._lighting_table_key():
+            self.lighting_table = self._build_lighting_table()
+        return self.lighting_table
+    
     def _create_initial_lighting(self) -> LightingData:
         """Создание начального освещения"""
         return LightingData()
@@ -213,6 +403,7 @@ class DayNightCycle(BaseComponent):
             return
         
         old_time_data = self.current_time_data
+        old_time_of_day = self.current_time_data.time_of_day
         old_day = self.current_time_data.day_of_year
         
         # Обновление времени
@@ -234,7 +425,7 @@ class DayNightCycle(BaseComponent):
         self._update_time_data()
         
         # Проверка изменений
-        if self.current_time_data.time_of_day != old_time_data.time_of_day:
+        if self.current_time_data.time_of_day != old_time_of_day:
             self.cycle_stats["phase_changes"] += 1
             self._notify_time_changed(old_time_data, self.current_time_data)
         
@@ -248,39 +439,12 @@ class DayNightCycle(BaseComponent):
         self.cycle_stats["total_update_time"] += update_time
     
     def _update_time_data(self):
-        """Обновление данных времени"""
+        """Обновление данных времени и освещения чтением из таблицы"""
         if not self.current_time_data:
             return
         
-        # Обновление времени суток
-        self.current_time_data.time_of_day = self._get_time_of_day(self.current_time_data.current_time)
-        
-        # Обновление фазы луны
-        self.current_time_data.moon_phase = self._calculate_moon_phase(self.current_time_data.day_of_year)
-        self.current_time_data.moon_illumination = self._calculate_moon_illumination(self.current_time_data.moon_phase)
-        
-        # Обновление углов
-        self.current_time_data.sun_angle = self._calculate_sun_angle(
-            self.current_time_data.current_time, 
-            self.current_time_data.day_of_year
-        )
-        self.current_time_data.moon_angle = self._calculate_moon_angle(
-            self.current_time_data.current_time, 
-            self.current_time_data.day_of_year
-        )
-        
-        # Обновление освещения
-        self.current_time_data.ambient_light = self._calculate_ambient_light(
-            self.current_time_data.current_time, 
-            self.current_time_data.moon_illumination
-        )
-        self.current_time_data.sky_color = self._calculate_sky_color(
-            self.current_time_data.current_time, 
-            self.current_time_data.sun_angle
-        )
-        
-        # Обновление данных освещения
-        self._update_lighting_data()
+        self._get_lighting_table().apply(self.current_time_data, self.lighting_data)
+        self._notify_lighting_changed()
     
     def _get_time_of_day(self, current_time: float) -> TimeOfDay:
         """Определение времени суток"""
@@ -396,44 +560,12 @@ class DayNightCycle(BaseComponent):
                 # Глубокая ночь
                 return (0.05, 0.05, 0.1)  # Очень темный
     
-    def _update_lighting_data(self):
-        """Обновление данных освещения"""
-        if not self.current_time_data or not self.lighting_data:
-            return
-        
-        # Интенсивность солнца
-        if 6.0 <= self.current_time_data.current_time <= 18.0:
-            sun_factor = 1.0 - abs(self.current_time_data.current_time - 12.0) / 6.0
-            self.lighting_data.sun_intensity = max(0.1, sun_factor)
-        else:
-            self.lighting_data.sun_intensity = 0.0
-        
-        # Интенсивность луны
-        if self.current_time_data.current_time < 6.0 or self.current_time_data.current_time > 18.0:
-            self.lighting_data.moon_intensity = self.current_time_data.moon_illumination * 0.3
-        else:
-            self.lighting_data.moon_intensity = 0.0
-        
-        # Окружающее освещение
-        self.lighting_data.ambient_intensity = self.current_time_data.ambient_light
-        
-        # Сила теней
-        if self.current_time_data.current_time < 6.0 or self.current_time_data.current_time > 18.0:
-            self.lighting_data.shadow_strength = 0.8
-        else:
-            self.lighting_data.shadow_strength = 0.5
-        
-        # Плотность тумана
-        if self.current_time_data.current_time < 7.0 or self.current_time_data.current_time > 17.0:
-            self.lighting_data.fog_density = 0.3
-        else:
-            self.lighting_data.fog_density = 0.0
-        
-        # Цветовая температура
-        if self.current_time_data.current_time < 8.0 or self.current_time_data.current_time > 16.0:
-            self.lighting_data.color_temperature = 3000.0  # Теплый свет
-        else:
-            self.lighting_data.color_temperature = 5500.0  # Дневной свет
+    def _calculate_sun_intensity(self, current_time: float) -> float:
+        """Расчет интенсивности солнца"""
+        if 6.0 <= current_time <= 18.0:
+            sun_factor = 1.0 - abs(current_time - 12.0) / 6.0
+            return max(0.1, sun_factor)
+        return 0.0
     
     def get_current_time_data(self) -> Optional[TimeData]:
         """Получение текущих данных времени"""
@@ -489,6 +621,10 @@ class DayNightCycle(BaseComponent):
         """Добавление callback для смены дня"""
         self.day_changed_callbacks.append(callback)
     
+    def add_lighting_callback(self, callback: callable):
+        """Добавление callback освещения: callback(lighting_data, sky_color) после каждого обновления"""
+        self.lighting_callbacks.append(callback)
+    
     def _notify_time_changed(self, old_time_data: TimeData, new_time_data: TimeData):
         """Уведомление об изменении времени"""
         for callback in self.time_changed_callbacks:
@@ -497,6 +633,18 @@ class DayNightCycle(BaseComponent):
             except Exception as e:
                 self.logger.error(f"Ошибка в callback изменения времени: {e}")
     
+    def _notify_lighting_changed(self):
+        """Передача освещения подписчикам (например, RenderSystem)"""
+        if not self.lighting_callbacks or not self.lighting_data:
+            return
+        
+        sky_color = self.current_time_data.sky_color
+        for callback in self.lighting_callbacks:
+            try:
+                callback(self.lighting_data, sky_color)
+            except Exception as e:
+                self.logger.error(f"Ошибка в callback освещения: {e}")
+    
     def _notify_day_changed(self, old_day: int, new_day: int):
         """Уведомление о смене дня"""
         for callback in self.day_changed_callbacks:
@@ -534,5 +682,6 @@ class DayNightCycle(BaseComponent):
         self.time_changed_callbacks.clear()
         self.phase_changed_callbacks.clear()
         self.day_changed_callbacks.clear()
+        self.lighting_callbacks.clear()
         
         self.logger.info("DayNightCycle уничтожен")
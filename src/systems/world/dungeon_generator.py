@@ -6,11 +6,24 @@ from dataclasses import dataclass, field
 from enum import Enum
 from typing import Dict, List, Optional, Any, Tuple, Set
 import logging
+import itertools
 import random
 import time
 import math
 
+import numpy as np
+
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.generation_cache import BoundedCache
+from src.systems.world.grid_utils import free_window_positions
+
+# Значения клеток сетки подземелья
+CELL_EMPTY = 0
+CELL_ROOM = 1
+CELL_CORRIDOR = 2
+
+# Случайные попытки размещения комнаты до точного поиска по таблице сумм
+ROOM_PLACEMENT_ATTEMPTS = 32
 
 # = ТИПЫ ПОДЗЕМЕЛИЙ
 class DungeonType(Enum):
@@ -98,7 +111,7 @@ class GeneratedDungeon:
     settings: DungeonSettings
     rooms: Dict[str, Room] = field(default_factory=dict)
     corridors: Dict[str, Corridor] = field(default_factory=dict)
-    grid: List[List[int]] = field(default_factory=list)
+    grid: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.int8))
     entrance_room: str = ""
     exit_room: str = ""
     boss_room: str = ""
@@ -124,7 +137,7 @@ class DungeonGenerator(BaseComponent):
         self.room_templates: Dict[DungeonType, Dict[RoomType, Dict[str, Any]]] = {}
         
         # Кэш сгенерированных подземелий
-        self.dungeon_cache: Dict[str, GeneratedDungeon] = {}
+        self.dungeon_cache = BoundedCache("dungeon.generated", max_entries=64)
         
         # Статистика генерации
         self.generation_stats = {
@@ -247,13 +260,13 @@ class DungeonGenerator(BaseComponent):
             self._logger.error(f"Ошибка генерации подземелья {dungeon_type.value}: {e}")
             return None
     
-    def _create_empty_grid(self, width: int, height: int) -> List[List[int]]:
-        """Создание пустой сетки подземелья"""
+    def _create_empty_grid(self, width: int, height: int) -> np.ndarray:
+        """Создание пустой сетки подземелья (int8, индексация [y, x])"""
         try:
-            return [[0 for _ in range(width)] for _ in range(height)]
+            return np.zeros((height, width), dtype=np.int8)
         except Exception as e:
             self._logger.error(f"Ошибка создания сетки: {e}")
-            return []
+            return np.zeros((0, 0), dtype=np.int8)
     
     def _generate_rooms(self, dungeon: GeneratedDungeon):
         """Генерация комнат подземелья"""
@@ -272,7 +285,7 @@ class DungeonGenerator(BaseComponent):
                 room = self._create_room(dungeon, room_type, i)
                 
                 if room:
-                    dungeon.rooms[room.room_id] = entrance_room
+                    dungeon.rooms[room.room_id] = room
                     
                     # Определяем специальные комнаты
                     if room_type == RoomType.BOSS:
@@ -305,37 +318,60 @@ class DungeonGenerator(BaseComponent):
             height = random.randint(size_range[0], size_range[1])
             
             # Определяем позицию комнаты
-            max_x = settings.width - width
-            max_y = settings.height - height
+            position = self._find_room_position(dungeon, width, height)
+            if position is None:
+                return None
+            
+            x, y = position
+            room = Room(
+                room_id=f"room_{room_type.value}_{room_index}_{int(time.time() * 1000)}",
+                room_type=room_type,
+                x=x,
+                y=y,
+                width=width,
+                height=height
+            )
+            
+            # Размещаем комнату на сетке
+            self._place_room_on_grid(dungeon, room)
+            
+            return room
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка создания комнаты {room_type.value}: {e}")
+            return None
+    
+    def _find_room_position(self, dungeon: GeneratedDungeon, width: int,
+                            height: int) -> Optional[Tuple[int, int]]:
+        """Поиск свободной позиции для комнаты
+        
+        Сначала несколько случайных попыток со срезовой проверкой, затем
+        точный поиск по таблице сумм: если место есть, оно будет найдено."""
+        try:
+            grid_height, grid_width = dungeon.grid.shape
+            max_x = grid_width - width
+            max_y = grid_height - height
             
             if max_x <= 0 or max_y <= 0:
                 return None
             
-            # Пытаемся разместить комнату
-            for attempt in range(100):
+            for attempt in range(ROOM_PLACEMENT_ATTEMPTS):
                 x = random.randint(0, max_x)
                 y = random.randint(0, max_y)
                 
                 if self._can_place_room(dungeon, x, y, width, height):
-                    # Создаем комнату
-                    room = Room(
-                        room_id=f"room_{room_type.value}_{room_index}_{int(time.time() * 1000)}",
-                        room_type=room_type,
-                        x=x,
-                        y=y,
-                        width=width,
-                        height=height
-                    )
-                    
-                    # Размещаем комнату на сетке
-                    self._place_room_on_grid(dungeon, room)
-                    
-                    return room
+                    return x, y
             
-            return None
+            # Все свободные окна width x height по таблице сумм
+            free = free_window_positions(dungeon.grid, width, height, CELL_EMPTY)
+            if len(free) == 0:
+                return None
+            
+            x, y = free[random.randrange(len(free))]
+            return int(x), int(y)
             
         except Exception as e:
-            self._logger.error(f"Ошибка создания комнаты {room_type.value}: {e}")
+            self._logger.error(f"Ошибка поиска позиции комнаты: {e}")
             return None
     
     def _can_place_room(self, dungeon: GeneratedDungeon, x: int, y: int, 
@@ -343,16 +379,12 @@ class DungeonGenerator(BaseComponent):
         """Проверка возможности размещения комнаты"""
         try:
             # Проверяем границы
-            if x < 0 or y < 0 or x + width > len(dungeon.grid[0]) or y + height > len(dungeon.grid):
+            grid_height, grid_width = dungeon.grid.shape
+            if x < 0 or y < 0 or x + width > grid_width or y + height > grid_height:
                 return False
             
             # Проверяем, что место свободно
-            for dy in range(y, y + height):
-                for dx in range(x, x + width):
-                    if dungeon.grid[dy][dx] != 0:
-                        return False
-            
-            return True
+            return not dungeon.grid[y:y + height, x:x + width].any()
             
         except Exception as e:
             self._logger.error(f"Ошибка проверки размещения комнаты: {e}")
@@ -361,9 +393,7 @@ class DungeonGenerator(BaseComponent):
     def _place_room_on_grid(self, dungeon: GeneratedDungeon, room: Room):
         """Размещение комнаты на сетке"""
         try:
-            for y in range(room.y, room.y + room.height):
-                for x in range(room.x, room.x + room.width):
-                    dungeon.grid[y][x] = 1  # 1 = комната
+            dungeon.grid[room.y:room.y + room.height, room.x:room.x + room.width] = CELL_ROOM
             
         except Exception as e:
             self._logger.error(f"Ошибка размещения комнаты на сетке: {e}")
@@ -450,20 +480,16 @@ class DungeonGenerator(BaseComponent):
                              end: Tuple[int, int]) -> List[Tuple[int, int]]:
         """Создание пути коридора"""
         try:
-            path = []
-            current = start
+            (start_x, start_y), (end_x, end_y) = start, end
             
             # Простой алгоритм: сначала по X, потом по Y
-            while current[0] != end[0]:
-                next_x = current[0] + (1 if current[0] < end[0] else -1)
-                current = (next_x, current[1])
-                path.append(current)
-            
-            while current[1] != end[1]:
-                next_y = current[1] + (1 if current[1] < end[1] else -1)
-                current = (current[0], next_y)
-                path.append(current)
+            step_x = 1 if start_x < end_x else -1
+            step_y = 1 if start_y < end_y else -1
+            xs = range(start_x + step_x, end_x + step_x, step_x) if start_x != end_x else range(0)
+            ys = range(start_y + step_y, end_y + step_y, step_y) if start_y != end_y else range(0)
             
+            path = list(zip(xs, itertools.repeat(start_y)))
+            path.extend(zip(itertools.repeat(end_x), ys))
             return path
             
         except Exception as e:
@@ -473,13 +499,33 @@ class DungeonGenerator(BaseComponent):
     def _place_corridor_on_grid(self, dungeon: GeneratedDungeon, corridor: Corridor):
         """Размещение коридора на сетке"""
         try:
-            for x, y in corridor.path:
-                # Размещаем коридор с учетом ширины
-                for dy in range(y - corridor.width // 2, y + corridor.width // 2 + 1):
-                    for dx in range(x - corridor.width // 2, x + corridor.width // 2 + 1):
-                        if (0 <= dy < len(dungeon.grid) and 
-                            0 <= dx < len(dungeon.grid[0])):
-                            dungeon.grid[dy][dx] = 2  # 2 = коридор
+            if not corridor.path:
+                return
+            
+            grid_height, grid_width = dungeon.grid.shape
+            half_width = corridor.width // 2
+            
+            # Путь режется на прямые участки, каждый закрашивается одним срезом
+            points = np.fromiter(itertools.chain.from_iterable(corridor.path), dtype=np.int64,
+                                 count=2 * len(corridor.path)).reshape(-1, 2)
+            steps = np.diff(points, axis=0)
+            breaks = np.flatnonzero(np.any(steps[1:] != steps[:-1], axis=1)) + 1
+            
+            for run in np.split(points, breaks):
+                run_steps = np.diff(run, axis=0)
+                if run_steps.size and np.all(run_steps != 0, axis=1).any():
+                    # Диагональный участок - по одной клетке
+                    segments = [(point, point) for point in run]
+                else:
+                    segments = [(run.min(axis=0), run.max(axis=0))]
+                
+                for low, high in segments:
+                    x0 = max(int(low[0]) - half_width, 0)
+                    y0 = max(int(low[1]) - half_width, 0)
+                    x1 = min(int(high[0]) + half_width + 1, grid_width)
+                    y1 = min(int(high[1]) + half_width + 1, grid_height)
+                    if x0 < x1 and y0 < y1:
+                        dungeon.grid[y0:y1, x0:x1] = CELL_CORRIDOR
             
         except Exception as e:
             self._logger.error(f"Ошибка размещения коридора на сетке: {e}")
@@ -537,6 +583,13 @@ class DungeonGenerator(BaseComponent):
         try:
             settings = dungeon.settings
             
+            # Коридоры по комнатам, чтобы не перебирать все коридоры для каждой комнаты
+            room_corridors: Dict[str, List[Corridor]] = {}
+            for corridor in dungeon.corridors.values():
+                room_corridors.setdefault(corridor.start_room, []).append(corridor)
+                if corridor.end_room != corridor.start_room:
+                    room_corridors.setdefault(corridor.end_room, []).append(corridor)
+            
             for room in dungeon.rooms.values():
                 # Добавляем ловушки
                 if random.random() < settings.trap_density:
@@ -549,12 +602,10 @@ class DungeonGenerator(BaseComponent):
                     room.treasures.append(treasure_type)
                 
                 # Добавляем ловушки в коридоры
-                for corridor in dungeon.corridors.values():
-                    if (corridor.start_room == room.room_id or 
-                        corridor.end_room == room.room_id):
-                        if random.random() < settings.trap_density * 0.5:
-                            trap_type = random.choice(list(TrapType))
-                            corridor.traps.append(trap_type.value)
+                for corridor in room_corridors.get(room.room_id, []):
+                    if random.random() < settings.trap_density * 0.5:
+                        trap_type = random.choice(list(TrapType))
+                        corridor.traps.append(trap_type.value)
             
         except Exception as e:
             self._logger.error(f"Ошибка добавления ловушек и сокровищ: {e}")
@@ -673,6 +724,8 @@ class DungeonGenerator(BaseComponent):
                 "total_corridors": self.generation_stats["total_corridors"],
                 "generation_time": self.generation_stats["generation_time"],
                 "cache_size": len(self.dungeon_cache),
+                "cache_memory_mb": self.dungeon_cache.size_bytes / (1024 * 1024),
+                "cache_evictions": self.dungeon_cache.stats["evictions"],
                 "average_time_per_dungeon": (self.generation_stats["generation_time"] / 
                                            max(self.generation_stats["total_dungeons"], 1))
             }
@@ -693,8 +746,8 @@ class DungeonGenerator(BaseComponent):
     def _on_destroy(self) -> bool:
         """Уничтожение генератора подземелий"""
         try:
-            # Очищаем кэш
-            self.clear_cache()
+            # Очищаем кэш и освобождаем бюджет памяти
+            self.dungeon_cache.close()
             
             # Сбрасываем статистику
             self.generation_stats = {
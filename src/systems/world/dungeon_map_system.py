@@ -8,9 +8,11 @@ from typing import Dict, List, Optional, Any, Tuple, Set
 import logging
 import random
 import time
-import math
+
+import numpy as np
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.field_of_view import FieldOfView, compute_field_of_view, compute_disk
 
 # = ТИПЫ КАРТ ПОДЗЕМЕЛИЙ
 class DungeonMapType(Enum):
@@ -37,6 +39,12 @@ class MapAreaType(Enum):
     EXIT = "exit"                 # Выход
     ENTRANCE = "entrance"         # Вход
 
+# Коды типов областей для плотных массивов слоев; UNEXPLORED обязан иметь код 0,
+# тогда туман войны накладывается одним умножением кодов на маску исследования
+AREA_TYPES: Tuple[MapAreaType, ...] = tuple(MapAreaType)
+AREA_TYPE_CODES: Dict[MapAreaType, int] = {area_type: code for code, area_type in enumerate(AREA_TYPES)}
+UNEXPLORED_CODE = AREA_TYPE_CODES[MapAreaType.UNEXPLORED]
+
 # = НАСТРОЙКИ КАРТЫ
 @dataclass
 class DungeonMapSettings:
@@ -75,6 +83,7 @@ class MapLayer:
     visible: bool = True
     opacity: float = 1.0
     z_order: int = 0
+    area_codes: Optional[np.ndarray] = None  # int8 [y, x], коды AREA_TYPE_CODES
 
 @dataclass
 class DungeonMapData:
@@ -85,11 +94,12 @@ class DungeonMapData:
     layers: Dict[str, MapLayer]
     grid_width: int
     grid_height: int
-    explored_cells: Set[Tuple[int, int]]
-    discovered_cells: Set[Tuple[int, int]]
+    explored: np.ndarray      # bool [y, x], объединение по всем персонажам
+    discovered: np.ndarray    # bool [y, x]
     secret_areas: Set[Tuple[int, int]]
     created_at: float = field(default_factory=time.time)
     last_updated: float = field(default_factory=time.time)
+    opaque: Optional[np.ndarray] = None  # bool [y, x], клетки, перекрывающие обзор
 
 @dataclass
 class MapMarker:
@@ -107,16 +117,128 @@ class MapMarker:
 
 @dataclass
 class ExplorationData:
-    """Данные исследования"""
+    """Данные исследования персонажа на одной карте
+    
+    Исследованные, обнаруженные и видимые ячейки хранятся булевыми
+    масками [y, x] размера карты."""
     dungeon_id: str
+    map_id: str
     character_id: str
-    explored_cells: Set[Tuple[int, int]]
-    discovered_secrets: Set[Tuple[int, int]]
-    found_treasures: Set[Tuple[int, int]]
-    triggered_traps: Set[Tuple[int, int]]
-    defeated_enemies: Set[Tuple[int, int]]
+    explored: np.ndarray
+    discovered: np.ndarray
+    visible: np.ndarray
+    discovered_secrets: Set[Tuple[int, int]] = field(default_factory=set)
+    found_treasures: Set[Tuple[int, int]] = field(default_factory=set)
+    triggered_traps: Set[Tuple[int, int]] = field(default_factory=set)
+    defeated_enemies: Set[Tuple[int, int]] = field(default_factory=set)
+    explored_count: int = 0
     exploration_percentage: float = 0.0
     last_exploration: float = 0.0
+    visible_bounds: Optional[Tuple[int, int, int, int]] = None  # окно текущей видимости
+    
+    @property
+    def explored_cells(self) -> Set[Tuple[int, int]]:
+        """Исследованные ячейки множеством (x, y); строится из маски при каждом вызове"""
+        ys, xs = np.nonzero(self.explored)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+# = ПРЕДСТАВЛЕНИЕ КАРТЫ С ТУМАНОМ ВОЙНЫ
+class FogOfWarView:
+    """Карта подземелья глазами персонажа
+    
+    Не копирует слои: туман войны накладывается маской исследования
+    персонажа поверх общих кодов слоев в момент запроса."""
+    
+    def __init__(self, dungeon_map: DungeonMapData, exploration: ExplorationData):
+        self.dungeon_map = dungeon_map
+        self.exploration = exploration
+    
+    @property
+    def dungeon_id(self) -> str:
+        return self.dungeon_map.dungeon_id
+    
+    @property
+    def map_id(self) -> str:
+        return self.dungeon_map.map_id
+    
+    @property
+    def settings(self) -> DungeonMapSettings:
+        return self.dungeon_map.settings
+    
+    @property
+    def grid_width(self) -> int:
+        return self.dungeon_map.grid_width
+    
+    @property
+    def grid_height(self) -> int:
+        return self.dungeon_map.grid_height
+    
+    @property
+    def layer_ids(self) -> List[str]:
+        return list(self.dungeon_map.layers.keys())
+    
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.dungeon_map.grid_width and 0 <= y < self.dungeon_map.grid_height
+    
+    def is_explored(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and bool(self.exploration.explored[y, x])
+    
+    def is_discovered(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and bool(self.exploration.discovered[y, x])
+    
+    def is_visible(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and bool(self.exploration.visible[y, x])
+    
+    def get_area_type(self, layer_id: str, x: int, y: int) -> MapAreaType:
+        """Тип области ячейки слоя с учетом тумана войны"""
+        layer = self.dungeon_map.layers.get(layer_id)
+        if layer is None or not self.is_explored(x, y):
+            return MapAreaType.UNEXPLORED
+        return AREA_TYPES[layer.area_codes[y, x]]
+    
+    def get_area_codes(self, layer_id: str, region: Optional[Tuple[int, int, int, int]] = None,
+                       out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Коды областей слоя под туманом войны
+        
+        region - (min_x, min_y, max_x, max_y) с исключающими верхними
+        границами. Если передан out нужной формы (int8), результат пишется в
+        него и новых массивов не создается - так миникарта может опрашивать
+        карту каждый кадр."""
+        layer = self.dungeon_map.layers.get(layer_id)
+        if layer is None:
+            return None
+        
+        codes = layer.area_codes
+        explored = self.exploration.explored
+        if region is not None:
+            min_x, min_y, max_x, max_y = region
+            window = (slice(max(min_y, 0), max_y), slice(max(min_x, 0), max_x))
+            codes = codes[window]
+            explored = explored[window]
+        
+        # Код UNEXPLORED равен нулю, поэтому маска применяется умножением
+        return np.multiply(codes, explored, out=out, dtype=np.int8)
+    
+    def get_cell(self, layer_id: str, x: int, y: int) -> Optional[MapCell]:
+        """Ячейка слоя с учетом тумана войны (создается по запросу)"""
+        layer = self.dungeon_map.layers.get(layer_id)
+        if layer is None:
+            return None
+        
+        cell = layer.cells.get((x, y))
+        if cell is None:
+            return None
+        
+        explored = self.is_explored(x, y)
+        return MapCell(
+            x=x, y=y,
+            area_type=AREA_TYPES[layer.area_codes[y, x]] if explored else MapAreaType.UNEXPLORED,
+            discovered=self.is_discovered(x, y),
+            explored=explored,
+            visible=explored and self.is_visible(x, y),
+            last_seen=self.exploration.last_exploration if explored else 0.0,
+            metadata=cell.metadata
+        )
 
 # = СИСТЕМА КАРТ ПОДЗЕМЕЛИЙ
 class DungeonMapSystem(BaseComponent):
@@ -133,6 +255,7 @@ class DungeonMapSystem(BaseComponent):
         self.dungeon_maps: Dict[str, DungeonMapData] = {}
         self.map_markers: Dict[str, List[MapMarker]] = {}
         self.exploration_data: Dict[str, ExplorationData] = {}
+        self.fog_views: Dict[str, FogOfWarView] = {}
         
         # Кэши и статистика
         self.map_cache: Dict[str, Any] = {}
@@ -148,6 +271,7 @@ class DungeonMapSystem(BaseComponent):
         self.cell_explored_callbacks: List[callable] = []
         self.area_discovered_callbacks: List[callable] = []
         self.secret_found_callbacks: List[callable] = []
+        self.cells_revealed_callbacks: List[callable] = []
         
         self.logger = logging.getLogger(__name__)
     
@@ -203,6 +327,10 @@ class DungeonMapSystem(BaseComponent):
         secret_layer = self._create_secret_layer(dungeon_id, grid_width, grid_height, dungeon_data)
         layers["secrets"] = secret_layer
         
+        # Плотные массивы кодов для быстрых запросов миникарты
+        for layer in layers.values():
+            layer.area_codes = self._build_area_codes(layer, grid_width, grid_height)
+        
         # Создание карты
         dungeon_map = DungeonMapData(
             dungeon_id=dungeon_id,
@@ -211,9 +339,10 @@ class DungeonMapSystem(BaseComponent):
             layers=layers,
             grid_width=grid_width,
             grid_height=grid_height,
-            explored_cells=set(),
-            discovered_cells=set(),
-            secret_areas=set()
+            explored=np.zeros((grid_height, grid_width), dtype=bool),
+            discovered=np.zeros((grid_height, grid_width), dtype=bool),
+            secret_areas=set(),
+            opaque=floor_layer.area_codes == UNEXPLORED_CODE
         )
         
         self.dungeon_maps[map_id] = dungeon_map
@@ -230,6 +359,14 @@ class DungeonMapSystem(BaseComponent):
         
         return dungeon_map
     
+    def _build_area_codes(self, layer: MapLayer, width: int, height: int) -> np.ndarray:
+        """Упаковка типов областей слоя в массив int8 [y, x]"""
+        codes = np.full((height, width), UNEXPLORED_CODE, dtype=np.int8)
+        for (x, y), cell in layer.cells.items():
+            if 0 <= x < width and 0 <= y < height:
+                codes[y, x] = AREA_TYPE_CODES[cell.area_type]
+        return codes
+    
     def _create_floor_layer(self, dungeon_id: str, width: int, height: int, 
                            dungeon_data: Dict[str, Any]) -> MapLayer:
         """Создание слоя плана этажа"""
@@ -461,25 +598,13 @@ class DungeonMapSystem(BaseComponent):
         if not (0 <= x < dungeon_map.grid_width and 0 <= y < dungeon_map.grid_height):
             return False
         
-        # Обновление ячеек во всех слоях
-        for layer in dungeon_map.layers.values():
-            cell_key = (x, y)
-            if cell_key in layer.cells:
-                cell = layer.cells[cell_key]
-                cell.explored = True
-                cell.visible = True
-                cell.last_seen = time.time()
-                
-                # Обновление типа области
-                if cell.area_type == MapAreaType.UNEXPLORED:
-                    cell.area_type = MapAreaType.EXPLORED
-        
-        # Добавление в исследованные ячейки
-        dungeon_map.explored_cells.add((x, y))
+        # Слои общие для всех персонажей и не меняются: состояние живет в масках
+        dungeon_map.explored[y, x] = True
+        dungeon_map.discovered[y, x] = True
         dungeon_map.last_updated = time.time()
         
         # Обновление данных исследования
-        self._update_exploration_data(dungeon_map.dungeon_id, character_id, x, y)
+        self._update_exploration_data(dungeon_map, character_id, x, y)
         
         # Уведомление о исследовании ячейки
         self._notify_cell_explored(map_id, character_id, x, y)
@@ -487,27 +612,88 @@ class DungeonMapSystem(BaseComponent):
         return True
     
     def reveal_area(self, map_id: str, character_id: str, center_x: int, center_y: int, 
-                    radius: int = 3) -> int:
-        """Раскрытие области вокруг позиции"""
-        if map_id not in self.dungeon_maps:
+                    radius: int = 3, line_of_sight: bool = True) -> int:
+        """Раскрытие области вокруг позиции
+        
+        С line_of_sight раскрывается поле зрения (стены закрывают обзор),
+        без него - весь круг. Видимая область персонажа заменяется новой,
+        подписчики получают одно событие со всеми впервые исследованными
+        ячейками. Возвращает число видимых ячеек."""
+        try:
+            fov = self.compute_visible_area(map_id, center_x, center_y, radius, line_of_sight)
+            if fov is None:
+                return 0
+            
+            self._apply_field_of_view(self.dungeon_maps[map_id], character_id, fov)
+            return fov.visible_count
+            
+        except Exception as e:
+            self.logger.error(f"Ошибка раскрытия области на карте {map_id}: {e}")
             return 0
+    
+    def compute_visible_area(self, map_id: str, center_x: int, center_y: int, radius: int,
+                             line_of_sight: bool = True) -> Optional[FieldOfView]:
+        """Видимая из точки область без изменения состояния исследования"""
+        dungeon_map = self.dungeon_maps.get(map_id)
+        if dungeon_map is None:
+            return None
         
-        dungeon_map = self.dungeon_maps[map_id]
-        revealed_cells = 0
+        if line_of_sight and dungeon_map.opaque is not None:
+            return compute_field_of_view(dungeon_map.opaque, center_x, center_y, radius)
+        return compute_disk(dungeon_map.grid_width, dungeon_map.grid_height, center_x, center_y, radius)
+    
+    def set_map_opacity(self, map_id: str, opaque: np.ndarray) -> bool:
+        """Замена маски стен карты (например, по сетке DungeonGenerator: opaque = grid == 0)"""
+        dungeon_map = self.dungeon_maps.get(map_id)
+        if dungeon_map is None:
+            return False
         
-        # Раскрытие ячеек в радиусе
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                x = center_x + dx
-                y = center_y + dy
-                
-                # Проверка расстояния
-                distance = math.sqrt(dx*dx + dy*dy)
-                if distance <= radius:
-                    if self.explore_cell(map_id, character_id, x, y):
-                        revealed_cells += 1
+        opaque = np.asarray(opaque, dtype=bool)
+        if opaque.shape != (dungeon_map.grid_height, dungeon_map.grid_width):
+            self.logger.error(f"Маска стен {opaque.shape} не совпадает с размером карты {map_id}")
+            return False
         
-        return revealed_cells
+        dungeon_map.opaque = opaque
+        return True
+    
+    def _apply_field_of_view(self, dungeon_map: DungeonMapData, character_id: str, fov: FieldOfView) -> int:
+        """Массовое применение видимой области к маскам исследования
+        
+        Возвращает число впервые исследованных персонажем ячеек."""
+        exploration = self._get_exploration(dungeon_map, character_id)
+        min_x, min_y, max_x, max_y = fov.bounds
+        window = (slice(min_y, max_y), slice(min_x, max_x))
+        
+        # Предыдущая видимость сбрасывается только в своем окне
+        if exploration.visible_bounds is not None:
+            old_min_x, old_min_y, old_max_x, old_max_y = exploration.visible_bounds
+            exploration.visible[old_min_y:old_max_y, old_min_x:old_max_x] = False
+        exploration.visible[window] = fov.mask
+        exploration.visible_bounds = fov.bounds
+        
+        explored = exploration.explored[window]
+        newly_explored = fov.mask & ~explored
+        revealed = int(np.count_nonzero(newly_explored))
+        
+        explored |= fov.mask
+        exploration.discovered[window] |= fov.mask
+        dungeon_map.explored[window] |= fov.mask
+        dungeon_map.discovered[window] |= fov.mask
+        
+        now = time.time()
+        exploration.last_exploration = now
+        dungeon_map.last_updated = now
+        
+        if revealed:
+            exploration.explored_count += revealed
+            total_cells = dungeon_map.grid_width * dungeon_map.grid_height
+            exploration.exploration_percentage = exploration.explored_count / max(total_cells, 1) * 100
+            
+            ys, xs = np.nonzero(newly_explored)
+            cells = np.column_stack((xs + min_x, ys + min_y)).astype(np.int32)
+            self._notify_cells_revealed(dungeon_map.map_id, character_id, cells)
+        
+        return revealed
     
     def discover_secret(self, map_id: str, character_id: str, x: int, y: int) -> bool:
         """Обнаружение секрета"""
@@ -532,9 +718,14 @@ class DungeonMapSystem(BaseComponent):
         # Обнаружение секрета
         cell.area_type = MapAreaType.DISCOVERED
         cell.metadata["discovered"] = True
+        secret_layer.area_codes[y, x] = AREA_TYPE_CODES[MapAreaType.DISCOVERED]
         dungeon_map.secret_areas.add(cell_key)
         dungeon_map.last_updated = time.time()
         
+        if character_id:
+            exploration = self._get_exploration(dungeon_map, character_id)
+            exploration.discovered_secrets.add(cell_key)
+        
         # Уведомление о обнаружении секрета
         self._notify_secret_found(map_id, character_id, x, y, cell.metadata)
         
@@ -577,8 +768,11 @@ class DungeonMapSystem(BaseComponent):
         
         return False
     
-    def get_map_data(self, map_id: str, character_id: str = None) -> Optional[DungeonMapData]:
-        """Получение данных карты"""
+    def get_map_data(self, map_id: str, character_id: str = None) -> Optional[Any]:
+        """Получение данных карты
+        
+        С персонажем и включенным туманом войны возвращается FogOfWarView -
+        представление поверх общих слоев, без копирования ячеек."""
         if map_id not in self.dungeon_maps:
             return None
         
@@ -586,86 +780,55 @@ class DungeonMapSystem(BaseComponent):
         
         # Если указан персонаж, применяем туман войны
         if character_id and dungeon_map.settings.fog_of_war:
-            return self._apply_fog_of_war(dungeon_map, character_id)
+            return self._get_fog_view(dungeon_map, character_id)
         
         return dungeon_map
     
-    def _apply_fog_of_war(self, dungeon_map: DungeonMapData, character_id: str) -> DungeonMapData:
-        """Применение тумана войны"""
-        # Создание копии карты
-        fog_map = DungeonMapData(
-            dungeon_id=dungeon_map.dungeon_id,
-            map_id=dungeon_map.map_id,
-            settings=dungeon_map.settings,
-            layers={},
-            grid_width=dungeon_map.grid_width,
-            grid_height=dungeon_map.grid_height,
-            explored_cells=dungeon_map.explored_cells.copy(),
-            discovered_cells=dungeon_map.discovered_cells.copy(),
-            secret_areas=dungeon_map.secret_areas.copy()
-        )
-        
-        # Копирование слоев с применением тумана войны
-        for layer_id, layer in dungeon_map.layers.items():
-            fog_layer = MapLayer(
-                layer_id=layer.layer_id,
-                layer_type=layer.layer_type,
-                cells={},
-                visible=layer.visible,
-                opacity=layer.opacity,
-                z_order=layer.z_order
+    def _get_fog_view(self, dungeon_map: DungeonMapData, character_id: str) -> FogOfWarView:
+        """Представление карты с туманом войны для персонажа"""
+        view_key = f"{dungeon_map.map_id}_{character_id}"
+        view = self.fog_views.get(view_key)
+        if view is None:
+            view = FogOfWarView(dungeon_map, self._get_exploration(dungeon_map, character_id))
+            self.fog_views[view_key] = view
+        return view
+    
+    def _get_exploration(self, dungeon_map: DungeonMapData, character_id: str) -> ExplorationData:
+        """Данные исследования персонажа на карте (создаются при первом обращении)"""
+        exploration_key = f"{dungeon_map.map_id}_{character_id}"
+        exploration = self.exploration_data.get(exploration_key)
+        
+        if exploration is None:
+            shape = (dungeon_map.grid_height, dungeon_map.grid_width)
+            exploration = ExplorationData(
+                dungeon_id=dungeon_map.dungeon_id,
+                map_id=dungeon_map.map_id,
+                character_id=character_id,
+                explored=np.zeros(shape, dtype=bool),
+                discovered=np.zeros(shape, dtype=bool),
+                visible=np.zeros(shape, dtype=bool)
             )
-            
-            for cell_key, cell in layer.cells.items():
-                fog_cell = MapCell(
-                    x=cell.x, y=cell.y,
-                    area_type=cell.area_type,
-                    discovered=cell.discovered,
-                    explored=cell.explored,
-                    visible=cell.visible,
-                    last_seen=cell.last_seen,
-                    metadata=cell.metadata.copy()
-                )
-                
-                # Скрытие неисследованных областей
-                if not cell.explored:
-                    fog_cell.area_type = MapAreaType.UNEXPLORED
-                    fog_cell.visible = False
-                
-                fog_layer.cells[cell_key] = fog_cell
-            
-            fog_map.layers[layer_id] = fog_layer
+            self.exploration_data[exploration_key] = exploration
         
-        return fog_map
+        return exploration
     
-    def _update_exploration_data(self, dungeon_id: str, character_id: str, x: int, y: int):
+    def _update_exploration_data(self, dungeon_map: DungeonMapData, character_id: str, x: int, y: int):
         """Обновление данных исследования"""
-        exploration_key = f"{dungeon_id}_{character_id}"
-        
-        if exploration_key not in self.exploration_data:
-            self.exploration_data[exploration_key] = ExplorationData(
-                dungeon_id=dungeon_id,
-                character_id=character_id,
-                explored_cells=set(),
-                discovered_secrets=set(),
-                found_treasures=set(),
-                triggered_traps=set(),
-                defeated_enemies=set()
-            )
+        exploration = self._get_exploration(dungeon_map, character_id)
         
-        exploration = self.exploration_data[exploration_key]
-        exploration.explored_cells.add((x, y))
+        if not exploration.explored[y, x]:
+            exploration.explored[y, x] = True
+            exploration.explored_count += 1
+        exploration.discovered[y, x] = True
         exploration.last_exploration = time.time()
         
         # Обновление процента исследования
-        if dungeon_id in self.dungeon_maps:
-            dungeon_map = self.dungeon_maps[dungeon_id]
-            total_cells = dungeon_map.grid_width * dungeon_map.grid_height
-            exploration.exploration_percentage = len(exploration.explored_cells) / total_cells * 100
+        total_cells = dungeon_map.grid_width * dungeon_map.grid_height
+        exploration.exploration_percentage = exploration.explored_count / max(total_cells, 1) * 100
     
-    def get_exploration_data(self, dungeon_id: str, character_id: str) -> Optional[ExplorationData]:
-        """Получение данных исследования"""
-        exploration_key = f"{dungeon_id}_{character_id}"
+    def get_exploration_data(self, map_id: str, character_id: str) -> Optional[ExplorationData]:
+        """Получение данных исследования персонажа на карте"""
+        exploration_key = f"{map_id}_{character_id}"
         return self.exploration_data.get(exploration_key)
     
     def get_map_markers(self, map_id: str) -> List[MapMarker]:
@@ -679,11 +842,18 @@ class DungeonMapSystem(BaseComponent):
         
         dungeon_map = self.dungeon_maps[map_id]
         
+        explored_total = int(np.count_nonzero(dungeon_map.explored))
+        
         # Подсчет статистики по слоям
         layer_stats = {}
         for layer_id, layer in dungeon_map.layers.items():
-            explored_cells = sum(1 for cell in layer.cells.values() if cell.explored)
             total_cells = len(layer.cells)
+            if total_cells == dungeon_map.grid_width * dungeon_map.grid_height:
+                explored_cells = explored_total
+            else:
+                explored_cells = sum(1 for (x, y) in layer.cells
+                                     if 0 <= x < dungeon_map.grid_width and 0 <= y < dungeon_map.grid_height
+                                     and dungeon_map.explored[y, x])
             
             layer_stats[layer_id] = {
                 "total_cells": total_cells,
@@ -696,8 +866,8 @@ class DungeonMapSystem(BaseComponent):
             "dungeon_id": dungeon_map.dungeon_id,
             "grid_size": f"{dungeon_map.grid_width}x{dungeon_map.grid_height}",
             "total_cells": dungeon_map.grid_width * dungeon_map.grid_height,
-            "explored_cells": len(dungeon_map.explored_cells),
-            "discovered_cells": len(dungeon_map.discovered_cells),
+            "explored_cells": explored_total,
+            "discovered_cells": int(np.count_nonzero(dungeon_map.discovered)),
             "secret_areas": len(dungeon_map.secret_areas),
             "layers": len(dungeon_map.layers),
             "markers": len(self.map_markers.get(map_id, [])),
@@ -718,6 +888,13 @@ class DungeonMapSystem(BaseComponent):
         """Добавление callback для обнаружения секрета"""
         self.secret_found_callbacks.append(callback)
     
+    def add_cells_revealed_callback(self, callback: callable):
+        """Добавление callback для массового раскрытия ячеек
+        
+        Вызывается как callback(map_id, character_id, cells), где cells -
+        массив int32 формы (N, 2) с координатами (x, y)."""
+        self.cells_revealed_callbacks.append(callback)
+    
     def _notify_cell_explored(self, map_id: str, character_id: str, x: int, y: int):
         """Уведомление о исследовании ячейки"""
         for callback in self.cell_explored_callbacks:
@@ -742,6 +919,14 @@ class DungeonMapSystem(BaseComponent):
             except Exception as e:
                 self.logger.error(f"Ошибка в callback обнаружения секрета: {e}")
     
+    def _notify_cells_revealed(self, map_id: str, character_id: str, cells: np.ndarray):
+        """Уведомление о раскрытии группы ячеек"""
+        for callback in self.cells_revealed_callbacks:
+            try:
+                callback(map_id, character_id, cells)
+            except Exception as e:
+                self.logger.error(f"Ошибка в callback раскрытия ячеек: {e}")
+    
     def get_generation_stats(self) -> Dict[str, Any]:
         """Получение статистики генерации"""
         return self.generation_stats.copy()
@@ -756,9 +941,11 @@ class DungeonMapSystem(BaseComponent):
         self.dungeon_maps.clear()
         self.map_markers.clear()
         self.exploration_data.clear()
+        self.fog_views.clear()
         self.map_cache.clear()
         self.cell_explored_callbacks.clear()
         self.area_discovered_callbacks.clear()
         self.secret_found_callbacks.clear()
+        self.cells_revealed_callbacks.clear()
         
         self.logger.info("DungeonMapSystem уничтожен")
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""Компактная двоичная сериализация подземелий и карт подземелий
+Сетки кодируются сериями (RLE) или хранятся как есть для загрузки без
+копирования, комнаты и коридоры упакованы структурированными массивами,
+все строки и идентификаторы лежат в одной таблице строк"""
+
+from dataclasses import fields
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple, Union
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from src.systems.world.dungeon_generator import (
+    Corridor, DungeonSettings, DungeonType, GeneratedDungeon, Room, RoomType
+)
+from src.systems.world.dungeon_map_system import (
+    AREA_TYPE_CODES, AREA_TYPES, DungeonMapData, DungeonMapSettings, DungeonMapType, MapCell, MapLayer
+)
+
+# = ФОРМАТ
+# [magic 4 байта][версия uint16][флаги uint16][таблица строк][секции]
+# Таблица строк: [число строк uint32][длины uint32 * n][UTF-8 данные]
+# Массив: [число элементов uint32][выравнивание до ARRAY_ALIGNMENT][данные]
+# Выравнивание считается от начала буфера, поэтому сырые сетки читаются
+# через np.frombuffer без копирования
+DUNGEON_MAGIC = b"DGNB"
+DUNGEON_MAP_MAGIC = b"DMAP"
+FORMAT_VERSION = 1
+ARRAY_ALIGNMENT = 8
+
+FLAG_GRID_RAW = 0x1  # Сетки без сжатия (передача между процессами)
+
+GRID_ENCODING_RLE = "rle"
+GRID_ENCODING_RAW = "raw"
+
+_PREFIX = struct.Struct("<4sHH")
+_COUNT = struct.Struct("<I")
+_GRID_SHAPE = struct.Struct("<II")
+_DUNGEON_HEADER = struct.Struct("<IIIIIId")   # id, тип, настройки, вход, выход, босс, время генерации
+_MAP_HEADER = struct.Struct("<IIIIIdd")       # подземелье, карта, настройки, ширина, высота, создана, обновлена
+_LAYER_HEADER = struct.Struct("<IIBfi")       # id, тип, visible, opacity, z_order
+
+ROOM_FLAG_EXPLORED = 0x1
+ROOM_FLAG_CLEARED = 0x2
+CORRIDOR_FLAG_POLYLINE = 0x1  # Путь хранится вершинами ломаной из единичных шагов
+
+# Списки строк комнаты в порядке счетчиков ROOM_DTYPE
+ROOM_LIST_FIELDS: Tuple[str, ...] = ("connections", "enemies", "traps", "treasures", "special_features")
+
+ROOM_DTYPE = np.dtype([
+    ("room_id", "<u4"), ("room_type", "<u4"),
+    ("x", "<i4"), ("y", "<i4"), ("width", "<i4"), ("height", "<i4"),
+    ("flags", "u1"),
+    ("connections", "<u2"), ("enemies", "<u2"), ("traps", "<u2"),
+    ("treasures", "<u2"), ("special_features", "<u2"),
+])
+
+CORRIDOR_DTYPE = np.dtype([
+    ("corridor_id", "<u4"), ("start_room", "<u4"), ("end_room", "<u4"),
+    ("width", "<i4"), ("points", "<u4"), ("traps", "<u2"), ("flags", "u1"),
+])
+
+METADATA_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("metadata", "<u4")])
+
+# = БУФЕРЫ
+class _StringTable:
+    """Таблица уникальных строк; в секциях хранятся только индексы"""
+
+    def __init__(self, strings: Optional[List[str]] = None):
+        self.strings: List[str] = strings if strings is not None else []
+        self.index: Dict[str, int] = {value: i for i, value in enumerate(self.strings)}
+
+    def add(self, value: str) -> int:
+        index = self.index.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.index[value] = index
+            self.strings.append(value)
+        return index
+
+    def encode(self) -> bytes:
+        blobs = [value.encode("utf-8") for value in self.strings]
+        lengths = np.fromiter((len(blob) for blob in blobs), dtype="<u4", count=len(blobs))
+        return _COUNT.pack(len(blobs)) + lengths.tobytes() + b"".join(blobs)
+
+class _Writer:
+    """Последовательная запись секций с выравниванием массивов"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def pack(self, fmt: struct.Struct, *values):
+        self.buffer += fmt.pack(*values)
+
+    def array(self, values: Any, dtype: Any):
+        array = np.ascontiguousarray(values, dtype=dtype).ravel()
+        self.buffer += _COUNT.pack(array.size)
+        self.buffer += b"\0" * (-len(self.buffer) % ARRAY_ALIGNMENT)
+        self.buffer += array.tobytes()
+
+class _Reader:
+    """Чтение секций; массивы - представления над исходным буфером"""
+
+    def __init__(self, buffer: Any, offset: int = 0):
+        self.buffer = memoryview(buffer).cast("B")
+        self.offset = offset
+
+    def unpack(self, fmt: struct.Struct) -> Tuple:
+        values = fmt.unpack_from(self.buffer, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def array(self, dtype: Any) -> np.ndarray:
+        (count,) = self.unpack(_COUNT)
+        self.offset += -self.offset % ARRAY_ALIGNMENT
+        dtype = np.dtype(dtype)
+        array = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=self.offset)
+        self.offset += count * dtype.itemsize
+        return array
+
+    def strings(self) -> List[str]:
+        (count,) = self.unpack(_COUNT)
+        lengths = np.frombuffer(self.buffer, dtype="<u4", count=count, offset=self.offset).tolist()
+        self.offset += count * 4
+        blob = bytes(self.buffer[self.offset:self.offset + sum(lengths)])
+        self.offset += len(blob)
+
+        result = []
+        position = 0
+        for length in lengths:
+            result.append(blob[position:position + length].decode("utf-8"))
+            position += length
+        return result
+
+def _assemble(magic: bytes, flags: int, strings: _StringTable, body: _Writer) -> bytes:
+    """Склейка префикса, таблицы строк и секций
+
+    Секции начинаются с выровненного смещения, поэтому выравнивание внутри
+    буфера секций совпадает с выравниванием в итоговом файле."""
+    head = _PREFIX.pack(magic, FORMAT_VERSION, flags) + strings.encode()
+    head += b"\0" * (-len(head) % ARRAY_ALIGNMENT)
+    return head + bytes(body.buffer)
+
+def _open(data: Any, magic: bytes) -> Tuple[_Reader, int, List[str]]:
+    """Проверка префикса и чтение таблицы строк"""
+    reader = _Reader(data)
+    file_magic, version, flags = reader.unpack(_PREFIX)
+    if file_magic != magic or version != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемый формат: {file_magic!r} v{version}")
+    strings = reader.strings()
+    reader.offset += -reader.offset % ARRAY_ALIGNMENT
+    return reader, flags, strings
+
+# = СЕТКИ
+def encode_runs(flat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Разбиение плоского массива на серии (значения, длины)"""
+    if flat.size == 0:
+        return flat[:0], np.zeros(0, dtype=np.uint32)
+    starts = np.flatnonzero(np.concatenate(([True], flat[1:] != flat[:-1])))
+    lengths = np.diff(np.append(starts, flat.size))
+    return flat[starts], lengths.astype(np.uint32)
+
+def decode_runs(values: np.ndarray, lengths: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Восстановление массива из серий"""
+    return np.repeat(values, lengths).reshape(shape)
+
+def _write_grid(writer: _Writer, grid: Optional[np.ndarray], raw: bool):
+    grid = np.zeros((0, 0), dtype=np.int8) if grid is None else np.ascontiguousarray(grid, dtype=np.int8)
+    if grid.ndim != 2:
+        grid = grid.reshape(0, 0)
+    writer.pack(_GRID_SHAPE, grid.shape[0], grid.shape[1])
+
+    if raw:
+        writer.array(grid.ravel(), np.int8)
+    else:
+        values, lengths = encode_runs(grid.ravel())
+        writer.array(values, np.int8)
+        writer.array(lengths, "<u4")
+
+def _read_grid(reader: _Reader, raw: bool, copy: bool = False) -> np.ndarray:
+    height, width = reader.unpack(_GRID_SHAPE)
+    if raw:
+        grid = reader.array(np.int8).reshape(height, width)
+        return grid.copy() if copy else grid
+
+    values = reader.array(np.int8)
+    lengths = reader.array("<u4")
+    return decode_runs(values, lengths, (height, width))
+
+# = ПУТИ КОРИДОРОВ
+def path_vertices(points: np.ndarray) -> Optional[np.ndarray]:
+    """Вершины ломаной, если путь состоит из единичных шагов (иначе None)"""
+    if len(points) < 3:
+        return None
+    steps = np.diff(points, axis=0)
+    if np.any(np.abs(steps) > 1) or np.any(np.all(steps == 0, axis=1)):
+        return None
+    turns = np.flatnonzero(np.any(steps[1:] != steps[:-1], axis=1)) + 1
+    return points[np.concatenate(([0], turns, [len(points) - 1]))]
+
+def expand_vertices(vertices: List[List[int]]) -> List[Tuple[int, int]]:
+    """Развертка вершин ломаной обратно в путь из единичных шагов"""
+    x, y = vertices[0]
+    path = [(x, y)]
+    for next_x, next_y in vertices[1:]:
+        step_x = (next_x > x) - (next_x < x)
+        step_y = (next_y > y) - (next_y < y)
+        count = max(abs(next_x - x), abs(next_y - y))
+        xs = range(x + step_x, next_x + step_x, step_x) if step_x else itertools.repeat(x, count)
+        ys = range(y + step_y, next_y + step_y, step_y) if step_y else itertools.repeat(y, count)
+        path.extend(zip(xs, ys))
+        x, y = next_x, next_y
+    return path
+
+# = НАСТРОЙКИ
+def _settings_to_json(settings: Any) -> str:
+    data = {}
+    for settings_field in fields(settings):
+        value = getattr(settings, settings_field.name)
+        data[settings_field.name] = value.value if isinstance(value, Enum) else value
+    return json.dumps(data, sort_keys=True)
+
+def _settings_from_json(settings_class: Any, text: str, enums: Dict[str, Any]) -> Any:
+    data = json.loads(text)
+    known = {settings_field.name for settings_field in fields(settings_class)}
+    # Поля из более новых версий формата пропускаются
+    data = {name: value for name, value in data.items() if name in known}
+    for name, enum_class in enums.items():
+        if name in data:
+            data[name] = enum_class(data[name])
+    return settings_class(**data)
+
+# = ПОДЗЕМЕЛЬЯ
+def encode_dungeon(dungeon: GeneratedDungeon, grid_encoding: str = GRID_ENCODING_RLE) -> bytes:
+    """Упаковка подземелья в компактный двоичный формат
+
+    grid_encoding=raw хранит сетку без сжатия: больше байт, зато
+    decode_dungeon отдает ее как представление над буфером."""
+    raw = grid_encoding == GRID_ENCODING_RAW
+    strings = _StringTable([""])
+    body = _Writer()
+
+    body.pack(
+        _DUNGEON_HEADER,
+        strings.add(dungeon.dungeon_id),
+        strings.add(dungeon.dungeon_type.value),
+        strings.add(_settings_to_json(dungeon.settings)),
+        strings.add(dungeon.entrance_room or ""),
+        strings.add(dungeon.exit_room or ""),
+        strings.add(dungeon.boss_room or ""),
+        float(dungeon.generation_time)
+    )
+    _write_grid(body, dungeon.grid, raw)
+
+    # Комнаты: фиксированная часть в таблице, списки строк - общим массивом индексов
+    rooms = list(dungeon.rooms.values())
+    room_table = np.zeros(len(rooms), dtype=ROOM_DTYPE)
+    room_lists: List[int] = []
+    for i, room in enumerate(rooms):
+        flags = (ROOM_FLAG_EXPLORED if room.explored else 0) | (ROOM_FLAG_CLEARED if room.cleared else 0)
+        values = [getattr(room, name) for name in ROOM_LIST_FIELDS]
+        room_table[i] = (
+            strings.add(room.room_id), strings.add(room.room_type.value),
+            room.x, room.y, room.width, room.height, flags,
+            *(len(value) for value in values)
+        )
+        for value in values:
+            room_lists.extend(strings.add(item) for item in value)
+    body.array(room_table, ROOM_DTYPE)
+    body.array(room_lists, "<u4")
+
+    # Коридоры: пути из единичных шагов сворачиваются до вершин ломаной
+    corridors = list(dungeon.corridors.values())
+    corridor_table = np.zeros(len(corridors), dtype=CORRIDOR_DTYPE)
+    path_chunks: List[np.ndarray] = []
+    corridor_traps: List[int] = []
+    for i, corridor in enumerate(corridors):
+        points = np.asarray(corridor.path, dtype=np.int32).reshape(-1, 2)
+        vertices = path_vertices(points)
+        flags = 0
+        if vertices is not None:
+            points = vertices
+            flags |= CORRIDOR_FLAG_POLYLINE
+        path_chunks.append(points)
+        corridor_table[i] = (
+            strings.add(corridor.corridor_id), strings.add(corridor.start_room), strings.add(corridor.end_room),
+            corridor.width, len(points), len(corridor.traps), flags
+        )
+        corridor_traps.extend(strings.add(trap) for trap in corridor.traps)
+    paths = np.concatenate(path_chunks) if path_chunks else np.zeros((0, 2), dtype=np.int32)
+    body.array(corridor_table, CORRIDOR_DTYPE)
+    body.array(paths, "<i4")
+    body.array(corridor_traps, "<u4")
+
+    body.array([strings.add(room_id) for room_id in dungeon.treasure_rooms], "<u4")
+    body.array([strings.add(room_id) for room_id in dungeon.trap_rooms], "<u4")
+
+    return _assemble(DUNGEON_MAGIC, FLAG_GRID_RAW if raw else 0, strings, body)
+
+def decode_dungeon(data: Any, copy_grid: bool = False) -> GeneratedDungeon:
+    """Восстановление подземелья из двоичного формата
+
+    Несжатая сетка возвращается представлением над data (для bytes - только
+    для чтения); copy_grid=True дает независимую изменяемую копию."""
+    reader, flags, strings = _open(data, DUNGEON_MAGIC)
+
+    dungeon_id, dungeon_type, settings, entrance, exit_room, boss, generation_time = reader.unpack(_DUNGEON_HEADER)
+    dungeon = GeneratedDungeon(
+        dungeon_id=strings[dungeon_id],
+        dungeon_type=DungeonType(strings[dungeon_type]),
+        settings=_settings_from_json(DungeonSettings, strings[settings], {"dungeon_type": DungeonType}),
+        entrance_room=strings[entrance],
+        exit_room=strings[exit_room],
+        boss_room=strings[boss],
+        generation_time=generation_time
+    )
+    dungeon.grid = _read_grid(reader, bool(flags & FLAG_GRID_RAW), copy_grid)
+
+    room_table = reader.array(ROOM_DTYPE)
+    room_lists = reader.array("<u4").tolist()
+    cursor = 0
+    for record in room_table.tolist():
+        room_id, room_type, x, y, width, height, room_flags, *counts = record
+        values = []
+        for count in counts:
+            values.append([strings[index] for index in room_lists[cursor:cursor + count]])
+            cursor += count
+        room = Room(
+            room_id=strings[room_id],
+            room_type=RoomType(strings[room_type]),
+            x=x, y=y, width=width, height=height,
+            explored=bool(room_flags & ROOM_FLAG_EXPLORED),
+            cleared=bool(room_flags & ROOM_FLAG_CLEARED),
+            **dict(zip(ROOM_LIST_FIELDS, values))
+        )
+        dungeon.rooms[room.room_id] = room
+
+    corridor_table = reader.array(CORRIDOR_DTYPE)
+    paths = reader.array("<i4").reshape(-1, 2)
+    corridor_traps = reader.array("<u4").tolist()
+    point_cursor = 0
+    trap_cursor = 0
+    for record in corridor_table.tolist():
+        corridor_id, start_room, end_room, width, point_count, trap_count, corridor_flags = record
+        points = paths[point_cursor:point_cursor + point_count]
+        point_cursor += point_count
+        if corridor_flags & CORRIDOR_FLAG_POLYLINE:
+            path = expand_vertices(points.tolist())
+        else:
+            path = list(zip(points[:, 0].tolist(), points[:, 1].tolist()))
+        corridor = Corridor(
+            corridor_id=strings[corridor_id],
+            start_room=strings[start_room],
+            end_room=strings[end_room],
+            path=path,
+            traps=[strings[index] for index in corridor_traps[trap_cursor:trap_cursor + trap_count]],
+            width=width
+        )
+        trap_cursor += trap_count
+        dungeon.corridors[corridor.corridor_id] = corridor
+
+    dungeon.treasure_rooms = [strings[index] for index in reader.array("<u4").tolist()]
+    dungeon.trap_rooms = [strings[index] for index in reader.array("<u4").tolist()]
+    return dungeon
+
+# = КАРТЫ ПОДЗЕМЕЛИЙ
+def _write_mask(writer: _Writer, mask: Optional[np.ndarray]):
+    """Булева маска упаковывается по биту на ячейку"""
+    if mask is None:
+        writer.pack(_GRID_SHAPE, 0, 0)
+        writer.array(np.zeros(0, dtype=np.uint8), np.uint8)
+        return
+    writer.pack(_GRID_SHAPE, mask.shape[0], mask.shape[1])
+    writer.array(np.packbits(mask, axis=None), np.uint8)
+
+def _read_mask(reader: _Reader) -> Optional[np.ndarray]:
+    height, width = reader.unpack(_GRID_SHAPE)
+    packed = reader.array(np.uint8)
+    if height == 0 and width == 0:
+        return None
+    return np.unpackbits(packed, count=height * width).reshape(height, width).astype(bool)
+
+def encode_dungeon_map(dungeon_map: DungeonMapData, grid_encoding: str = GRID_ENCODING_RLE) -> bytes:
+    """Упаковка карты подземелья: коды слоев сериями, метаданные - по таблице строк
+
+    Одинаковые словари метаданных (все ячейки одной комнаты) хранятся один раз."""
+    raw = grid_encoding == GRID_ENCODING_RAW
+    strings = _StringTable([""])
+    body = _Writer()
+
+    body.pack(
+        _MAP_HEADER,
+        strings.add(dungeon_map.dungeon_id),
+        strings.add(dungeon_map.map_id),
+        strings.add(_settings_to_json(dungeon_map.settings)),
+        dungeon_map.grid_width,
+        dungeon_map.grid_height,
+        float(dungeon_map.created_at),
+        float(dungeon_map.last_updated)
+    )
+    _write_mask(body, dungeon_map.explored)
+    _write_mask(body, dungeon_map.discovered)
+    _write_mask(body, dungeon_map.opaque)
+    body.array(np.array(sorted(dungeon_map.secret_areas), dtype="<i4").reshape(-1, 2), "<i4")
+
+    body.pack(_COUNT, len(dungeon_map.layers))
+    for layer in dungeon_map.layers.values():
+        body.pack(
+            _LAYER_HEADER,
+            strings.add(layer.layer_id), strings.add(layer.layer_type.value),
+            int(layer.visible), float(layer.opacity), int(layer.z_order)
+        )
+
+        codes = layer.area_codes
+        if codes is None:
+            codes = np.zeros((dungeon_map.grid_height, dungeon_map.grid_width), dtype=np.int8)
+            for (x, y), cell in layer.cells.items():
+                codes[y, x] = AREA_TYPE_CODES[cell.area_type]
+        _write_grid(body, codes, raw)
+
+        metadata = [
+            (x, y, strings.add(json.dumps(cell.metadata, sort_keys=True)))
+            for (x, y), cell in layer.cells.items() if cell.metadata
+        ]
+        body.array(np.array(metadata, dtype=METADATA_DTYPE), METADATA_DTYPE)
+
+    return _assemble(DUNGEON_MAP_MAGIC, FLAG_GRID_RAW if raw else 0, strings, body)
+
+def decode_dungeon_map(data: Any) -> DungeonMapData:
+    """Восстановление карты подземелья; ячейки слоев создаются заново по кодам"""
+    reader, flags, strings = _open(data, DUNGEON_MAP_MAGIC)
+    raw = bool(flags & FLAG_GRID_RAW)
+
+    dungeon_id, map_id, settings, grid_width, grid_height, created_at, last_updated = reader.unpack(_MAP_HEADER)
+    explored = _read_mask(reader)
+    discovered = _read_mask(reader)
+    opaque = _read_mask(reader)
+    secret_points = reader.array("<i4").reshape(-1, 2).tolist()
+
+    (layer_count,) = reader.unpack(_COUNT)
+    layers: Dict[str, MapLayer] = {}
+    parsed_metadata: Dict[int, Dict[str, Any]] = {}
+    for _ in range(layer_count):
+        layer_id, layer_type, visible, opacity, z_order = reader.unpack(_LAYER_HEADER)
+        codes = _read_grid(reader, raw, copy=True)
+        metadata_table = reader.array(METADATA_DTYPE).tolist()
+
+        metadata_by_cell = {}
+        for x, y, index in metadata_table:
+            if index not in parsed_metadata:
+                parsed_metadata[index] = json.loads(strings[index])
+            metadata_by_cell[(x, y)] = parsed_metadata[index]
+
+        cells: Dict[Tuple[int, int], MapCell] = {}
+        for y, row in enumerate(codes.tolist()):
+            for x, code in enumerate(row):
+                metadata = metadata_by_cell.get((x, y))
+                cells[(x, y)] = MapCell(
+                    x=x, y=y, area_type=AREA_TYPES[code],
+                    metadata=dict(metadata) if metadata else {}
+                )
+
+        layers[strings[layer_id]] = MapLayer(
+            layer_id=strings[layer_id],
+            layer_type=DungeonMapType(strings[layer_type]),
+            cells=cells,
+            visible=bool(visible),
+            opacity=opacity,
+            z_order=z_order,
+            area_codes=codes
+        )
+
+    shape = (grid_height, grid_width)
+    return DungeonMapData(
+        dungeon_id=strings[dungeon_id],
+        map_id=strings[map_id],
+        settings=_settings_from_json(DungeonMapSettings, strings[settings], {"map_type": DungeonMapType}),
+        layers=layers,
+        grid_width=grid_width,
+        grid_height=grid_height,
+        explored=explored if explored is not None else np.zeros(shape, dtype=bool),
+        discovered=discovered if discovered is not None else np.zeros(shape, dtype=bool),
+        secret_areas={(x, y) for x, y in secret_points},
+        created_at=created_at,
+        last_updated=last_updated,
+        opaque=opaque
+    )
+
+# = ФАЙЛЫ
+def _write_atomic(path: Union[str, Path], data: bytes):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(f"{path.suffix}.tmp{threading.get_ident()}")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _map_file(path: Union[str, Path]) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def save_dungeon(path: Union[str, Path], dungeon: GeneratedDungeon,
+                 grid_encoding: str = GRID_ENCODING_RLE) -> int:
+    """Запись подземелья в файл; возвращает размер в байтах"""
+    data = encode_dungeon(dungeon, grid_encoding)
+    _write_atomic(path, data)
+    return len(data)
+
+def load_dungeon(path: Union[str, Path], copy_grid: bool = False) -> GeneratedDungeon:
+    """Загрузка подземелья через отображение файла в память"""
+    return decode_dungeon(_map_file(path), copy_grid)
+
+def save_dungeon_map(path: Union[str, Path], dungeon_map: DungeonMapData) -> int:
+    """Запись карты подземелья в файл; возвращает размер в байтах"""
+    data = encode_dungeon_map(dungeon_map)
+    _write_atomic(path, data)
+    return len(data)
+
+def load_dungeon_map(path: Union[str, Path]) -> DungeonMapData:
+    """Загрузка карты подземелья из файла"""
+    return decode_dungeon_map(_map_file(path))
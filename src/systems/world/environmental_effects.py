@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """Система экологических эффектов для игрового мира
-Включает влияние погоды, времени и сезонов на геймплей"""
+Включает влияние погоды, времени и сезонов на геймплей.
+Истечение эффектов идет по кучам сроков, модификаторы стеков и целей
+поддерживаются инкрементально"""
 
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Dict, List, Optional, Any, Tuple
+import heapq
 import logging
 import random
 import time
@@ -68,13 +72,71 @@ class EffectCondition:
     wind_speed_range: Optional[Tuple[float, float]] = None
     location_type: Optional[str] = None
 
+class ModifierAggregate:
+    """Сумма modifiers * intensity по набору затухающих эффектов
+    
+    Все эффекты затухают с одной скоростью, поэтому интенсивность эффекта
+    выражается через общие часы затухания: intensity = anchor - clock.
+    Сумма хранится как weighted - clock * plain: добавление и удаление
+    эффекта стоят O(числа его модификаторов), чтение не зависит от
+    числа эффектов. version растет при каждом изменении состава."""
+    
+    def __init__(self):
+        self.count = 0
+        self.anchor_sum = 0.0
+        self.weighted: Dict[str, float] = {}
+        self.plain: Dict[str, float] = {}
+        self.modifier_counts: Dict[str, int] = {}
+        self.version = 0
+    
+    def add(self, modifiers: Dict[str, float], anchor: float):
+        self.count += 1
+        self.anchor_sum += anchor
+        for name, value in modifiers.items():
+            self.weighted[name] = self.weighted.get(name, 0.0) + value * anchor
+            self.plain[name] = self.plain.get(name, 0.0) + value
+            self.modifier_counts[name] = self.modifier_counts.get(name, 0) + 1
+        self.version += 1
+    
+    def subtract(self, modifiers: Dict[str, float], anchor: float):
+        self.count -= 1
+        # Пустой агрегат обнуляется точно, без накопленной ошибки округления
+        self.anchor_sum = self.anchor_sum - anchor if self.count else 0.0
+        for name, value in modifiers.items():
+            remaining = self.modifier_counts[name] - 1
+            if remaining:
+                self.modifier_counts[name] = remaining
+                self.weighted[name] -= value * anchor
+                self.plain[name] -= value
+            else:
+                del self.modifier_counts[name]
+                del self.weighted[name]
+                del self.plain[name]
+        self.version += 1
+    
+    def clear(self):
+        self.count = 0
+        self.anchor_sum = 0.0
+        self.weighted.clear()
+        self.plain.clear()
+        self.modifier_counts.clear()
+        self.version += 1
+    
+    def total_intensity(self, clock: float) -> float:
+        return self.anchor_sum - clock * self.count if self.count else 0.0
+    
+    def modifiers(self, clock: float) -> Dict[str, float]:
+        plain = self.plain
+        return {name: weighted - clock * plain[name] for name, weighted in self.weighted.items()}
+
 @dataclass
 class EffectStack:
-    """Стек эффектов"""
+    """Стек эффектов (effects по effect_id, суммы ведет aggregate)"""
     effect_type: EffectType
-    effects: List[EnvironmentalEffect] = field(default_factory=list)
+    effects: Dict[str, EnvironmentalEffect] = field(default_factory=dict)
     total_intensity: float = 0.0
     combined_modifiers: Dict[str, float] = field(default_factory=dict)
+    aggregate: ModifierAggregate = field(default_factory=ModifierAggregate, repr=False)
 
 # = СИСТЕМА ЭКОЛОГИЧЕСКИХ ЭФФЕКТОВ
 class EnvironmentalEffects(BaseComponent):
@@ -94,6 +156,21 @@ class EnvironmentalEffects(BaseComponent):
         self.active_effects: Dict[str, EnvironmentalEffect] = {}
         self.effect_stacks: Dict[EffectType, EffectStack] = {}
         
+        # Часы затухания: интенсивность эффекта = якорь - часы
+        self.decay_clock = 0.0
+        self._effect_terms: Dict[str, Tuple[float, Dict[str, float]]] = {}
+        self._effect_sequence = 0
+        
+        # Кучи сроков (время истечения и момент полного затухания) и очередь создания;
+        # записи удаленных эффектов отбрасываются лениво
+        self._expiry_heap: List[Tuple[float, int, str]] = []
+        self._exhaustion_heap: List[Tuple[float, int, str]] = []
+        self._creation_order: deque = deque()
+        
+        # Агрегаты модификаторов по типу цели (None - все цели) и кэш ответов
+        self._target_aggregates: Dict[Optional[str], ModifierAggregate] = {}
+        self._modifier_cache: Dict[Optional[str], Tuple[int, float, Dict[str, float]]] = {}
+        
         # Шаблоны эффектов
         self.effect_templates: Dict[str, Dict[str, Any]] = {}
         
@@ -254,7 +331,10 @@ class EnvironmentalEffects(BaseComponent):
         template = self.effect_templates[template_name]
         
         # Создание эффекта
+        self._effect_sequence += 1
         effect_id = f"{template_name}_{int(time.time())}"
+        if effect_id in self.active_effects:
+            effect_id = f"{effect_id}_{self._effect_sequence}"
         effect_duration = duration or self.settings.effect_duration
         
         effect = EnvironmentalEffect(
@@ -275,6 +355,17 @@ class EnvironmentalEffects(BaseComponent):
         self.active_effects[effect_id] = effect
         self.effect_stats["effects_applied"] += 1
         
+        anchor = intensity + self.decay_clock
+        modifiers = dict(effect.modifiers)
+        self._effect_terms[effect_id] = (anchor, modifiers)
+        self._target_aggregate(target_type).add(modifiers, anchor)
+        self._target_aggregate(None).add(modifiers, anchor)
+        
+        heapq.heappush(self._expiry_heap, (effect.expires_at, self._effect_sequence, effect_id))
+        heapq.heappush(self._exhaustion_heap, (anchor, self._effect_sequence, effect_id))
+        self._creation_order.append(effect_id)
+        self._compact_schedules()
+        
         # Обновление стека эффектов
         self._update_effect_stack(effect)
         
@@ -291,6 +382,7 @@ class EnvironmentalEffects(BaseComponent):
             return False
         
         effect = self.active_effects[effect_id]
+        self._refresh_intensity(effect)
         
         # Удаление из активных эффектов
         del self.active_effects[effect_id]
@@ -299,6 +391,10 @@ class EnvironmentalEffects(BaseComponent):
         # Обновление стека эффектов
         self._update_effect_stack(effect, remove=True)
         
+        anchor, modifiers = self._effect_terms.pop(effect_id)
+        self._target_aggregate(effect.target_type).subtract(modifiers, anchor)
+        self._target_aggregate(None).subtract(modifiers, anchor)
+        
         # Уведомление об удалении эффекта
         self._notify_effect_expired(effect)
         
@@ -307,25 +403,35 @@ class EnvironmentalEffects(BaseComponent):
         return True
     
     def update_effects(self, delta_time: float):
-        """Обновление эффектов"""
+        """Обновление эффектов
+        
+        Затухание сдвигает общие часы, а не интенсивности эффектов;
+        из куч извлекаются только эффекты, чей срок наступил."""
         start_time = time.time()
         
         current_time = time.time()
         expired_effects = []
         
+        # Затухание интенсивности
+        if self.settings.intensity_decay > 0:
+            self.decay_clock += self.settings.intensity_decay * delta_time
+        
         # Проверка истечения эффектов
-        for effect_id, effect in self.active_effects.items():
-            if current_time >= effect.expires_at:
+        expiry_heap = self._expiry_heap
+        while expiry_heap and expiry_heap[0][0] <= current_time:
+            effect_id = heapq.heappop(expiry_heap)[2]
+            if effect_id in self.active_effects:
                 expired_effects.append(effect_id)
-            else:
-                # Обновление интенсивности (затухание)
-                if self.settings.intensity_decay > 0:
-                    effect.intensity = max(0.0, effect.intensity - self.settings.intensity_decay * delta_time)
-                    
-                    if effect.intensity <= 0:
-                        expired_effects.append(effect_id)
-        
-        # Удаление истекших эффектов
+        
+        # Полностью затухшие эффекты
+        exhaustion_heap = self._exhaustion_heap
+        while self.settings.intensity_decay > 0 and exhaustion_heap and \
+                exhaustion_heap[0][0] <= self.decay_clock:
+            effect_id = heapq.heappop(exhaustion_heap)[2]
+            if effect_id in self.active_effects:
+                expired_effects.append(effect_id)
+        
+        # Удаление истекших эффектов (повторы отсекает remove_effect)
         for effect_id in expired_effects:
             self.remove_effect(effect_id)
         
@@ -336,63 +442,73 @@ class EnvironmentalEffects(BaseComponent):
         self.effect_stats["total_update_time"] += time.time() - start_time
     
     def _update_effect_stack(self, effect: EnvironmentalEffect, remove: bool = False):
-        """Обновление стека эффектов"""
+        """Обновление стека эффектов: прибавление или вычитание вклада эффекта"""
         effect_type = effect.effect_type
         
         if effect_type not in self.effect_stacks:
             return
         
         stack = self.effect_stacks[effect_type]
+        anchor, modifiers = self._effect_terms.get(effect.effect_id) or \
+            (effect.intensity + self.decay_clock, effect.modifiers)
         
         if remove:
             # Удаление эффекта из стека
-            stack.effects = [e for e in stack.effects if e.effect_id != effect.effect_id]
+            if stack.effects.pop(effect.effect_id, None) is None:
+                return
+            stack.aggregate.subtract(modifiers, anchor)
         else:
             # Добавление эффекта в стек
-            if self.settings.stacking_enabled:
-                stack.effects.append(effect)
-            else:
+            if not self.settings.stacking_enabled:
                 # Замена существующего эффекта
-                stack.effects = [effect]
+                for replaced in stack.effects.values():
+                    replaced_anchor, replaced_modifiers = self._effect_terms.get(replaced.effect_id) or \
+                        (replaced.intensity + self.decay_clock, replaced.modifiers)
+                    stack.aggregate.subtract(replaced_modifiers, replaced_anchor)
+                stack.effects.clear()
+            stack.effects[effect.effect_id] = effect
+            stack.aggregate.add(modifiers, anchor)
         
-        # Пересчет общей интенсивности и модификаторов
         self._recalculate_stack_modifiers(stack)
     
     def _recalculate_stack_modifiers(self, stack: EffectStack):
-        """Пересчет модификаторов стека"""
-        total_intensity = 0.0
-        combined_modifiers = {}
-        
-        for effect in stack.effects:
-            total_intensity += effect.intensity
-            
-            for modifier, value in effect.modifiers.items():
-                if modifier not in combined_modifiers:
-                    combined_modifiers[modifier] = 0.0
-                combined_modifiers[modifier] += value * effect.intensity
-        
-        stack.total_intensity = total_intensity
-        stack.combined_modifiers = combined_modifiers
+        """Пересчет модификаторов стека из его агрегата (без обхода эффектов)"""
+        stack.total_intensity = stack.aggregate.total_intensity(self.decay_clock)
+        stack.combined_modifiers = stack.aggregate.modifiers(self.decay_clock)
         
         self.effect_stats["effects_stacked"] += 1
     
     def _cleanup_oldest_effects(self):
-        """Очистка старых эффектов"""
-        if len(self.active_effects) <= self.settings.max_effects:
-            return
-        
-        # Сортировка по времени создания
-        sorted_effects = sorted(
-            self.active_effects.items(),
-            key=lambda x: x[1].created_at
-        )
-        
-        # Удаление старых эффектов
-        effects_to_remove = len(self.active_effects) - self.settings.max_effects
-        
-        for i in range(effects_to_remove):
-            effect_id, _ = sorted_effects[i]
-            self.remove_effect(effect_id)
+        """Очистка старых эффектов в порядке создания"""
+        creation_order = self._creation_order
+        while len(self.active_effects) > self.settings.max_effects and creation_order:
+            self.remove_effect(creation_order.popleft())
+    
+    def _compact_schedules(self):
+        """Перестройка куч и очереди, когда в них копятся записи удаленных эффектов"""
+        limit = 2 * len(self.active_effects) + 64
+        if len(self._expiry_heap) > limit:
+            self._expiry_heap = [entry for entry in self._expiry_heap if entry[2] in self.active_effects]
+            heapq.heapify(self._expiry_heap)
+        if len(self._exhaustion_heap) > limit:
+            self._exhaustion_heap = [entry for entry in self._exhaustion_heap if entry[2] in self.active_effects]
+            heapq.heapify(self._exhaustion_heap)
+        if len(self._creation_order) > limit:
+            self._creation_order = deque(effect_id for effect_id in self._creation_order
+                                         if effect_id in self.active_effects)
+    
+    def _target_aggregate(self, target_type: Optional[str]) -> ModifierAggregate:
+        aggregate = self._target_aggregates.get(target_type)
+        if aggregate is None:
+            aggregate = self._target_aggregates[target_type] = ModifierAggregate()
+        return aggregate
+    
+    def _refresh_intensity(self, effect: EnvironmentalEffect) -> EnvironmentalEffect:
+        """Актуализация effect.intensity по часам затухания"""
+        terms = self._effect_terms.get(effect.effect_id)
+        if terms is not None:
+            effect.intensity = max(0.0, terms[0] - self.decay_clock)
+        return effect
     
     def get_active_effects(self, target_type: str = None, effect_type: EffectType = None) -> List[EnvironmentalEffect]:
         """Получение активных эффектов"""
@@ -404,23 +520,37 @@ class EnvironmentalEffects(BaseComponent):
         if effect_type:
             effects = [e for e in effects if e.effect_type == effect_type]
         
+        for effect in effects:
+            self._refresh_intensity(effect)
+        
         return effects
     
     def get_effect_modifiers(self, target_type: str = "player") -> Dict[str, float]:
-        """Получение комбинированных модификаторов эффектов"""
-        modifiers = {}
+        """Получение комбинированных модификаторов эффектов
+        
+        Ответ берется из агрегата цели и кэшируется до изменения его
+        версии или часов затухания."""
+        key = target_type or None
+        aggregate = self._target_aggregates.get(key)
+        if aggregate is None:
+            return {}
         
-        for effect in self.get_active_effects(target_type):
-            for modifier, value in effect.modifiers.items():
-                if modifier not in modifiers:
-                    modifiers[modifier] = 0.0
-                modifiers[modifier] += value * effect.intensity
+        cached = self._modifier_cache.get(key)
+        if cached is None or cached[0] != aggregate.version or cached[1] != self.decay_clock:
+            cached = (aggregate.version, self.decay_clock, aggregate.modifiers(self.decay_clock))
+            self._modifier_cache[key] = cached
         
-        return modifiers
+        return dict(cached[2])
     
     def get_effect_stack(self, effect_type: EffectType) -> Optional[EffectStack]:
         """Получение стека эффектов"""
-        return self.effect_stacks.get(effect_type)
+        stack = self.effect_stacks.get(effect_type)
+        if stack is not None:
+            stack.total_intensity = stack.aggregate.total_intensity(self.decay_clock)
+            stack.combined_modifiers = stack.aggregate.modifiers(self.decay_clock)
+            for effect in stack.effects.values():
+                self._refresh_intensity(effect)
+        return stack
     
     def check_effect_conditions(self, weather_data: Dict[str, Any] = None, 
                                time_data: Dict[str, Any] = None,
@@ -539,6 +669,12 @@ class EnvironmentalEffects(BaseComponent):
         """Уничтожение системы экологических эффектов"""
         self.active_effects.clear()
         self.effect_stacks.clear()
+        self._effect_terms.clear()
+        self._expiry_heap.clear()
+        self._exhaustion_heap.clear()
+        self._creation_order.clear()
+        self._target_aggregates.clear()
+        self._modifier_cache.clear()
         self.effect_cache.clear()
         self.effect_applied_callbacks.clear()
         self.effect_expired_callbacks.clear()
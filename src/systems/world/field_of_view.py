@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Поле зрения на сетке подземелья
+Рекурсивный shadowcasting по восьми октантам: за один проход находит все
+клетки, видимые из точки, стены перекрывают обзор"""
+
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+# Множители октантов (xx, xy, yx, yy): перевод координат октанта в координаты сетки
+OCTANTS: Tuple[Tuple[int, int, int, int], ...] = (
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1)
+)
+
+# = ДАТАКЛАССЫ
+@dataclass
+class FieldOfView:
+    """Видимая область: маска окна карты вокруг наблюдателя"""
+    origin_x: int
+    origin_y: int
+    radius: int
+    min_x: int
+    min_y: int
+    mask: np.ndarray  # bool [y, x] в координатах окна
+
+    @property
+    def bounds(self) -> Tuple[int, int, int, int]:
+        """(min_x, min_y, max_x, max_y) окна, верхние границы исключающие"""
+        height, width = self.mask.shape
+        return self.min_x, self.min_y, self.min_x + width, self.min_y + height
+
+    @property
+    def visible_count(self) -> int:
+        return int(np.count_nonzero(self.mask))
+
+# = SHADOWCASTING
+def _cast_light(opaque: List[List[bool]], visible: bytearray, width: int, height: int,
+                cx: int, cy: int, row: int, start: float, end: float, radius: int,
+                xx: int, xy: int, yx: int, yy: int):
+    """Освещение одного октанта начиная со строки row между наклонами start и end"""
+    if start < end:
+        return
+
+    radius_squared = radius * radius
+    new_start = start
+    for j in range(row, radius + 1):
+        dx = -j - 1
+        dy = -j
+        blocked = False
+        while dx <= 0:
+            dx += 1
+            x = cx + dx * xx + dy * xy
+            y = cy + dx * yx + dy * yy
+            left_slope = (dx - 0.5) / (dy + 0.5)
+            right_slope = (dx + 0.5) / (dy - 0.5)
+            if start < right_slope:
+                continue
+            if end > left_slope:
+                break
+
+            # Клетки за краем окна - стены, которые не подсвечиваются
+            inside = 0 <= x < width and 0 <= y < height
+            if inside and dx * dx + dy * dy <= radius_squared:
+                visible[y * width + x] = 1
+            wall = not inside or opaque[y][x]
+
+            if blocked:
+                if wall:
+                    new_start = right_slope
+                    continue
+                blocked = False
+                start = new_start
+            elif wall and j < radius:
+                # Стена делит сектор: ближняя часть обходится рекурсией
+                blocked = True
+                _cast_light(opaque, visible, width, height, cx, cy, j + 1, start, left_slope,
+                            radius, xx, xy, yx, yy)
+                new_start = right_slope
+        if blocked:
+            break
+
+def compute_field_of_view(opaque: np.ndarray, origin_x: int, origin_y: int, radius: int) -> FieldOfView:
+    """Поле зрения из клетки (origin_x, origin_y)
+
+    opaque - bool [y, x], True для клеток, перекрывающих обзор. Сами стены
+    на границе видимой области тоже видны. Работа идет в окне радиуса, так
+    что стоимость не зависит от размера карты."""
+    origin_x, origin_y, radius = int(origin_x), int(origin_y), max(int(radius), 0)
+    map_height, map_width = opaque.shape
+
+    if not (0 <= origin_x < map_width and 0 <= origin_y < map_height):
+        return FieldOfView(origin_x, origin_y, radius, origin_x, origin_y, np.zeros((0, 0), dtype=bool))
+
+    min_x = max(origin_x - radius, 0)
+    min_y = max(origin_y - radius, 0)
+    max_x = min(origin_x + radius + 1, map_width)
+    max_y = min(origin_y + radius + 1, map_height)
+    width = max_x - min_x
+    height = max_y - min_y
+
+    # Окно переводится в списки один раз: поэлементный доступ к ndarray медленнее
+    window = opaque[min_y:max_y, min_x:max_x].tolist()
+    visible = bytearray(width * height)
+    cx = origin_x - min_x
+    cy = origin_y - min_y
+    visible[cy * width + cx] = 1
+
+    for xx, xy, yx, yy in OCTANTS:
+        _cast_light(window, visible, width, height, cx, cy, 1, 1.0, 0.0, radius, xx, xy, yx, yy)
+
+    mask = np.frombuffer(visible, dtype=np.uint8).reshape(height, width).astype(bool)
+    return FieldOfView(origin_x, origin_y, radius, min_x, min_y, mask)
+
+def compute_disk(map_width: int, map_height: int, origin_x: int, origin_y: int, radius: int) -> FieldOfView:
+    """Круг радиуса radius без учета стен (раскрытие магией, картой и т.п.)"""
+    origin_x, origin_y, radius = int(origin_x), int(origin_y), max(int(radius), 0)
+    min_x = min(max(origin_x - radius, 0), map_width)
+    min_y = min(max(origin_y - radius, 0), map_height)
+    max_x = max(min(origin_x + radius + 1, map_width), min_x)
+    max_y = max(min(origin_y + radius + 1, map_height), min_y)
+
+    ys, xs = np.ogrid[min_y - origin_y:max_y - origin_y, min_x - origin_x:max_x - origin_x]
+    mask = xs * xs + ys * ys <= radius * radius
+    return FieldOfView(origin_x, origin_y, radius, min_x, min_y, mask)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Поля потока для толп, идущих к одной цели
+Один проход Дейкстры от цели дает поле направлений, которое любое число
+агентов читает за O(1); при движении цели поле обновляется инкрементально"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+import heapq
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from src.systems.world.pathfinding import Cell, GridMap, PathfindingService, SQRT2
+
+# Ходы в порядке кодов направлений; код -1 - цель или недостижимая клетка
+FLOW_DIRECTIONS: Tuple[Tuple[int, int], ...] = (
+    (1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)
+)
+# Улучшения меньше этого порога - ошибки округления, а не более короткий путь
+IMPROVEMENT_EPSILON = 1e-6
+
+FLOW_VECTORS = np.array([(dx / math.hypot(dx, dy), dy / math.hypot(dx, dy)) for dx, dy in FLOW_DIRECTIONS],
+                        dtype=np.float32)
+
+# = ДАТАКЛАССЫ
+@dataclass
+class FlowFieldSettings:
+    """Настройки полей потока"""
+    allow_diagonal: bool = True
+    max_distance: float = 96.0          # Радиус поля в единицах стоимости пути
+    incremental_max_cost: float = 16.0  # Сдвиг цели дороже - полный пересчет
+    max_fields: int = 32
+
+@dataclass
+class FlowField:
+    """Поле расстояний и направлений к цели на одной карте"""
+    field_id: str
+    map_id: str
+    goal: Cell
+    distances: np.ndarray    # float64, inf - недостижимо
+    directions: np.ndarray   # int8, индекс в FLOW_DIRECTIONS или -1
+    map_version: int
+    updated_at: float = field(default_factory=time.time)
+
+# = ПОСТРОЕНИЕ ПОЛЯ
+def propagate_distances(costs: List[float], width: int, height: int, distances: List[float],
+                        sources: List[Cell], allow_diagonal: bool = True,
+                        max_distance: float = math.inf, frontier: Iterable[int] = ()) -> int:
+    """Дейкстра от источников с уменьшением уже известных расстояний
+
+    distances - плоский список верхних оценок (inf для полного расчета);
+    значения меняются на месте. Распространяются только улучшения, поэтому
+    при сдвиге цели пересчитывается лишь область, где новый путь короче.
+    Клетки frontier продолжают расчет со своих текущих значений (граница
+    ограниченного поля). Возвращает число обработанных клеток."""
+    moves = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0)]
+    if allow_diagonal:
+        moves += [(1, 1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (-1, -1, SQRT2)]
+
+    open_heap = []
+    for x, y in sources:
+        node = y * width + x
+        if costs[node] != math.inf:
+            distances[node] = 0.0
+            open_heap.append((0.0, node))
+    open_heap.extend((distances[node], node) for node in frontier)
+    heapq.heapify(open_heap)
+
+    processed = 0
+    while open_heap:
+        g, node = heapq.heappop(open_heap)
+        if g > distances[node]:
+            continue
+        processed += 1
+        x, y = node % width, node // width
+        node_cost = costs[node]
+        for dx, dy, length in moves:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            neighbour = ny * width + nx
+            neighbour_cost = costs[neighbour]
+            if neighbour_cost == math.inf:
+                continue
+            if dx and dy and (costs[y * width + nx] == math.inf or costs[ny * width + x] == math.inf):
+                continue
+            tentative = g + length * 0.5 * (node_cost + neighbour_cost)
+            if tentative <= max_distance and tentative < distances[neighbour] - IMPROVEMENT_EPSILON:
+                distances[neighbour] = tentative
+                heapq.heappush(open_heap, (tentative, neighbour))
+    return processed
+
+def find_field_frontier(costs: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    """Плоские индексы достигнутых клеток, граничащих с проходимыми недостигнутыми"""
+    rows, cols = distances.shape
+    reached = np.isfinite(distances)
+    padded_open = np.zeros((rows + 2, cols + 2), dtype=bool)
+    padded_open[1:-1, 1:-1] = np.isfinite(costs) & ~reached
+    near_open = np.zeros_like(reached)
+    for dx, dy in FLOW_DIRECTIONS:
+        near_open |= padded_open[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx]
+    return np.flatnonzero(reached & near_open)
+
+def compute_flow_directions(costs: np.ndarray, distances: np.ndarray,
+                            allow_diagonal: bool = True) -> np.ndarray:
+    """Направление спуска по полю расстояний для каждой клетки (векторно)
+
+    Выбирается сосед с минимумом distance[n] + стоимость шага, то есть
+    следующий шаг кратчайшего пути; диагонали не срезают углы."""
+    rows, cols = distances.shape
+    padded_distance = np.full((rows + 2, cols + 2), np.inf, dtype=np.float64)
+    padded_distance[1:-1, 1:-1] = distances
+    padded_cost = np.full((rows + 2, cols + 2), np.inf, dtype=np.float32)
+    padded_cost[1:-1, 1:-1] = costs
+
+    moves = FLOW_DIRECTIONS if allow_diagonal else FLOW_DIRECTIONS[:4]
+    candidates = np.empty((len(moves), rows, cols), dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        for index, (dx, dy) in enumerate(moves):
+            neighbour_distance = padded_distance[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx]
+            neighbour_cost = padded_cost[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx]
+            length = SQRT2 if dx and dy else 1.0
+            candidate = neighbour_distance + length * 0.5 * (costs + neighbour_cost)
+            if dx and dy:
+                blocked = np.isinf(padded_cost[1:rows + 1, 1 + dx:cols + 1 + dx]) | \
+                          np.isinf(padded_cost[1 + dy:rows + 1 + dy, 1:cols + 1])
+                candidate[blocked] = np.inf
+            candidates[index] = candidate
+
+    directions = np.argmin(candidates, axis=0).astype(np.int8)
+    best = np.take_along_axis(candidates, directions[None].astype(np.intp), axis=0)[0]
+    # Цель, недостижимые клетки и клетки без спуска не имеют направления
+    directions[~np.isfinite(best) | (distances <= 0) | ~np.isfinite(distances)] = -1
+    return directions
+
+# = СЕРВИС ПОЛЕЙ ПОТОКА
+class FlowFieldService:
+    """Поля потока к целям (игрок, алтарь босса, ворота поселения)
+
+    Поля хранятся по идентификатору цели и используют карты сервиса
+    поиска пути. Сдвиг цели на небольшую стоимость обновляет поле
+    инкрементально: старые расстояния плюс стоимость сдвига остаются
+    верхними оценками, и Дейкстра распространяет только улучшения.
+    Чтение направления не зависит от числа агентов."""
+
+    def __init__(self, pathfinding: PathfindingService, settings: Optional[FlowFieldSettings] = None):
+        self.pathfinding = pathfinding
+        self.settings = settings or FlowFieldSettings()
+        self.fields: Dict[str, FlowField] = {}
+        self._lock = threading.RLock()
+
+        self.stats = {
+            "full_builds": 0,
+            "incremental_updates": 0,
+            "skipped_updates": 0,
+            "cells_processed": 0,
+            "build_time": 0.0,
+            "samples": 0
+        }
+        self.logger = logging.getLogger(__name__)
+
+    # Цели
+    def set_goal(self, field_id: str, map_id: str, x: float, y: float) -> Optional[FlowField]:
+        """Создание поля или перенос цели в мировые координаты (x, y)"""
+        try:
+            grid_map = self.pathfinding.get_map(map_id)
+            if grid_map is None:
+                self.logger.warning(f"Карта для поля потока не найдена: {map_id}")
+                return None
+            goal = grid_map.world_to_cell(x, y)
+            if not grid_map.is_walkable(goal):
+                return self.fields.get(field_id)
+
+            with self._lock:
+                flow_field = self.fields.get(field_id)
+                if flow_field is not None and flow_field.map_id == map_id and \
+                        flow_field.map_version == grid_map.version:
+                    if flow_field.goal == goal:
+                        self.stats["skipped_updates"] += 1
+                        return flow_field
+                    shift_cost = float(flow_field.distances[goal[1], goal[0]])
+                    if shift_cost <= self.settings.incremental_max_cost:
+                        return self._update_incremental(flow_field, grid_map, goal, shift_cost)
+
+                if flow_field is None and len(self.fields) >= self.settings.max_fields:
+                    oldest = min(self.fields.values(), key=lambda existing: existing.updated_at)
+                    del self.fields[oldest.field_id]
+                return self._build(field_id, grid_map, goal)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка обновления поля потока {field_id}: {e}")
+            return None
+
+    def _build(self, field_id: str, grid_map: GridMap, goal: Cell) -> FlowField:
+        """Полный расчет поля"""
+        start_time = time.time()
+        costs, version, _, _ = grid_map.snapshot()
+        distances = [math.inf] * len(costs)
+        processed = propagate_distances(costs, grid_map.width, grid_map.height, distances,
+                                        [goal], self.settings.allow_diagonal, self.settings.max_distance)
+        distance_array = np.array(distances).reshape(grid_map.height, grid_map.width)
+
+        flow_field = FlowField(field_id, grid_map.map_id, goal, distance_array,
+                               self._directions(grid_map, distance_array), version)
+        self.fields[field_id] = flow_field
+        self.stats["full_builds"] += 1
+        self.stats["cells_processed"] += processed
+        self.stats["build_time"] += time.time() - start_time
+        return flow_field
+
+    def _update_incremental(self, flow_field: FlowField, grid_map: GridMap,
+                            goal: Cell, shift_cost: float) -> FlowField:
+        """Перенос цели: путь через старую цель остается допустимым
+
+        Оценки за пределами радиуса отбрасываются, а граница поля
+        продолжает расчет, чтобы охватить клетки, ставшие ближе."""
+        start_time = time.time()
+        costs, _, _, _ = grid_map.snapshot()
+        shifted = flow_field.distances + shift_cost
+        shifted[shifted > self.settings.max_distance] = np.inf
+        frontier = find_field_frontier(grid_map.costs, shifted).tolist()
+        distances = shifted.ravel().tolist()
+        processed = propagate_distances(costs, grid_map.width, grid_map.height, distances,
+                                        [goal], self.settings.allow_diagonal,
+                                        self.settings.max_distance, frontier)
+        flow_field.distances = np.array(distances).reshape(flow_field.distances.shape)
+        flow_field.directions = self._directions(grid_map, flow_field.distances)
+        flow_field.goal = goal
+        flow_field.updated_at = time.time()
+
+        self.stats["incremental_updates"] += 1
+        self.stats["cells_processed"] += processed
+        self.stats["build_time"] += time.time() - start_time
+        return flow_field
+
+    def _directions(self, grid_map: GridMap, distances: np.ndarray) -> np.ndarray:
+        return compute_flow_directions(grid_map.costs, distances, self.settings.allow_diagonal)
+
+    def remove_goal(self, field_id: str) -> bool:
+        with self._lock:
+            return self.fields.pop(field_id, None) is not None
+
+    def has_goal(self, field_id: str) -> bool:
+        return field_id in self.fields
+
+    # Чтение
+    def _get_current(self, field_id: str) -> Optional[Tuple[FlowField, GridMap]]:
+        """Поле и его карта; при изменении карты поле пересчитывается"""
+        flow_field = self.fields.get(field_id)
+        if flow_field is None:
+            return None
+        grid_map = self.pathfinding.get_map(flow_field.map_id)
+        if grid_map is None:
+            return None
+        if grid_map.version != flow_field.map_version:
+            with self._lock:
+                flow_field = self._build(field_id, grid_map, flow_field.goal)
+        return flow_field, grid_map
+
+    def get_direction(self, field_id: str, x: float, y: float) -> Optional[Tuple[float, float]]:
+        """Единичный вектор движения к цели из точки мира
+
+        (0, 0) - точка уже в клетке цели; None - вне карты или недостижимо."""
+        current = self._get_current(field_id)
+        if current is None:
+            return None
+        flow_field, grid_map = current
+        cell_x, cell_y = grid_map.world_to_cell(x, y)
+        if not (0 <= cell_x < grid_map.width and 0 <= cell_y < grid_map.height):
+            return None
+
+        self.stats["samples"] += 1
+        code = flow_field.directions[cell_y, cell_x]
+        if code < 0:
+            return (0.0, 0.0) if (cell_x, cell_y) == flow_field.goal else None
+        vector = FLOW_VECTORS[code]
+        return float(vector[0]), float(vector[1])
+
+    def get_flee_direction(self, field_id: str, x: float, y: float) -> Optional[Tuple[float, float]]:
+        """Направление от цели: против потока"""
+        direction = self.get_direction(field_id, x, y)
+        return (-direction[0], -direction[1]) if direction is not None else None
+
+    def get_distance(self, field_id: str, x: float, y: float) -> float:
+        """Стоимость пути до цели из точки мира (inf - недостижимо)"""
+        current = self._get_current(field_id)
+        if current is None:
+            return math.inf
+        flow_field, grid_map = current
+        cell_x, cell_y = grid_map.world_to_cell(x, y)
+        if not (0 <= cell_x < grid_map.width and 0 <= cell_y < grid_map.height):
+            return math.inf
+        return float(flow_field.distances[cell_y, cell_x])
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики полей"""
+        builds = self.stats["full_builds"] + self.stats["incremental_updates"]
+        return {
+            **self.stats,
+            "fields": len(self.fields),
+            "average_build_time": self.stats["build_time"] / max(1, builds)
+        }
+
+    def clear(self):
+        with self._lock:
+            self.fields.clear()
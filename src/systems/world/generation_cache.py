@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Ограниченные LRU-кэши генераторов мира
+Общий бюджет памяти для кэшей высот, подземелий, поселений, структур и башен"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Any, Tuple, Iterator
+import itertools
+import logging
+import sys
+import threading
+import weakref
+
+import numpy as np
+
+# Бюджет памяти по умолчанию для всех кэшей генерации
+DEFAULT_GENERATION_BUDGET_MB = 256.0
+
+# = ОЦЕНКА РАЗМЕРА
+def estimate_size(value: Any, depth: int = 3) -> int:
+    """Приблизительный размер значения в байтах
+
+    Массивы NumPy учитываются точно (nbytes), контейнеры и объекты -
+    рекурсивно до заданной глубины."""
+    if isinstance(value, np.memmap):
+        return 0  # Данные отображены с диска, а не лежат в памяти процесса
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    size = sys.getsizeof(value)
+    if depth <= 0 or isinstance(value, (str, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k, depth - 1) + estimate_size(v, depth - 1)
+                          for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item, depth - 1) for item in value)
+    if hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), depth - 1)
+    return size
+
+# = ОБЩИЙ БЮДЖЕТ ПАМЯТИ
+class MemoryBudget:
+    """Общий бюджет памяти для набора кэшей
+
+    При превышении лимита вытесняется глобально самая старая запись
+    среди всех зарегистрированных кэшей. Кэши хранятся по слабым ссылкам
+    и освобождают свою долю бюджета при удалении владельца."""
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.used_bytes = 0
+        self.caches: "weakref.WeakSet[BoundedCache]" = weakref.WeakSet()
+        self._ticks = itertools.count()
+        self._lock = threading.RLock()  # adjust может вызываться из __del__ кэша
+        self._enforce_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def next_tick(self) -> int:
+        """Монотонная метка обращения, общая для всех кэшей бюджета"""
+        return next(self._ticks)
+
+    def register(self, cache: "BoundedCache"):
+        with self._lock:
+            self.caches.add(cache)
+
+    def unregister(self, cache: "BoundedCache"):
+        with self._lock:
+            self.caches.discard(cache)
+
+    def adjust(self, delta: int):
+        with self._lock:
+            self.used_bytes += delta
+
+    def set_limit_mb(self, limit_mb: float):
+        """Изменение лимита с немедленным применением"""
+        self.limit_bytes = int(limit_mb * 1024 * 1024)
+        self.enforce()
+
+    def enforce(self):
+        """Вытеснение самых старых записей до соблюдения лимита"""
+        with self._enforce_lock:
+            while self.used_bytes > self.limit_bytes:
+                victim = None
+                victim_tick = None
+                for cache in list(self.caches):
+                    tick = cache.oldest_tick()
+                    if tick is not None and (victim_tick is None or tick < victim_tick):
+                        victim, victim_tick = cache, tick
+                if victim is None or not victim.evict_oldest():
+                    break
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Статистика бюджета по всем кэшам"""
+        return {
+            "limit_mb": self.limit_bytes / (1024 * 1024),
+            "used_mb": self.used_bytes / (1024 * 1024),
+            "caches": {cache.name: cache.get_statistics() for cache in list(self.caches)}
+        }
+
+_generation_budget: Optional[MemoryBudget] = None
+_generation_budget_lock = threading.Lock()
+
+def get_generation_budget() -> MemoryBudget:
+    """Глобальный бюджет памяти кэшей генерации мира"""
+    global _generation_budget
+    with _generation_budget_lock:
+        if _generation_budget is None:
+            _generation_budget = MemoryBudget(int(DEFAULT_GENERATION_BUDGET_MB * 1024 * 1024))
+        return _generation_budget
+
+# = ОГРАНИЧЕННЫЙ LRU-КЭШ
+class BoundedCache:
+    """LRU-кэш с ограничением по числу записей и учетом размера в байтах
+
+    Вытеснение O(1) за счет упорядоченного словаря. Поддерживает
+    основные операции словаря, поэтому заменяет Dict без изменения
+    вызывающего кода. on_evict(key, value) вызывается для записей,
+    вытесненных по лимиту или бюджету и удаленных clear(), вне
+    блокировки кэша."""
+
+    def __init__(self, name: str, max_entries: int = 1000,
+                 budget: Optional[MemoryBudget] = None,
+                 on_evict: Optional[Callable[[Any, Any], None]] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self.budget = budget if budget is not None else get_generation_budget()
+        self._entries: "OrderedDict[Any, Tuple[Any, int, int]]" = OrderedDict()  # key -> (value, size, tick)
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+        self.budget.register(self)
+
+    # Доступ
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._entries[key] = (entry[0], entry[1], self.budget.next_tick())
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key: Any, value: Any):
+        size = estimate_size(value)
+        evicted_bytes = 0
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                evicted_bytes += previous[1]
+            self._entries[key] = (value, size, self.budget.next_tick())
+            while len(self._entries) > self.max_entries:
+                old_key, (old_value, old_size, _) = self._entries.popitem(last=False)
+                evicted_bytes += old_size
+                evicted.append((old_key, old_value))
+                self.stats["evictions"] += 1
+            self.size_bytes += size - evicted_bytes
+
+        # Бюджет обновляется вне блокировки кэша
+        self.budget.adjust(size - evicted_bytes)
+        self._notify_evicted(evicted)
+        self.budget.enforce()
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.size_bytes -= entry[1]
+        self.budget.adjust(-entry[1])
+        return entry[0]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Any, value: Any):
+        self.put(key, value)
+
+    def __delitem__(self, key: Any):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._entries.keys()))
+
+    def keys(self) -> List[Any]:
+        return list(self._entries.keys())
+
+    def values(self) -> List[Any]:
+        return [entry[0] for entry in list(self._entries.values())]
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        return [(key, entry[0]) for key, entry in list(self._entries.items())]
+
+    # Вытеснение
+    def oldest_tick(self) -> Optional[int]:
+        with self._lock:
+            if not self._entries:
+                return None
+            return self._entries[next(iter(self._entries))][2]
+
+    def evict_oldest(self) -> bool:
+        with self._lock:
+            if not self._entries:
+                return False
+            key, (value, size, _) = self._entries.popitem(last=False)
+            self.size_bytes -= size
+            self.stats["evictions"] += 1
+        self.budget.adjust(-size)
+        self._notify_evicted([(key, value)])
+        return True
+
+    def clear(self):
+        with self._lock:
+            released = self.size_bytes
+            removed = [(key, entry[0]) for key, entry in self._entries.items()] if self.on_evict else []
+            self._entries.clear()
+            self.size_bytes = 0
+        self.budget.adjust(-released)
+        self._notify_evicted(removed)
+
+    def _notify_evicted(self, evicted: List[Tuple[Any, Any]]):
+        if self.on_evict is None:
+            return
+        for key, value in evicted:
+            try:
+                self.on_evict(key, value)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Ошибка обработчика вытеснения кэша {self.name}: {e}")
+
+    def close(self):
+        """Очистка и отключение от бюджета"""
+        self.clear()
+        self.budget.unregister(self)
+
+    def __del__(self):
+        try:
+            self.budget.adjust(-self.size_bytes)
+        except Exception:
+            pass
+
+    def get_statistics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "size_mb": self.size_bytes / (1024 * 1024),
+            "hit_rate": self.stats["hits"] / max(1, lookups)
+        }
+
+_MISSING = object()
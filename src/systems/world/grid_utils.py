@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""Операции над сетками занятости генераторов локаций
+Таблица сумм (summed-area table) отвечает на вопрос о занятости любого
+прямоугольника за O(1), поэтому поиск места перебирает все окна сразу"""
+
+import numpy as np
+
+# = ТАБЛИЦА СУММ
+def occupancy_table(grid: np.ndarray, empty_value: int = 0) -> np.ndarray:
+    """Таблица сумм занятых клеток с нулевой строкой и столбцом"""
+    table = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1), dtype=np.int32)
+    np.cumsum(grid != empty_value, axis=0, dtype=np.int32, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+def window_occupancy(table: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Число занятых клеток в каждом окне width x height
+
+    Элемент [y, x] результата относится к окну с левым верхним углом (x, y)."""
+    return (table[height:, width:] - table[:-height, width:]
+            - table[height:, :-width] + table[:-height, :-width])
+
+def free_window_positions(grid: np.ndarray, width: int, height: int,
+                          empty_value: int = 0) -> np.ndarray:
+    """Левые верхние углы (x, y) всех полностью свободных окон, массив формы (n, 2)"""
+    if width > grid.shape[1] or height > grid.shape[0]:
+        return np.empty((0, 2), dtype=np.intp)
+    occupied = window_occupancy(occupancy_table(grid, empty_value), width, height)
+    ys, xs = np.nonzero(occupied == 0)
+    return np.stack([xs, ys], axis=1)
@@ -8,10 +8,25 @@ from typing import Dict, List, Optional, Any, Tuple, Callable
 import logging
 import math
 import random
+import struct
 import time
+import zlib
 import numpy as np
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.generation_cache import BoundedCache
+
+# Версия алгоритма генерации: увеличивается при любом изменении,
+# которое меняет результат для тех же настроек и сида
+TERRAIN_GENERATOR_VERSION = 4
+
+# Максимальный уровень детализации: 0 - полное разрешение, 3 - 1/8
+MAX_TERRAIN_LOD = 3
+
+# Смещения 8 соседей клетки для эрозии и длины шагов к ним
+_NEIGHBOUR_DY = np.array([-1, -1, -1, 0, 0, 1, 1, 1])
+_NEIGHBOUR_DX = np.array([-1, 0, 1, -1, 1, -1, 0, 1])
+_NEIGHBOUR_DISTANCE = np.hypot(_NEIGHBOUR_DY, _NEIGHBOUR_DX)
 
 # = ТИПЫ И ПЕРЕЧИСЛЕНИЯ
 class TerrainType(Enum):
@@ -63,11 +78,160 @@ class BiomeSettings:
 class ErosionSettings:
     """Настройки эрозии"""
     enabled: bool = True
-    iterations: int = 1000
+    iterations: int = 4000          # Число капель на чанк полного разрешения
     erosion_rate: float = 0.1
     deposition_rate: float = 0.1
     evaporation_rate: float = 0.01
     gravity: float = 9.81
+    max_lifetime: int = 32          # Максимальное число шагов капли
+    sediment_capacity: float = 1.0  # Груз на единицу уклона и воды
+    min_slope: float = 0.01         # Минимальный уклон для расчета вместимости
+    border_falloff: int = 4         # Ширина зоны затухания у границы чанка, клеток
+
+# = КЛАССИФИКАЦИЯ БИОМОВ
+class BiomeLookupTable:
+    """Двумерная таблица биомов в стиле диаграммы Уиттекера
+
+    Ось 0 - температура, ось 1 - влажность. Каждая ячейка хранит индекс
+    биома в списке labels, поэтому стоимость классификации не зависит
+    от количества зарегистрированных биомов."""
+
+    def __init__(self, labels: List[Any], codes: np.ndarray,
+                 temperature_range: Tuple[float, float],
+                 humidity_range: Tuple[float, float] = (0.0, 1.0)):
+        if codes.ndim != 2:
+            raise ValueError("Таблица биомов должна быть двумерной")
+        if codes.size and (codes.min() < 0 or codes.max() >= len(labels)):
+            raise ValueError("Индексы таблицы выходят за пределы списка биомов")
+
+        self.labels = list(labels)
+        self.codes = codes.astype(np.int32, copy=False)
+        self.temperature_range = temperature_range
+        self.humidity_range = humidity_range
+
+    @classmethod
+    def from_biome_manager(cls, biome_manager: Any,
+                           temperature_range: Tuple[float, float],
+                           humidity_range: Tuple[float, float] = (0.0, 1.0),
+                           resolution: int = 64,
+                           elevation: Optional[float] = None) -> "BiomeLookupTable":
+        """Построение таблицы из свойств биомов менеджера биомов
+
+        Оценка соответствия совпадает с BiomeManager.determine_biome и
+        вычисляется один раз на ячейку таблицы, а не на клетку карты."""
+        biomes = list(biome_manager.biomes.items())
+        if not biomes:
+            raise ValueError("Менеджер биомов не содержит биомов")
+
+        temperatures = np.linspace(temperature_range[0], temperature_range[1], resolution)
+        humidities = np.linspace(humidity_range[0], humidity_range[1], resolution)
+        T, H = np.meshgrid(temperatures, humidities, indexing="ij")
+
+        scores = np.empty((len(biomes), resolution, resolution), dtype=np.float32)
+        for index, (_, properties) in enumerate(biomes):
+            temp_center = sum(properties.temperature_range) / 2
+            humidity_center = sum(properties.humidity_range) / 2
+            score = (1.0 - np.abs(T - temp_center) / 25.0) + (1.0 - np.abs(H - humidity_center))
+            count = 2.0
+            if elevation is not None:
+                elevation_center = sum(properties.elevation_range) / 2
+                score += 1.0 - abs(elevation - elevation_center) / 1000.0
+                count += 1.0
+            scores[index] = score / count
+
+        labels = [biome_type for biome_type, _ in biomes]
+        return cls(labels, np.argmax(scores, axis=0), temperature_range, humidity_range)
+
+    def indices(self, temperature: np.ndarray,
+                humidity: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Индексы ячеек таблицы для массивов температуры и влажности"""
+        t_bins, h_bins = self.codes.shape
+        t_min, t_max = self.temperature_range
+        h_min, h_max = self.humidity_range
+
+        t_index = ((temperature - t_min) / max(t_max - t_min, 1e-6) * (t_bins - 1)).round()
+        h_index = ((humidity - h_min) / max(h_max - h_min, 1e-6) * (h_bins - 1)).round()
+        t_index = np.clip(np.nan_to_num(t_index), 0, t_bins - 1).astype(np.intp)
+        h_index = np.clip(np.nan_to_num(h_index), 0, h_bins - 1).astype(np.intp)
+
+        return t_index, h_index
+
+    def lookup(self, temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+        """Поиск индексов биомов для массивов температуры и влажности"""
+        return self.codes[self.indices(temperature, humidity)]
+
+class BiomeClassifier:
+    """Векторизованный классификатор биомов для целого чанка
+
+    Коды карты биомов - индексы в списке labels. Первые коды всегда
+    соответствуют TerrainType, биомы подключенной таблицы добавляются
+    после них."""
+
+    def __init__(self, settings: HeightMapSettings):
+        self.settings = settings
+        self.labels: List[Any] = list(TerrainType)
+        self.label_codes: Dict[Any, int] = {label: code for code, label in enumerate(self.labels)}
+        self.lookup_table: Optional[BiomeLookupTable] = None
+        self._table_codes: Optional[np.ndarray] = None
+
+    def code_of(self, biome: Any) -> int:
+        """Получение кода биома"""
+        return self.label_codes[biome]
+
+    def label_of(self, code: int) -> Any:
+        """Получение биома по коду"""
+        return self.labels[code]
+
+    def set_lookup_table(self, table: Optional[BiomeLookupTable]) -> None:
+        """Подключение таблицы биомов для равнинного пояса высот"""
+        self.lookup_table = table
+        if table is None:
+            self._table_codes = None
+            return
+
+        remap = np.empty(len(table.labels), dtype=np.int32)
+        for index, label in enumerate(table.labels):
+            if label not in self.label_codes:
+                self.label_codes[label] = len(self.labels)
+                self.labels.append(label)
+            remap[index] = self.label_codes[label]
+
+        # Переводим локальные индексы таблицы в коды классификатора один раз
+        self._table_codes = remap[table.codes]
+
+    def classify(self, height_map: np.ndarray, temperature_map: np.ndarray,
+                 humidity_map: np.ndarray) -> np.ndarray:
+        """Классификация всей карты по маскам высот, температуры и влажности"""
+        settings = self.settings
+        normalized = (height_map - settings.min_height) / (settings.max_height - settings.min_height)
+        lowland = normalized < settings.hill_threshold
+
+        if self.lookup_table is not None:
+            lowland_biome = self._table_codes[self.lookup_table.indices(temperature_map, humidity_map)]
+        else:
+            lowland_biome = np.where(humidity_map > 0.6,
+                                     self.label_codes[TerrainType.FOREST],
+                                     self.label_codes[TerrainType.GRASSLAND])
+
+        conditions = [
+            normalized < settings.beach_width,
+            lowland,
+            normalized < settings.mountain_threshold,
+            temperature_map < -10,
+        ]
+        choices = [
+            self.label_codes[TerrainType.BEACH],
+            lowland_biome,
+            self.label_codes[TerrainType.HILLS],
+            self.label_codes[TerrainType.SNOW],
+        ]
+
+        return np.select(conditions, choices,
+                         default=self.label_codes[TerrainType.MOUNTAINS]).astype(np.int32)
+
+def get_lod_resolution(chunk_size: int, lod: int) -> int:
+    """Число отсчетов на сторону чанка для уровня детализации"""
+    return max(1, chunk_size >> lod)
 
 # = ОСНОВНАЯ СИСТЕМА ГЕНЕРАЦИИ ВЫСОТ
 class HeightMapGenerator(BaseComponent):
@@ -85,15 +249,20 @@ class HeightMapGenerator(BaseComponent):
         self.biome_settings = BiomeSettings()
         self.erosion_settings = ErosionSettings()
         
-        # Кэш для сгенерированных данных
-        self.height_cache: Dict[str, np.ndarray] = {}
-        self.biome_cache: Dict[str, np.ndarray] = {}
-        self.temperature_cache: Dict[str, np.ndarray] = {}
-        self.humidity_cache: Dict[str, np.ndarray] = {}
+        # Векторизованный классификатор биомов
+        self.biome_classifier = BiomeClassifier(self.settings)
+        
+        # Кэш для сгенерированных данных (LRU в общем бюджете памяти)
+        self.height_cache = BoundedCache("height_map.height", max_entries=256)
+        self.biome_cache = BoundedCache("height_map.biome", max_entries=256)
+        self.temperature_cache = BoundedCache("height_map.temperature", max_entries=256)
+        self.humidity_cache = BoundedCache("height_map.humidity", max_entries=256)
         
         # Системные параметры
         self.seed = int(time.time())
         self.random_generator = random.Random(self.seed)
+        self.noise_seed = self.seed  # Общий для мира: смещения шума одинаковы во всех чанках
+        self._noise_offsets: Dict[Tuple[float, int, int], Tuple[float, float]] = {}
         
         # Статистика генерации
         self.generation_stats = {
@@ -118,28 +287,37 @@ class HeightMapGenerator(BaseComponent):
             return False
     
     def generate_height_map(self, chunk_x: int, chunk_y: int, 
-                           chunk_size: int = 64) -> np.ndarray:
-        """Генерация карты высот для чанка"""
+                           chunk_size: int = 64, lod: int = 0) -> np.ndarray:
+        """Генерация карты высот для чанка
+
+        lod задает уровень детализации: карта имеет chunk_size >> lod
+        отсчетов на сторону и покрывает ту же область мира. Шум вычисляется
+        сразу в нужном разрешении, без генерации полной карты."""
+        lod = min(max(lod, 0), MAX_TERRAIN_LOD)
+        resolution = get_lod_resolution(chunk_size, lod)
         try:
             start_time = time.time()
-            chunk_key = f"{chunk_x}_{chunk_y}_{chunk_size}"
+            chunk_key = f"{chunk_x}_{chunk_y}_{chunk_size}" + (f"_lod{lod}" if lod else "")
             
             # Проверяем кэш
-            if chunk_key in self.height_cache:
+            cached = self.height_cache.get(chunk_key)
+            if cached is not None:
                 self.generation_stats["cache_hits"] += 1
-                return self.height_cache[chunk_key]
+                return cached
             
             self.generation_stats["cache_misses"] += 1
             
             # Создаем базовую карту высот
-            height_map = self._create_base_height_map(chunk_x, chunk_y, chunk_size)
+            height_map = self._create_base_height_map(chunk_x, chunk_y, chunk_size, resolution)
             
             # Применяем слои шума
-            height_map = self._apply_noise_layers(height_map, chunk_x, chunk_y, chunk_size)
+            height_map = self._apply_noise_layers(height_map, chunk_x, chunk_y, chunk_size, resolution)
             
-            # Применяем эрозию
+            # Применяем эрозию (число капель пропорционально числу клеток)
             if self.erosion_settings.enabled:
-                height_map = self._apply_erosion(height_map)
+                height_map = self._apply_erosion(
+                    height_map, max(1, self.erosion_settings.iterations >> (2 * lod))
+                )
             
             # Нормализуем высоты
             height_map = self._normalize_heights(height_map)
@@ -159,18 +337,20 @@ class HeightMapGenerator(BaseComponent):
         except Exception as e:
             self._logger.error(f"Ошибка генерации карты высот для чанка {chunk_x}, {chunk_y}: {e}")
             # Возвращаем пустую карту в случае ошибки
-            return np.zeros((chunk_size, chunk_size), dtype=np.float32)
+            return np.zeros((resolution, resolution), dtype=np.float32)
     
-    def _create_base_height_map(self, chunk_x: int, chunk_y: int, chunk_size: int) -> np.ndarray:
+    def _create_base_height_map(self, chunk_x: int, chunk_y: int, chunk_size: int,
+                                resolution: Optional[int] = None) -> np.ndarray:
         """Создание базовой карты высот"""
+        resolution = resolution or chunk_size
         try:
             # Создаем координатную сетку
-            x_coords = np.linspace(chunk_x * chunk_size, (chunk_x + 1) * chunk_size, chunk_size)
-            y_coords = np.linspace(chunk_y * chunk_size, (chunk_y + 1) * chunk_size, chunk_size)
+            x_coords = np.linspace(chunk_x * chunk_size, (chunk_x + 1) * chunk_size, resolution)
+            y_coords = np.linspace(chunk_y * chunk_size, (chunk_y + 1) * chunk_size, resolution)
             X, Y = np.meshgrid(x_coords, y_coords)
             
             # Базовые высоты
-            base_height = np.full((chunk_size, chunk_size), self.settings.base_height, dtype=np.float32)
+            base_height = np.full((resolution, resolution), self.settings.base_height, dtype=np.float32)
             
             # Добавляем глобальный уклон (например, от севера к югу)
             global_slope = (Y - chunk_y * chunk_size) * 0.01
@@ -180,31 +360,34 @@ class HeightMapGenerator(BaseComponent):
             
         except Exception as e:
             self._logger.error(f"Ошибка создания базовой карты высот: {e}")
-            return np.zeros((chunk_size, chunk_size), dtype=np.float32)
+            return np.zeros((resolution, resolution), dtype=np.float32)
     
     def _apply_noise_layers(self, height_map: np.ndarray, chunk_x: int, chunk_y: int, 
-                           chunk_size: int) -> np.ndarray:
+                           chunk_size: int, resolution: Optional[int] = None) -> np.ndarray:
         """Применение слоев шума к карте высот"""
         try:
             result = height_map.copy()
             
             # Основной слой шума (крупные формы рельефа)
             main_noise = self._generate_perlin_noise(chunk_x, chunk_y, chunk_size, 
-                                                   scale=self.settings.scale, octaves=1)
+                                                   scale=self.settings.scale, octaves=1,
+                                                   resolution=resolution)
             result += main_noise * 200.0
             
             # Детализирующий слой (средние формы)
             detail_noise = self._generate_perlin_noise(chunk_x, chunk_y, chunk_size,
-                                                     scale=self.settings.scale * 0.5, octaves=3)
+                                                     scale=self.settings.scale * 0.5, octaves=3,
+                                                     resolution=resolution)
             result += detail_noise * 100.0
             
             # Мелкие детали (каменистость)
             fine_noise = self._generate_perlin_noise(chunk_x, chunk_y, chunk_size,
-                                                   scale=self.settings.scale * 0.25, octaves=6)
+                                                   scale=self.settings.scale * 0.25, octaves=6,
+                                                   resolution=resolution)
             result += fine_noise * 50.0
             
             # Фрактальный шум для естественности
-            fractal_noise = self._generate_fractal_noise(chunk_x, chunk_y, chunk_size)
+            fractal_noise = self._generate_fractal_noise(chunk_x, chunk_y, chunk_size, resolution)
             result += fractal_noise * 75.0
             
             return result
@@ -214,26 +397,29 @@ class HeightMapGenerator(BaseComponent):
             return height_map
     
     def _generate_perlin_noise(self, chunk_x: int, chunk_y: int, chunk_size: int,
-                              scale: float, octaves: int) -> np.ndarray:
+                              scale: float, octaves: int,
+                              resolution: Optional[int] = None) -> np.ndarray:
         """Генерация шума Перлина"""
+        resolution = resolution or chunk_size
         try:
             # Создаем координатную сетку
             x_coords = np.linspace(chunk_x * chunk_size / scale, 
-                                 (chunk_x + 1) * chunk_size / scale, chunk_size)
+                                 (chunk_x + 1) * chunk_size / scale, resolution)
             y_coords = np.linspace(chunk_y * chunk_size / scale, 
-                                 (chunk_y + 1) * chunk_size / scale, chunk_size)
+                                 (chunk_y + 1) * chunk_size / scale, resolution)
             X, Y = np.meshgrid(x_coords, y_coords)
             
             # Генерируем шум Перлина
-            noise = np.zeros((chunk_size, chunk_size))
+            noise = np.zeros((resolution, resolution))
             
             for i in range(octaves):
                 frequency = self.settings.lacunarity ** i
                 amplitude = self.settings.persistence ** i
                 
                 # Смешиваем координаты для разнообразия
-                x_noise = X * frequency + self.random_generator.uniform(0, 1000)
-                y_noise = Y * frequency + self.random_generator.uniform(0, 1000)
+                offset_x, offset_y = self._get_noise_offset(scale, octaves, i)
+                x_noise = X * frequency + offset_x
+                y_noise = Y * frequency + offset_y
                 
                 # Простая реализация шума Перлина (для производительности)
                 layer_noise = self._simple_perlin_noise(x_noise, y_noise)
@@ -243,7 +429,28 @@ class HeightMapGenerator(BaseComponent):
             
         except Exception as e:
             self._logger.error(f"Ошибка генерации шума Перлина: {e}")
-            return np.zeros((chunk_size, chunk_size))
+            return np.zeros((resolution, resolution))
+    
+    def _get_noise_offset(self, scale: float, octaves: int, octave: int) -> Tuple[float, float]:
+        """Смещение октавы шума, зависящее только от noise_seed и слоя
+        
+        Смещения не берутся из состояния генератора, поэтому соседние
+        чанки видят одно и то же поле шума и стыкуются без швов."""
+        key = (scale, octaves, octave)
+        offset = self._noise_offsets.get(key)
+        if offset is None:
+            packed = struct.pack("<qdii", self.noise_seed, scale, octaves, octave)
+            layer_random = random.Random(zlib.crc32(packed))
+            offset = (layer_random.uniform(0, 1000), layer_random.uniform(0, 1000))
+            self._noise_offsets[key] = offset
+        return offset
+    
+    def set_noise_seed(self, noise_seed: int):
+        """Установка общего для мира сида шума"""
+        if noise_seed != self.noise_seed:
+            self.noise_seed = noise_seed
+            self._noise_offsets.clear()
+            self.clear_cache()
     
     def _simple_perlin_noise(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
         """Упрощенная реализация шума Перлина"""
@@ -289,59 +496,103 @@ class HeightMapGenerator(BaseComponent):
             self._logger.error(f"Ошибка простого шума Перлина: {e}")
             return np.zeros_like(x)
     
-    def _generate_fractal_noise(self, chunk_x: int, chunk_y: int, chunk_size: int) -> np.ndarray:
+    def _generate_fractal_noise(self, chunk_x: int, chunk_y: int, chunk_size: int,
+                                resolution: Optional[int] = None) -> np.ndarray:
         """Генерация фрактального шума"""
+        resolution = resolution or chunk_size
         try:
-            result = np.zeros((chunk_size, chunk_size))
+            result = np.zeros((resolution, resolution))
             
             # Множественные слои с разными масштабами
             for i in range(4):
                 scale = self.settings.scale * (0.5 ** i)
                 amplitude = 50.0 * (0.7 ** i)
                 
-                layer = self._generate_perlin_noise(chunk_x, chunk_y, chunk_size, scale, 2)
+                layer = self._generate_perlin_noise(chunk_x, chunk_y, chunk_size, scale, 2, resolution)
                 result += layer * amplitude
             
             return result
             
         except Exception as e:
             self._logger.error(f"Ошибка генерации фрактального шума: {e}")
-            return np.zeros((chunk_size, chunk_size))
+            return np.zeros((resolution, resolution))
     
-    def _apply_erosion(self, height_map: np.ndarray) -> np.ndarray:
-        """Применение эрозии к карте высот"""
+    def _apply_erosion(self, height_map: np.ndarray, iterations: Optional[int] = None) -> np.ndarray:
+        """Применение гидравлической эрозии к карте высот
+
+        Все капли симулируются одновременно: на каждом шаге для каждой
+        капли выбирается самый крутой спуск среди 8 соседей, после чего
+        материал размывается или откладывается в зависимости от
+        насыщенности капли. Граничные клетки не изменяются, а влияние
+        эрозии плавно затухает к краям, поэтому соседние чанки
+        стыкуются без швов."""
         try:
-            if not self.erosion_settings.enabled:
+            settings = self.erosion_settings
+            if not settings.enabled:
                 return height_map
             
-            result = height_map.copy()
-            height, width = result.shape
+            rows, cols = height_map.shape
+            if rows < 3 or cols < 3:
+                return height_map
+            
+            result = height_map.astype(np.float64)
+            flat = result.ravel()
+            droplet_count = iterations or settings.iterations
+            rng = np.random.default_rng(self.random_generator.getrandbits(32))
             
-            # Простая гидравлическая эрозия
-            for iteration in range(self.erosion_settings.iterations):
-                # Выбираем случайную точку
-                x = self.random_generator.randint(0, width - 1)
-                y = self.random_generator.randint(0, height - 1)
+            # Капли стартуют только во внутренних клетках
+            y = rng.integers(1, rows - 1, droplet_count)
+            x = rng.integers(1, cols - 1, droplet_count)
+            water = np.ones(droplet_count)
+            sediment = np.zeros(droplet_count)
+            
+            for _ in range(settings.max_lifetime):
+                if y.size == 0:
+                    break
                 
-                if y < height - 1:  # Не на нижней границе
-                    # Вычисляем градиент
-                    current_height = result[y, x]
-                    down_height = result[y + 1, x]
-                    
-                    if current_height > down_height:
-                        # Переносим материал вниз
-                        height_diff = current_height - down_height
-                        transfer = min(height_diff * self.erosion_settings.erosion_rate, 
-                                     height_diff * 0.5)
-                        
-                        result[y, x] -= transfer
-                        result[y + 1, x] += transfer * self.erosion_settings.deposition_rate
+                cells = y * cols + x
+                current = flat[cells]
+                neighbours = flat[cells[:, None] + (_NEIGHBOUR_DY * cols + _NEIGHBOUR_DX)]
+                slopes = (current[:, None] - neighbours) / _NEIGHBOUR_DISTANCE
+                direction = np.argmax(slopes, axis=1)
+                slope = slopes[np.arange(y.size), direction]
+                drop = slope * _NEIGHBOUR_DISTANCE[direction]
                 
-                # Эвапорация
-                if iteration % 100 == 0:
-                    result *= (1.0 - self.erosion_settings.evaporation_rate)
+                # Вместимость растет с крутизной и объемом воды
+                capacity = np.maximum(slope, settings.min_slope) * water * settings.sediment_capacity
+                excess = sediment - capacity
+                
+                # Капли в одной клетке делят между собой допустимый перепад
+                share = np.bincount(cells, minlength=flat.size)[cells]
+                
+                # Перенасыщенная капля откладывает часть груза, иначе размывает склон
+                change = np.where(
+                    excess > 0,
+                    excess * settings.deposition_rate,
+                    -np.minimum(-excess * settings.erosion_rate, drop * 0.5 / share)
+                )
+                # В яме капля засыпает ее не выше самого низкого соседа и исчезает
+                in_pit = slope <= 0
+                change[in_pit] = np.minimum(sediment[in_pit], -drop[in_pit] / share[in_pit])
+                
+                flat += np.bincount(cells, weights=change, minlength=flat.size)
+                sediment -= change
+                
+                y = y + _NEIGHBOUR_DY[direction]
+                x = x + _NEIGHBOUR_DX[direction]
+                water *= 1.0 - settings.evaporation_rate
+                
+                # Капли на границе чанка уносят груз за его пределы
+                alive = ~in_pit & (y > 0) & (y < rows - 1) & (x > 0) & (x < cols - 1)
+                y, x, water, sediment = y[alive], x[alive], water[alive], sediment[alive]
             
-            return result
+            # Затухание изменений к краям: граница остается общей с соседями
+            falloff = max(1, min(settings.border_falloff, min(rows, cols) // 4))
+            weight_y = np.clip(np.minimum(np.arange(rows), np.arange(rows)[::-1]) / falloff, 0.0, 1.0)
+            weight_x = np.clip(np.minimum(np.arange(cols), np.arange(cols)[::-1]) / falloff, 0.0, 1.0)
+            
+            eroded = height_map + (result - height_map) * np.outer(weight_y, weight_x)
+            return eroded.astype(height_map.dtype, copy=False)
             
         except Exception as e:
             self._logger.error(f"Ошибка применения эрозии: {e}")
@@ -369,30 +620,27 @@ class HeightMapGenerator(BaseComponent):
             self._logger.error(f"Ошибка нормализации высот: {e}")
             return height_map
     
-    def generate_biome_map(self, height_map: np.ndarray, chunk_x: int, chunk_y: int) -> np.ndarray:
-        """Генерация карты биомов на основе высот"""
+    def generate_biome_map(self, height_map: np.ndarray, chunk_x: int, chunk_y: int,
+                           chunk_size: Optional[int] = None) -> np.ndarray:
+        """Генерация карты биомов на основе высот
+
+        chunk_size нужен для карт пониженной детализации, где размер
+        массива меньше размера чанка в мире."""
         try:
-            chunk_key = f"biome_{chunk_x}_{chunk_y}"
+            chunk_key = f"biome_{chunk_x}_{chunk_y}_{height_map.shape[1]}"
             
-            if chunk_key in self.biome_cache:
-                return self.biome_cache[chunk_key]
+            cached = self.biome_cache.get(chunk_key)
+            if cached is not None:
+                return cached
             
             height, width = height_map.shape
-            biome_map = np.zeros((height, width), dtype=np.int32)
             
             # Генерируем температуру и влажность
-            temperature_map = self._generate_temperature_map(chunk_x, chunk_y, height, width)
-            humidity_map = self._generate_humidity_map(chunk_x, chunk_y, height, width)
-            
-            # Определяем биомы для каждой точки
-            for y in range(height):
-                for x in range(width):
-                    height_val = height_map[y, x]
-                    temperature = temperature_map[y, x]
-                    humidity = humidity_map[y, x]
-                    
-                    biome = self._determine_biome(height_val, temperature, humidity)
-                    biome_map[y, x] = biome.value
+            temperature_map = self._generate_temperature_map(chunk_x, chunk_y, height, width, chunk_size)
+            humidity_map = self._generate_humidity_map(chunk_x, chunk_y, height, width, chunk_size)
+            
+            # Классифицируем весь чанк за один проход по массивам
+            biome_map = self.biome_classifier.classify(height_map, temperature_map, humidity_map)
             
             # Кэшируем результат
             self.biome_cache[chunk_key] = biome_map
@@ -403,13 +651,15 @@ class HeightMapGenerator(BaseComponent):
             self._logger.error(f"Ошибка генерации карты биомов: {e}")
             return np.zeros_like(height_map, dtype=np.int32)
     
-    def _generate_temperature_map(self, chunk_x: int, chunk_y: int, height: int, width: int) -> np.ndarray:
+    def _generate_temperature_map(self, chunk_x: int, chunk_y: int, height: int, width: int,
+                                  chunk_size: Optional[int] = None) -> np.ndarray:
         """Генерация карты температур"""
         try:
-            chunk_key = f"temp_{chunk_x}_{chunk_y}"
+            chunk_key = f"temp_{chunk_x}_{chunk_y}_{width}"
             
-            if chunk_key in self.temperature_cache:
-                return self.temperature_cache[chunk_key]
+            cached = self.temperature_cache.get(chunk_key)
+            if cached is not None:
+                return cached
             
             # Базовая температура зависит от широты (Y координата)
             base_temp = np.linspace(self.biome_settings.temperature_range[1],
@@ -417,8 +667,8 @@ class HeightMapGenerator(BaseComponent):
             base_temp = np.tile(base_temp[:, np.newaxis], (1, width))
             
             # Добавляем случайные вариации
-            noise = self._generate_perlin_noise(chunk_x, chunk_y, width, 
-                                              scale=100.0, octaves=2)
+            noise = self._generate_perlin_noise(chunk_x, chunk_y, chunk_size or width, 
+                                              scale=100.0, octaves=2, resolution=width)
             temperature_variation = noise * 10.0
             
             # Финальная температура
@@ -438,20 +688,22 @@ class HeightMapGenerator(BaseComponent):
                          (self.biome_settings.temperature_range[0] + 
                           self.biome_settings.temperature_range[1]) / 2)
     
-    def _generate_humidity_map(self, chunk_x: int, chunk_y: int, height: int, width: int) -> np.ndarray:
+    def _generate_humidity_map(self, chunk_x: int, chunk_y: int, height: int, width: int,
+                               chunk_size: Optional[int] = None) -> np.ndarray:
         """Генерация карты влажности"""
         try:
-            chunk_key = f"humidity_{chunk_x}_{chunk_y}"
+            chunk_key = f"humidity_{chunk_x}_{chunk_y}_{width}"
             
-            if chunk_key in self.humidity_cache:
-                return self.humidity_cache[chunk_key]
+            cached = self.humidity_cache.get(chunk_key)
+            if cached is not None:
+                return cached
             
             # Базовая влажность
             humidity = np.full((height, width), 0.5)
             
             # Добавляем случайные вариации
-            noise = self._generate_perlin_noise(chunk_x, chunk_y, width,
-                                              scale=80.0, octaves=3)
+            noise = self._generate_perlin_noise(chunk_x, chunk_y, chunk_size or width,
+                                              scale=80.0, octaves=3, resolution=width)
             humidity_variation = noise * 0.3
             
             # Финальная влажность
@@ -467,33 +719,53 @@ class HeightMapGenerator(BaseComponent):
             self._logger.error(f"Ошибка генерации карты влажности: {e}")
             return np.full((height, width), 0.5)
     
-    def _determine_biome(self, height: float, temperature: float, humidity: float) -> TerrainType:
+    def _determine_biome(self, height: float, temperature: float, humidity: float) -> Any:
         """Определение биома на основе параметров"""
         try:
-            # Нормализуем высоту
-            normalized_height = (height - self.settings.min_height) / \
-                              (self.settings.max_height - self.settings.min_height)
-            
-            # Определяем биом по высоте
-            if normalized_height < self.settings.beach_width:
-                return TerrainType.BEACH
-            elif normalized_height < self.settings.hill_threshold:
-                if humidity > 0.6:
-                    return TerrainType.FOREST
-                else:
-                    return TerrainType.GRASSLAND
-            elif normalized_height < self.settings.mountain_threshold:
-                return TerrainType.HILLS
-            else:
-                if temperature < -10:
-                    return TerrainType.SNOW
-                else:
-                    return TerrainType.MOUNTAINS
+            code = self.biome_classifier.classify(np.asarray([height]),
+                                                  np.asarray([temperature]),
+                                                  np.asarray([humidity]))[0]
+            return self.biome_classifier.label_of(int(code))
             
         except Exception as e:
             self._logger.error(f"Ошибка определения биома: {e}")
             return TerrainType.GRASSLAND
     
+    def set_biome_lookup_table(self, table: Optional[BiomeLookupTable]) -> None:
+        """Подключение таблицы биомов (None возвращает правила по умолчанию)"""
+        try:
+            self.biome_classifier.set_lookup_table(table)
+            self.biome_cache.clear()
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка подключения таблицы биомов: {e}")
+    
+    def load_biomes_from_manager(self, biome_manager: Any, resolution: int = 64) -> bool:
+        """Построение таблицы биомов из BiomeManager"""
+        try:
+            table = BiomeLookupTable.from_biome_manager(
+                biome_manager,
+                self.biome_settings.temperature_range,
+                self.biome_settings.humidity_range,
+                resolution=resolution
+            )
+            self.set_biome_lookup_table(table)
+            return True
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка построения таблицы биомов: {e}")
+            return False
+    
+    def get_generator_version(self) -> str:
+        """Версия генератора с отпечатком настроек (ключ постоянного хранилища)"""
+        fingerprint = repr((self.settings, self.biome_settings, self.erosion_settings,
+                            [str(label) for label in self.biome_classifier.labels]))
+        return f"{TERRAIN_GENERATOR_VERSION}_{zlib.crc32(fingerprint.encode('utf-8')):08x}"
+    
+    def get_biome_type(self, code: int) -> Any:
+        """Получение биома по коду карты биомов"""
+        return self.biome_classifier.label_of(code)
+    
     def clear_cache(self) -> None:
         """Очистка кэша"""
         try:
@@ -510,8 +782,9 @@ class HeightMapGenerator(BaseComponent):
     def get_generation_stats(self) -> Dict[str, Any]:
         """Получение статистики генерации"""
         try:
-            cache_size = len(self.height_cache) + len(self.biome_cache) + \
-                        len(self.temperature_cache) + len(self.humidity_cache)
+            caches = [self.height_cache, self.biome_cache,
+                      self.temperature_cache, self.humidity_cache]
+            cache_size = sum(len(cache) for cache in caches)
             
             avg_time = (self.generation_stats["total_time"] / 
                        max(self.generation_stats["total_chunks"], 1))
@@ -526,7 +799,8 @@ class HeightMapGenerator(BaseComponent):
                 "total_time": self.generation_stats["total_time"],
                 "average_time_per_chunk": avg_time,
                 "cache_size": cache_size,
-                "memory_usage_mb": cache_size * 64 * 64 * 4 / (1024 * 1024)  # Примерный размер в МБ
+                "memory_usage_mb": sum(cache.size_bytes for cache in caches) / (1024 * 1024),
+                "cache_evictions": sum(cache.stats["evictions"] for cache in caches)
             }
             
         except Exception as e:
@@ -536,8 +810,10 @@ class HeightMapGenerator(BaseComponent):
     def _on_destroy(self) -> bool:
         """Уничтожение генератора высот"""
         try:
-            # Очищаем кэш
-            self.clear_cache()
+            # Очищаем кэш и освобождаем бюджет памяти
+            for cache in (self.height_cache, self.biome_cache,
+                          self.temperature_cache, self.humidity_cache):
+                cache.close()
             
             # Сбрасываем статистику
             self.generation_stats = {
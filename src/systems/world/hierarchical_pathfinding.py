@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""Иерархический поиск пути (HPA*) по потоковым чанкам мира
+Порталы на общих границах чанков, граф переходов между порталами внутри
+каждого чанка и уточнение маршрута только в пройденных чанках"""
+
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Set, Callable, Iterator
+import heapq
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from src.systems.world.pathfinding import (
+    Cell, GridMap, PathfindingSettings, astar_search, dijkstra_costs, octile_distance
+)
+
+ChunkKey = Tuple[int, int]
+Rect = Tuple[float, float, float, float]
+
+def _rects_overlap(first: Rect, second: Rect) -> bool:
+    return first[0] <= second[2] and second[0] <= first[2] and first[1] <= second[3] and second[1] <= first[3]
+
+# = ДАТАКЛАССЫ
+@dataclass
+class ChunkNavGraph:
+    """Граф переходов между порталами одного чанка (глобальные клетки)"""
+    key: ChunkKey
+    grid_map: GridMap
+    portals: List[Cell]
+    edges: Dict[Cell, Dict[Cell, float]] = field(default_factory=dict)
+    version: int = -1  # Версия сетки, по которой построен граф
+
+@dataclass
+class HierarchicalPathResult:
+    """Результат иерархического поиска пути"""
+    start: Cell
+    goal: Cell
+    abstract_path: List[Cell]
+    path: List[Cell]
+    cost: float
+    chunks: List[ChunkKey]
+    expanded_nodes: int
+    search_time: float = 0.0
+
+    @property
+    def found(self) -> bool:
+        return bool(self.abstract_path)
+
+# = ИЕРАРХИЧЕСКИЙ ПОИСК
+class HierarchicalPathfinder:
+    """Поиск пути HPA* по чанкам ландшафта
+
+    Соседние чанки делят граничные клетки (карты высот включают обе
+    границы), поэтому портал - это одна глобальная клетка, общая для двух
+    чанков. Регистрация и изменение проходимости только помечают чанк;
+    порталы и граф перестраиваются перед ближайшим поиском и только для
+    изменившихся чанков и соседей, у которых сменились порталы.
+
+    Препятствия (здания, завалы) хранятся отдельно от сеток в мировых
+    координатах и накладываются на каждый чанк при регистрации, поэтому
+    переживают выгрузку и повторную загрузку чанка."""
+
+    def __init__(self, chunk_size: float, settings: Optional[PathfindingSettings] = None,
+                 portal_split_length: int = 12):
+        self.chunk_size = float(chunk_size)
+        self.settings = settings or PathfindingSettings()
+        self.portal_split_length = portal_split_length  # С этой длины проход дает два портала
+        self.cells_per_chunk: Optional[int] = None
+
+        self._grids: Dict[ChunkKey, GridMap] = {}
+        self._base_costs: Dict[ChunkKey, np.ndarray] = {}
+        self._obstacles: Dict[str, Rect] = {}  # id -> (min_x, min_y, max_x, max_y) в мире
+        self._dirty: Set[ChunkKey] = set()
+        self._lock = threading.Lock()
+
+        # Абстрактный граф (меняется только под _search_lock)
+        self._graphs: Dict[ChunkKey, ChunkNavGraph] = {}
+        self._edge_portals: Dict[Tuple[ChunkKey, ChunkKey], List[Cell]] = {}
+        self._min_cost = 1.0
+        self._search_lock = threading.Lock()
+
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.stats = {
+            "chunks_built": 0,
+            "searches": 0,
+            "failed_searches": 0,
+            "refined_chunks": 0,
+            "build_time": 0.0,
+            "search_time": 0.0
+        }
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def cell_size(self) -> float:
+        return self.chunk_size / (self.cells_per_chunk or 1)
+
+    # Регистрация чанков
+    def register_chunk(self, chunk_x: int, chunk_y: int, grid_map: GridMap) -> bool:
+        """Добавление сетки чанка; граф строится перед ближайшим поиском"""
+        cells = grid_map.width - 1
+        if grid_map.width != grid_map.height or cells < 1:
+            self.logger.warning(f"Сетка чанка {chunk_x}, {chunk_y} должна быть квадратной")
+            return False
+
+        with self._lock:
+            if not self._grids:
+                # Геометрия графа задается первым чанком
+                self.cells_per_chunk = cells
+                self.chunk_size = grid_map.cell_size * cells
+            elif cells != self.cells_per_chunk:
+                self.logger.warning(f"Разрешение сетки чанка {chunk_x}, {chunk_y} ({cells}) "
+                                    f"не совпадает с графом ({self.cells_per_chunk})")
+                return False
+            key = (chunk_x, chunk_y)
+            self._grids[key] = grid_map
+            self._base_costs[key] = grid_map.costs.copy()
+            for rect in self._obstacles.values():
+                self._write_rect(key, grid_map, rect, walkable=False)
+            self._dirty.add(key)
+        return True
+
+    def register_world_chunk(self, chunk, biome_labels: List[Any]) -> bool:
+        """Добавление чанка WorldChunk (стоимость по биому и уклону)"""
+        grid_map = GridMap.from_terrain(
+            chunk.chunk_id, chunk.height_map, chunk.biome_map, biome_labels, chunk.chunk_size,
+            origin=(chunk.chunk_x * chunk.chunk_size, chunk.chunk_y * chunk.chunk_size),
+            settings=self.settings
+        )
+        return self.register_chunk(chunk.chunk_x, chunk.chunk_y, grid_map)
+
+    def unregister_chunk(self, chunk_x: int, chunk_y: int) -> bool:
+        with self._lock:
+            key = (chunk_x, chunk_y)
+            self._base_costs.pop(key, None)
+            if self._grids.pop(key, None) is None:
+                return False
+            self._dirty.add(key)
+            return True
+
+    def has_chunk(self, chunk_x: int, chunk_y: int) -> bool:
+        return (chunk_x, chunk_y) in self._grids
+
+    def set_area_walkable(self, min_x: float, min_y: float, max_x: float, max_y: float,
+                          walkable: bool) -> List[ChunkKey]:
+        """Разовое изменение проходимости прямоугольника в загруженных чанках
+
+        При walkable=True восстанавливаются исходные стоимости ландшафта.
+        Изменение теряется при повторной регистрации чанка; для зданий
+        используйте add_obstacle. Возвращает затронутые чанки."""
+        rect = (min_x, min_y, max_x, max_y)
+        with self._lock:
+            affected = [key for key in self._chunks_in_rect(rect)
+                        if self._write_rect(key, self._grids[key], rect, walkable)]
+            self._dirty.update(affected)
+        return affected
+
+    def add_obstacle(self, obstacle_id: str, min_x: float, min_y: float,
+                     max_x: float, max_y: float) -> List[ChunkKey]:
+        """Постоянное препятствие; накладывается и на чанки, загруженные позже"""
+        rect = (min_x, min_y, max_x, max_y)
+        with self._lock:
+            self._obstacles[obstacle_id] = rect
+            affected = [key for key in self._chunks_in_rect(rect)
+                        if self._write_rect(key, self._grids[key], rect, walkable=False)]
+            self._dirty.update(affected)
+        return affected
+
+    def remove_obstacle(self, obstacle_id: str) -> List[ChunkKey]:
+        """Снятие препятствия: клетки получают исходные стоимости ландшафта
+
+        Пересекающиеся с ним препятствия накладываются заново. Затронутые
+        чанки помечаются, и перед ближайшим поиском их порталы и графы
+        (а при смене порталов - и графы соседей) перестраиваются."""
+        with self._lock:
+            rect = self._obstacles.pop(obstacle_id, None)
+            if rect is None:
+                return []
+            overlapping = [other for other in self._obstacles.values() if _rects_overlap(rect, other)]
+            affected = []
+            for key in self._chunks_in_rect(rect):
+                grid_map = self._grids[key]
+                if not self._write_rect(key, grid_map, rect, walkable=True):
+                    continue
+                for other in overlapping:
+                    self._write_rect(key, grid_map, other, walkable=False)
+                affected.append(key)
+            self._dirty.update(affected)
+        return affected
+
+    def has_obstacle(self, obstacle_id: str) -> bool:
+        return obstacle_id in self._obstacles
+
+    def _chunks_in_rect(self, rect: Rect) -> List[ChunkKey]:
+        """Загруженные чанки, сетки которых может задеть прямоугольник (под _lock)"""
+        if self.cells_per_chunk is None:
+            return []
+        min_x, min_y, max_x, max_y = rect
+        # Граничные клетки общие, поэтому захватывается и соседний слева/снизу чанк
+        return [(chunk_x, chunk_y)
+                for chunk_x in range(math.floor(min_x / self.chunk_size) - 1, math.floor(max_x / self.chunk_size) + 1)
+                for chunk_y in range(math.floor(min_y / self.chunk_size) - 1, math.floor(max_y / self.chunk_size) + 1)
+                if (chunk_x, chunk_y) in self._grids]
+
+    def _write_rect(self, key: ChunkKey, grid_map: GridMap, rect: Rect, walkable: bool) -> bool:
+        """Запись прямоугольника мира в сетку чанка (под _lock); False, если не пересекаются"""
+        min_x, min_y, max_x, max_y = rect
+        cells = self.cells_per_chunk
+        step = self.cell_size
+        origin_x, origin_y = key[0] * self.chunk_size, key[1] * self.chunk_size
+        x0 = max(0, math.ceil((min_x - origin_x) / step))
+        x1 = min(cells, math.floor((max_x - origin_x) / step))
+        y0 = max(0, math.ceil((min_y - origin_y) / step))
+        y1 = min(cells, math.floor((max_y - origin_y) / step))
+        if x0 > x1 or y0 > y1:
+            return False
+        if walkable:
+            region = self._base_costs[key][y0:y1 + 1, x0:x1 + 1]
+        else:
+            region = np.full((y1 - y0 + 1, x1 - x0 + 1), np.inf, dtype=np.float32)
+        grid_map.update_region(x0, y0, region)
+        return True
+
+    # Построение графа
+    @staticmethod
+    def _side_neighbours(key: ChunkKey) -> List[ChunkKey]:
+        x, y = key
+        return [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]
+
+    def _find_edge_portals(self, grids: Dict[ChunkKey, GridMap],
+                           pair: Tuple[ChunkKey, ChunkKey]) -> List[Cell]:
+        """Порталы на общей границе пары чанков (первый - левый или нижний)"""
+        first, second = pair
+        cells = self.cells_per_chunk
+        if first[0] != second[0]:
+            open_cells = np.isfinite(grids[first].costs[:, cells]) & np.isfinite(grids[second].costs[:, 0])
+            to_global = lambda i: (second[0] * cells, first[1] * cells + i)
+        else:
+            open_cells = np.isfinite(grids[first].costs[cells, :]) & np.isfinite(grids[second].costs[0, :])
+            to_global = lambda i: (first[0] * cells + i, second[1] * cells)
+
+        # Непрерывные проходы вдоль границы
+        padded = np.concatenate(([False], open_cells, [False])).astype(np.int8)
+        changes = np.flatnonzero(np.diff(padded))
+        portals = []
+        for run_start, run_end in zip(changes[::2], changes[1::2] - 1):
+            if run_end - run_start + 1 >= self.portal_split_length:
+                portals.extend((to_global(int(run_start)), to_global(int(run_end))))
+            else:
+                portals.append(to_global(int(run_start + run_end) // 2))
+        return portals
+
+    def _build_chunk_graph(self, key: ChunkKey, grid_map: GridMap):
+        """Стоимости переходов между всеми парами порталов чанка"""
+        portals = []
+        for neighbour in self._side_neighbours(key):
+            for portal in self._edge_portals.get(tuple(sorted((key, neighbour))), []):
+                if portal not in portals:
+                    portals.append(portal)
+
+        costs, version, _, _ = grid_map.snapshot()
+        size = grid_map.width
+        offset_x, offset_y = key[0] * self.cells_per_chunk, key[1] * self.cells_per_chunk
+        local = [(x - offset_x, y - offset_y) for x, y in portals]
+
+        edges: Dict[Cell, Dict[Cell, float]] = {portal: {} for portal in portals}
+        for index, portal in enumerate(portals):
+            # Стоимость шага симметрична, поэтому каждая пара ищется один раз
+            reached = dijkstra_costs(costs, size, size, local[index], local[index + 1:],
+                                     self.settings.allow_diagonal)
+            for other_local, cost in reached.items():
+                other = (other_local[0] + offset_x, other_local[1] + offset_y)
+                edges[portal][other] = cost
+                edges[other][portal] = cost
+
+        self._graphs[key] = ChunkNavGraph(key, grid_map, portals, edges, version)
+        self.stats["chunks_built"] += 1
+
+    def _rebuild_dirty(self):
+        """Перестройка графов изменившихся чанков (под _search_lock)"""
+        with self._lock:
+            grids = dict(self._grids)
+            dirty = self._dirty
+            self._dirty = set()
+        for key, graph in self._graphs.items():
+            if grids.get(key) is graph.grid_map and graph.grid_map.version != graph.version:
+                dirty.add(key)
+        if not dirty:
+            return
+
+        start_time = time.time()
+        rebuild = set()
+        for key in dirty:
+            if key in grids:
+                rebuild.add(key)
+            else:
+                self._graphs.pop(key, None)
+            for neighbour in self._side_neighbours(key):
+                pair = tuple(sorted((key, neighbour)))
+                portals = self._find_edge_portals(grids, pair) \
+                    if key in grids and neighbour in grids else []
+                if portals != self._edge_portals.get(pair, []):
+                    if portals:
+                        self._edge_portals[pair] = portals
+                    else:
+                        self._edge_portals.pop(pair, None)
+                    if neighbour in grids:
+                        rebuild.add(neighbour)
+
+        for key in rebuild:
+            self._build_chunk_graph(key, grids[key])
+        self._min_cost = min((graph.grid_map.min_cost for graph in self._graphs.values()), default=1.0)
+        self.stats["build_time"] += time.time() - start_time
+
+    # Поиск
+    def world_to_cell(self, x: float, y: float) -> Cell:
+        return (int(round(x / self.cell_size)), int(round(y / self.cell_size)))
+
+    def cell_to_world(self, cell: Cell) -> Tuple[float, float]:
+        return (cell[0] * self.cell_size, cell[1] * self.cell_size)
+
+    def _chunks_of(self, cell: Cell) -> List[ChunkKey]:
+        """Построенные чанки, содержащие глобальную клетку (до четырех на углу)"""
+        cells = self.cells_per_chunk
+        xs = [cell[0] // cells] + ([cell[0] // cells - 1] if cell[0] % cells == 0 else [])
+        ys = [cell[1] // cells] + ([cell[1] // cells - 1] if cell[1] % cells == 0 else [])
+        return [(x, y) for x in xs for y in ys if (x, y) in self._graphs]
+
+    def _to_local(self, key: ChunkKey, cell: Cell) -> Cell:
+        return (cell[0] - key[0] * self.cells_per_chunk, cell[1] - key[1] * self.cells_per_chunk)
+
+    def _connect_endpoint(self, cell: Cell, other: Cell,
+                          extra: Dict[Cell, Dict[Cell, Tuple[float, ChunkKey]]]):
+        """Временные ребра от старта или цели к порталам их чанков"""
+        for key in self._chunks_of(cell):
+            graph = self._graphs[key]
+            targets = list(graph.portals)
+            if key in self._chunks_of(other):
+                targets.append(other)
+            costs, _, _, _ = graph.grid_map.snapshot()
+            size = graph.grid_map.width
+            reached = dijkstra_costs(costs, size, size, self._to_local(key, cell),
+                                     [self._to_local(key, target) for target in targets],
+                                     self.settings.allow_diagonal)
+            offset_x, offset_y = key[0] * self.cells_per_chunk, key[1] * self.cells_per_chunk
+            for (x, y), cost in reached.items():
+                target = (x + offset_x, y + offset_y)
+                if target == cell:
+                    continue
+                for a, b in ((cell, target), (target, cell)):
+                    if cost < extra.setdefault(a, {}).get(b, (math.inf, key))[0]:
+                        extra[a][b] = (cost, key)
+
+    def _neighbours(self, node: Cell, extra: Dict[Cell, Dict[Cell, Tuple[float, ChunkKey]]]
+                    ) -> Iterator[Tuple[Cell, float, ChunkKey]]:
+        for key in self._chunks_of(node):
+            for other, cost in self._graphs[key].edges.get(node, {}).items():
+                yield other, cost, key
+        for other, (cost, key) in extra.get(node, {}).items():
+            yield other, cost, key
+
+    def find_path(self, start: Tuple[float, float], goal: Tuple[float, float],
+                  refine: bool = True) -> Optional[HierarchicalPathResult]:
+        """Поиск маршрута между мировыми координатами
+
+        Без refine возвращается только последовательность порталов;
+        иначе путь уточняется A* внутри каждого пройденного чанка."""
+        try:
+            with self._search_lock:
+                self._rebuild_dirty()
+                if self.cells_per_chunk is None:
+                    return None
+                start_time = time.time()
+                start_cell, goal_cell = self.world_to_cell(*start), self.world_to_cell(*goal)
+                if not self._chunks_of(start_cell) or not self._chunks_of(goal_cell):
+                    return None
+
+                extra: Dict[Cell, Dict[Cell, Tuple[float, ChunkKey]]] = {}
+                self._connect_endpoint(start_cell, goal_cell, extra)
+                self._connect_endpoint(goal_cell, start_cell, extra)
+
+                # A* по абстрактному графу
+                g_score = {start_cell: 0.0}
+                came_from: Dict[Cell, Tuple[Optional[Cell], Optional[ChunkKey]]] = {start_cell: (None, None)}
+                open_heap = [(0.0, 0.0, start_cell)]
+                closed = set()
+                expanded = 0
+                while open_heap:
+                    _, g, node = heapq.heappop(open_heap)
+                    if node in closed:
+                        continue
+                    if node == goal_cell:
+                        break
+                    closed.add(node)
+                    expanded += 1
+                    for other, cost, key in self._neighbours(node, extra):
+                        tentative = g + cost
+                        if other not in closed and tentative < g_score.get(other, math.inf):
+                            g_score[other] = tentative
+                            came_from[other] = (node, key)
+                            heuristic = self._min_cost * octile_distance(goal_cell[0] - other[0],
+                                                                         goal_cell[1] - other[1])
+                            heapq.heappush(open_heap, (tentative + heuristic, tentative, other))
+
+                self.stats["searches"] += 1
+                if goal_cell not in came_from:
+                    self.stats["failed_searches"] += 1
+                    return HierarchicalPathResult(start_cell, goal_cell, [], [], math.inf, [], expanded,
+                                                  time.time() - start_time)
+
+                hops = []
+                node = goal_cell
+                while node is not None:
+                    previous, key = came_from[node]
+                    hops.append((node, key))
+                    node = previous
+                hops.reverse()
+                abstract_path = [node for node, _ in hops]
+                chunks = [key for _, key in hops[1:]]
+
+                path = self._refine(abstract_path, chunks) if refine else []
+                search_time = time.time() - start_time
+                self.stats["search_time"] += search_time
+                return HierarchicalPathResult(start_cell, goal_cell, abstract_path, path,
+                                              g_score[goal_cell], chunks, expanded, search_time)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка иерархического поиска пути: {e}")
+            return None
+
+    def _refine(self, abstract_path: List[Cell], chunks: List[ChunkKey]) -> List[Cell]:
+        """Уточнение пути A* внутри пройденных чанков"""
+        path = [abstract_path[0]]
+        for a, b, key in zip(abstract_path, abstract_path[1:], chunks):
+            graph = self._graphs[key]
+            costs, _, _, min_cost = graph.grid_map.snapshot()
+            size = graph.grid_map.width
+            segment, _, _ = astar_search(costs, size, size, self._to_local(key, a), self._to_local(key, b),
+                                         self.settings.allow_diagonal, min_cost)
+            if not segment:
+                return []  # Проходимость изменилась после построения графа
+            offset_x, offset_y = key[0] * self.cells_per_chunk, key[1] * self.cells_per_chunk
+            path.extend((x + offset_x, y + offset_y) for x, y in segment[1:])
+            self.stats["refined_chunks"] += 1
+        return path
+
+    def request_path(self, start: Tuple[float, float], goal: Tuple[float, float],
+                     callback: Optional[Callable[[Optional[HierarchicalPathResult]], None]] = None,
+                     refine: bool = True) -> Future:
+        """Асинхронный поиск маршрута; колбэк вызывается в рабочем потоке"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hpa")
+        future = self.executor.submit(self.find_path, start, goal, refine)
+        if callback:
+            future.add_done_callback(lambda f: self._run_callback(callback, f))
+        return future
+
+    def _run_callback(self, callback: Callable, future: Future):
+        try:
+            callback(future.result())
+        except Exception as e:
+            self.logger.error(f"Ошибка в callback иерархического поиска: {e}")
+
+    def path_to_world(self, path: List[Cell]) -> List[Tuple[float, float]]:
+        return [self.cell_to_world(cell) for cell in path]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики графа"""
+        return {
+            **self.stats,
+            "chunks": len(self._grids),
+            "built_chunks": len(self._graphs),
+            "portals": sum(len(portals) for portals in self._edge_portals.values()),
+            "average_search_time": self.stats["search_time"] / max(1, self.stats["searches"])
+        }
+
+    def clear(self):
+        with self._search_lock:
+            with self._lock:
+                self._grids.clear()
+                self._base_costs.clear()
+                self._obstacles.clear()
+                self._dirty.clear()
+            self._graphs.clear()
+            self._edge_portals.clear()
+
+    def shutdown(self):
+        """Остановка рабочего потока и очистка графа"""
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.clear()
@@ -4,13 +4,16 @@
 
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Any, Tuple, Set
+from typing import Dict, List, Optional, Any, Tuple, Set, Callable
+from concurrent.futures import Future
 import logging
 import random
 import time
 import math
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.spatial_index import SpatialGridIndex
+from src.systems.world.pathfinding import PathfindingService
 
 # = ТИПЫ НАВИГАЦИИ
 class MapType(Enum):
@@ -135,9 +138,21 @@ class NavigationSystem(BaseComponent):
         
         # Путевые точки
         self.waypoints: Dict[str, Waypoint] = {}
+        self.waypoint_index = SpatialGridIndex(cell_size=self.settings.mini_map_size / 2)
         
-        # Позиция игрока
+        # Позиция игрока и подписчики на ее изменение: callback(x, y, z)
         self.player_position = (0.0, 0.0, 0.0)
+        self.player_moved_callbacks: List[Callable] = []
+        
+        # Поиск пути по зарегистрированным сеткам (подземелья, чанки)
+        self.pathfinding = PathfindingService()
+        self.biome_labels: List[Any] = []
+        self.world_manager = None
+        self.location_map_id: Optional[str] = None  # Карта подземелья, в котором игрок
+        
+        # Карта поиска пути под игроком и подписчики на ее смену: callback(map_id)
+        self.player_map_id: Optional[str] = None
+        self.player_map_callbacks: List[Callable] = []
         
         # Статистика
         self.navigation_stats = {
@@ -208,7 +223,7 @@ class NavigationSystem(BaseComponent):
                 color="#00FF00",
                 permanent=True
             )
-            self.waypoints["player"] = player_waypoint
+            self._register_waypoint(player_waypoint)
             
             self.navigation_stats["total_waypoints"] = len(self.waypoints)
             
@@ -232,13 +247,122 @@ class NavigationSystem(BaseComponent):
                 self.waypoints["player"].y = y
                 self.waypoints["player"].z = z
                 self.waypoints["player"].last_visited = time.time()
+                self.waypoint_index.move("player", x, y)
             
             # Обновляем центры карт
             self._update_map_centers(x, y)
+            self._update_player_map()
+            
+            # Уведомляем подписчиков (восприятие AI, поля потока)
+            for callback in self.player_moved_callbacks:
+                try:
+                    callback(x, y, z)
+                except Exception as e:
+                    self._logger.error(f"Ошибка в колбэке перемещения игрока: {e}")
             
         except Exception as e:
             self._logger.error(f"Ошибка обновления позиции игрока: {e}")
     
+    def add_player_moved_callback(self, callback: Callable):
+        """Подписка на перемещение игрока: callback(x, y, z)"""
+        if callback not in self.player_moved_callbacks:
+            self.player_moved_callbacks.append(callback)
+    
+    def add_player_map_callback(self, callback: Callable):
+        """Подписка на смену карты под игроком: callback(map_id), None - карты нет"""
+        if callback not in self.player_map_callbacks:
+            self.player_map_callbacks.append(callback)
+    
+    def _find_player_map(self) -> Optional[str]:
+        """Подземелье, в котором игрок, иначе загруженный чанк под ним"""
+        if self.location_map_id is not None:
+            return self.location_map_id
+        if self.world_manager is None:
+            return None
+        chunk = self.world_manager.get_chunk_at_position(self.player_position[0], self.player_position[1])
+        if chunk is None or self.pathfinding.get_map(chunk.chunk_id) is None:
+            return None
+        return chunk.chunk_id
+    
+    def _update_player_map(self):
+        """Уведомление подписчиков, если карта под игроком сменилась"""
+        map_id = self._find_player_map()
+        if map_id == self.player_map_id:
+            return
+        self.player_map_id = map_id
+        for callback in self.player_map_callbacks:
+            try:
+                callback(map_id)
+            except Exception as e:
+                self._logger.error(f"Ошибка в колбэке смены карты игрока: {e}")
+    
+    # Карты поиска пути
+    def attach_world(self, world_manager) -> bool:
+        """Регистрация карт чанков и подземелий WorldManager в сервисе поиска пути
+        
+        Колбэки чанков приходят из рабочих потоков менеджера мира;
+        регистрация карт в PathfindingService защищена его блокировкой."""
+        try:
+            height_generator = getattr(world_manager, 'height_generator', None)
+            if height_generator is not None:
+                self.biome_labels = list(height_generator.biome_classifier.labels)
+            
+            world_manager.add_chunk_loaded_callback(self.on_chunk_loaded)
+            world_manager.add_chunk_refined_callback(self.on_chunk_loaded)
+            world_manager.add_chunk_unloaded_callback(self.on_chunk_unloaded)
+            world_manager.add_location_entered_callback(self.on_location_entered)
+            world_manager.add_location_left_callback(self.on_location_left)
+            self.world_manager = world_manager
+            
+            for chunk in list(world_manager.chunks.values()):
+                self.on_chunk_loaded(chunk)
+            return True
+        
+        except Exception as e:
+            self._logger.error(f"Ошибка подключения карт мира к навигации: {e}")
+            return False
+    
+    def on_chunk_loaded(self, chunk):
+        """Карта чанка полной детализации (также после уточнения LOD)"""
+        try:
+            if chunk.lod != 0 or chunk.height_map is None or chunk.biome_map is None:
+                return
+            self.pathfinding.register_terrain_chunk(chunk, self.biome_labels)
+            self._update_player_map()
+        
+        except Exception as e:
+            self._logger.error(f"Ошибка регистрации карты чанка {chunk.chunk_id}: {e}")
+    
+    def on_chunk_unloaded(self, chunk):
+        self.pathfinding.unregister_map(chunk.chunk_id)
+        self._update_player_map()
+    
+    def on_location_entered(self, structure_id: str, content: Any):
+        """Карта подземелья при входе; карта прошлой локации удаляется"""
+        try:
+            if not hasattr(content, 'dungeon_id') or not hasattr(content, 'grid'):
+                return
+            self.register_dungeon(content)
+        
+        except Exception as e:
+            self._logger.error(f"Ошибка регистрации карты локации {structure_id}: {e}")
+    
+    def register_dungeon(self, dungeon):
+        """Регистрация карты подземелья как текущей локации игрока"""
+        if self.location_map_id is not None and self.location_map_id != dungeon.dungeon_id:
+            self.pathfinding.unregister_map(self.location_map_id)
+        self.location_map_id = dungeon.dungeon_id
+        grid_map = self.pathfinding.register_dungeon(dungeon)
+        self._update_player_map()
+        return grid_map
+    
+    def on_location_left(self, structure_id: str):
+        """Выход из локации: игрок возвращается на карту чанка"""
+        if self.location_map_id is not None:
+            self.pathfinding.unregister_map(self.location_map_id)
+            self.location_map_id = None
+        self._update_player_map()
+    
     def _update_gps_data(self, x: float, y: float, z: float):
         """Обновление GPS данных"""
         try:
@@ -336,7 +460,7 @@ class NavigationSystem(BaseComponent):
                 color=self._get_waypoint_color(waypoint_type)
             )
             
-            self.waypoints[waypoint_id] = waypoint
+            self._register_waypoint(waypoint)
             self.navigation_stats["total_waypoints"] += 1
             
             self._logger.info(f"Добавлена путевая точка {waypoint_id} в позиции ({x}, {y})")
@@ -359,6 +483,7 @@ class NavigationSystem(BaseComponent):
                     return False
                 
                 del self.waypoints[waypoint_id]
+                self.waypoint_index.remove(waypoint_id)
                 self.navigation_stats["total_waypoints"] -= 1
                 
                 self._logger.info(f"Удалена путевая точка {waypoint_id}")
@@ -370,6 +495,28 @@ class NavigationSystem(BaseComponent):
             self._logger.error(f"Ошибка удаления путевой точки {waypoint_id}: {e}")
             return False
     
+    def _register_waypoint(self, waypoint: Waypoint):
+        """Регистрация путевой точки в словаре и пространственном индексе"""
+        self.waypoints[waypoint.waypoint_id] = waypoint
+        self.waypoint_index.insert(waypoint.waypoint_id, waypoint.x, waypoint.y, waypoint)
+    
+    def move_waypoint(self, waypoint_id: str, x: float, y: float, z: Optional[float] = None) -> bool:
+        """Перемещение путевой точки с обновлением индекса"""
+        try:
+            waypoint = self.waypoints.get(waypoint_id)
+            if waypoint is None:
+                return False
+            
+            waypoint.x = x
+            waypoint.y = y
+            if z is not None:
+                waypoint.z = z
+            return self.waypoint_index.move(waypoint_id, x, y)
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка перемещения путевой точки {waypoint_id}: {e}")
+            return False
+    
     def get_waypoint(self, waypoint_id: str) -> Optional[Waypoint]:
         """Получение путевой точки по ID"""
         try:
@@ -382,20 +529,47 @@ class NavigationSystem(BaseComponent):
                               radius: float) -> List[Waypoint]:
         """Получение путевых точек в радиусе"""
         try:
-            waypoints_in_range = []
-            
-            for waypoint in self.waypoints.values():
-                if waypoint.visible:
-                    distance = math.sqrt((waypoint.x - center_x) ** 2 + (waypoint.y - center_y) ** 2)
-                    if distance <= radius:
-                        waypoints_in_range.append(waypoint)
-            
-            return waypoints_in_range
+            return self.waypoint_index.query_radius(center_x, center_y, radius,
+                                                    lambda waypoint: waypoint.visible)
             
         except Exception as e:
             self._logger.error(f"Ошибка получения путевых точек в радиусе: {e}")
             return []
     
+    def get_nearest_waypoints(self, x: float, y: float, count: int = 1,
+                              waypoint_type: Optional[WaypointType] = None) -> List[Waypoint]:
+        """Получение ближайших видимых путевых точек по возрастанию расстояния"""
+        try:
+            return [waypoint for _, waypoint in self.waypoint_index.nearest(
+                x, y, count, self.settings.waypoint_max_distance,
+                lambda waypoint: waypoint.visible and
+                (waypoint_type is None or waypoint.waypoint_type == waypoint_type)
+            )]
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка поиска ближайших путевых точек: {e}")
+            return []
+    
+    def request_route_to_waypoint(self, map_id: str, waypoint_id: str,
+                                  callback: Optional[Callable] = None) -> Optional[Future]:
+        """Асинхронный поиск маршрута от игрока до путевой точки по карте map_id
+        
+        Future разрешается в PathResult; клетки переводятся в мировые
+        координаты через GridMap.cell_to_world."""
+        try:
+            waypoint = self.waypoints.get(waypoint_id)
+            grid_map = self.pathfinding.get_map(map_id)
+            if waypoint is None or grid_map is None:
+                return None
+            
+            start = grid_map.world_to_cell(self.player_position[0], self.player_position[1])
+            goal = grid_map.world_to_cell(waypoint.x, waypoint.y)
+            return self.pathfinding.request_path(map_id, start, goal, callback)
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка поиска маршрута до путевой точки {waypoint_id}: {e}")
+            return None
+    
     def calculate_distance_to_waypoint(self, waypoint_id: str) -> float:
         """Расчет расстояния до путевой точки"""
         try:
@@ -594,6 +768,7 @@ class NavigationSystem(BaseComponent):
             
             for waypoint_id in waypoints_to_remove:
                 del self.waypoints[waypoint_id]
+                self.waypoint_index.remove(waypoint_id)
             
             self.navigation_stats["total_waypoints"] = len(self.waypoints)
             
@@ -608,6 +783,13 @@ class NavigationSystem(BaseComponent):
             # Очищаем все данные
             self.maps.clear()
             self.waypoints.clear()
+            self.waypoint_index.clear()
+            self.player_moved_callbacks.clear()
+            self.player_map_callbacks.clear()
+            self.pathfinding.shutdown()
+            self.location_map_id = None
+            self.player_map_id = None
+            self.world_manager = None
             
             # Сбрасываем статистику
             self.navigation_stats = {
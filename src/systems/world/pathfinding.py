@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""Поиск пути по сеткам подземелий и чанков ландшафта
+Jump Point Search на равномерных сетках, A* с весами клеток на остальных,
+LRU-кэш путей по версии карты и асинхронные запросы в рабочих потоках"""
+
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Callable
+import heapq
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from src.systems.world.generation_cache import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+
+SQRT2 = math.sqrt(2.0)
+
+# Стоимость прохода по биомам (множитель к базовой стоимости клетки)
+DEFAULT_BIOME_COSTS: Dict[str, float] = {
+    "water": math.inf,
+    "beach": 1.0,
+    "grassland": 1.0,
+    "forest": 1.5,
+    "hills": 1.8,
+    "mountains": 3.0,
+    "snow": 2.5,
+    "desert": 1.3,
+}
+
+# = ДАТАКЛАССЫ
+@dataclass
+class PathfindingSettings:
+    """Настройки поиска пути"""
+    cache_entries: int = 512
+    worker_threads: int = 2
+    allow_diagonal: bool = True
+    max_expanded_nodes: int = 200000
+    height_scale: float = 0.01      # Перевод высот генератора в единицы сцены
+    slope_cost: float = 1.0         # Добавка к стоимости на единицу уклона
+    max_slope: float = 8.0          # Круче - непроходимо
+    biome_costs: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_BIOME_COSTS))
+
+@dataclass
+class PathResult:
+    """Результат поиска пути"""
+    map_id: str
+    start: Cell
+    goal: Cell
+    path: List[Cell]
+    cost: float
+    expanded_nodes: int
+    algorithm: str
+    map_version: int
+    search_time: float = 0.0
+
+    @property
+    def found(self) -> bool:
+        return bool(self.path)
+
+# = КАРТА ПРОХОДИМОСТИ
+class GridMap:
+    """Сетка стоимостей прохода для поиска пути
+
+    costs[y, x] - стоимость входа в клетку, inf - непроходимо. Любое
+    изменение увеличивает version, поэтому закэшированные пути старой
+    версии больше не используются. Поиск работает со снимком плоского
+    списка стоимостей и не блокирует изменения карты."""
+
+    def __init__(self, map_id: str, costs: np.ndarray,
+                 origin: Tuple[float, float] = (0.0, 0.0), cell_size: float = 1.0):
+        self.map_id = map_id
+        self.costs = np.array(costs, dtype=np.float32)
+        if self.costs.ndim != 2:
+            raise ValueError(f"Ожидается двумерная сетка стоимостей, получено {self.costs.shape}")
+        self.height, self.width = self.costs.shape
+        self.origin = origin
+        self.cell_size = float(cell_size)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._refresh()
+
+    # Конструкторы
+    @classmethod
+    def from_walkable(cls, map_id: str, walkable: np.ndarray, **kwargs) -> "GridMap":
+        """Равномерная карта по маске проходимости"""
+        walkable = np.asarray(walkable, dtype=bool)
+        return cls(map_id, np.where(walkable, 1.0, np.inf), **kwargs)
+
+    @classmethod
+    def from_dungeon(cls, dungeon) -> "GridMap":
+        """Карта подземелья: проходимы комнаты и коридоры (ненулевые клетки)"""
+        return cls.from_walkable(dungeon.dungeon_id, np.asarray(dungeon.grid) != 0)
+
+    @classmethod
+    def from_terrain(cls, map_id: str, height_map: np.ndarray, biome_map: np.ndarray,
+                     biome_labels: List[Any], chunk_size: float,
+                     origin: Tuple[float, float] = (0.0, 0.0),
+                     settings: Optional[PathfindingSettings] = None) -> "GridMap":
+        """Карта чанка ландшафта: стоимость по биому и уклону"""
+        settings = settings or PathfindingSettings()
+        rows, cols = height_map.shape
+        step = chunk_size / max(cols - 1, 1)
+
+        biome_costs = np.array([settings.biome_costs.get(str(getattr(label, "value", label)), 1.0)
+                                for label in biome_labels] or [1.0], dtype=np.float32)
+        codes = np.clip(np.asarray(biome_map, dtype=np.intp), 0, len(biome_costs) - 1)
+
+        heights = np.asarray(height_map, dtype=np.float32) * np.float32(settings.height_scale)
+        slope_y, slope_x = np.gradient(heights, step)
+        slope = np.hypot(slope_x, slope_y)
+
+        costs = biome_costs[codes] + settings.slope_cost * slope
+        costs[slope > settings.max_slope] = np.inf
+        return cls(map_id, costs, origin=origin, cell_size=step)
+
+    # Изменение
+    def _refresh(self):
+        """Пересборка снимка для поиска (вызывается под блокировкой или в конструкторе)"""
+        finite = self.costs[np.isfinite(self.costs)]
+        self.min_cost = float(finite.min()) if finite.size else 1.0
+        self.uniform = bool(finite.size) and float(finite.max()) == self.min_cost
+        self._flat_costs = self.costs.ravel().tolist()
+
+    def set_cost(self, x: int, y: int, cost: float):
+        """Изменение стоимости одной клетки"""
+        self.update_region(x, y, np.full((1, 1), cost, dtype=np.float32))
+
+    def set_walkable(self, x: int, y: int, walkable: bool, cost: float = 1.0):
+        self.set_cost(x, y, cost if walkable else math.inf)
+
+    def update_region(self, x: int, y: int, costs: np.ndarray):
+        """Замена прямоугольника стоимостей с левым верхним углом (x, y)"""
+        costs = np.asarray(costs, dtype=np.float32)
+        with self._lock:
+            self.costs[y:y + costs.shape[0], x:x + costs.shape[1]] = costs
+            self.version += 1
+            self._refresh()
+
+    def snapshot(self) -> Tuple[List[float], int, bool, float]:
+        """Согласованный снимок: стоимости, версия, равномерность, минимум"""
+        with self._lock:
+            return self._flat_costs, self.version, self.uniform, self.min_cost
+
+    # Координаты
+    def in_bounds(self, cell: Cell) -> bool:
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height
+
+    def is_walkable(self, cell: Cell) -> bool:
+        return self.in_bounds(cell) and math.isfinite(self._flat_costs[cell[1] * self.width + cell[0]])
+
+    def world_to_cell(self, x: float, y: float) -> Cell:
+        return (int(round((x - self.origin[0]) / self.cell_size)),
+                int(round((y - self.origin[1]) / self.cell_size)))
+
+    def cell_to_world(self, cell: Cell) -> Tuple[float, float]:
+        return (self.origin[0] + cell[0] * self.cell_size,
+                self.origin[1] + cell[1] * self.cell_size)
+
+# = АЛГОРИТМЫ
+def _as_cell(cell) -> Cell:
+    """Клетка как кортеж int: ключ кэша не зависит от типа входа (list, np.int64)"""
+    return int(cell[0]), int(cell[1])
+
+def octile_distance(dx: int, dy: int) -> float:
+    dx, dy = abs(dx), abs(dy)
+    return max(dx, dy) + (SQRT2 - 1.0) * min(dx, dy)
+
+def _reconstruct(came_from: Dict[int, int], node: int, width: int) -> List[Cell]:
+    path = []
+    while node != -1:
+        path.append((node % width, node // width))
+        node = came_from[node]
+    path.reverse()
+    return path
+
+def astar_search(costs: List[float], width: int, height: int, start: Cell, goal: Cell,
+                 allow_diagonal: bool = True, min_cost: float = 1.0,
+                 max_expanded: Optional[int] = None) -> Tuple[List[Cell], float, int]:
+    """A* по сетке стоимостей; возвращает (путь, стоимость, раскрыто узлов)
+
+    Шаг стоит длину шага, умноженную на среднюю стоимость двух клеток.
+    Диагональ не срезает углы: обе соседние ортогональные клетки должны
+    быть проходимы. Эвристика octile * min_cost допустима."""
+    start, goal = (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1]))
+    start_node = start[1] * width + start[0]
+    goal_node = goal[1] * width + goal[0]
+    if not math.isfinite(costs[start_node]) or not math.isfinite(costs[goal_node]):
+        return [], math.inf, 0
+
+    goal_x, goal_y = goal
+    moves = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0)]
+    if allow_diagonal:
+        moves += [(1, 1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (-1, -1, SQRT2)]
+
+    g_score = {start_node: 0.0}
+    came_from = {start_node: -1}
+    open_heap = [(min_cost * octile_distance(goal_x - start[0], goal_y - start[1]), 0.0, start_node)]
+    closed = set()
+    expanded = 0
+
+    while open_heap:
+        _, g, node = heapq.heappop(open_heap)
+        if node in closed:
+            continue
+        if node == goal_node:
+            return _reconstruct(came_from, node, width), g, expanded
+        closed.add(node)
+        expanded += 1
+        if max_expanded is not None and expanded > max_expanded:
+            break
+
+        x, y = node % width, node // width
+        node_cost = costs[node]
+        for dx, dy, length in moves:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            neighbour = ny * width + nx
+            neighbour_cost = costs[neighbour]
+            if neighbour_cost == math.inf or neighbour in closed:
+                continue
+            if dx and dy and (costs[y * width + nx] == math.inf or costs[ny * width + x] == math.inf):
+                continue
+            tentative = g + length * 0.5 * (node_cost + neighbour_cost)
+            if tentative < g_score.get(neighbour, math.inf):
+                g_score[neighbour] = tentative
+                came_from[neighbour] = node
+                heapq.heappush(open_heap, (tentative + min_cost * octile_distance(goal_x - nx, goal_y - ny),
+                                           tentative, neighbour))
+
+    return [], math.inf, expanded
+
+def jps_search(costs: List[float], width: int, height: int, start: Cell, goal: Cell,
+               max_expanded: Optional[int] = None) -> Tuple[List[Cell], float, int]:
+    """Jump Point Search на равномерной сетке (без срезания углов)
+
+    Раскрываются только точки прыжка; результат разворачивается в
+    последовательность соседних клеток той же стоимости, что и у A*."""
+    start, goal = (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1]))
+    start_x, start_y = start
+    goal_x, goal_y = goal
+
+    def walkable(x: int, y: int) -> bool:
+        return 0 <= x < width and 0 <= y < height and costs[y * width + x] != math.inf
+
+    if not walkable(start_x, start_y) or not walkable(goal_x, goal_y):
+        return [], math.inf, 0
+    step_cost = costs[start_y * width + start_x]
+
+    def jump_straight(x: int, y: int, dx: int, dy: int) -> Optional[Cell]:
+        while True:
+            if not walkable(x, y):
+                return None
+            if x == goal_x and y == goal_y:
+                return x, y
+            if dx:
+                if (walkable(x, y - 1) and not walkable(x - dx, y - 1)) or \
+                        (walkable(x, y + 1) and not walkable(x - dx, y + 1)):
+                    return x, y
+            elif (walkable(x - 1, y) and not walkable(x - 1, y - dy)) or \
+                    (walkable(x + 1, y) and not walkable(x + 1, y - dy)):
+                return x, y
+            x += dx
+            y += dy
+
+    def jump(x: int, y: int, dx: int, dy: int) -> Optional[Cell]:
+        if not (dx and dy):
+            return jump_straight(x, y, dx, dy)
+        while True:
+            if not walkable(x, y):
+                return None
+            if x == goal_x and y == goal_y:
+                return x, y
+            if jump_straight(x + dx, y, dx, 0) or jump_straight(x, y + dy, 0, dy):
+                return x, y
+            if not (walkable(x + dx, y) and walkable(x, y + dy)):
+                return None
+            x += dx
+            y += dy
+
+    def directions(x: int, y: int, parent: Optional[Cell]) -> List[Cell]:
+        if parent is None:
+            result = []
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    if (dx or dy) and walkable(x + dx, y + dy) and \
+                            (not (dx and dy) or (walkable(x + dx, y) and walkable(x, y + dy))):
+                        result.append((dx, dy))
+            return result
+
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        result = []
+        if dx and dy:
+            horizontal, vertical = walkable(x + dx, y), walkable(x, y + dy)
+            if vertical:
+                result.append((0, dy))
+            if horizontal:
+                result.append((dx, 0))
+            if horizontal and vertical:
+                result.append((dx, dy))
+        elif dx:
+            upper, lower = walkable(x, y + 1), walkable(x, y - 1)
+            if walkable(x + dx, y):
+                result.append((dx, 0))
+                if upper:
+                    result.append((dx, 1))
+                if lower:
+                    result.append((dx, -1))
+            if upper:
+                result.append((0, 1))
+            if lower:
+                result.append((0, -1))
+        else:
+            right, left = walkable(x + 1, y), walkable(x - 1, y)
+            if walkable(x, y + dy):
+                result.append((0, dy))
+                if right:
+                    result.append((1, dy))
+                if left:
+                    result.append((-1, dy))
+            if right:
+                result.append((1, 0))
+            if left:
+                result.append((-1, 0))
+        return result
+
+    g_score = {start: 0.0}
+    came_from: Dict[Cell, Optional[Cell]] = {start: None}
+    open_heap = [(octile_distance(goal_x - start_x, goal_y - start_y), 0.0, start)]
+    closed = set()
+    expanded = 0
+
+    while open_heap:
+        _, g, point = heapq.heappop(open_heap)
+        if point in closed:
+            continue
+        if point == goal:
+            return _expand_jump_points(came_from, point), g * step_cost, expanded
+        closed.add(point)
+        expanded += 1
+        if max_expanded is not None and expanded > max_expanded:
+            break
+
+        x, y = point
+        for dx, dy in directions(x, y, came_from[point]):
+            found = jump(x + dx, y + dy, dx, dy)
+            if found is None or found in closed:
+                continue
+            tentative = g + octile_distance(found[0] - x, found[1] - y)
+            if tentative < g_score.get(found, math.inf):
+                g_score[found] = tentative
+                came_from[found] = point
+                heapq.heappush(open_heap, (tentative + octile_distance(goal_x - found[0], goal_y - found[1]),
+                                           tentative, found))
+
+    return [], math.inf, expanded
+
+def _expand_jump_points(came_from: Dict[Cell, Optional[Cell]], point: Cell) -> List[Cell]:
+    """Разворачивание точек прыжка в путь по соседним клеткам"""
+    jump_points = []
+    while point is not None:
+        jump_points.append(point)
+        point = came_from[point]
+    jump_points.reverse()
+
+    path = [jump_points[0]]
+    for x, y in jump_points[1:]:
+        px, py = path[-1]
+        dx = (x > px) - (x < px)
+        dy = (y > py) - (y < py)
+        while (px, py) != (x, y):
+            # Отрезок между точками прыжка - диагональ, затем прямая
+            px += dx if px != x else 0
+            py += dy if py != y else 0
+            path.append((px, py))
+    return path
+
+def dijkstra_costs(costs: List[float], width: int, height: int, start: Cell,
+                   targets: Optional[List[Cell]] = None,
+                   allow_diagonal: bool = True) -> Dict[Cell, float]:
+    """Стоимости кратчайших путей от start (те же правила шага, что у A*)
+
+    Если заданы targets, поиск останавливается, как только все цели
+    достигнуты, и возвращаются только их стоимости; недостижимые цели
+    в результат не попадают."""
+    start = (int(start[0]), int(start[1]))
+    start_node = start[1] * width + start[0]
+    if not math.isfinite(costs[start_node]):
+        return {}
+
+    moves = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0)]
+    if allow_diagonal:
+        moves += [(1, 1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (-1, -1, SQRT2)]
+    remaining = {y * width + x for x, y in targets} if targets is not None else None
+
+    distances = {start_node: 0.0}
+    open_heap = [(0.0, start_node)]
+    settled = {}
+    while open_heap:
+        g, node = heapq.heappop(open_heap)
+        if node in settled:
+            continue
+        settled[node] = g
+        if remaining is not None:
+            remaining.discard(node)
+            if not remaining:
+                break
+
+        x, y = node % width, node // width
+        node_cost = costs[node]
+        for dx, dy, length in moves:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            neighbour = ny * width + nx
+            neighbour_cost = costs[neighbour]
+            if neighbour_cost == math.inf or neighbour in settled:
+                continue
+            if dx and dy and (costs[y * width + nx] == math.inf or costs[ny * width + x] == math.inf):
+                continue
+            tentative = g + length * 0.5 * (node_cost + neighbour_cost)
+            if tentative < distances.get(neighbour, math.inf):
+                distances[neighbour] = tentative
+                heapq.heappush(open_heap, (tentative, neighbour))
+
+    if targets is not None:
+        return {(x, y): settled[y * width + x] for x, y in targets if y * width + x in settled}
+    return {(node % width, node // width): g for node, g in settled.items()}
+
+# = СЕРВИС ПОИСКА ПУТИ
+class PathfindingService:
+    """Сервис поиска пути по зарегистрированным картам
+
+    Пути кэшируются по (карта, старт, цель, версия карты), поэтому
+    изменение проходимости автоматически делает старые пути
+    недействительными. Асинхронные запросы выполняются в пуле потоков,
+    колбэк вызывается в рабочем потоке."""
+
+    def __init__(self, settings: Optional[PathfindingSettings] = None):
+        self.settings = settings or PathfindingSettings()
+        self.maps: Dict[str, GridMap] = {}
+        self.path_cache = BoundedCache("world.paths", max_entries=self.settings.cache_entries)
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "searches": 0,
+            "jps_searches": 0,
+            "astar_searches": 0,
+            "failed_searches": 0,
+            "expanded_nodes": 0,
+            "search_time": 0.0,
+            "async_requests": 0
+        }
+        self.logger = logging.getLogger(__name__)
+
+    # Карты
+    def register_map(self, grid_map: GridMap) -> GridMap:
+        with self._lock:
+            self.maps[grid_map.map_id] = grid_map
+        return grid_map
+
+    def register_dungeon(self, dungeon) -> GridMap:
+        """Регистрация карты подземелья (GeneratedDungeon)"""
+        return self.register_map(GridMap.from_dungeon(dungeon))
+
+    def register_terrain_chunk(self, chunk, biome_labels: List[Any]) -> GridMap:
+        """Регистрация карты чанка ландшафта (WorldChunk)"""
+        grid_map = GridMap.from_terrain(
+            chunk.chunk_id, chunk.height_map, chunk.biome_map, biome_labels, chunk.chunk_size,
+            origin=(chunk.chunk_x * chunk.chunk_size, chunk.chunk_y * chunk.chunk_size),
+            settings=self.settings
+        )
+        return self.register_map(grid_map)
+
+    def unregister_map(self, map_id: str) -> bool:
+        with self._lock:
+            return self.maps.pop(map_id, None) is not None
+
+    def get_map(self, map_id: str) -> Optional[GridMap]:
+        return self.maps.get(map_id)
+
+    # Поиск
+    def find_path(self, map_id: str, start: Cell, goal: Cell) -> Optional[PathResult]:
+        """Синхронный поиск пути между клетками карты"""
+        try:
+            grid_map = self.maps.get(map_id)
+            if grid_map is None:
+                self.logger.warning(f"Карта для поиска пути не найдена: {map_id}")
+                return None
+            start, goal = _as_cell(start), _as_cell(goal)
+            if not (grid_map.in_bounds(start) and grid_map.in_bounds(goal)):
+                return None
+
+            costs, version, uniform, min_cost = grid_map.snapshot()
+            cache_key = (map_id, start, goal, version)
+            cached = self.path_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            start_time = time.time()
+            if uniform and self.settings.allow_diagonal:
+                algorithm = "jps"
+                path, cost, expanded = jps_search(costs, grid_map.width, grid_map.height, start, goal,
+                                                  self.settings.max_expanded_nodes)
+            else:
+                algorithm = "astar"
+                path, cost, expanded = astar_search(costs, grid_map.width, grid_map.height, start, goal,
+                                                    self.settings.allow_diagonal, min_cost,
+                                                    self.settings.max_expanded_nodes)
+            search_time = time.time() - start_time
+
+            result = PathResult(map_id, start, goal, path, cost, expanded, algorithm, version, search_time)
+            with self._lock:
+                self.stats["searches"] += 1
+                self.stats[f"{algorithm}_searches"] += 1
+                self.stats["expanded_nodes"] += expanded
+                self.stats["search_time"] += search_time
+                if not path:
+                    self.stats["failed_searches"] += 1
+            self.path_cache.put(cache_key, result)
+            return result
+
+        except Exception as e:
+            self.logger.error(f"Ошибка поиска пути на карте {map_id}: {e}")
+            return None
+
+    def find_world_path(self, map_id: str, start: Tuple[float, float],
+                        goal: Tuple[float, float]) -> List[Tuple[float, float]]:
+        """Поиск пути между мировыми координатами; возвращает точки пути"""
+        grid_map = self.maps.get(map_id)
+        if grid_map is None:
+            return []
+        result = self.find_path(map_id, grid_map.world_to_cell(*start), grid_map.world_to_cell(*goal))
+        if result is None or not result.found:
+            return []
+        return [grid_map.cell_to_world(cell) for cell in result.path]
+
+    def request_path(self, map_id: str, start: Cell, goal: Cell,
+                     callback: Optional[Callable[[Optional[PathResult]], None]] = None) -> Future:
+        """Асинхронный поиск пути; Future разрешается в PathResult
+
+        Попадание в кэш разрешается сразу, без обращения к пулу."""
+        start, goal = _as_cell(start), _as_cell(goal)
+        grid_map = self.maps.get(map_id)
+        if grid_map is not None:
+            cached = self.path_cache.get((map_id, start, goal, grid_map.version))
+            if cached is not None:
+                future: Future = Future()
+                future.set_result(cached)
+                if callback:
+                    callback(cached)
+                return future
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.settings.worker_threads,
+                                               thread_name_prefix="pathfinding")
+        with self._lock:
+            self.stats["async_requests"] += 1
+        future = self.executor.submit(self.find_path, map_id, start, goal)
+        if callback:
+            future.add_done_callback(lambda f: self._run_callback(callback, f))
+        return future
+
+    def _run_callback(self, callback: Callable, future: Future):
+        try:
+            callback(future.result())
+        except Exception as e:
+            self.logger.error(f"Ошибка в callback поиска пути: {e}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики сервиса"""
+        return {
+            **self.stats,
+            "maps": len(self.maps),
+            "average_search_time": self.stats["search_time"] / max(1, self.stats["searches"]),
+            "cache": self.path_cache.get_statistics()
+        }
+
+    def shutdown(self):
+        """Остановка рабочих потоков и очистка кэша"""
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.path_cache.close()
+        with self._lock:
+            self.maps.clear()
@@ -10,7 +10,31 @@ import random
 import time
 import math
 
+import numpy as np
+
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.flow_field import FLOW_DIRECTIONS, IMPROVEMENT_EPSILON
+from src.systems.world.generation_cache import BoundedCache
+from src.systems.world.grid_utils import free_window_positions
+from src.systems.world.pathfinding import SQRT2, Cell, astar_search
+
+# Значения клеток сетки поселения
+CELL_EMPTY = 0
+CELL_BUILDING = 1
+CELL_ROAD = 2
+CELL_WALL = 3
+CELL_GATE = 4
+
+# Случайные попытки размещения здания до точного поиска по таблице сумм
+BUILDING_PLACEMENT_ATTEMPTS = 8
+
+# Стоимость прокладки дороги по клеткам каждого типа: по готовой дороге
+# дешевле, поэтому новые дороги вливаются в сеть, а не идут рядом с ней
+ROAD_REUSE_COST = 0.3
+ROAD_CELL_COSTS = np.array([1.0, math.inf, ROAD_REUSE_COST, math.inf, ROAD_REUSE_COST])
+# Здания дальше этой стоимости пути от дорог не подключаются: поле
+# расстояний считается только в этой полосе вокруг дорожной сети
+ROAD_CONNECTION_RANGE = 16.0
 
 # = ТИПЫ ПОСЕЛЕНИЙ
 class SettlementType(Enum):
@@ -98,7 +122,7 @@ class GeneratedSettlement:
     settings: SettlementSettings
     buildings: Dict[str, Building] = field(default_factory=dict)
     roads: Dict[str, Road] = field(default_factory=dict)
-    grid: List[List[int]] = field(default_factory=list)
+    grid: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.int8))  # [y, x]
     center: Tuple[int, int] = (0, 0)
     walls: List[Tuple[int, int]] = field(default_factory=list)
     gates: List[Tuple[int, int]] = field(default_factory=list)
@@ -108,6 +132,157 @@ class GeneratedSettlement:
     trade: float = 0.0
     generation_time: float = field(default_factory=time.time)
 
+# = ДОРОЖНАЯ СЕТЬ
+def relax_distances(costs: np.ndarray, distances: np.ndarray, max_distance: float = math.inf) -> int:
+    """Векторная дистанционная трансформация по полю стоимостей
+
+    distances - текущие оценки (0 у дорог, inf у остальных клеток); они
+    уменьшаются на месте синхронными проходами по восьми направлениям, пока
+    есть улучшения. Шаг стоит как в A*: длина шага на среднюю стоимость
+    двух клеток, диагональ не срезает углы. Возвращает число проходов."""
+    rows, cols = costs.shape
+    padded_costs = np.full((rows + 2, cols + 2), math.inf)
+    padded_costs[1:-1, 1:-1] = costs
+
+    # Стоимость шага в клетку из соседа (x + dx, y + dy) для каждого направления
+    steps = []
+    for dx, dy in FLOW_DIRECTIONS:
+        length = SQRT2 if dx and dy else 1.0
+        step = length * 0.5 * (costs + padded_costs[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx])
+        if dx and dy:
+            step[np.isinf(padded_costs[1:-1, 1 + dx:cols + 1 + dx]) |
+                 np.isinf(padded_costs[1 + dy:rows + 1 + dy, 1:-1])] = math.inf
+        steps.append((dx, dy, step))
+
+    padded = np.full((rows + 2, cols + 2), math.inf)
+    current = padded[1:-1, 1:-1]
+    current[...] = distances
+    previous = np.empty_like(current)
+    candidate = np.empty_like(current)
+
+    passes = 0
+    while True:
+        passes += 1
+        previous[...] = current
+        # Направления применяются по очереди к уже улучшенным значениям,
+        # поэтому за проход фронт уходит дальше чем на одну клетку
+        for dx, dy, step in steps:
+            np.add(padded[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx], step, out=candidate)
+            np.minimum(current, candidate, out=current)
+        current[current > max_distance] = math.inf
+        if not (current < previous - IMPROVEMENT_EPSILON).any():
+            break
+
+    distances[...] = current
+    return passes
+
+class RoadNetwork:
+    """Поле стоимостей для прокладки дорог и поле расстояний до ближайшей дороги
+
+    Расстояния строятся при первом запросе дистанционной трансформацией от
+    всех дорожных клеток. Новая дорога только уменьшает их, поэтому поле
+    пересчитывается лишь в окне вокруг нее, а путь к ближайшей дороге -
+    спуск по полю без перебора точек дорог."""
+
+    def __init__(self, grid: np.ndarray):
+        self.height, self.width = grid.shape
+        self.cost_grid = ROAD_CELL_COSTS[grid]
+        self.costs: List[float] = self.cost_grid.ravel().tolist()  # плоская копия для A*
+        self._distances: Optional[np.ndarray] = None
+
+    @property
+    def distances(self) -> np.ndarray:
+        """Стоимость пути до ближайшей дороги, inf дальше ROAD_CONNECTION_RANGE"""
+        if self._distances is None:
+            self._distances = np.where(self.cost_grid == ROAD_REUSE_COST, 0.0, math.inf)
+            relax_distances(self.cost_grid, self._distances, ROAD_CONNECTION_RANGE)
+        return self._distances
+
+    def add_road_cells(self, xs: np.ndarray, ys: np.ndarray) -> int:
+        """Учет новых дорожных клеток; возвращает число проходов пересчета"""
+        if ys.size == 0:
+            return 0
+
+        self.cost_grid[ys, xs] = ROAD_REUSE_COST
+        for node in (ys * self.width + xs).tolist():
+            self.costs[node] = ROAD_REUSE_COST
+        if self._distances is None:
+            return 0
+
+        # Улучшения не уходят от новой дороги дальше радиуса подключения
+        margin = int(ROAD_CONNECTION_RANGE) + 2
+        y0, y1 = max(int(ys.min()) - margin, 0), min(int(ys.max()) + margin + 1, self.height)
+        x0, x1 = max(int(xs.min()) - margin, 0), min(int(xs.max()) + margin + 1, self.width)
+        self._distances[ys, xs] = 0.0
+        window = self._distances[y0:y1, x0:x1]
+        return relax_distances(self.cost_grid[y0:y1, x0:x1], window, ROAD_CONNECTION_RANGE)
+
+    def is_passable(self, cell: Cell) -> bool:
+        x, y = cell
+        return 0 <= x < self.width and 0 <= y < self.height and self.costs[y * self.width + x] != math.inf
+
+    def distance_to_road(self, cell: Cell) -> float:
+        return float(self.distances[cell[1], cell[0]])
+
+    def find_path(self, start: Cell, goal: Cell) -> List[Cell]:
+        """Путь по полю стоимостей в обход зданий и стен
+
+        Эвристика взята по стоимости свободной клетки, а не дороги: поиск
+        раскрывает на порядки меньше клеток ценой чуть менее выгодного
+        переиспользования готовых дорог."""
+        path, _, _ = astar_search(self.costs, self.width, self.height, start, goal,
+                                  min_cost=ROAD_CELL_COSTS[CELL_EMPTY])
+        return path
+
+    def path_to_nearest_road(self, start: Cell) -> List[Cell]:
+        """Путь от start до ближайшей по стоимости дорожной клетки включительно"""
+        width, height = self.width, self.height
+        costs, distances = self.costs, self.distances
+        x, y = start
+        if distances[y, x] == math.inf:
+            return []
+
+        path = [(x, y)]
+        current = distances[y, x]
+        while current > 0.0:
+            best = None
+            for dx, dy in FLOW_DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                # Те же правила шага, что у поиска: без срезания углов
+                if dx and dy and (costs[y * width + nx] == math.inf or costs[ny * width + x] == math.inf):
+                    continue
+                if distances[ny, nx] < current:
+                    best, current = (nx, ny), distances[ny, nx]
+            if best is None:
+                break
+            x, y = best
+            path.append(best)
+        return path
+
+    def nearest_road_point(self, cell: Cell) -> Optional[Cell]:
+        path = self.path_to_nearest_road(cell)
+        return path[-1] if path else None
+
+    def entrance(self, building: "Building", target: Optional[Cell] = None) -> Optional[Cell]:
+        """Проходимая клетка вплотную к стене здания
+
+        Без target - клетка, ближайшая к дорожной сети, иначе ближайшая к target."""
+        left, top = building.x - 1, building.y - 1
+        right, bottom = building.x + building.width, building.y + building.height
+        cells = ([(x, top) for x in range(building.x, right)] +
+                 [(x, bottom) for x in range(building.x, right)] +
+                 [(left, y) for y in range(building.y, bottom)] +
+                 [(right, y) for y in range(building.y, bottom)])
+        candidates = [cell for cell in cells if self.is_passable(cell)]
+        if not candidates:
+            return None
+
+        if target is None:
+            return min(candidates, key=self.distance_to_road)
+        return min(candidates, key=lambda cell: (cell[0] - target[0]) ** 2 + (cell[1] - target[1]) ** 2)
+
 # = ОСНОВНАЯ СИСТЕМА ГЕНЕРАЦИИ ПОСЕЛЕНИЙ
 class SettlementGenerator(BaseComponent):
     """Генератор поселений для процедурного мира"""
@@ -126,7 +301,7 @@ class SettlementGenerator(BaseComponent):
         self.building_templates: Dict[SettlementType, Dict[BuildingType, Dict[str, Any]]] = {}
         
         # Кэш сгенерированных поселений
-        self.settlement_cache: Dict[str, GeneratedSettlement] = {}
+        self.settlement_cache = BoundedCache("settlement.generated", max_entries=64)
         
         # Статистика генерации
         self.generation_stats = {
@@ -240,6 +415,12 @@ class SettlementGenerator(BaseComponent):
             # Определяем центр поселения
             settlement.center = (settings.width // 2, settings.height // 2)
             
+            # Главная дорога прокладывается до застройки: здания встают вдоль нее
+            main_road = self._create_main_road(settlement)
+            if main_road:
+                settlement.roads[main_road.road_id] = main_road
+                self._place_road_on_grid(settlement, main_road)
+            
             # Генерируем здания
             self._generate_buildings(settlement)
             
@@ -275,25 +456,28 @@ class SettlementGenerator(BaseComponent):
             self._logger.error(f"Ошибка генерации поселения {settlement_type.value}: {e}")
             return None
     
-    def _create_empty_grid(self, width: int, height: int) -> List[List[int]]:
+    def _create_empty_grid(self, width: int, height: int) -> np.ndarray:
         """Создание пустой сетки поселения"""
         try:
-            return [[0 for _ in range(width)] for _ in range(height)]
+            return np.zeros((height, width), dtype=np.int8)
         except Exception as e:
             self._logger.error(f"Ошибка создания сетки: {e}")
-            return []
+            return np.zeros((0, 0), dtype=np.int8)
     
     def _generate_buildings(self, settlement: GeneratedSettlement):
         """Генерация зданий поселения"""
         try:
             templates = self.building_templates.get(settlement.settlement_type, {})
             
+            # Размеры, для которых места уже нет: сетка только заполняется
+            rejected_sizes: List[Tuple[int, int]] = []
+            
             for building_type, template in templates.items():
                 count_range = template.get("count_range", (1, 3))
                 count = random.randint(count_range[0], count_range[1])
                 
                 for i in range(count):
-                    building = self._create_building(settlement, building_type, template, i)
+                    building = self._create_building(settlement, building_type, template, i, rejected_sizes)
                     if building:
                         settlement.buildings[building.building_id] = building
                         self._place_building_on_grid(settlement, building)
@@ -302,11 +486,10 @@ class SettlementGenerator(BaseComponent):
             self._logger.error(f"Ошибка генерации зданий: {e}")
     
     def _create_building(self, settlement: GeneratedSettlement, building_type: BuildingType, 
-                         template: Dict[str, Any], index: int) -> Optional[Building]:
+                         template: Dict[str, Any], index: int,
+                         rejected_sizes: Optional[List[Tuple[int, int]]] = None) -> Optional[Building]:
         """Создание отдельного здания"""
         try:
-            settings = settlement.settings
-            
             # Получаем параметры здания
             size_range = template.get("size_range", (3, 5))
             level_range = template.get("level_range", (1, 2))
@@ -319,36 +502,66 @@ class SettlementGenerator(BaseComponent):
             level = random.randint(level_range[0], level_range[1])
             
             # Определяем позицию здания
-            max_x = settings.width - width
-            max_y = settings.height - height
+            position = self._find_building_position(settlement, width, height, rejected_sizes)
+            if position is None:
+                return None
+            
+            x, y = position
+            building = Building(
+                building_id=f"building_{building_type.value}_{index}_{int(time.time() * 1000)}",
+                building_type=building_type,
+                x=x,
+                y=y,
+                width=width,
+                height=height,
+                level=level,
+                condition=random.uniform(0.7, 1.0)
+            )
+            
+            return building
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка создания здания {building_type.value}: {e}")
+            return None
+    
+    def _find_building_position(self, settlement: GeneratedSettlement, width: int, height: int,
+                                rejected_sizes: Optional[List[Tuple[int, int]]] = None) -> Optional[Tuple[int, int]]:
+        """Позиция для здания width x height на сетке поселения
+        
+        Случайные пробы годятся для почти пустой сетки; когда они не
+        находят места, перебираются все свободные окна (grid_utils).
+        Размеры, которым места не нашлось, копятся в rejected_sizes:
+        здание не меньше любого из них заведомо не поместится."""
+        try:
+            grid_height, grid_width = settlement.grid.shape
+            max_x = grid_width - width
+            max_y = grid_height - height
             
             if max_x <= 0 or max_y <= 0:
                 return None
             
-            # Пытаемся разместить здание
-            for attempt in range(100):
+            if rejected_sizes and any(width >= rejected_width and height >= rejected_height
+                                      for rejected_width, rejected_height in rejected_sizes):
+                return None
+            
+            for attempt in range(BUILDING_PLACEMENT_ATTEMPTS):
                 x = random.randint(0, max_x)
                 y = random.randint(0, max_y)
                 
                 if self._can_place_building(settlement, x, y, width, height):
-                    # Создаем здание
-                    building = Building(
-                        building_id=f"building_{building_type.value}_{index}_{int(time.time() * 1000)}",
-                        building_type=building_type,
-                        x=x,
-                        y=y,
-                        width=width,
-                        height=height,
-                        level=level,
-                        condition=random.uniform(0.7, 1.0)
-                    )
-                    
-                    return building
+                    return x, y
             
-            return None
+            free = free_window_positions(settlement.grid, width, height, CELL_EMPTY)
+            if len(free) == 0:
+                if rejected_sizes is not None:
+                    rejected_sizes.append((width, height))
+                return None
+            
+            x, y = free[random.randrange(len(free))]
+            return int(x), int(y)
             
         except Exception as e:
-            self._logger.error(f"Ошибка создания здания {building_type.value}: {e}")
+            self._logger.error(f"Ошибка поиска позиции здания: {e}")
             return None
     
     def _can_place_building(self, settlement: GeneratedSettlement, x: int, y: int, 
@@ -356,16 +569,12 @@ class SettlementGenerator(BaseComponent):
         """Проверка возможности размещения здания"""
         try:
             # Проверяем границы
-            if x < 0 or y < 0 or x + width > len(settlement.grid[0]) or y + height > len(settlement.grid):
+            grid_height, grid_width = settlement.grid.shape
+            if x < 0 or y < 0 or x + width > grid_width or y + height > grid_height:
                 return False
             
             # Проверяем, что место свободно
-            for dy in range(y, y + height):
-                for dx in range(x, x + width):
-                    if settlement.grid[dy][dx] != 0:
-                        return False
-            
-            return True
+            return not settlement.grid[y:y + height, x:x + width].any()
             
         except Exception as e:
             self._logger.error(f"Ошибка проверки размещения здания: {e}")
@@ -374,9 +583,8 @@ class SettlementGenerator(BaseComponent):
     def _place_building_on_grid(self, settlement: GeneratedSettlement, building: Building):
         """Размещение здания на сетке"""
         try:
-            for y in range(building.y, building.y + building.height):
-                for x in range(building.x, building.x + building.width):
-                    settlement.grid[y][x] = 1  # 1 = здание
+            settlement.grid[max(building.y, 0):building.y + building.height,
+                            max(building.x, 0):building.x + building.width] = CELL_BUILDING
             
         except Exception as e:
             self._logger.error(f"Ошибка размещения здания на сетке: {e}")
@@ -386,35 +594,49 @@ class SettlementGenerator(BaseComponent):
         try:
             buildings = list(settlement.buildings.values())
             
-            # Создаем главную дорогу через центр
-            main_road = self._create_main_road(settlement)
-            if main_road:
-                settlement.roads[main_road.road_id] = main_road
-                self._place_road_on_grid(settlement, main_road)
+            # Поле стоимостей строится по готовой застройке и главной дороге
+            network = RoadNetwork(settlement.grid)
             
             # Создаем дороги между важными зданиями
             important_buildings = [b for b in buildings if b.building_type in 
                                  [BuildingType.TOWN_HALL, BuildingType.TEMPLE, BuildingType.TAVERN]]
+            important_buildings = self._order_by_proximity(important_buildings)
             
             for i in range(len(important_buildings) - 1):
-                road = self._create_road_between_buildings(settlement, 
+                road = self._create_road_between_buildings(settlement, network,
                                                          important_buildings[i], 
                                                          important_buildings[i + 1])
                 if road:
                     settlement.roads[road.road_id] = road
-                    self._place_road_on_grid(settlement, road)
+                    self._place_road_on_grid(settlement, road, network)
             
             # Создаем случайные дороги к домам
             houses = [b for b in buildings if b.building_type == BuildingType.HOUSE]
             for house in houses[:len(houses) // 3]:  # Подключаем треть домов
-                road = self._create_road_to_building(settlement, house)
+                road = self._create_road_to_building(settlement, network, house)
                 if road:
                     settlement.roads[road.road_id] = road
-                    self._place_road_on_grid(settlement, road)
+                    self._place_road_on_grid(settlement, road, network)
             
         except Exception as e:
             self._logger.error(f"Ошибка создания дорог: {e}")
     
+    def _order_by_proximity(self, buildings: List[Building]) -> List[Building]:
+        """Цепочка зданий от ратуши, где следующее - ближайшее к предыдущему
+        
+        Дороги между соседями цепочки короче, и поиск пути раскрывает меньше клеток."""
+        remaining = sorted(buildings, key=lambda b: b.building_type != BuildingType.TOWN_HALL)
+        if not remaining:
+            return []
+        
+        ordered = [remaining.pop(0)]
+        while remaining:
+            last = ordered[-1]
+            nearest = min(range(len(remaining)),
+                          key=lambda i: (remaining[i].x - last.x) ** 2 + (remaining[i].y - last.y) ** 2)
+            ordered.append(remaining.pop(nearest))
+        return ordered
+    
     def _create_main_road(self, settlement: GeneratedSettlement) -> Optional[Road]:
         """Создание главной дороги"""
         try:
@@ -424,7 +646,7 @@ class SettlementGenerator(BaseComponent):
             start_point = (center_x, 0)
             end_point = (center_x, settlement.settings.height - 1)
             
-            path = self._create_road_path(start_point, end_point)
+            path = [(center_x, y) for y in range(settlement.settings.height)]
             
             road = Road(
                 road_id=f"main_road_{int(time.time() * 1000)}",
@@ -441,7 +663,7 @@ class SettlementGenerator(BaseComponent):
             self._logger.error(f"Ошибка создания главной дороги: {e}")
             return None
     
-    def _create_road_between_buildings(self, settlement: GeneratedSettlement, 
+    def _create_road_between_buildings(self, settlement: GeneratedSettlement, network: RoadNetwork,
                                       building1: Building, building2: Building) -> Optional[Road]:
         """Создание дороги между двумя зданиями"""
         try:
@@ -449,13 +671,21 @@ class SettlementGenerator(BaseComponent):
             center1 = (building1.x + building1.width // 2, building1.y + building1.height // 2)
             center2 = (building2.x + building2.width // 2, building2.y + building2.height // 2)
             
-            path = self._create_road_path(center1, center2)
+            # Дорога идет от входа к входу: входы обращены друг к другу
+            start_point = network.entrance(building1, center2)
+            end_point = network.entrance(building2, center1)
+            if start_point is None or end_point is None:
+                return None
+            
+            path = self._create_road_path(network, start_point, end_point)
+            if not path:
+                return None
             
             road = Road(
                 road_id=f"road_{building1.building_id}_{building2.building_id}_{int(time.time() * 1000)}",
                 road_type=RoadType.COBBLESTONE if settlement.settings.wealth_level > 0.3 else RoadType.DIRT,
-                start_point=center1,
-                end_point=center2,
+                start_point=start_point,
+                end_point=end_point,
                 path=path,
                 width=3
             )
@@ -466,24 +696,24 @@ class SettlementGenerator(BaseComponent):
             self._logger.error(f"Ошибка создания дороги между зданиями: {e}")
             return None
     
-    def _create_road_to_building(self, settlement: GeneratedSettlement, 
+    def _create_road_to_building(self, settlement: GeneratedSettlement, network: RoadNetwork,
                                 building: Building) -> Optional[Road]:
         """Создание дороги к зданию"""
         try:
-            # Определяем центр здания
-            building_center = (building.x + building.width // 2, building.y + building.height // 2)
+            # Вход здания - ближайшая к дорожной сети клетка у его стены
+            entrance = network.entrance(building)
+            if entrance is None:
+                return None
             
-            # Находим ближайшую существующую дорогу
-            nearest_road_point = self._find_nearest_road_point(settlement, building_center)
+            # Спуск по полю расстояний сразу дает путь до ближайшей дороги
+            path = network.path_to_nearest_road(entrance)
             
-            if nearest_road_point:
-                path = self._create_road_path(building_center, nearest_road_point)
-                
+            if len(path) > 1:
                 road = Road(
                     road_id=f"road_to_{building.building_id}_{int(time.time() * 1000)}",
                     road_type=RoadType.DIRT,
-                    start_point=building_center,
-                    end_point=nearest_road_point,
+                    start_point=entrance,
+                    end_point=path[-1],
                     path=path,
                     width=2
                 )
@@ -496,60 +726,50 @@ class SettlementGenerator(BaseComponent):
             self._logger.error(f"Ошибка создания дороги к зданию: {e}")
             return None
     
-    def _create_road_path(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
-        """Создание пути дороги"""
+    def _create_road_path(self, network: RoadNetwork, start: Tuple[int, int],
+                          end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Создание пути дороги по полю стоимостей с переиспользованием готовых дорог"""
         try:
-            path = []
-            current = start
-            
-            # Простой алгоритм: сначала по X, потом по Y
-            while current[0] != end[0]:
-                next_x = current[0] + (1 if current[0] < end[0] else -1)
-                current = (next_x, current[1])
-                path.append(current)
-            
-            while current[1] != end[1]:
-                next_y = current[1] + (1 if current[1] < end[1] else -1)
-                current = (current[0], next_y)
-                path.append(current)
-            
-            return path
+            return network.find_path(start, end)
             
         except Exception as e:
             self._logger.error(f"Ошибка создания пути дороги: {e}")
             return []
     
-    def _find_nearest_road_point(self, settlement: GeneratedSettlement, 
-                                 point: Tuple[int, int]) -> Optional[Tuple[int, int]]:
-        """Поиск ближайшей точки на дороге"""
-        try:
-            nearest_point = None
-            min_distance = float('inf')
-            
-            for road in settlement.roads.values():
-                for road_point in road.path:
-                    distance = math.sqrt((point[0] - road_point[0]) ** 2 + 
-                                       (point[1] - road_point[1]) ** 2)
-                    if distance < min_distance:
-                        min_distance = distance
-                        nearest_point = road_point
-            
-            return nearest_point
-            
-        except Exception as e:
-            self._logger.error(f"Ошибка поиска ближайшей точки дороги: {e}")
-            return None
-    
-    def _place_road_on_grid(self, settlement: GeneratedSettlement, road: Road):
-        """Размещение дороги на сетке"""
+    def _place_road_on_grid(self, settlement: GeneratedSettlement, road: Road,
+                            network: Optional[RoadNetwork] = None):
+        """Размещение дороги на сетке
+        
+        Осевая линия расширяется до ширины дороги сдвигами маски; дорога
+        занимает только свободные клетки и не заходит в здания."""
         try:
-            for x, y in road.path:
-                # Размещаем дорогу с учетом ширины
-                for dy in range(y - road.width // 2, y + road.width // 2 + 1):
-                    for dx in range(x - road.width // 2, x + road.width // 2 + 1):
-                        if (0 <= dy < len(settlement.grid) and 
-                            0 <= dx < len(settlement.grid[0])):
-                            settlement.grid[dy][dx] = 2  # 2 = дорога
+            if not road.path:
+                return
+            
+            grid_height, grid_width = settlement.grid.shape
+            radius = road.width // 2
+            points = np.array(road.path, dtype=np.intp)
+            
+            # Работаем в окне вокруг дороги, а не по всей сетке
+            x0 = max(int(points[:, 0].min()) - radius, 0)
+            y0 = max(int(points[:, 1].min()) - radius, 0)
+            x1 = min(int(points[:, 0].max()) + radius + 1, grid_width)
+            y1 = min(int(points[:, 1].max()) + radius + 1, grid_height)
+            grid = settlement.grid[y0:y1, x0:x1]
+            height, width = grid.shape
+            
+            axis = np.zeros((height + 2 * radius, width + 2 * radius), dtype=bool)
+            axis[points[:, 1] - y0 + radius, points[:, 0] - x0 + radius] = True
+            covered = np.zeros((height, width), dtype=bool)
+            for dy in range(2 * radius + 1):
+                for dx in range(2 * radius + 1):
+                    covered |= axis[dy:dy + height, dx:dx + width]
+            
+            new_cells = covered & (grid == CELL_EMPTY)
+            grid[new_cells] = CELL_ROAD
+            if network is not None:
+                ys, xs = np.nonzero(new_cells)
+                network.add_road_cells(xs + x0, ys + y0)
             
         except Exception as e:
             self._logger.error(f"Ошибка размещения дороги на сетке: {e}")
@@ -577,23 +797,21 @@ class SettlementGenerator(BaseComponent):
         try:
             # Простая прямоугольная стена
             margin = 5
-            for x in range(margin, settlement.settings.width - margin):
-                # Северная стена
-                settlement.walls.append((x, margin))
-                settlement.grid[margin][x] = 3  # 3 = стена
-                
-                # Южная стена
-                settlement.walls.append((x, settlement.settings.height - margin - 1))
-                settlement.grid[settlement.settings.height - margin - 1][x] = 3
-            
-            for y in range(margin, settlement.settings.height - margin):
-                # Западная стена
-                settlement.walls.append((margin, y))
-                settlement.grid[y][margin] = 3
-                
-                # Восточная стена
-                settlement.walls.append((settlement.settings.width - margin - 1, y))
-                settlement.grid[y][settlement.settings.width - margin - 1] = 3
+            north, south = margin, settlement.settings.height - margin - 1
+            west, east = margin, settlement.settings.width - margin - 1
+            if south <= north or east <= west:
+                return
+            
+            for x in range(west, east + 1):
+                settlement.walls.append((x, north))
+                settlement.walls.append((x, south))
+            for y in range(north, south + 1):
+                settlement.walls.append((west, y))
+                settlement.walls.append((east, y))
+            
+            # Северная и южная, затем западная и восточная стены
+            settlement.grid[[north, south], west:east + 1] = CELL_WALL
+            settlement.grid[north:south + 1, [west, east]] = CELL_WALL
             
         except Exception as e:
             self._logger.error(f"Ошибка создания стен: {e}")
@@ -631,11 +849,11 @@ class SettlementGenerator(BaseComponent):
             
             # Северные ворота
             settlement.gates.append((center_x, 5))
-            settlement.grid[5][center_x] = 4  # 4 = ворота
+            settlement.grid[5, center_x] = CELL_GATE
             
             # Южные ворота
             settlement.gates.append((center_x, settlement.settings.height - 6))
-            settlement.grid[settlement.settings.height - 6][center_x] = 4
+            settlement.grid[settlement.settings.height - 6, center_x] = CELL_GATE
             
         except Exception as e:
             self._logger.error(f"Ошибка создания ворот: {e}")
@@ -699,6 +917,8 @@ class SettlementGenerator(BaseComponent):
                 "total_roads": self.generation_stats["total_roads"],
                 "generation_time": self.generation_stats["generation_time"],
                 "cache_size": len(self.settlement_cache),
+                "cache_memory_mb": self.settlement_cache.size_bytes / (1024 * 1024),
+                "cache_evictions": self.settlement_cache.stats["evictions"],
                 "average_time_per_settlement": (self.generation_stats["generation_time"] / 
                                               max(self.generation_stats["total_settlements"], 1))
             }
@@ -719,8 +939,8 @@ class SettlementGenerator(BaseComponent):
     def _on_destroy(self) -> bool:
         """Уничтожение генератора поселений"""
         try:
-            # Очищаем кэш
-            self.clear_cache()
+            # Очищаем кэш и освобождаем бюджет памяти
+            self.settlement_cache.close()
             
             # Сбрасываем статистику
             self.generation_stats = {
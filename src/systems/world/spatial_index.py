@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Пространственные индексы объектов мира
+Равномерная хеш-сетка для структур, локаций и путевых точек и хеш
+подвижных сущностей: запросы просматривают только пересекаемые ячейки"""
+
+from typing import Dict, List, Optional, Any, Tuple, Callable, Iterable, Iterator
+import heapq
+import math
+import threading
+
+CellKey = Tuple[int, int]
+
+# = ПРОСТРАНСТВЕННАЯ СЕТКА
+class SpatialGridIndex:
+    """Индекс точечных объектов на равномерной хеш-сетке
+
+    Хранятся только занятые ячейки, поэтому память пропорциональна
+    числу объектов, а не площади мира. Вставка, удаление и перемещение -
+    O(1); запрос по радиусу - O(k + число пересекаемых ячеек), поиск
+    ближайших идет расширяющимися кольцами ячеек. Размер ячейки стоит
+    выбирать порядка типичного радиуса запроса."""
+
+    def __init__(self, cell_size: float = 64.0):
+        if cell_size <= 0:
+            raise ValueError("Размер ячейки должен быть положительным")
+        self.cell_size = float(cell_size)
+        self._cells: Dict[CellKey, Dict[Any, Tuple[float, float, Any]]] = {}
+        self._entries: Dict[Any, Tuple[float, float, Any]] = {}
+        self._lock = threading.RLock()
+
+    def _cell_of(self, x: float, y: float) -> CellKey:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    # Изменение
+    def insert(self, item_id: Any, x: float, y: float, item: Any = None):
+        """Добавление объекта (повторная вставка перемещает его)"""
+        with self._lock:
+            if item_id in self._entries:
+                self.remove(item_id)
+            entry = (float(x), float(y), item if item is not None else item_id)
+            self._entries[item_id] = entry
+            self._cells.setdefault(self._cell_of(x, y), {})[item_id] = entry
+
+    def remove(self, item_id: Any) -> bool:
+        """Удаление объекта"""
+        with self._lock:
+            entry = self._entries.pop(item_id, None)
+            if entry is None:
+                return False
+            key = self._cell_of(entry[0], entry[1])
+            cell = self._cells.get(key)
+            if cell is not None:
+                cell.pop(item_id, None)
+                if not cell:
+                    del self._cells[key]
+            return True
+
+    def move(self, item_id: Any, x: float, y: float) -> bool:
+        """Перемещение объекта; ячейка меняется только при пересечении границы"""
+        with self._lock:
+            entry = self._entries.get(item_id)
+            if entry is None:
+                return False
+            old_key = self._cell_of(entry[0], entry[1])
+            new_key = self._cell_of(x, y)
+            new_entry = (float(x), float(y), entry[2])
+            self._entries[item_id] = new_entry
+            if old_key == new_key:
+                self._cells[old_key][item_id] = new_entry
+            else:
+                old_cell = self._cells[old_key]
+                del old_cell[item_id]
+                if not old_cell:
+                    del self._cells[old_key]
+                self._cells.setdefault(new_key, {})[item_id] = new_entry
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._entries.clear()
+
+    # Доступ
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, item_id: Any) -> bool:
+        return item_id in self._entries
+
+    def get_position(self, item_id: Any) -> Optional[Tuple[float, float]]:
+        entry = self._entries.get(item_id)
+        return (entry[0], entry[1]) if entry is not None else None
+
+    def _iter_cells(self, min_x: float, min_y: float,
+                    max_x: float, max_y: float) -> Iterator[Dict[Any, Tuple[float, float, Any]]]:
+        """Занятые ячейки, пересекающие прямоугольник"""
+        low = self._cell_of(min_x, min_y)
+        high = self._cell_of(max_x, max_y)
+        span = (high[0] - low[0] + 1) * (high[1] - low[1] + 1)
+        if span > len(self._cells):
+            # Область больше заселенной части мира: быстрее пройти занятые ячейки
+            for key, cell in list(self._cells.items()):
+                if low[0] <= key[0] <= high[0] and low[1] <= key[1] <= high[1]:
+                    yield cell
+            return
+        for cx in range(low[0], high[0] + 1):
+            for cy in range(low[1], high[1] + 1):
+                cell = self._cells.get((cx, cy))
+                if cell:
+                    yield cell
+
+    # Запросы
+    def query_radius(self, x: float, y: float, radius: float,
+                     predicate: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """Объекты на расстоянии не больше radius"""
+        with self._lock:
+            result = []
+            radius_sq = radius * radius
+            for cell in self._iter_cells(x - radius, y - radius, x + radius, y + radius):
+                for ex, ey, item in cell.values():
+                    dx = ex - x
+                    dy = ey - y
+                    if dx * dx + dy * dy <= radius_sq and (predicate is None or predicate(item)):
+                        result.append(item)
+            return result
+
+    def any_within(self, x: float, y: float, radius: float,
+                   predicate: Optional[Callable[[Any], bool]] = None) -> bool:
+        """Есть ли объект строго ближе radius (с ранним выходом)"""
+        with self._lock:
+            radius_sq = radius * radius
+            for cell in self._iter_cells(x - radius, y - radius, x + radius, y + radius):
+                for ex, ey, item in cell.values():
+                    dx = ex - x
+                    dy = ey - y
+                    if dx * dx + dy * dy < radius_sq and (predicate is None or predicate(item)):
+                        return True
+            return False
+
+    def query_rect(self, min_x: float, min_y: float, max_x: float, max_y: float,
+                   predicate: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """Объекты внутри прямоугольника (границы включительно)"""
+        with self._lock:
+            result = []
+            for cell in self._iter_cells(min_x, min_y, max_x, max_y):
+                for ex, ey, item in cell.values():
+                    if min_x <= ex <= max_x and min_y <= ey <= max_y and \
+                            (predicate is None or predicate(item)):
+                        result.append(item)
+            return result
+
+    def nearest(self, x: float, y: float, k: int = 1, max_radius: Optional[float] = None,
+                predicate: Optional[Callable[[Any], bool]] = None) -> List[Tuple[float, Any]]:
+        """k ближайших объектов в виде списка (расстояние, объект) по возрастанию"""
+        with self._lock:
+            if k <= 0 or not self._cells:
+                return []
+
+            limit_sq = max_radius * max_radius if max_radius is not None else math.inf
+            center = self._cell_of(x, y)
+
+            best: List[Tuple[float, int, Any]] = []  # куча с обратным знаком расстояния
+            sequence = 0
+            visited = 0
+            ring = 0
+            while visited < len(self._cells):
+                # Разреженный мир: кольца дороже прямого перебора занятых ячеек
+                if (2 * ring + 1) ** 2 > 4 * len(self._cells):
+                    return self._nearest_brute_force(x, y, k, limit_sq, predicate)
+
+                for cell in self._ring_cells(center, ring):
+                    visited += 1
+                    for ex, ey, item in cell.values():
+                        distance_sq = (ex - x) ** 2 + (ey - y) ** 2
+                        if distance_sq > limit_sq or (predicate is not None and not predicate(item)):
+                            continue
+                        sequence += 1
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance_sq, sequence, item))
+                        elif distance_sq < -best[0][0]:
+                            heapq.heapreplace(best, (-distance_sq, sequence, item))
+
+                # Объекты за пределами пройденных колец не ближе края блока
+                reach = min(x - (center[0] - ring) * self.cell_size,
+                            (center[0] + ring + 1) * self.cell_size - x,
+                            y - (center[1] - ring) * self.cell_size,
+                            (center[1] + ring + 1) * self.cell_size - y)
+                if reach * reach >= limit_sq:
+                    break
+                if len(best) == k and -best[0][0] <= reach * reach:
+                    break
+                ring += 1
+
+            return [(math.sqrt(-negative), item) for negative, _, item in sorted(best, reverse=True)]
+
+    def _nearest_brute_force(self, x: float, y: float, k: int, limit_sq: float,
+                             predicate: Optional[Callable[[Any], bool]]) -> List[Tuple[float, Any]]:
+        candidates = (((ex - x) ** 2 + (ey - y) ** 2, index, item)
+                      for index, (ex, ey, item) in enumerate(self._entries.values())
+                      if predicate is None or predicate(item))
+        closest = heapq.nsmallest(k, (c for c in candidates if c[0] <= limit_sq))
+        return [(math.sqrt(distance_sq), item) for distance_sq, _, item in closest]
+
+    def _ring_cells(self, center: CellKey, ring: int) -> Iterator[Dict[Any, Tuple[float, float, Any]]]:
+        """Занятые ячейки на кольце заданного радиуса (в ячейках)"""
+        if ring == 0:
+            cell = self._cells.get(center)
+            if cell:
+                yield cell
+            return
+        cx, cy = center
+        for dx in range(-ring, ring + 1):
+            for cell_key in ((cx + dx, cy - ring), (cx + dx, cy + ring)):
+                cell = self._cells.get(cell_key)
+                if cell:
+                    yield cell
+        for dy in range(-ring + 1, ring):
+            for cell_key in ((cx - ring, cy + dy), (cx + ring, cy + dy)):
+                cell = self._cells.get(cell_key)
+                if cell:
+                    yield cell
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Статистика заполнения сетки"""
+        with self._lock:
+            occupancy = [len(cell) for cell in self._cells.values()]
+            return {
+                "objects": len(self._entries),
+                "cells": len(self._cells),
+                "cell_size": self.cell_size,
+                "max_per_cell": max(occupancy, default=0),
+                "average_per_cell": len(self._entries) / max(1, len(self._cells))
+            }
+
+# = ДИНАМИЧЕСКИЙ ХЕШ СУЩНОСТЕЙ
+class DynamicSpatialHash:
+    """Пространственный хеш подвижных сущностей с разбиением по типам
+
+    Для каждого типа сущностей ведется своя сетка, поэтому запрос с
+    фильтром по типу не просматривает сущности других типов. Позиции
+    обновляются инкрементально: перенос между ячейками происходит
+    только при пересечении границы ячейки."""
+
+    def __init__(self, cell_size: float = 16.0):
+        self.cell_size = float(cell_size)
+        self._grids: Dict[str, SpatialGridIndex] = {}
+        self._types: Dict[Any, str] = {}
+        self._lock = threading.RLock()
+        self.stats = {
+            "updates": 0,
+            "queries": 0
+        }
+
+    def update(self, entity_id: Any, x: float, y: float,
+               entity_type: str = "default", item: Any = None):
+        """Добавление сущности или обновление ее позиции и типа"""
+        with self._lock:
+            self.stats["updates"] += 1
+            current_type = self._types.get(entity_id)
+            if current_type == entity_type and item is None:
+                self._grids[entity_type].move(entity_id, x, y)
+                return
+            if current_type is not None:
+                self._grids[current_type].remove(entity_id)
+            grid = self._grids.get(entity_type)
+            if grid is None:
+                grid = self._grids[entity_type] = SpatialGridIndex(self.cell_size)
+            grid.insert(entity_id, x, y, item)
+            self._types[entity_id] = entity_type
+
+    def remove(self, entity_id: Any) -> bool:
+        with self._lock:
+            entity_type = self._types.pop(entity_id, None)
+            if entity_type is None:
+                return False
+            return self._grids[entity_type].remove(entity_id)
+
+    def clear(self):
+        with self._lock:
+            self._grids.clear()
+            self._types.clear()
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __contains__(self, entity_id: Any) -> bool:
+        return entity_id in self._types
+
+    def get_type(self, entity_id: Any) -> Optional[str]:
+        return self._types.get(entity_id)
+
+    def get_position(self, entity_id: Any) -> Optional[Tuple[float, float]]:
+        entity_type = self._types.get(entity_id)
+        return self._grids[entity_type].get_position(entity_id) if entity_type is not None else None
+
+    def _select_grids(self, entity_types: Optional[Iterable[str]]) -> List[SpatialGridIndex]:
+        if entity_types is None:
+            return list(self._grids.values())
+        return [self._grids[t] for t in entity_types if t in self._grids]
+
+    # Запросы
+    def query_radius(self, x: float, y: float, radius: float,
+                     entity_types: Optional[Iterable[str]] = None,
+                     exclude: Any = None) -> List[Any]:
+        """Сущности в радиусе (опционально только заданных типов)"""
+        with self._lock:
+            self.stats["queries"] += 1
+            predicate = (lambda item: item != exclude) if exclude is not None else None
+            result = []
+            for grid in self._select_grids(entity_types):
+                result.extend(grid.query_radius(x, y, radius, predicate))
+            return result
+
+    def nearest(self, x: float, y: float, k: int = 1, max_radius: Optional[float] = None,
+                entity_types: Optional[Iterable[str]] = None,
+                exclude: Any = None) -> List[Tuple[float, Any]]:
+        """k ближайших сущностей в виде списка (расстояние, сущность)"""
+        with self._lock:
+            self.stats["queries"] += 1
+            predicate = (lambda item: item != exclude) if exclude is not None else None
+            candidates = []
+            for grid in self._select_grids(entity_types):
+                candidates.extend(grid.nearest(x, y, k, max_radius, predicate))
+            return heapq.nsmallest(k, candidates, key=lambda candidate: candidate[0])
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "entities": len(self._types),
+                "types": {entity_type: len(grid) for entity_type, grid in self._grids.items()}
+            }
@@ -4,13 +4,15 @@
 
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
 import logging
 import random
 import time
 import math
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.generation_cache import BoundedCache
+from src.systems.world.spatial_index import SpatialGridIndex
 
 # = ТИПЫ СТРУКТУР
 class StructureType(Enum):
@@ -104,8 +106,17 @@ class StructureGenerator(BaseComponent):
         self.spawn_density = 0.01  # Структур на единицу площади
         self.min_distance = 100.0  # Минимальное расстояние между структурами
         
+        # Пространственный индекс структур (ячейка порядка min_distance)
+        self.spatial_index = SpatialGridIndex(cell_size=self.min_distance)
+        
+        # Структуры по чанкам; удерживаемые чанки (загруженные в мире) не
+        # снимаются с учета при вытеснении их записи из кэша
+        self.chunk_structures: Dict[str, List[str]] = {}
+        self.retained_chunks: Set[str] = set()
+        
         # Кэш и статистика
-        self.generation_cache: Dict[str, Any] = {}
+        self.generation_cache = BoundedCache("structure.chunks", max_entries=512,
+                                             on_evict=self._on_chunk_evicted)
         self.generation_stats = {
             "total_structures": 0,
             "structures_by_type": {},
@@ -215,10 +226,14 @@ class StructureGenerator(BaseComponent):
             start_time = time.time()
             chunk_key = f"{chunk_x}_{chunk_y}"
             
-            # Проверяем кэш
-            if chunk_key in self.generation_cache:
-                return self.generation_cache[chunk_key]
+            # Проверяем кэш (структуры могли быть сняты с учета при выгрузке)
+            cached = self.generation_cache.get(chunk_key)
+            if cached is not None:
+                self._register_chunk(chunk_key, cached)
+                return cached
             
+            # Старые копии структур этого чанка не должны мешать новой генерации
+            self._unregister_chunk(chunk_key)
             structures = []
             random.seed(world_seed + hash(chunk_key))
             
@@ -232,9 +247,10 @@ class StructureGenerator(BaseComponent):
                     structure = self._generate_random_structure(chunk_x, chunk_y, chunk_size)
                     if structure:
                         structures.append(structure)
-                        self.generated_structures[structure.structure_id] = structure
+                        self._register_structure(structure)
             
             # Кэшируем результат
+            self.chunk_structures[chunk_key] = [s.structure_id for s in structures]
             self.generation_cache[chunk_key] = structures
             
             # Обновляем статистику
@@ -293,17 +309,45 @@ class StructureGenerator(BaseComponent):
             self._logger.error(f"Ошибка генерации случайной структуры: {e}")
             return None
     
+    def _register_structure(self, structure: GeneratedStructure):
+        """Регистрация структуры в реестре и пространственном индексе"""
+        self.generated_structures[structure.structure_id] = structure
+        self.spatial_index.insert(structure.structure_id, structure.position[0],
+                                  structure.position[1], structure)
+    
+    def _register_chunk(self, chunk_key: str, structures: List[GeneratedStructure]):
+        for structure in structures:
+            self._register_structure(structure)
+        self.chunk_structures[chunk_key] = [s.structure_id for s in structures]
+    
+    def _unregister_chunk(self, chunk_key: str):
+        """Снятие структур чанка с учета в реестре и пространственном индексе"""
+        for structure_id in self.chunk_structures.pop(chunk_key, []):
+            self.generated_structures.pop(structure_id, None)
+            self.spatial_index.remove(structure_id)
+    
+    def _on_chunk_evicted(self, chunk_key: str, structures: List[GeneratedStructure]):
+        """Вытеснение записи кэша: структуры неудерживаемого чанка больше не нужны"""
+        if chunk_key not in self.retained_chunks:
+            self._unregister_chunk(chunk_key)
+    
+    def retain_chunk(self, chunk_x: int, chunk_y: int):
+        """Пометка структур чанка как используемых до release_chunk"""
+        self.retained_chunks.add(f"{chunk_x}_{chunk_y}")
+    
+    def release_chunk(self, chunk_x: int, chunk_y: int):
+        """Выгрузка чанка: структуры снимаются с учета, запись кэша остается
+        
+        Иначе при повторной генерации того же чанка структуры отклонялись бы
+        проверкой минимального расстояния до собственных старых копий."""
+        chunk_key = f"{chunk_x}_{chunk_y}"
+        self.retained_chunks.discard(chunk_key)
+        self._unregister_chunk(chunk_key)
+    
     def _check_minimum_distance(self, position: Tuple[float, float, float]) -> bool:
         """Проверка минимального расстояния до других структур"""
         try:
-            for structure in self.generated_structures.values():
-                distance = math.sqrt(
-                    (position[0] - structure.position[0]) ** 2 +
-                    (position[1] - structure.position[1]) ** 2
-                )
-                if distance < self.min_distance:
-                    return False
-            return True
+            return not self.spatial_index.any_within(position[0], position[1], self.min_distance)
             
         except Exception as e:
             self._logger.error(f"Ошибка проверки минимального расстояния: {e}")
@@ -459,26 +503,91 @@ class StructureGenerator(BaseComponent):
             self._logger.error(f"Ошибка генерации врагов: {e}")
             return []
     
-    def get_structures_in_area(self, center: Tuple[float, float, float], 
-                              radius: float) -> List[GeneratedStructure]:
-        """Получение структур в заданной области"""
+    def export_structure(self, structure: GeneratedStructure) -> Dict[str, Any]:
+        """Сериализация структуры в словарь для постоянного хранилища"""
+        return {
+            "structure_id": structure.structure_id,
+            "template_id": structure.template.template_id,
+            "position": list(structure.position),
+            "rotation": structure.rotation,
+            "scale": structure.scale,
+            "level": structure.level,
+            "loot_containers": list(structure.loot_containers),
+            "active_enemies": list(structure.active_enemies),
+            "discovered": structure.discovered,
+            "explored": structure.explored,
+            "generation_time": structure.generation_time
+        }
+    
+    def restore_structures_for_chunk(self, chunk_x: int, chunk_y: int,
+                                     records: List[Dict[str, Any]]) -> List[GeneratedStructure]:
+        """Восстановление структур чанка из постоянного хранилища"""
         try:
             structures = []
             
-            for structure in self.generated_structures.values():
-                distance = math.sqrt(
-                    (center[0] - structure.position[0]) ** 2 +
-                    (center[1] - structure.position[1]) ** 2
+            for record in records:
+                template = self.structure_templates.get(record["template_id"])
+                if template is None:
+                    self._logger.warning(f"Неизвестный шаблон структуры: {record['template_id']}")
+                    continue
+                
+                structure = GeneratedStructure(
+                    structure_id=record["structure_id"],
+                    template=template,
+                    position=tuple(record["position"]),
+                    rotation=record.get("rotation", 0.0),
+                    scale=record.get("scale", 1.0),
+                    level=record.get("level", 1),
+                    loot_containers=list(record.get("loot_containers", [])),
+                    active_enemies=list(record.get("active_enemies", [])),
+                    discovered=record.get("discovered", False),
+                    explored=record.get("explored", False),
+                    generation_time=record.get("generation_time", time.time())
                 )
-                if distance <= radius:
-                    structures.append(structure)
+                structures.append(structure)
             
+            chunk_key = f"{chunk_x}_{chunk_y}"
+            self._unregister_chunk(chunk_key)
+            self._register_chunk(chunk_key, structures)
+            self.generation_cache[chunk_key] = structures
             return structures
             
+        except Exception as e:
+            self._logger.error(f"Ошибка восстановления структур чанка {chunk_x}, {chunk_y}: {e}")
+            return []
+    
+    def get_structures_in_area(self, center: Tuple[float, float, float], 
+                              radius: float) -> List[GeneratedStructure]:
+        """Получение структур в заданной области"""
+        try:
+            return self.spatial_index.query_radius(center[0], center[1], radius)
+            
         except Exception as e:
             self._logger.error(f"Ошибка получения структур в области: {e}")
             return []
     
+    def get_nearest_structures(self, center: Tuple[float, float, float], count: int = 1,
+                               max_distance: Optional[float] = None) -> List[GeneratedStructure]:
+        """Получение ближайших структур по возрастанию расстояния"""
+        try:
+            return [structure for _, structure in
+                    self.spatial_index.nearest(center[0], center[1], count, max_distance)]
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка поиска ближайших структур: {e}")
+            return []
+    
+    def get_structures_in_rect(self, min_corner: Tuple[float, float],
+                               max_corner: Tuple[float, float]) -> List[GeneratedStructure]:
+        """Получение структур в прямоугольной области"""
+        try:
+            return self.spatial_index.query_rect(min_corner[0], min_corner[1],
+                                                 max_corner[0], max_corner[1])
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка получения структур в прямоугольнике: {e}")
+            return []
+    
     def discover_structure(self, structure_id: str) -> bool:
         """Открытие структуры игроком"""
         try:
@@ -526,6 +635,8 @@ class StructureGenerator(BaseComponent):
                 "total_loot_containers": self.generation_stats["total_loot_containers"],
                 "generation_time": self.generation_stats["generation_time"],
                 "cache_size": len(self.generation_cache),
+                "cache_memory_mb": self.generation_cache.size_bytes / (1024 * 1024),
+                "cache_evictions": self.generation_cache.stats["evictions"],
                 "templates_count": len(self.structure_templates)
             }
             
@@ -545,11 +656,14 @@ class StructureGenerator(BaseComponent):
     def _on_destroy(self) -> bool:
         """Уничтожение генератора структур"""
         try:
-            # Очищаем кэш
-            self.clear_cache()
+            # Очищаем кэш и освобождаем бюджет памяти
+            self.generation_cache.close()
             
             # Очищаем структуры
             self.generated_structures.clear()
+            self.spatial_index.clear()
+            self.chunk_structures.clear()
+            self.retained_chunks.clear()
             
             # Сбрасываем статистику
             self.generation_stats = {
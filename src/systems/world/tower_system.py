@@ -9,8 +9,17 @@ import logging
 import random
 import time
 import math
+import zlib
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
+from src.systems.world.generation_cache import BoundedCache
+
+# Босс появляется после последнего этажа каждого BOSS_LEVEL_INTERVAL-го уровня
+BOSS_LEVEL_INTERVAL = 5
+
+def derive_floor_seed(tower_seed: int, floor_number: int) -> int:
+    """Сид этажа: зависит только от сида башни и номера этажа"""
+    return zlib.crc32(f"floor:{floor_number}".encode("utf-8"), tower_seed & 0xFFFFFFFF)
 
 # = ТИПЫ БАШЕН
 class TowerType(Enum):
@@ -111,11 +120,18 @@ class TowerLevel:
 
 @dataclass
 class GeneratedTower:
-    """Сгенерированная башня"""
+    """Сгенерированная башня
+
+    Хранит только заголовок: этажи выводятся из сида по требованию. В floors
+    лежат этажи с прогрессом игроков, нетронутые живут в кэше системы и
+    при нехватке памяти сбрасываются обратно к сиду."""
     tower_id: str
     tower_type: TowerType
     settings: TowerSettings
-    levels: List[TowerLevel]
+    seed: int = 0
+    level_count: int = 0
+    floors: Dict[int, TowerFloor] = field(default_factory=dict)
+    completed_levels: Set[int] = field(default_factory=set)
     current_floor: int = 1
     current_level: int = 1
     total_floors_completed: int = 0
@@ -123,6 +139,9 @@ class GeneratedTower:
     total_time: float = 0.0
     created_at: float = field(default_factory=time.time)
 
+    def floor_seed(self, floor_number: int) -> int:
+        return derive_floor_seed(self.seed, floor_number)
+
 @dataclass
 class TowerProgress:
     """Прогресс в башне"""
@@ -159,7 +178,8 @@ class TowerSystem(BaseComponent):
         self.tower_progress: Dict[str, TowerProgress] = {}
         
         # Кэши и статистика
-        self.tower_cache: Dict[str, Any] = {}
+        self.tower_cache = BoundedCache("tower.generated", max_entries=128)
+        self.floor_cache = BoundedCache("tower.floors", max_entries=4096)  # (tower_id, этаж) -> TowerFloor
         self.generation_stats = {
             "towers_created": 0,
             "floors_generated": 0,
@@ -354,8 +374,6 @@ class TowerSystem(BaseComponent):
         if world_seed is None:
             world_seed = int(time.time())
         
-        random.seed(world_seed)
-        
         # Получение настроек башни
         settings = self.tower_templates.get(tower_type)
         if not settings:
@@ -364,58 +382,13 @@ class TowerSystem(BaseComponent):
         # Создание ID башни
         tower_id = f"tower_{tower_type.value}_{world_seed}"
         
-        # Генерация уровней и этажей
-        levels = []
-        floor_number = 1
-        
-        for level_num in range(1, (settings.max_floors // settings.floors_per_level) + 1):
-            level_floors = []
-            
-            # Генерация обычных этажей
-            for floor_in_level in range(settings.floors_per_level):
-                if floor_number > settings.max_floors:
-                    break
-                
-                challenge = self._generate_challenge_for_floor(floor_number, settings)
-                rewards = self._generate_rewards_for_floor(floor_number, settings)
-                
-                floor = TowerFloor(
-                    floor_number=floor_number,
-                    challenge=challenge,
-                    rewards=rewards,
-                    unlocked=(floor_number == 1)
-                )
-                
-                level_floors.append(floor)
-                floor_number += 1
-            
-            # Создание уровня
-            level = TowerLevel(
-                level_number=level_num,
-                floors=level_floors
-            )
-            
-            # Добавление босса на последний этаж уровня
-            if level_floors and level_num % 5 == 0:  # Каждый 5-й уровень
-                boss_challenge = self._generate_boss_challenge(level_num, settings)
-                boss_rewards = self._generate_boss_rewards(level_num, settings)
-                
-                level.boss_floor = TowerFloor(
-                    floor_number=floor_number,
-                    challenge=boss_challenge,
-                    rewards=boss_rewards,
-                    unlocked=False
-                )
-                floor_number += 1
-            
-            levels.append(level)
-        
-        # Создание башни
+        # Создается только заголовок: этажи появятся при первом обращении
         tower = GeneratedTower(
             tower_id=tower_id,
             tower_type=tower_type,
             settings=settings,
-            levels=levels
+            seed=world_seed,
+            level_count=settings.max_floors // settings.floors_per_level
         )
         
         self.generated_towers[tower_id] = tower
@@ -423,22 +396,104 @@ class TowerSystem(BaseComponent):
         # Обновление статистики
         generation_time = time.time() - start_time
         self.generation_stats["towers_created"] += 1
-        self.generation_stats["floors_generated"] += sum(len(level.floors) for level in levels)
         self.generation_stats["total_generation_time"] += generation_time
         
-        self.logger.info(f"Создана башня {tower_id}: {len(levels)} уровней, {sum(len(level.floors) for level in levels)} этажей")
+        self.logger.info(f"Создана башня {tower_id}: {tower.level_count} уровней, до {settings.max_floors} этажей")
         
         return tower
     
-    def _generate_challenge_for_floor(self, floor_number: int, settings: TowerSettings) -> ChallengeSettings:
+    # Раскладка этажей
+    def _level_layout(self, settings: TowerSettings, level_number: int) -> Tuple[int, int]:
+        """(первый этаж, число обычных этажей) уровня
+        
+        Этажи нумеруются подряд, босс занимает номер после последнего этажа
+        своего уровня; обычные этажи не выходят за max_floors."""
+        per_level = settings.floors_per_level
+        first = 1 + (level_number - 1) * per_level + (level_number - 1) // BOSS_LEVEL_INTERVAL
+        count = max(0, min(per_level, settings.max_floors - first + 1))
+        return first, count
+    
+    def _level_has_boss(self, settings: TowerSettings, level_number: int) -> bool:
+        return level_number % BOSS_LEVEL_INTERVAL == 0 and self._level_layout(settings, level_number)[1] > 0
+    
+    def _locate_floor(self, tower: GeneratedTower, floor_number: int) -> Optional[Tuple[int, bool]]:
+        """(номер уровня, этаж босса) для номера этажа за O(1) или None"""
+        if floor_number < 1:
+            return None
+        
+        # Группа из BOSS_LEVEL_INTERVAL уровней занимает их этажи и один этаж босса
+        per_level = tower.settings.floors_per_level
+        group_size = BOSS_LEVEL_INTERVAL * per_level + 1
+        group, offset = divmod(floor_number - 1, group_size)
+        if offset == group_size - 1:
+            level_number, index = (group + 1) * BOSS_LEVEL_INTERVAL, per_level
+        else:
+            level_number = group * BOSS_LEVEL_INTERVAL + offset // per_level + 1
+            index = offset % per_level
+        
+        if level_number > tower.level_count:
+            return None
+        
+        _, count = self._level_layout(tower.settings, level_number)
+        if index < count:
+            return level_number, False
+        # Босс неполного уровня стоит сразу за его последним этажом
+        if index == count and self._level_has_boss(tower.settings, level_number):
+            return level_number, True
+        return None
+    
+    def _level_floor_numbers(self, tower: GeneratedTower, level_number: int) -> Tuple[range, Optional[int]]:
+        """Номера обычных этажей уровня и номер этажа босса"""
+        first, count = self._level_layout(tower.settings, level_number)
+        boss_floor = first + count if self._level_has_boss(tower.settings, level_number) else None
+        return range(first, first + count), boss_floor
+    
+    def _regular_floor_numbers(self, tower: GeneratedTower) -> List[int]:
+        """Номера всех обычных этажей башни без их генерации"""
+        numbers = []
+        for level_number in range(1, tower.level_count + 1):
+            numbers.extend(self._level_floor_numbers(tower, level_number)[0])
+        return numbers
+    
+    def _generate_floor(self, tower: GeneratedTower, floor_number: int) -> Optional[TowerFloor]:
+        """Генерация этажа из сида башни; один и тот же этаж всегда одинаков"""
+        location = self._locate_floor(tower, floor_number)
+        if location is None:
+            return None
+        
+        level_number, is_boss = location
+        rng = random.Random(tower.floor_seed(floor_number))
+        
+        if is_boss:
+            challenge = self._generate_boss_challenge(level_number, tower.settings)
+            rewards = self._generate_boss_rewards(level_number, tower.settings)
+        else:
+            challenge = self._generate_challenge_for_floor(floor_number, tower.settings, rng)
+            rewards = self._generate_rewards_for_floor(floor_number, tower.settings, rng)
+        
+        self.generation_stats["floors_generated"] += 1
+        self.generation_stats["challenges_created"] += 1
+        self.generation_stats["rewards_generated"] += len(rewards)
+        
+        return TowerFloor(
+            floor_number=floor_number,
+            challenge=challenge,
+            rewards=rewards,
+            unlocked=(floor_number == 1)
+        )
+    
+    def _generate_challenge_for_floor(self, floor_number: int, settings: TowerSettings,
+                                      rng: Optional[random.Random] = None) -> ChallengeSettings:
         """Генерация испытания для этажа"""
+        rng = rng or random
+        
         # Выбор типа испытания
         challenge_types = list(ChallengeType)
-        challenge_type = random.choice(challenge_types)
+        challenge_type = rng.choice(challenge_types)
         
         # Расчет сложности
         base_difficulty = max(1, floor_number // 10)
-        difficulty_variation = random.randint(-2, 2)
+        difficulty_variation = rng.randint(-2, 2)
         difficulty = max(1, min(10, base_difficulty + difficulty_variation))
         
         # Получение базовых настроек
@@ -488,8 +543,10 @@ class TowerSystem(BaseComponent):
         
         return boss_challenge
     
-    def _generate_rewards_for_floor(self, floor_number: int, settings: TowerSettings) -> List[RewardSettings]:
+    def _generate_rewards_for_floor(self, floor_number: int, settings: TowerSettings,
+                                    rng: Optional[random.Random] = None) -> List[RewardSettings]:
         """Генерация наград для этажа"""
+        rng = rng or random
         rewards = []
         
         # Базовые награды
@@ -514,9 +571,9 @@ class TowerSystem(BaseComponent):
             rewards.append(reward)
         
         # Случайные дополнительные награды
-        if random.random() < 0.3:  # 30% шанс
+        if rng.random() < 0.3:  # 30% шанс
             special_rewards = [rt for rt in RewardType if rt not in base_rewards]
-            special_reward_type = random.choice(special_rewards)
+            special_reward_type = rng.choice(special_rewards)
             
             template = self.reward_templates[special_reward_type]
             amount = max(1, int(template.base_amount * (template.scaling_factor ** (floor_number // 20))))
@@ -640,6 +697,7 @@ class TowerSystem(BaseComponent):
             progress.completion_times[floor_number] = completion_time
         
         # Отметка этажа как завершенного
+        self._pin_floor(tower, floor)
         floor.completed = True
         floor.best_score = max(floor.best_score, score)
         floor.completion_time = min(floor.completion_time, completion_time) if floor.completion_time > 0 else completion_time
@@ -648,6 +706,7 @@ class TowerSystem(BaseComponent):
         # Разблокировка следующего этажа
         next_floor = self._get_floor(tower, floor_number + 1)
         if next_floor:
+            self._pin_floor(tower, next_floor)
             next_floor.unlocked = True
         
         # Проверка завершения уровня
@@ -661,39 +720,62 @@ class TowerSystem(BaseComponent):
         return True
     
     def _get_floor(self, tower: GeneratedTower, floor_number: int) -> Optional[TowerFloor]:
-        """Получение этажа по номеру"""
-        for level in tower.levels:
-            for floor in level.floors:
-                if floor.floor_number == floor_number:
-                    return floor
-            
-            if level.boss_floor and level.boss_floor.floor_number == floor_number:
-                return level.boss_floor
-        
-        return None
+        """Получение этажа по номеру: с прогрессом, из кэша или генерацией из сида"""
+        floor = tower.floors.get(floor_number)
+        if floor is not None:
+            return floor
+        
+        key = (tower.tower_id, floor_number)
+        floor = self.floor_cache.get(key)
+        if floor is None:
+            floor = self._generate_floor(tower, floor_number)
+            if floor is not None:
+                self.floor_cache.put(key, floor)
+        
+        return floor
+    
+    def _pin_floor(self, tower: GeneratedTower, floor: TowerFloor):
+        """Перенос этажа в башню перед изменением: этаж с прогрессом не вытесняется"""
+        if tower.floors.get(floor.floor_number) is not floor:
+            tower.floors[floor.floor_number] = floor
+            self.floor_cache.pop((tower.tower_id, floor.floor_number))
+    
+    def get_level(self, tower_id: str, level_number: int) -> Optional[TowerLevel]:
+        """Уровень башни целиком; его этажи генерируются при первом обращении"""
+        tower = self.generated_towers.get(tower_id)
+        if tower is None or not 1 <= level_number <= tower.level_count:
+            return None
+        
+        floor_numbers, boss_number = self._level_floor_numbers(tower, level_number)
+        return TowerLevel(
+            level_number=level_number,
+            floors=[self._get_floor(tower, number) for number in floor_numbers],
+            completed=level_number in tower.completed_levels,
+            boss_floor=self._get_floor(tower, boss_number) if boss_number is not None else None
+        )
     
     def _check_level_completion(self, tower: GeneratedTower, progress: TowerProgress):
         """Проверка завершения уровня"""
         current_level = progress.current_level
         
-        if current_level > len(tower.levels):
+        if current_level > tower.level_count:
             return
         
-        level = tower.levels[current_level - 1]
+        floor_numbers, boss_number = self._level_floor_numbers(tower, current_level)
         
         # Проверка завершения всех этажей уровня
         all_floors_completed = all(
-            floor.floor_number in progress.completed_floors 
-            for floor in level.floors
+            number in progress.completed_floors 
+            for number in floor_numbers
         )
         
         # Проверка завершения босса
         boss_completed = True
-        if level.boss_floor:
-            boss_completed = level.boss_floor.floor_number in progress.completed_floors
+        if boss_number is not None:
+            boss_completed = boss_number in progress.completed_floors
         
         if all_floors_completed and boss_completed:
-            level.completed = True
+            tower.completed_levels.add(current_level)
             progress.current_level += 1
             
             # Уведомление о завершении уровня
@@ -729,30 +811,37 @@ class TowerSystem(BaseComponent):
         tower = self.generated_towers[tower_id]
         
         # Подсчет статистики по прогрессу
-        total_players = len([p for p in self.tower_progress.values() if p.tower_id == tower_id])
-        completed_players = len([p for p in self.tower_progress.values() 
-                               if p.tower_id == tower_id and p.completed_floors])
-        
-        # Статистика по этажам
+        tower_progress = [p for p in self.tower_progress.values() if p.tower_id == tower_id]
+        total_players = len(tower_progress)
+        completed_players = len([p for p in tower_progress if p.completed_floors])
+        
+        # Завершения и очки по этажам за один проход по прогрессу
+        completed_counts: Dict[int, int] = {}
+        score_sums: Dict[int, int] = {}
+        for p in tower_progress:
+            for number in p.completed_floors:
+                completed_counts[number] = completed_counts.get(number, 0) + 1
+            for number, score in p.best_scores.items():
+                score_sums[number] = score_sums.get(number, 0) + score
+        
+        # Статистика по этажам: нужны только номера, сами этажи не генерируются
+        floor_numbers = self._regular_floor_numbers(tower)
         floor_stats = {}
-        for level in tower.levels:
-            for floor in level.floors:
-                completed_count = len([p for p in self.tower_progress.values() 
-                                     if p.tower_id == tower_id and floor.floor_number in p.completed_floors])
-                
-                floor_stats[floor.floor_number] = {
-                    "completed_count": completed_count,
-                    "completion_rate": completed_count / total_players if total_players > 0 else 0,
-                    "average_score": sum(p.best_scores.get(floor.floor_number, 0) 
-                                       for p in self.tower_progress.values() 
-                                       if p.tower_id == tower_id) / completed_count if completed_count > 0 else 0
-                }
+        for number in floor_numbers:
+            completed_count = completed_counts.get(number, 0)
+            
+            floor_stats[number] = {
+                "completed_count": completed_count,
+                "completion_rate": completed_count / total_players if total_players > 0 else 0,
+                "average_score": score_sums.get(number, 0) / completed_count if completed_count > 0 else 0
+            }
         
         return {
             "tower_id": tower_id,
             "tower_type": tower.tower_type.value,
-            "total_floors": sum(len(level.floors) for level in tower.levels),
-            "total_levels": len(tower.levels),
+            "total_floors": len(floor_numbers),
+            "total_levels": tower.level_count,
+            "materialized_floors": len(tower.floors) + sum(1 for key in self.floor_cache.keys() if key[0] == tower_id),
             "total_players": total_players,
             "completed_players": completed_players,
             "completion_rate": completed_players / total_players if total_players > 0 else 0,
@@ -791,18 +880,26 @@ class TowerSystem(BaseComponent):
     
     def get_generation_stats(self) -> Dict[str, Any]:
         """Получение статистики генерации"""
-        return self.generation_stats.copy()
+        return {
+            **self.generation_stats,
+            "cached_floors": len(self.floor_cache),
+            "pinned_floors": sum(len(tower.floors) for tower in self.generated_towers.values()),
+            "floor_cache_memory_mb": self.floor_cache.size_bytes / (1024 * 1024),
+            "floor_cache_evictions": self.floor_cache.stats["evictions"]
+        }
     
     def clear_cache(self):
         """Очистка кэша"""
         self.tower_cache.clear()
+        self.floor_cache.clear()
         self.logger.info("Кэш TowerSystem очищен")
     
     def _on_destroy(self):
         """Уничтожение системы башен"""
         self.generated_towers.clear()
         self.tower_progress.clear()
-        self.tower_cache.clear()
+        self.tower_cache.close()
+        self.floor_cache.close()
         self.floor_completed_callbacks.clear()
         self.level_completed_callbacks.clear()
         self.tower_completed_callbacks.clear()
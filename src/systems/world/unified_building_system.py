@@ -310,6 +310,7 @@ class UnifiedBuildingSystem(BaseComponent):
             self.buildings[building_id] = building
             self.stats['total_buildings'] += 1
             self.stats['construction_projects'] += 1
+            self._block_navigation(building_id, position, template.size)
             
             logger.info(f"Здание {building_id} создано")
             return building_id
@@ -335,6 +336,7 @@ class UnifiedBuildingSystem(BaseComponent):
             
             self.structures[structure_id] = structure
             self.stats['total_structures'] += 1
+            self._block_navigation(structure_id, position, size)
             
             logger.info(f"Структура {structure_id} создана")
             return structure_id
@@ -343,6 +345,67 @@ class UnifiedBuildingSystem(BaseComponent):
             logger.error(f"Ошибка создания структуры: {e}")
             return None
     
+    def remove_building(self, building_id: str) -> bool:
+        """Удаление здания с освобождением его площади в навигации"""
+        try:
+            if self.buildings.pop(building_id, None) is None:
+                return False
+            
+            self._unblock_navigation(building_id)
+            self._update_stats()
+            logger.info(f"Здание {building_id} удалено")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Ошибка удаления здания {building_id}: {e}")
+            return False
+    
+    def remove_structure(self, structure_id: str) -> bool:
+        """Удаление структуры с освобождением ее площади в навигации"""
+        try:
+            if self.structures.pop(structure_id, None) is None:
+                return False
+            
+            self._unblock_navigation(structure_id)
+            self._update_stats()
+            logger.info(f"Структура {structure_id} удалена")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Ошибка удаления структуры {structure_id}: {e}")
+            return False
+    
+    def _block_navigation(self, obstacle_id: str, position: Tuple[float, float, float],
+                          size: Tuple[float, float, float]):
+        """Площадь здания как препятствие графа навигации мира
+        
+        Препятствие хранится в графе и накладывается заново при повторной
+        загрузке чанка; перестраиваются только графы затронутых чанков."""
+        try:
+            navigation_graph = getattr(self.world_manager, "navigation_graph", None)
+            if navigation_graph is None:
+                return
+            
+            half_width, half_depth = size[0] / 2, size[2] / 2
+            navigation_graph.add_obstacle(obstacle_id,
+                                          position[0] - half_width, position[1] - half_depth,
+                                          position[0] + half_width, position[1] + half_depth)
+        
+        except Exception as e:
+            logger.error(f"Ошибка обновления проходимости: {e}")
+    
+    def _unblock_navigation(self, obstacle_id: str):
+        """Снятие препятствия здания из графа навигации мира"""
+        try:
+            navigation_graph = getattr(self.world_manager, "navigation_graph", None)
+            if navigation_graph is None:
+                return
+            
+            navigation_graph.remove_obstacle(obstacle_id)
+        
+        except Exception as e:
+            logger.error(f"Ошибка обновления проходимости: {e}")
+    
     def create_settlement(self, name: str, position: Tuple[float, float], size: float) -> Optional[str]:
         """Создание поселения"""
         try:
@@ -1,18 +1,24 @@
 #!/usr/bin/env python3
 """Система погоды для игрового мира
-Включает динамическую погоду, осадки, ветер и влияние на геймплей"""
+Включает динамическую погоду, осадки, ветер и влияние на геймплей.
+Состояние зон хранится столбцами NumPy и обновляется одним векторным шагом,
+прогнозы зон кэшируются и продлеваются по мере хода времени"""
 
-from dataclasses import dataclass, field
+from dataclasses import astuple, dataclass, field, replace
 from enum import Enum
 from typing import Dict, List, Optional, Any, Tuple
 import logging
 import random
 import time
 import math
+import zlib
+
+import numpy as np
 
 from src.core.architecture import BaseComponent, ComponentType, Priority, LifecycleState
 from src.core.constants import WeatherType
 from src.core.state_manager import StateManager, StateType
+from src.systems.world.spatial_index import SpatialGridIndex
 
 # = ДОПОЛНИТЕЛЬНЫЕ ТИПЫ ПОГОДЫ
 
@@ -40,6 +46,9 @@ class WindDirection(Enum):
     WEST = "west"             # Запад
     NORTHWEST = "northwest"   # Северо-запад
 
+# Длительность шага прогноза погоды (секунды)
+FORECAST_STEP = 3600.0
+
 # = НАСТРОЙКИ ПОГОДЫ
 @dataclass
 class WeatherSettings:
@@ -52,6 +61,7 @@ class WeatherSettings:
     wind_max_speed: float = 30.0
     precipitation_chance: float = 0.3
     weather_change_rate: float = 0.1
+    zone_index_cell_size: float = 256.0
     season_influence: bool = True
     biome_influence: bool = True
 
@@ -73,17 +83,33 @@ class WeatherCondition:
 
 @dataclass
 class WeatherZone:
-    """Погодная зона"""
+    """Погодная зона
+    
+    Текущая погода живет в строке WeatherZoneTable; current_weather
+    собирает WeatherCondition из столбцов при обращении."""
     zone_id: str
     center_x: float
     center_y: float
     radius: float
-    current_weather: WeatherCondition
     weather_history: List[WeatherCondition]
     biome_type: str
     season: str
     created_at: float = field(default_factory=time.time)
-    last_update: float = field(default_factory=time.time)
+    table: Optional["WeatherZoneTable"] = field(default=None, repr=False, compare=False)
+    
+    @property
+    def current_weather(self) -> Optional[WeatherCondition]:
+        if self.table is None:
+            return None
+        return self.table.read(self.zone_id)
+    
+    @current_weather.setter
+    def current_weather(self, weather: WeatherCondition):
+        self.table.write(self.zone_id, weather)
+    
+    @property
+    def last_update(self) -> float:
+        return self.table.updated_at if self.table is not None else self.created_at
 
 @dataclass
 class WeatherEffect:
@@ -95,11 +121,132 @@ class WeatherEffect:
     description: str
     modifiers: Dict[str, float] = field(default_factory=dict)
 
+@dataclass
+class ZoneForecast:
+    """Кэшированный прогноз зоны: conditions[i] - погода на час start_hour + i
+
+    rng - собственный генератор прогноза: досчет продолжает его, не трогая
+    генераторы живой погоды."""
+    zone_id: str
+    start_hour: int
+    modifiers_key: Tuple[Any, ...]
+    rng: random.Random
+    conditions: List[WeatherCondition] = field(default_factory=list)
+
+# = ТАБЛИЦА ПОГОДНЫХ ЗОН
+WEATHER_TYPES: Tuple[WeatherType, ...] = tuple(WeatherType)
+WIND_DIRECTIONS: Tuple[WindDirection, ...] = tuple(WindDirection)
+PRECIPITATION_TYPES: Tuple[PrecipitationType, ...] = tuple(PrecipitationType)
+
+WEATHER_TYPE_CODES = {weather_type: code for code, weather_type in enumerate(WEATHER_TYPES)}
+WIND_DIRECTION_CODES = {direction: code for code, direction in enumerate(WIND_DIRECTIONS)}
+PRECIPITATION_TYPE_CODES = {precipitation: code for code, precipitation in enumerate(PRECIPITATION_TYPES)}
+
+class WeatherZoneTable:
+    """Погода всех зон в виде структуры массивов
+    
+    Каждый параметр WeatherCondition - столбец NumPy, строка - зона.
+    Перечисления хранятся кодами. Удаление переносит последнюю строку
+    на место удаленной, поэтому живые строки всегда занимают [0, size)
+    и шаг симуляции выполняется срезами без циклов по зонам."""
+    
+    FLOAT_COLUMNS = ("temperature", "humidity", "wind_speed", "precipitation_intensity",
+                     "visibility", "pressure", "duration", "intensity")
+    CODE_COLUMNS = ("weather_type", "wind_direction", "precipitation_type")
+    
+    def __init__(self, capacity: int = 64):
+        capacity = max(int(capacity), 1)
+        self._columns: Dict[str, np.ndarray] = {}
+        for name in self.FLOAT_COLUMNS:
+            self._columns[name] = np.zeros(capacity, dtype=np.float64)
+        for name in self.CODE_COLUMNS:
+            self._columns[name] = np.zeros(capacity, dtype=np.int16)
+        self.zone_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.updated_at = time.time()
+    
+    def __len__(self) -> int:
+        return len(self.zone_ids)
+    
+    def __contains__(self, zone_id: str) -> bool:
+        return zone_id in self._rows
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Столбец живых строк (представление, изменяемое на месте)"""
+        return self._columns[name][:len(self.zone_ids)]
+    
+    def row_of(self, zone_id: str) -> Optional[int]:
+        return self._rows.get(zone_id)
+    
+    def _grow(self):
+        for name, column in self._columns.items():
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:len(column)] = column
+            self._columns[name] = grown
+    
+    # Изменение
+    def add(self, zone_id: str, weather: WeatherCondition) -> int:
+        """Добавление зоны (повторное добавление перезаписывает строку)"""
+        row = self._rows.get(zone_id)
+        if row is None:
+            row = len(self.zone_ids)
+            if row == len(self._columns["temperature"]):
+                self._grow()
+            self.zone_ids.append(zone_id)
+            self._rows[zone_id] = row
+        self.write_row(row, weather)
+        return row
+    
+    def remove(self, zone_id: str) -> bool:
+        """Удаление зоны с переносом последней строки на ее место"""
+        row = self._rows.pop(zone_id, None)
+        if row is None:
+            return False
+        last = len(self.zone_ids) - 1
+        if row != last:
+            for column in self._columns.values():
+                column[row] = column[last]
+            moved_id = self.zone_ids[last]
+            self.zone_ids[row] = moved_id
+            self._rows[moved_id] = row
+        self.zone_ids.pop()
+        return True
+    
+    def clear(self):
+        self.zone_ids.clear()
+        self._rows.clear()
+    
+    def write(self, zone_id: str, weather: WeatherCondition):
+        self.write_row(self._rows[zone_id], weather)
+    
+    def write_row(self, row: int, weather: WeatherCondition):
+        columns = self._columns
+        for name in self.FLOAT_COLUMNS:
+            columns[name][row] = getattr(weather, name)
+        columns["weather_type"][row] = WEATHER_TYPE_CODES[weather.weather_type]
+        columns["wind_direction"][row] = WIND_DIRECTION_CODES[weather.wind_direction]
+        columns["precipitation_type"][row] = PRECIPITATION_TYPE_CODES[weather.precipitation_type]
+    
+    # Чтение
+    def read(self, zone_id: str) -> Optional[WeatherCondition]:
+        row = self._rows.get(zone_id)
+        return self.read_row(row) if row is not None else None
+    
+    def read_row(self, row: int) -> WeatherCondition:
+        """Сборка WeatherCondition из строки таблицы"""
+        columns = self._columns
+        return WeatherCondition(
+            weather_type=WEATHER_TYPES[columns["weather_type"][row]],
+            wind_direction=WIND_DIRECTIONS[columns["wind_direction"][row]],
+            precipitation_type=PRECIPITATION_TYPES[columns["precipitation_type"][row]],
+            **{name: float(columns[name][row]) for name in self.FLOAT_COLUMNS}
+        )
+
 # = СИСТЕМА ПОГОДЫ
 class WeatherSystem(BaseComponent):
     """Система погоды"""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         super().__init__(
             component_id="WeatherSystem",
             component_type=ComponentType.SYSTEM,
@@ -111,11 +258,26 @@ class WeatherSystem(BaseComponent):
         self.weather_zones: Dict[str, WeatherZone] = {}
         self.global_weather: Optional[WeatherCondition] = None
         
+        # Столбцы состояния зон и индекс их центров
+        self.zone_table = WeatherZoneTable()
+        self.zone_index = SpatialGridIndex(self.settings.zone_index_cell_size)
+        self._zone_sequence = 0
+        self._max_zone_radius = 0.0
+        
+        # Собственные генераторы: погода и прогнозы воспроизводимы по seed
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._rng = np.random.default_rng(seed)
+        
         # Шаблоны погоды
         self.weather_templates: Dict[WeatherType, Dict[str, Any]] = {}
         self.biome_weather_modifiers: Dict[str, Dict[str, float]] = {}
         self.season_weather_modifiers: Dict[str, Dict[str, float]] = {}
         
+        # Игровое время симуляции и прогнозы зон, привязанные к его часам
+        self.simulated_time = 0.0
+        self.forecast_cache: Dict[str, ZoneForecast] = {}
+        
         # Эффекты погоды
         self.active_effects: Dict[str, WeatherEffect] = {}
         self.weather_effects: Dict[WeatherType, List[WeatherEffect]] = {}
@@ -126,6 +288,9 @@ class WeatherSystem(BaseComponent):
             "zones_created": 0,
             "weather_changes": 0,
             "effects_applied": 0,
+            "forecast_requests": 0,
+            "forecast_hours_computed": 0,
+            "forecast_invalidations": 0,
             "total_update_time": 0.0
         }
         
@@ -153,6 +318,18 @@ class WeatherSystem(BaseComponent):
             self.logger.error(f"Ошибка инициализации WeatherSystem: {e}")
             return False
     
+    def set_seed(self, seed: int):
+        """Пересоздание генераторов погоды от seed (обычно seed мира)
+        
+        Глобальная погода, созданная при инициализации, генерируется заново,
+        чтобы и она зависела только от seed."""
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._rng = np.random.default_rng(seed)
+        self.invalidate_forecast()
+        if self.global_weather is not None:
+            self.global_weather = self._create_base_weather()
+    
     def _initialize_weather_templates(self):
         """Инициализация шаблонов погоды"""
         self.weather_templates = {
@@ -379,73 +556,100 @@ class WeatherSystem(BaseComponent):
         modified_weather = self._apply_season_modifiers(modified_weather, season)
         
         # Создание зоны
+        if zone_id in self.weather_zones:
+            self.remove_weather_zone(zone_id)
+        
         weather_zone = WeatherZone(
             zone_id=zone_id,
             center_x=center_x,
             center_y=center_y,
             radius=radius,
-            current_weather=modified_weather,
             weather_history=[modified_weather],
             biome_type=biome_type,
-            season=season
+            season=season,
+            table=self.zone_table
         )
         
+        self.zone_table.add(zone_id, modified_weather)
         self.weather_zones[zone_id] = weather_zone
+        
+        # Порядковый номер сохраняет приоритет ранее созданных зон при перекрытии
+        self._zone_sequence += 1
+        self.zone_index.insert(zone_id, center_x, center_y, (self._zone_sequence, weather_zone))
+        self._max_zone_radius = max(self._max_zone_radius, float(radius))
         self.weather_stats["zones_created"] += 1
         
         self.logger.info(f"Создана погодная зона {zone_id}: {biome_type}, {season}")
         
         return weather_zone
     
-    def _create_base_weather(self) -> WeatherCondition:
-        """Создание базовой погоды"""
+    def remove_weather_zone(self, zone_id: str) -> bool:
+        """Удаление погодной зоны"""
+        zone = self.weather_zones.pop(zone_id, None)
+        if zone is None:
+            return False
+        
+        self.forecast_cache.pop(zone_id, None)
+        
+        # Отвязанная зона сохраняет последнюю погоду для тех, кто держит ссылку
+        last_weather = zone.current_weather
+        self.zone_table.remove(zone_id)
+        self.zone_index.remove(zone_id)
+        zone.table = WeatherZoneTable(capacity=1)
+        zone.table.add(zone_id, last_weather)
+        return True
+    
+    def _create_base_weather(self, rng: Optional[random.Random] = None) -> WeatherCondition:
+        """Создание базовой погоды (по умолчанию из генератора живой погоды)"""
+        rng = rng or self._random
+        
         # Выбор типа погоды
-        weather_type = random.choice(list(WeatherType))
+        weather_type = rng.choice(list(WeatherType))
         
         # Базовые параметры
-        temperature = self.settings.base_temperature + random.uniform(
+        temperature = self.settings.base_temperature + rng.uniform(
             -self.settings.temperature_variation, 
             self.settings.temperature_variation
         )
         
-        humidity = self.settings.humidity_base + random.uniform(
+        humidity = self.settings.humidity_base + rng.uniform(
             -self.settings.humidity_variation, 
             self.settings.humidity_variation
         )
         humidity = max(0.0, min(1.0, humidity))
         
-        wind_speed = random.uniform(0.0, self.settings.wind_max_speed)
-        wind_direction = random.choice(list(WindDirection))
+        wind_speed = rng.uniform(0.0, self.settings.wind_max_speed)
+        wind_direction = rng.choice(list(WindDirection))
         
         # Определение типа осадков
         precipitation_type = PrecipitationType.NONE
         precipitation_intensity = 0.0
         
-        if random.random() < self.settings.precipitation_chance:
+        if rng.random() < self.settings.precipitation_chance:
             if temperature > 5.0:
-                precipitation_type = random.choice([
+                precipitation_type = rng.choice([
                     PrecipitationType.LIGHT_RAIN,
                     PrecipitationType.HEAVY_RAIN,
                     PrecipitationType.DRIZZLE
                 ])
             else:
-                precipitation_type = random.choice([
+                precipitation_type = rng.choice([
                     PrecipitationType.LIGHT_SNOW,
                     PrecipitationType.HEAVY_SNOW,
                     PrecipitationType.SLEET
                 ])
             
-            precipitation_intensity = random.uniform(0.1, 1.0)
+            precipitation_intensity = rng.uniform(0.1, 1.0)
         
         # Видимость
         visibility = 1.0
         if weather_type in [WeatherType.FOG, WeatherType.STORM, WeatherType.EXTREME]:
-            visibility = random.uniform(0.1, 0.5)
+            visibility = rng.uniform(0.1, 0.5)
         elif weather_type in [WeatherType.RAIN, WeatherType.SNOW]:
-            visibility = random.uniform(0.5, 0.8)
+            visibility = rng.uniform(0.5, 0.8)
         
         # Давление
-        pressure = random.uniform(980.0, 1020.0)
+        pressure = rng.uniform(980.0, 1020.0)
         
         return WeatherCondition(
             weather_type=weather_type,
@@ -508,7 +712,8 @@ class WeatherSystem(BaseComponent):
     def update_weather(self, delta_time: float):
         """Обновление погоды"""
         start_time = time.time()
-        
+        self.simulated_time += delta_time
+
         # Обновление глобальной погоды
         if self.global_weather:
             self.global_weather = self._update_weather_condition(
@@ -516,45 +721,74 @@ class WeatherSystem(BaseComponent):
             )
         
         # Обновление погодных зон
-        for zone_id, zone in self.weather_zones.items():
-            old_weather = zone.current_weather
-            zone.current_weather = self._update_weather_condition(
-                zone.current_weather, delta_time
-            )
-            
-            # Проверка изменения погоды
-            if zone.current_weather.weather_type != old_weather.weather_type:
-                zone.weather_history.append(zone.current_weather)
-                self.weather_stats["weather_changes"] += 1
-                
-                # Уведомление об изменении погоды
-                self._notify_weather_changed(zone_id, old_weather, zone.current_weather)
-                
-                # Применение эффектов новой погоды
-                self._apply_weather_effects(zone_id, zone.current_weather)
-            
-            zone.last_update = time.time()
-        
+        self._advance_zones(delta_time)
+
         # Обновление статистики
         update_time = time.time() - start_time
         self.weather_stats["total_update_time"] += update_time
     
-    def _update_weather_condition(self, weather: WeatherCondition, delta_time: float) -> WeatherCondition:
+    def _advance_zones(self, delta_time: float):
+        """Векторный шаг погоды всех зон
+        
+        Дрейф параметров считается по столбцам сразу для всех строк.
+        Поштучно обрабатываются только зоны, у которых сработала смена
+        погоды, а события уходят лишь при реальной смене weather_type."""
+        table = self.zone_table
+        count = len(table)
+        if count == 0:
+            return
+        
+        rng = self._rng
+        changing = np.flatnonzero(rng.random(count) < self.settings.weather_change_rate * delta_time)
+        previous = [table.read_row(row) for row in changing.tolist()]
+        
+        temperature = table["temperature"]
+        humidity = table["humidity"]
+        wind_speed = table["wind_speed"]
+        
+        temperature += rng.uniform(-0.1, 0.1, count) * delta_time
+        humidity += rng.uniform(-0.05, 0.05, count) * delta_time
+        np.clip(humidity, 0.0, 1.0, out=humidity)
+        wind_speed += rng.uniform(-0.5, 0.5, count) * delta_time
+        np.maximum(wind_speed, 0.0, out=wind_speed)
+        table["duration"][:] += delta_time
+        table.updated_at = time.time()
+        
+        for row, old_weather in zip(changing.tolist(), previous):
+            new_weather = self._create_base_weather()
+            table.write_row(row, new_weather)
+            if new_weather.weather_type == old_weather.weather_type:
+                continue
+            
+            zone_id = table.zone_ids[row]
+            self.weather_zones[zone_id].weather_history.append(new_weather)
+            self.weather_stats["weather_changes"] += 1
+            
+            # Уведомление об изменении погоды
+            self._notify_weather_changed(zone_id, old_weather, new_weather)
+            
+            # Применение эффектов новой погоды
+            self._apply_weather_effects(zone_id, new_weather)
+    
+    def _update_weather_condition(self, weather: WeatherCondition, delta_time: float,
+                                  rng: Optional[random.Random] = None) -> WeatherCondition:
         """Обновление погодного условия"""
+        rng = rng or self._random
+        
         # Увеличение длительности
         new_duration = weather.duration + delta_time
         
         # Проверка необходимости смены погоды
-        if random.random() < self.settings.weather_change_rate * delta_time:
+        if rng.random() < self.settings.weather_change_rate * delta_time:
             # Создание новой погоды
-            new_weather = self._create_base_weather()
+            new_weather = self._create_base_weather(rng)
             new_weather.duration = 0.0
             return new_weather
         
         # Плавное изменение параметров
-        temperature_change = random.uniform(-0.1, 0.1) * delta_time
-        humidity_change = random.uniform(-0.05, 0.05) * delta_time
-        wind_change = random.uniform(-0.5, 0.5) * delta_time
+        temperature_change = rng.uniform(-0.1, 0.1) * delta_time
+        humidity_change = rng.uniform(-0.05, 0.05) * delta_time
+        wind_change = rng.uniform(-0.5, 0.5) * delta_time
         
         updated_weather = WeatherCondition(
             weather_type=weather.weather_type,
@@ -574,12 +808,16 @@ class WeatherSystem(BaseComponent):
     
     def get_weather_at_position(self, x: float, y: float) -> Optional[WeatherCondition]:
         """Получение погоды в позиции"""
-        # Проверка погодных зон
-        for zone in self.weather_zones.values():
-            distance = math.sqrt((x - zone.center_x)**2 + (y - zone.center_y)**2)
-            if distance <= zone.radius:
-                return zone.current_weather
-        
+        # Проверка погодных зон: кандидаты из сетки в пределах наибольшего радиуса,
+        # из покрывающих точку выбирается созданная раньше других
+        best = None
+        for sequence, zone in self.zone_index.query_radius(x, y, self._max_zone_radius):
+            if (x - zone.center_x) ** 2 + (y - zone.center_y) ** 2 <= zone.radius * zone.radius:
+                if best is None or sequence < best[0]:
+                    best = (sequence, zone)
+        if best is not None:
+            return best[1].current_weather
+
         # Возврат глобальной погоды
         return self.global_weather
     
@@ -625,29 +863,133 @@ class WeatherSystem(BaseComponent):
         
         return False
     
+    # Прогноз
+    def set_biome_modifiers(self, biome_type: str, modifiers: Dict[str, float]):
+        """Замена модификаторов биома (сбрасывает прогнозы зон этого биома)"""
+        self.biome_weather_modifiers[biome_type] = dict(modifiers)
+        for zone in self.weather_zones.values():
+            if zone.biome_type == biome_type:
+                self.invalidate_forecast(zone.zone_id)
+    
+    def set_season_modifiers(self, season: str, modifiers: Dict[str, float]):
+        """Замена модификаторов сезона (сбрасывает прогнозы зон этого сезона)"""
+        self.season_weather_modifiers[season] = dict(modifiers)
+        for zone in self.weather_zones.values():
+            if zone.season == season:
+                self.invalidate_forecast(zone.zone_id)
+    
+    def set_zone_conditions(self, zone_id: str, biome_type: Optional[str] = None,
+                            season: Optional[str] = None) -> bool:
+        """Смена биома и/или сезона зоны"""
+        zone = self.weather_zones.get(zone_id)
+        if zone is None:
+            return False
+        
+        if biome_type is not None:
+            zone.biome_type = biome_type
+        if season is not None:
+            zone.season = season
+        self.invalidate_forecast(zone_id)
+        return True
+    
+    def set_season(self, season: str):
+        """Смена сезона во всех зонах"""
+        for zone in self.weather_zones.values():
+            zone.season = season
+            self.invalidate_forecast(zone.zone_id)
+    
+    def invalidate_forecast(self, zone_id: Optional[str] = None):
+        """Сброс кэшированного прогноза зоны (или всех зон)"""
+        if zone_id is None:
+            dropped = len(self.forecast_cache)
+            self.forecast_cache.clear()
+        else:
+            dropped = int(self.forecast_cache.pop(zone_id, None) is not None)
+        self.weather_stats["forecast_invalidations"] += dropped
+    
+    def _forecast_key(self, zone: WeatherZone) -> Tuple[Any, ...]:
+        """Все, от чего зависит прогноз зоны
+        
+        Ключ строится по значениям, а не по счетчикам версий, поэтому
+        прямая правка полей зоны, словарей модификаторов или настроек
+        тоже сбрасывает прогноз при следующем запросе."""
+        biome_modifiers = self.biome_weather_modifiers.get(zone.biome_type, {})
+        season_modifiers = self.season_weather_modifiers.get(zone.season, {})
+        return (zone.biome_type, zone.season,
+                tuple(sorted(biome_modifiers.items())),
+                tuple(sorted(season_modifiers.items())),
+                astuple(self.settings))
+    
+    def _forecast_rng(self, zone_id: str, start_hour: int) -> random.Random:
+        """Генератор прогноза зоны: зависит только от seed, зоны и первого часа"""
+        key = f"forecast:{zone_id}:{start_hour}".encode("utf-8")
+        return random.Random(zlib.crc32(key, (self.seed or 0) & 0xFFFFFFFF))
+    
+    def _forecast_step(self, weather: WeatherCondition, zone: WeatherZone,
+                       rng: random.Random) -> WeatherCondition:
+        """Погода через час; новая погода получает модификаторы биома и сезона зоны"""
+        next_weather = self._update_weather_condition(weather, FORECAST_STEP, rng)
+        if next_weather.duration == 0.0:
+            next_weather = self._apply_biome_modifiers(next_weather, zone.biome_type)
+            next_weather = self._apply_season_modifiers(next_weather, zone.season)
+        return next_weather
+    
     def get_weather_forecast(self, zone_id: str, hours: int = 24) -> List[WeatherCondition]:
-        """Получение прогноза погоды"""
-        if zone_id not in self.weather_zones:
+        """Получение прогноза погоды
+        
+        Прогноз зоны кэшируется по часам игрового времени: прошедшие часы
+        отбрасываются, недостающие досчитываются от последнего известного
+        часа. Кэш сбрасывается при смене биома, сезона, модификаторов или
+        настроек. Возвращаются копии, кэш вызывающему не доступен."""
+        zone = self.weather_zones.get(zone_id)
+        if zone is None or hours <= 0:
             return []
         
-        zone = self.weather_zones[zone_id]
-        forecast = []
+        self.weather_stats["forecast_requests"] += 1
+        return self._extend_forecast(zone, hours, int(self.simulated_time // FORECAST_STEP) + 1)
+    
+    def get_weather_forecasts(self, hours: int = 24,
+                              zone_ids: Optional[List[str]] = None) -> Dict[str, List[WeatherCondition]]:
+        """Прогнозы сразу для всех (или перечисленных) зон"""
+        if hours <= 0:
+            return {}
         
-        # Симуляция погоды на указанное время
-        current_weather = zone.current_weather
-        current_time = 0.0
+        first_hour = int(self.simulated_time // FORECAST_STEP) + 1
+        zones = (self.weather_zones.values() if zone_ids is None else
+                 [self.weather_zones[zone_id] for zone_id in zone_ids if zone_id in self.weather_zones])
         
-        while current_time < hours * 3600:  # Конвертация в секунды
-            # Обновление погоды
-            current_weather = self._update_weather_condition(current_weather, 3600)  # 1 час
-            
-            # Добавление в прогноз каждый час
-            if len(forecast) < hours:
-                forecast.append(current_weather)
-            
-            current_time += 3600
+        forecasts = {}
+        for zone in zones:
+            forecasts[zone.zone_id] = self._extend_forecast(zone, hours, first_hour)
+        self.weather_stats["forecast_requests"] += len(forecasts)
+        return forecasts
+    
+    def _extend_forecast(self, zone: WeatherZone, hours: int, first_hour: int) -> List[WeatherCondition]:
+        """Сдвиг кэша зоны к first_hour и досчет до hours часов"""
+        key = self._forecast_key(zone)
+        forecast = self.forecast_cache.get(zone.zone_id)
+        
+        if forecast is None or forecast.modifiers_key != key:
+            if forecast is not None:
+                self.weather_stats["forecast_invalidations"] += 1
+            forecast = ZoneForecast(zone_id=zone.zone_id, start_hour=first_hour, modifiers_key=key,
+                                    rng=self._forecast_rng(zone.zone_id, first_hour))
+            self.forecast_cache[zone.zone_id] = forecast
+        elif forecast.start_hour < first_hour:
+            # Отбрасывание прошедших часов
+            del forecast.conditions[:first_hour - forecast.start_hour]
+            forecast.start_hour = first_hour
+        
+        conditions = forecast.conditions
+        missing = hours - len(conditions)
+        if missing > 0:
+            weather = conditions[-1] if conditions else zone.current_weather
+            for _ in range(missing):
+                weather = self._forecast_step(weather, zone, forecast.rng)
+                conditions.append(weather)
+            self.weather_stats["forecast_hours_computed"] += missing
         
-        return forecast
+        return [replace(weather) for weather in conditions[:hours]]
     
     def add_weather_changed_callback(self, callback: callable):
         """Добавление callback для изменения погоды"""
@@ -704,13 +1046,17 @@ class WeatherSystem(BaseComponent):
     def clear_cache(self):
         """Очистка кэша"""
         self.weather_cache.clear()
+        self.forecast_cache.clear()
         self.logger.info("Кэш WeatherSystem очищен")
     
     def _on_destroy(self):
         """Уничтожение системы погоды"""
         self.weather_zones.clear()
+        self.zone_table.clear()
+        self.zone_index.clear()
         self.active_effects.clear()
         self.weather_cache.clear()
+        self.forecast_cache.clear()
         self.weather_changed_callbacks.clear()
         self.effect_applied_callbacks.clear()
         
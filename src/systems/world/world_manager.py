@@ -7,13 +7,33 @@ from enum import Enum
 from typing import Dict, List, Optional, Any, Tuple, Callable
 import logging
 import time
+import heapq
 import math
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
 from src.core.architecture import BaseComponent, ComponentType, Priority
-from src.systems.world.height_map_generator import HeightMapGenerator
-from src.systems.world.structure_generator import StructureGenerator
+from src.systems.world.height_map_generator import HeightMapGenerator, MAX_TERRAIN_LOD
+from src.systems.world.structure_generator import StructureGenerator, StructureType, GeneratedStructure
+from src.systems.world.chunk_generation_pool import (
+    ChunkGenerationPool, ChunkPoolSettings, ChunkTerrain, seed_generator_for_chunk
+)
+from src.systems.world.chunk_store import ChunkStore
+from src.systems.world.chunk_streaming import ChunkStreamScheduler, StreamingSettings
+from src.systems.world.generation_cache import BoundedCache
+from src.systems.world.hierarchical_pathfinding import HierarchicalPathfinder, HierarchicalPathResult
+from src.systems.world.content_pregeneration import (
+    ContentKind, ContentPregenerationService, PregenerationSettings, location_key
+)
+
+# Структуры, содержимое которых генерируется заранее при приближении игрока
+STRUCTURE_CONTENT: Dict[StructureType, ContentKind] = {
+    StructureType.DUNGEON: ContentKind.DUNGEON,
+    StructureType.TOWER: ContentKind.TOWER,
+    StructureType.CITY: ContentKind.SETTLEMENT,
+}
 
 # = ТИПЫ МИРА
 class WorldType(Enum):
@@ -42,6 +62,12 @@ class WorldSettings:
     max_chunks_loaded: int = 25
     view_distance: int = 3
     generation_threads: int = 4
+    pregeneration_workers: int = 2  # Процессы предгенерации подземелий, башен и поселений (0 - выкл.)
+    use_process_pool: bool = True  # Генерация ландшафта в отдельных процессах
+    use_chunk_store: bool = True  # Постоянное хранилище чанков на диске
+    chunk_store_path: str = "saves/world_chunks"
+    lod_distances: Tuple[int, ...] = (1, 2, 3)  # Внешние границы колец LOD 0, 1, 2 в чанках
+    sampling_cache_chunks: int = 64  # Ландшафт незагруженных чанков для sample_terrain
     auto_save_interval: float = 300.0  # 5 минут
     max_chunk_generation_time: float = 5.0  # 5 секунд
 
@@ -55,12 +81,24 @@ class WorldChunk:
     state: ChunkState = ChunkState.UNLOADED
     height_map: Optional[Any] = None
     biome_map: Optional[Any] = None
+    temperature_map: Optional[Any] = None
+    humidity_map: Optional[Any] = None
+    lod: int = 0  # Уровень детализации ландшафта: разрешение chunk_size >> lod
+    pending_lod: Optional[int] = None  # Уточнение, которое генерируется сейчас
     structures: List[str] = field(default_factory=list)
     entities: List[str] = field(default_factory=list)
     last_accessed: float = field(default_factory=time.time)
     generation_time: float = 0.0
     memory_usage: float = 0.0
 
+@dataclass
+class TerrainSample:
+    """Результат пакетной выборки ландшафта"""
+    heights: np.ndarray  # Высота в точке (NaN, если чанк недоступен)
+    biomes: np.ndarray   # Код биома ближайшего узла (-1, если чанк недоступен)
+    slopes: np.ndarray   # Модуль градиента высоты на единицу расстояния
+    pending: List[Tuple[int, int]] = field(default_factory=list)  # Чанки, ландшафт которых еще генерируется
+
 @dataclass
 class WorldStats:
     """Статистика мира"""
@@ -94,21 +132,40 @@ class WorldManager(BaseComponent):
         
         # Управление чанками
         self.chunks: Dict[str, WorldChunk] = {}
-        self.chunk_load_queue: List[str] = []
-        self.chunk_unload_queue: List[str] = []
+        self.chunk_unload_queue: deque = deque()
+        self.chunk_scheduler = ChunkStreamScheduler(self, StreamingSettings())
+        
+        # Счетчики чанков по состояниям (поддерживаются при каждом переходе)
+        self.chunk_state_counts: Dict[ChunkState, int] = {state: 0 for state in ChunkState}
+        self.state_lock = threading.Lock()
         
         # Многопоточность
         self.executor: Optional[ThreadPoolExecutor] = None
+        self.chunk_pool: Optional[ChunkGenerationPool] = None
+        self.chunk_store: Optional[ChunkStore] = None
         self.generation_lock = threading.Lock()
+        self.terrain_lock = threading.Lock()  # Генерация ландшафта в основном процессе
         
         # Кэш и оптимизация
-        self.chunk_cache: Dict[str, Any] = {}
+        self.chunk_cache = BoundedCache("world.sampling", self.settings.sampling_cache_chunks)
+        self._sampling_requests: Dict[Tuple[int, int], Future] = {}
+        self._sampling_lock = threading.Lock()
         self.spatial_index: Dict[Tuple[int, int], str] = {}  # (x, y) -> chunk_id
         
+        # Иерархический граф навигации по загруженным чанкам полной детализации
+        self.navigation_graph = HierarchicalPathfinder(self.settings.chunk_size)
+        
+        # Предгенерация содержимого локаций (создается после выбора seed мира)
+        self.content_pregeneration: Optional[ContentPregenerationService] = None
+        self.location_keys: Dict[str, str] = {}  # structure_id -> детерминированный ключ локации
+        
         # События и колбэки
         self.chunk_loaded_callbacks: List[Callable] = []
         self.chunk_unloaded_callbacks: List[Callable] = []
+        self.chunk_refined_callbacks: List[Callable] = []
         self.world_updated_callbacks: List[Callable] = []
+        self.location_entered_callbacks: List[Callable] = []  # callback(structure_id, content)
+        self.location_left_callbacks: List[Callable] = []  # callback(structure_id)
         
         # Автосохранение
         self.last_save_time = time.time()
@@ -135,6 +192,28 @@ class WorldManager(BaseComponent):
             # Устанавливаем seed мира
             if self.settings.world_seed == 0:
                 self.settings.world_seed = int(time.time())
+            self.height_generator.set_noise_seed(self.settings.world_seed)
+            
+            # Постоянное хранилище чанков, общее для сессий с тем же seed
+            if self.settings.use_chunk_store:
+                self.chunk_store = ChunkStore(
+                    self.settings.chunk_store_path,
+                    self.settings.world_seed,
+                    self.height_generator.get_generator_version()
+                )
+            
+            # Пул процессов для ландшафта (при ошибке остаемся на потоках)
+            if self.settings.use_process_pool:
+                self._start_chunk_pool()
+            
+            # Подземелья, башни и поселения рядом с игроком генерируются заранее
+            self.content_pregeneration = ContentPregenerationService(PregenerationSettings(
+                world_seed=self.settings.world_seed,
+                workers=max(1, self.settings.pregeneration_workers)
+            ))
+            if self.settings.use_process_pool and self.settings.pregeneration_workers > 0:
+                if not self.content_pregeneration.start():
+                    self._logger.warning("Пул предгенерации недоступен, локации генерируются при входе")
             
             self._logger.info(f"Менеджер мира инициализирован с seed: {self.settings.world_seed}")
             return True
@@ -154,32 +233,33 @@ class WorldManager(BaseComponent):
                 chunk.last_accessed = time.time()
                 
                 if chunk.state == ChunkState.LOADED:
-                    chunk.state = ChunkState.ACTIVE
+                    self._set_chunk_state(chunk, ChunkState.ACTIVE)
                     return chunk
                 elif chunk.state == ChunkState.LOADING:
                     return None  # Чанк уже загружается
+                elif chunk.state == ChunkState.UNLOADING:
+                    # Отменяем выгрузку: данные еще не освобождены
+                    self._set_chunk_state(chunk, ChunkState.ACTIVE if chunk.height_map is not None
+                                          else ChunkState.LOADING)
+                    return chunk
             
             # Проверяем лимит загруженных чанков
-            if len([c for c in self.chunks.values() if c.state in [ChunkState.LOADED, ChunkState.ACTIVE]]) >= self.settings.max_chunks_loaded:
+            if self.get_loaded_chunk_count() >= self.settings.max_chunks_loaded:
                 self._unload_oldest_chunks()
             
-            # Создаем новый чанк
+            # Создаем новый чанк (дальние - с пониженной детализацией)
             chunk = WorldChunk(
                 chunk_id=chunk_id,
                 chunk_x=chunk_x,
                 chunk_y=chunk_y,
                 chunk_size=self.settings.chunk_size,
-                state=ChunkState.LOADING
+                state=ChunkState.LOADING,
+                lod=self.get_chunk_lod(chunk_x, chunk_y)
             )
             
             self.chunks[chunk_id] = chunk
             self.spatial_index[(chunk_x, chunk_y)] = chunk_id
-            
-            # Добавляем в очередь загрузки
-            if priority:
-                self.chunk_load_queue.insert(0, chunk_id)
-            else:
-                self.chunk_load_queue.append(chunk_id)
+            self._count_chunk_state(chunk.state, 1)
             
             # Запускаем асинхронную загрузку
             self._load_chunk_async(chunk_id)
@@ -190,17 +270,132 @@ class WorldManager(BaseComponent):
             self._logger.error(f"Ошибка загрузки чанка {chunk_x}, {chunk_y}: {e}")
             return None
     
+    def _start_chunk_pool(self) -> bool:
+        """Запуск пула процессов для генерации ландшафта"""
+        try:
+            pool = ChunkGenerationPool(ChunkPoolSettings(
+                world_seed=self.settings.world_seed,
+                workers=self.settings.generation_threads,
+                height_settings=self.height_generator.settings,
+                biome_settings=self.height_generator.biome_settings,
+                erosion_settings=self.height_generator.erosion_settings,
+                biome_table=self.height_generator.biome_classifier.lookup_table
+            ))
+            
+            if not pool.start():
+                self._logger.warning("Пул процессов недоступен, генерация чанков в потоках")
+                return False
+            
+            self.chunk_pool = pool
+            return True
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка запуска пула генерации чанков: {e}")
+            return False
+    
     def _load_chunk_async(self, chunk_id: str):
         """Асинхронная загрузка чанка"""
         try:
-            if self.executor:
+            # Ранее посещенный чанк читается из хранилища без генерации
+            if self.chunk_store and self._load_chunk_from_store(chunk_id):
+                return
+            
+            if self.chunk_pool:
+                chunk = self.chunks[chunk_id]
+                future = self.chunk_pool.submit(chunk.chunk_x, chunk.chunk_y, chunk.chunk_size, chunk.lod)
+                future.add_done_callback(lambda f: self._on_chunk_terrain_generated(chunk_id, f))
+            elif self.executor:
                 future = self.executor.submit(self._generate_chunk_content, chunk_id)
                 future.add_done_callback(lambda f: self._on_chunk_generated(chunk_id, f))
             
         except Exception as e:
             self._logger.error(f"Ошибка запуска асинхронной загрузки чанка {chunk_id}: {e}")
     
-    def _generate_chunk_content(self, chunk_id: str) -> bool:
+    def _load_chunk_from_store(self, chunk_id: str) -> bool:
+        """Загрузка чанка из постоянного хранилища"""
+        try:
+            chunk = self.chunks[chunk_id]
+            start_time = time.time()
+            
+            stored = self.chunk_store.load(chunk.chunk_x, chunk.chunk_y)
+            if stored is None:
+                return False
+            
+            structures = self.structure_generator.restore_structures_for_chunk(
+                chunk.chunk_x, chunk.chunk_y, stored.structures
+            )
+            self.structure_generator.retain_chunk(chunk.chunk_x, chunk.chunk_y)
+            
+            with self.generation_lock:
+                chunk.height_map = stored.layers.get("height_map")
+                chunk.biome_map = stored.layers.get("biome_map")
+                chunk.temperature_map = stored.layers.get("temperature_map")
+                chunk.humidity_map = stored.layers.get("humidity_map")
+                chunk.lod = 0  # Хранилище содержит только полное разрешение
+                chunk.structures = [s.structure_id for s in structures]
+                chunk.generation_time = time.time() - start_time
+                chunk.last_accessed = time.time()
+                if chunk.state == ChunkState.LOADING:
+                    self._set_chunk_state(chunk, ChunkState.LOADED)
+            
+            self.world_stats.total_structures += len(structures)
+            self._register_content_locations(chunk, structures)
+            self._finish_chunk_generation(chunk_id, True)
+            
+            self._logger.debug(f"Чанк {chunk_id} загружен из хранилища")
+            return True
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка загрузки чанка {chunk_id} из хранилища: {e}")
+            return False
+    
+    def _persist_chunk(self, chunk: WorldChunk, terrain: bool = True) -> bool:
+        """Запись чанка в постоянное хранилище"""
+        try:
+            if not self.chunk_store:
+                return False
+            
+            layers = None
+            if terrain and chunk.height_map is not None and chunk.lod == 0:
+                layers = {
+                    "height_map": chunk.height_map,
+                    "biome_map": chunk.biome_map,
+                    "temperature_map": chunk.temperature_map,
+                    "humidity_map": chunk.humidity_map
+                }
+            
+            records = [
+                self.structure_generator.export_structure(
+                    self.structure_generator.generated_structures[structure_id]
+                )
+                for structure_id in chunk.structures
+                if structure_id in self.structure_generator.generated_structures
+            ]
+            return self.chunk_store.save_chunk(chunk.chunk_x, chunk.chunk_y, layers, records)
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка записи чанка {chunk.chunk_id} в хранилище: {e}")
+            return False
+    
+    def _on_chunk_terrain_generated(self, chunk_id: str, future):
+        """Ландшафт из пула процессов готов: достройка чанка уходит в пул потоков
+        
+        Колбэк выполняется в служебном потоке пула процессов. Массивы к этому
+        моменту уже скопированы из разделяемой памяти, поэтому здесь только
+        передача работы в executor, как в потоковом пути генерации."""
+        try:
+            terrain = future.result()
+            if self.executor is None:
+                raise RuntimeError("Пул потоков менеджера мира остановлен")
+            
+            work = self.executor.submit(self._generate_chunk_content, chunk_id, terrain)
+            work.add_done_callback(lambda f: self._on_chunk_generated(chunk_id, f))
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка генерации ландшафта чанка {chunk_id}: {e}")
+            self._finish_chunk_generation(chunk_id, False)
+    
+    def _generate_chunk_content(self, chunk_id: str, terrain: Optional[ChunkTerrain] = None) -> bool:
         """Генерация содержимого чанка"""
         try:
             if chunk_id not in self.chunks:
@@ -209,34 +404,37 @@ class WorldManager(BaseComponent):
             chunk = self.chunks[chunk_id]
             start_time = time.time()
             
-            # Генерируем карту высот
-            height_map = self.height_generator.generate_height_map(
-                chunk.chunk_x, chunk.chunk_y, chunk.chunk_size
-            )
-            
-            # Генерируем карту биомов
-            biome_map = self.height_generator.generate_biome_map(
-                height_map, chunk.chunk_x, chunk.chunk_y
-            )
+            if terrain is None:
+                terrain = self._generate_terrain_local(
+                    chunk.chunk_x, chunk.chunk_y, chunk.chunk_size, chunk.lod
+                )
+            else:
+                # Ландшафт уже сгенерирован рабочим процессом
+                start_time -= terrain.generation_time
             
             # Генерируем структуры
             structures = self.structure_generator.generate_structures_for_chunk(
                 chunk.chunk_x, chunk.chunk_y, chunk.chunk_size, self.settings.world_seed
             )
+            self.structure_generator.retain_chunk(chunk.chunk_x, chunk.chunk_y)
             
             # Сохраняем результаты
             with self.generation_lock:
-                chunk.height_map = height_map
-                chunk.biome_map = biome_map
+                self._apply_terrain(chunk, terrain)
                 chunk.structures = [s.structure_id for s in structures]
                 chunk.generation_time = time.time() - start_time
-                chunk.state = ChunkState.LOADED
                 chunk.last_accessed = time.time()
+                if chunk.state == ChunkState.LOADING:
+                    self._set_chunk_state(chunk, ChunkState.LOADED)
             
             # Обновляем статистику
             self.world_stats.total_structures += len(structures)
+            self._register_content_locations(chunk, structures)
             self.world_stats.generation_time += chunk.generation_time
             
+            # Сохраняем чанк для следующих сессий
+            self._persist_chunk(chunk)
+            
             self._logger.debug(f"Чанк {chunk_id} сгенерирован за {chunk.generation_time:.3f}с")
             return True
             
@@ -244,26 +442,159 @@ class WorldManager(BaseComponent):
             self._logger.error(f"Ошибка генерации содержимого чанка {chunk_id}: {e}")
             return False
     
+    def _generate_terrain_local(self, chunk_x: int, chunk_y: int,
+                                chunk_size: int, lod: int = 0) -> ChunkTerrain:
+        """Генерация ландшафта чанка в текущем процессе
+        
+        Генератор пересеивается сидом чанка, как в пуле процессов, поэтому
+        результат не зависит от пути генерации и порядка запросов."""
+        start_time = time.time()
+        generator = self.height_generator
+        with self.terrain_lock:
+            seed = seed_generator_for_chunk(generator, self.settings.world_seed, chunk_x, chunk_y)
+            height_map = generator.generate_height_map(chunk_x, chunk_y, chunk_size, lod)
+            biome_map = generator.generate_biome_map(height_map, chunk_x, chunk_y, chunk_size)
+            rows, cols = height_map.shape
+            temperature_map = generator._generate_temperature_map(chunk_x, chunk_y, rows, cols, chunk_size)
+            humidity_map = generator._generate_humidity_map(chunk_x, chunk_y, rows, cols, chunk_size)
+        
+        return ChunkTerrain(
+            chunk_x=chunk_x,
+            chunk_y=chunk_y,
+            chunk_size=chunk_size,
+            seed=seed,
+            height_map=height_map,
+            biome_map=biome_map,
+            temperature_map=temperature_map,
+            humidity_map=humidity_map,
+            lod=lod,
+            generation_time=time.time() - start_time
+        )
+    
+    @staticmethod
+    def _apply_terrain(chunk: WorldChunk, terrain: ChunkTerrain):
+        chunk.height_map = terrain.height_map
+        chunk.biome_map = terrain.biome_map
+        chunk.temperature_map = terrain.temperature_map
+        chunk.humidity_map = terrain.humidity_map
+        chunk.lod = terrain.lod
+    
+    # = УРОВНИ ДЕТАЛИЗАЦИИ
+    def get_chunk_lod(self, chunk_x: int, chunk_y: int) -> int:
+        """Требуемый уровень детализации чанка по удаленности от игрока"""
+        center = self.chunk_scheduler.player_chunk
+        if center is None:
+            return 0
+        
+        distance = max(abs(chunk_x - center[0]), abs(chunk_y - center[1]))
+        lod = sum(1 for limit in self.settings.lod_distances if distance > limit)
+        return min(lod, MAX_TERRAIN_LOD)
+    
+    def _refine_chunks(self, keys):
+        """Запуск уточнения чанков, детализация которых ниже требуемой"""
+        try:
+            for key in keys:
+                chunk_id = self.spatial_index.get(key)
+                chunk = self.chunks.get(chunk_id) if chunk_id else None
+                if chunk is None or chunk.pending_lod is not None:
+                    continue
+                if chunk.state not in (ChunkState.LOADED, ChunkState.ACTIVE):
+                    continue
+                
+                lod = self.get_chunk_lod(*key)
+                if lod < chunk.lod:
+                    self._refine_chunk(chunk, lod)
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка уточнения детализации чанков: {e}")
+    
+    def _refine_chunk(self, chunk: WorldChunk, lod: int):
+        """Генерация ландшафта чанка с более высокой детализацией
+        
+        Грубые данные остаются в чанке до готовности уточненных,
+        структуры не перегенерируются."""
+        chunk_id = chunk.chunk_id
+        chunk.pending_lod = lod
+        
+        # Полное разрешение может уже лежать в хранилище
+        if lod == 0 and self.chunk_store and self.chunk_store.contains(chunk.chunk_x, chunk.chunk_y):
+            stored = self.chunk_store.load(chunk.chunk_x, chunk.chunk_y)
+            if stored is not None:
+                future = Future()
+                future.set_result(ChunkTerrain(
+                    chunk_x=chunk.chunk_x,
+                    chunk_y=chunk.chunk_y,
+                    chunk_size=chunk.chunk_size,
+                    seed=self.settings.world_seed,
+                    lod=0,
+                    **stored.layers
+                ))
+                self._on_chunk_refined(chunk_id, chunk, future)
+                return
+        
+        if self.chunk_pool:
+            future = self.chunk_pool.submit(chunk.chunk_x, chunk.chunk_y, chunk.chunk_size, lod)
+        elif self.executor:
+            future = self.executor.submit(
+                self._generate_terrain_local, chunk.chunk_x, chunk.chunk_y, chunk.chunk_size, lod
+            )
+        else:
+            chunk.pending_lod = None
+            return
+        future.add_done_callback(lambda f: self._on_chunk_refined(chunk_id, chunk, f))
+    
+    def _on_chunk_refined(self, chunk_id: str, chunk: WorldChunk, future):
+        """Подмена грубого ландшафта уточненным"""
+        try:
+            terrain = future.result()
+            
+            with self.generation_lock:
+                # Чанк мог быть выгружен или пересоздан за время генерации
+                if self.chunks.get(chunk_id) is not chunk or \
+                        chunk.state not in (ChunkState.LOADED, ChunkState.ACTIVE) or \
+                        terrain.lod >= chunk.lod:
+                    return
+                self._apply_terrain(chunk, terrain)
+            
+            if chunk.lod == 0:
+                self._persist_chunk(chunk)
+                self._register_navigation_chunk(chunk)
+            self._notify_chunk_refined(chunk)
+            
+            self._logger.debug(f"Чанк {chunk_id} уточнен до LOD {chunk.lod}")
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка уточнения чанка {chunk_id}: {e}")
+        finally:
+            chunk.pending_lod = None
+    
     def _on_chunk_generated(self, chunk_id: str, future):
         """Обработка завершения генерации чанка"""
+        try:
+            success = future.result()
+        except Exception as e:
+            self._logger.error(f"Ошибка генерации чанка {chunk_id}: {e}")
+            success = False
+        
+        self._finish_chunk_generation(chunk_id, success)
+    
+    def _finish_chunk_generation(self, chunk_id: str, success: bool):
+        """Регистрация результата генерации чанка"""
         try:
             if chunk_id in self.chunks:
                 chunk = self.chunks[chunk_id]
                 
-                if future.result():
+                if success:
+                    self._register_navigation_chunk(chunk)
+                    
                     # Уведомляем о загрузке чанка
                     self._notify_chunk_loaded(chunk)
                     
                     # Обновляем статистику
-                    self.world_stats.loaded_chunks += 1
                     self.world_stats.total_chunks += 1
                 else:
                     # Ошибка генерации
-                    chunk.state = ChunkState.UNLOADED
-                    if chunk_id in self.chunks:
-                        del self.chunks[chunk_id]
-                    if (chunk.chunk_x, chunk.chunk_y) in self.spatial_index:
-                        del self.spatial_index[(chunk.chunk_x, chunk.chunk_y)]
+                    self._remove_chunk(chunk)
             
         except Exception as e:
             self._logger.error(f"Ошибка обработки завершения генерации чанка {chunk_id}: {e}")
@@ -279,18 +610,11 @@ class WorldManager(BaseComponent):
             chunk = self.chunks[chunk_id]
             
             if chunk.state in [ChunkState.LOADING, ChunkState.LOADED, ChunkState.ACTIVE]:
-                chunk.state = ChunkState.UNLOADING
+                # Подписчики узнают о выгрузке при обработке очереди: до нее
+                # load_chunk может отменить выгрузку
+                self._set_chunk_state(chunk, ChunkState.UNLOADING)
                 self.chunk_unload_queue.append(chunk_id)
                 
-                # Уведомляем о выгрузке
-                self._notify_chunk_unloaded(chunk)
-                
-                # Обновляем статистику
-                if chunk.state == ChunkState.LOADED:
-                    self.world_stats.loaded_chunks -= 1
-                elif chunk.state == ChunkState.ACTIVE:
-                    self.world_stats.active_chunks -= 1
-                
                 return True
             
             return False
@@ -299,24 +623,117 @@ class WorldManager(BaseComponent):
             self._logger.error(f"Ошибка выгрузки чанка {chunk_x}, {chunk_y}: {e}")
             return False
     
-    def _unload_oldest_chunks(self):
-        """Выгрузка самых старых чанков"""
+    def _unload_oldest_chunks(self, count: int = 1):
+        """Выгрузка самых старых неактивных чанков
+
+        Чанки в зоне видимости (ACTIVE) не выгружаются: при нехватке
+        места лимит временно превышается, а не вызывает подгрузку заново."""
         try:
-            # Сортируем чанки по времени последнего доступа
-            sorted_chunks = sorted(
-                [c for c in self.chunks.values() if c.state in [ChunkState.LOADED, ChunkState.ACTIVE]],
+            candidates = heapq.nsmallest(
+                count,
+                (c for c in self.chunks.values() if c.state == ChunkState.LOADED),
                 key=lambda c: c.last_accessed
             )
             
-            # Выгружаем самые старые
-            chunks_to_unload = sorted_chunks[:len(sorted_chunks) // 2]
-            
-            for chunk in chunks_to_unload:
+            for chunk in candidates:
                 self.unload_chunk(chunk.chunk_x, chunk.chunk_y)
             
         except Exception as e:
             self._logger.error(f"Ошибка выгрузки старых чанков: {e}")
     
+    def _count_chunk_state(self, state: ChunkState, delta: int):
+        with self.state_lock:
+            self.chunk_state_counts[state] += delta
+    
+    def _set_chunk_state(self, chunk: WorldChunk, state: ChunkState):
+        """Переход чанка в новое состояние с обновлением счетчиков"""
+        with self.state_lock:
+            self.chunk_state_counts[chunk.state] -= 1
+            self.chunk_state_counts[state] += 1
+            chunk.state = state
+    
+    def _remove_chunk(self, chunk: WorldChunk):
+        """Удаление чанка из менеджера и индекса"""
+        if self.chunks.get(chunk.chunk_id) is chunk:
+            del self.chunks[chunk.chunk_id]
+            self._count_chunk_state(chunk.state, -1)
+        if self.spatial_index.get((chunk.chunk_x, chunk.chunk_y)) == chunk.chunk_id:
+            del self.spatial_index[(chunk.chunk_x, chunk.chunk_y)]
+            self.navigation_graph.unregister_chunk(chunk.chunk_x, chunk.chunk_y)
+        chunk.state = ChunkState.UNLOADED
+    
+    # Навигация
+    def _register_navigation_chunk(self, chunk: WorldChunk):
+        """Передача чанка полной детализации в граф навигации"""
+        try:
+            if chunk.lod != 0 or chunk.height_map is None:
+                return
+            self.navigation_graph.register_world_chunk(chunk, self.height_generator.biome_classifier.labels)
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка добавления чанка {chunk.chunk_id} в граф навигации: {e}")
+    
+    def find_route(self, start: Tuple[float, float], goal: Tuple[float, float],
+                   refine: bool = True) -> Optional[HierarchicalPathResult]:
+        """Маршрут между точками мира по загруженным чанкам (HPA*)"""
+        return self.navigation_graph.find_path(start, goal, refine)
+    
+    def request_route(self, start: Tuple[float, float], goal: Tuple[float, float],
+                      callback: Optional[Callable] = None, refine: bool = True) -> Future:
+        """Асинхронный поиск маршрута; граф перестраивается в рабочем потоке"""
+        return self.navigation_graph.request_path(start, goal, callback, refine)
+    
+    # Содержимое локаций
+    def _register_content_locations(self, chunk: WorldChunk, structures: List[GeneratedStructure]):
+        """Регистрация подземелий, башен и городов чанка для предгенерации
+        
+        Ключ и сид локации зависят только от seed мира, координат чанка и
+        номера структуры в нем, а не от structure_id со временем создания."""
+        try:
+            if self.content_pregeneration is None:
+                return
+            for index, structure in enumerate(structures):
+                kind = STRUCTURE_CONTENT.get(structure.template.structure_type)
+                if kind is not None:
+                    key = location_key(chunk.chunk_x, chunk.chunk_y, index)
+                    self.location_keys[structure.structure_id] = key
+                    self.content_pregeneration.register_location(
+                        key, kind, (structure.position[0], structure.position[1])
+                    )
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка регистрации локаций для предгенерации: {e}")
+    
+    def enter_location(self, structure_id: str) -> Optional[Any]:
+        """Содержимое локации при входе: готовое из пула предгенерации или синхронно"""
+        if self.content_pregeneration is None:
+            return None
+        content = self.content_pregeneration.acquire(self.location_keys.get(structure_id, structure_id))
+        if content is not None:
+            self._notify_location_entered(structure_id, content)
+        return content
+    
+    def leave_location(self, structure_id: str):
+        """Выход из локации обратно в открытый мир"""
+        for callback in self.location_left_callbacks:
+            try:
+                callback(structure_id)
+            except Exception as e:
+                self._logger.error(f"Ошибка в колбэке выхода из локации: {e}")
+    
+    def get_loaded_chunk_count(self) -> int:
+        """Количество загруженных чанков за O(1)"""
+        return (self.chunk_state_counts[ChunkState.LOADED] +
+                self.chunk_state_counts[ChunkState.ACTIVE])
+    
+    def is_chunk_resident(self, chunk_x: int, chunk_y: int) -> bool:
+        """Чанк загружен или загружается (и не помечен к выгрузке)"""
+        chunk_id = self.spatial_index.get((chunk_x, chunk_y))
+        if chunk_id is None:
+            return False
+        chunk = self.chunks.get(chunk_id)
+        return chunk is not None and chunk.state != ChunkState.UNLOADING
+    
     def get_chunk_at_position(self, world_x: float, world_y: float) -> Optional[WorldChunk]:
         """Получение чанка по позиции в мире"""
         try:
@@ -333,6 +750,143 @@ class WorldManager(BaseComponent):
             self._logger.error(f"Ошибка получения чанка по позиции ({world_x}, {world_y}): {e}")
             return None
     
+    # = ВЫБОРКА ЛАНДШАФТА
+    def sample_terrain(self, xs, ys, generate_missing: bool = True) -> TerrainSample:
+        """Пакетная выборка высоты, биома и уклона в мировых координатах
+        
+        Точки группируются по чанкам, внутри чанка высота и уклон
+        интерполируются билинейно по узлам карты (любого LOD), биом берется
+        из ближайшего узла. Ландшафт незагруженных чанков генерируется
+        по требованию без структур в фоне и кэшируется: пока генерация
+        идет, точки чанка остаются NaN, а сам чанк попадает в pending -
+        выборку нужно повторить позже. Вызов никогда не ждет генерацию."""
+        xs, ys = np.broadcast_arrays(np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+        shape = xs.shape
+        heights = np.full(xs.size, np.nan, dtype=np.float32)
+        biomes = np.full(xs.size, -1, dtype=np.int32)
+        slopes = np.full(xs.size, np.nan, dtype=np.float32)
+        pending: List[Tuple[int, int]] = []
+        
+        try:
+            if xs.size == 0:
+                return TerrainSample(heights.reshape(shape), biomes.reshape(shape), slopes.reshape(shape))
+            
+            size = self.settings.chunk_size
+            flat_x = xs.ravel()
+            flat_y = ys.ravel()
+            chunk_x = np.floor(flat_x / size).astype(np.int64)
+            chunk_y = np.floor(flat_y / size).astype(np.int64)
+            
+            # Группируем точки по чанкам одной сортировкой
+            keys, inverse = np.unique(np.stack([chunk_x, chunk_y], axis=1), axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.cumsum(np.bincount(inverse, minlength=len(keys)))[:-1]
+            
+            for (cx, cy), points in zip(keys, np.split(order, bounds)):
+                maps = self._get_sampling_maps(int(cx), int(cy), generate_missing, pending)
+                if maps is None:
+                    continue
+                height_map, biome_map = maps
+                
+                rows, cols = height_map.shape
+                u = (flat_x[points] - cx * size) * ((cols - 1) / size)
+                v = (flat_y[points] - cy * size) * ((rows - 1) / size)
+                col = np.clip(np.floor(u).astype(np.intp), 0, cols - 2)
+                row = np.clip(np.floor(v).astype(np.intp), 0, rows - 2)
+                fu = u - col
+                fv = v - row
+                
+                h00 = height_map[row, col]
+                h01 = height_map[row, col + 1]
+                h10 = height_map[row + 1, col]
+                h11 = height_map[row + 1, col + 1]
+                top = h00 + (h01 - h00) * fu
+                bottom = h10 + (h11 - h10) * fu
+                heights[points] = top + (bottom - top) * fv
+                
+                # Производные билинейной поверхности в единицах мира
+                dh_du = (h01 - h00) * (1.0 - fv) + (h11 - h10) * fv
+                dh_dv = bottom - top
+                slopes[points] = np.hypot(dh_du * ((cols - 1) / size), dh_dv * ((rows - 1) / size))
+                
+                biomes[points] = biome_map[np.rint(v).astype(np.intp).clip(0, rows - 1),
+                                           np.rint(u).astype(np.intp).clip(0, cols - 1)]
+            
+        except Exception as e:
+            self._logger.error(f"Ошибка выборки ландшафта: {e}")
+        
+        return TerrainSample(heights.reshape(shape), biomes.reshape(shape), slopes.reshape(shape), pending)
+    
+    def _get_sampling_maps(self, chunk_x: int, chunk_y: int, generate_missing: bool,
+                           pending: Optional[List[Tuple[int, int]]] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Карты высот и биомов чанка для выборки
+        
+        Если ландшафт еще генерируется (фоновый запрос выборки или загрузка
+        самого чанка), возвращает None и добавляет чанк в pending."""
+        chunk_id = self.spatial_index.get((chunk_x, chunk_y))
+        chunk = self.chunks.get(chunk_id) if chunk_id else None
+        if chunk is not None and chunk.height_map is not None and chunk.biome_map is not None:
+            return chunk.height_map, chunk.biome_map
+        
+        maps = self.chunk_cache.get((chunk_x, chunk_y))
+        if maps is not None:
+            return maps
+        
+        # Ландшафт загружающегося чанка уже генерируется, второй запрос не нужен
+        if chunk is not None and chunk.state == ChunkState.LOADING:
+            if pending is not None:
+                pending.append((chunk_x, chunk_y))
+            return None
+        
+        if not generate_missing:
+            return None
+        
+        if self.chunk_store:
+            stored = self.chunk_store.load(chunk_x, chunk_y)
+            if stored is not None and "height_map" in stored.layers and "biome_map" in stored.layers:
+                maps = (stored.layers["height_map"], stored.layers["biome_map"])
+        
+        if maps is None:
+            if self._request_sampling_terrain(chunk_x, chunk_y) and pending is not None:
+                pending.append((chunk_x, chunk_y))
+            return None
+        
+        self.chunk_cache.put((chunk_x, chunk_y), maps)
+        return maps
+    
+    def _request_sampling_terrain(self, chunk_x: int, chunk_y: int) -> bool:
+        """Фоновая генерация ландшафта для выборки (не более одного запроса на чанк)"""
+        key = (chunk_x, chunk_y)
+        with self._sampling_lock:
+            if key in self._sampling_requests:
+                return True
+            try:
+                if self.chunk_pool:
+                    future = self.chunk_pool.submit(chunk_x, chunk_y, self.settings.chunk_size)
+                elif self.executor:
+                    future = self.executor.submit(self._generate_terrain_local,
+                                                  chunk_x, chunk_y, self.settings.chunk_size)
+                else:
+                    return False
+            except Exception as e:
+                self._logger.error(f"Ошибка запроса ландшафта чанка ({chunk_x}, {chunk_y}) для выборки: {e}")
+                return False
+            self._sampling_requests[key] = future
+        future.add_done_callback(lambda f: self._on_sampling_terrain_generated(key, f))
+        return True
+    
+    def _on_sampling_terrain_generated(self, key: Tuple[int, int], future):
+        """Кэширование ландшафта, сгенерированного для выборки"""
+        try:
+            terrain = future.result()
+            self.chunk_cache.put(key, (terrain.height_map, terrain.biome_map))
+        except Exception as e:
+            self._logger.error(f"Ошибка генерации ландшафта чанка {key} для выборки: {e}")
+        finally:
+            with self._sampling_lock:
+                self._sampling_requests.pop(key, None)
+    
     def get_chunks_in_area(self, center: Tuple[float, float], radius: float) -> List[WorldChunk]:
         """Получение чанков в заданной области"""
         try:
@@ -360,34 +914,40 @@ class WorldManager(BaseComponent):
             self._logger.error(f"Ошибка получения чанков в области: {e}")
             return []
     
-    def update_chunk_priorities(self, player_position: Tuple[float, float]):
-        """Обновление приоритетов загрузки чанков на основе позиции игрока"""
+    def update_chunk_priorities(self, player_position: Tuple[float, float],
+                                player_velocity: Tuple[float, float] = (0.0, 0.0)):
+        """Обновление приоритетов загрузки чанков на основе позиции и скорости игрока"""
         try:
-            player_chunk_x = int(player_position[0] // self.settings.chunk_size)
-            player_chunk_y = int(player_position[1] // self.settings.chunk_size)
+            previous_view = self.chunk_scheduler.view_chunks
+            view_chunks = self.chunk_scheduler.update(player_position, player_velocity)
+            now = time.time()
             
-            # Определяем чанки в области видимости
-            view_chunks = []
-            for dx in range(-self.settings.view_distance, self.settings.view_distance + 1):
-                for dy in range(-self.settings.view_distance, self.settings.view_distance + 1):
-                    chunk_x = player_chunk_x + dx
-                    chunk_y = player_chunk_y + dy
-                    chunk_id = f"{chunk_x}_{chunk_y}"
-                    
-                    if chunk_id not in self.chunks:
-                        # Загружаем новый чанк с высоким приоритетом
-                        self.load_chunk(chunk_x, chunk_y, priority=True)
-                    else:
-                        chunk = self.chunks[chunk_id]
-                        if chunk.state == ChunkState.LOADED:
-                            chunk.state = ChunkState.ACTIVE
-                        chunk.last_accessed = time.time()
-                        view_chunks.append(chunk_id)
+            # Активируем чанки в области видимости
+            for key in view_chunks:
+                chunk_id = self.spatial_index.get(key)
+                chunk = self.chunks.get(chunk_id) if chunk_id else None
+                if chunk is None:
+                    continue
+                if chunk.state == ChunkState.LOADED:
+                    self._set_chunk_state(chunk, ChunkState.ACTIVE)
+                chunk.last_accessed = now
+            
+            # Приближающиеся чанки догенерируются до нужной детализации
+            self._refine_chunks(view_chunks)
             
-            # Выгружаем чанки вне области видимости
-            for chunk_id, chunk in self.chunks.items():
-                if chunk_id not in view_chunks and chunk.state == ChunkState.ACTIVE:
-                    chunk.state = ChunkState.LOADED
+            # Ближайшие локации генерируются заранее
+            if self.content_pregeneration:
+                self.content_pregeneration.update(player_position)
+            
+            # Деактивируем только чанки, покинувшие область видимости
+            for key in previous_view - view_chunks:
+                chunk_id = self.spatial_index.get(key)
+                chunk = self.chunks.get(chunk_id) if chunk_id else None
+                if chunk is not None and chunk.state == ChunkState.ACTIVE:
+                    self._set_chunk_state(chunk, ChunkState.LOADED)
+            
+            # Самые срочные запросы отправляем сразу, остальные - в _on_update
+            self.chunk_scheduler.dispatch()
             
         except Exception as e:
             self._logger.error(f"Ошибка обновления приоритетов чанков: {e}")
@@ -408,6 +968,52 @@ class WorldManager(BaseComponent):
         except Exception as e:
             self._logger.error(f"Ошибка добавления колбэка выгрузки чанка: {e}")
     
+    def add_chunk_refined_callback(self, callback: Callable):
+        """Добавление колбэка для события уточнения детализации чанка"""
+        try:
+            if callback not in self.chunk_refined_callbacks:
+                self.chunk_refined_callbacks.append(callback)
+        except Exception as e:
+            self._logger.error(f"Ошибка добавления колбэка уточнения чанка: {e}")
+    
+    def add_location_entered_callback(self, callback: Callable):
+        """Добавление колбэка для события входа в локацию"""
+        try:
+            if callback not in self.location_entered_callbacks:
+                self.location_entered_callbacks.append(callback)
+        except Exception as e:
+            self._logger.error(f"Ошибка добавления колбэка входа в локацию: {e}")
+    
+    def add_location_left_callback(self, callback: Callable):
+        """Добавление колбэка для события выхода из локации"""
+        try:
+            if callback not in self.location_left_callbacks:
+                self.location_left_callbacks.append(callback)
+        except Exception as e:
+            self._logger.error(f"Ошибка добавления колбэка выхода из локации: {e}")
+    
+    def _notify_location_entered(self, structure_id: str, content: Any):
+        """Уведомление о входе в локацию с ее содержимым"""
+        try:
+            for callback in self.location_entered_callbacks:
+                try:
+                    callback(structure_id, content)
+                except Exception as e:
+                    self._logger.error(f"Ошибка в колбэке входа в локацию: {e}")
+        except Exception as e:
+            self._logger.error(f"Ошибка уведомления о входе в локацию: {e}")
+    
+    def _notify_chunk_refined(self, chunk: WorldChunk):
+        """Уведомление об уточнении детализации чанка"""
+        try:
+            for callback in self.chunk_refined_callbacks:
+                try:
+                    callback(chunk)
+                except Exception as e:
+                    self._logger.error(f"Ошибка в колбэке уточнения чанка: {e}")
+        except Exception as e:
+            self._logger.error(f"Ошибка уведомления об уточнении чанка: {e}")
+    
     def _notify_chunk_loaded(self, chunk: WorldChunk):
         """Уведомление о загрузке чанка"""
         try:
@@ -434,10 +1040,8 @@ class WorldManager(BaseComponent):
         """Получение статистики мира"""
         try:
             # Обновляем статистику
-            self.world_stats.loaded_chunks = len([c for c in self.chunks.values() 
-                                                if c.state == ChunkState.LOADED])
-            self.world_stats.active_chunks = len([c for c in self.chunks.values() 
-                                                if c.state == ChunkState.ACTIVE])
+            self.world_stats.loaded_chunks = self.chunk_state_counts[ChunkState.LOADED]
+            self.world_stats.active_chunks = self.chunk_state_counts[ChunkState.ACTIVE]
             self.world_stats.total_chunks = len(self.chunks)
             self.world_stats.last_update = time.time()
             
@@ -448,6 +1052,10 @@ class WorldManager(BaseComponent):
                     total_memory += chunk.height_map.nbytes / (1024 * 1024)  # МБ
                 if chunk.biome_map is not None:
                     total_memory += chunk.biome_map.nbytes / (1024 * 1024)  # МБ
+                if chunk.temperature_map is not None:
+                    total_memory += chunk.temperature_map.nbytes / (1024 * 1024)  # МБ
+                if chunk.humidity_map is not None:
+                    total_memory += chunk.humidity_map.nbytes / (1024 * 1024)  # МБ
             
             self.world_stats.memory_usage_mb = total_memory
             
@@ -460,7 +1068,14 @@ class WorldManager(BaseComponent):
     def save_world_state(self) -> bool:
         """Сохранение состояния мира"""
         try:
-            # TODO: Реализовать сохранение состояния мира
+            # Ландшафт неизменен после записи, обновляем метаданные структур
+            if self.chunk_store:
+                with self.generation_lock:
+                    loaded = [c for c in self.chunks.values()
+                              if c.state in [ChunkState.LOADED, ChunkState.ACTIVE]]
+                for chunk in loaded:
+                    self._persist_chunk(chunk, terrain=False)
+            
             self.last_save_time = time.time()
             self._logger.info("Состояние мира сохранено")
             return True
@@ -477,6 +1092,10 @@ class WorldManager(BaseComponent):
                 time.time() - self.last_save_time > self.settings.auto_save_interval):
                 self.save_world_state()
             
+            # Потоковая загрузка и порционная выгрузка
+            self.chunk_scheduler.dispatch()
+            self.chunk_scheduler.process_unloads()
+            
             # Обрабатываем очередь выгрузки
             self._process_unload_queue()
             
@@ -490,24 +1109,35 @@ class WorldManager(BaseComponent):
         """Обработка очереди выгрузки чанков"""
         try:
             while self.chunk_unload_queue:
-                chunk_id = self.chunk_unload_queue.pop(0)
+                chunk_id = self.chunk_unload_queue.popleft()
                 
-                if chunk_id in self.chunks:
-                    chunk = self.chunks[chunk_id]
+                chunk = self.chunks.get(chunk_id)
+                # Чанк мог быть снова запрошен до обработки очереди
+                if chunk is not None and chunk.state == ChunkState.UNLOADING:
+                    # Уведомляем о выгрузке, пока данные чанка еще доступны
+                    self._notify_chunk_unloaded(chunk)
                     
                     # Очищаем данные чанка
                     chunk.height_map = None
                     chunk.biome_map = None
+                    chunk.temperature_map = None
+                    chunk.humidity_map = None
+                    if self.content_pregeneration:
+                        for structure_id in chunk.structures:
+                            key = self.location_keys.pop(structure_id, None)
+                            if key is not None:
+                                self.content_pregeneration.unregister_location(key)
+                    
+                    # Состояние структур сохраняется до снятия их с учета
+                    if chunk.structures and self.chunk_store:
+                        self._persist_chunk(chunk, terrain=False)
+                    if self.structure_generator:
+                        self.structure_generator.release_chunk(chunk.chunk_x, chunk.chunk_y)
                     chunk.structures.clear()
                     chunk.entities.clear()
-                    chunk.state = ChunkState.UNLOADED
                     
-                    # Удаляем из индекса
-                    if (chunk.chunk_x, chunk.chunk_y) in self.spatial_index:
-                        del self.spatial_index[(chunk.chunk_x, chunk.chunk_y)]
-                    
-                    # Удаляем чанк
-                    del self.chunks[chunk_id]
+                    # Удаляем чанк и запись индекса
+                    self._remove_chunk(chunk)
                     
                     self._logger.debug(f"Чанк {chunk_id} выгружен")
             
@@ -520,6 +1150,12 @@ class WorldManager(BaseComponent):
             # Сохраняем состояние
             self.save_world_state()
             
+            # Останавливаем пул процессов первым: его колбэки передают
+            # достройку чанков в executor
+            if self.chunk_pool:
+                self.chunk_pool.shutdown(wait=True)
+                self.chunk_pool = None
+            
             # Останавливаем executor
             if self.executor:
                 self.executor.shutdown(wait=True)
@@ -527,12 +1163,23 @@ class WorldManager(BaseComponent):
             # Очищаем чанки
             self.chunks.clear()
             self.spatial_index.clear()
-            self.chunk_cache.clear()
+            self.chunk_cache.close()
+            with self._sampling_lock:
+                self._sampling_requests.clear()
+            self.navigation_graph.shutdown()
+            if self.content_pregeneration:
+                self.content_pregeneration.shutdown(wait=True)
+                self.content_pregeneration = None
+            self.location_keys.clear()
+            self.chunk_scheduler.clear()
+            self.chunk_state_counts = {state: 0 for state in ChunkState}
             
             # Очищаем колбэки
             self.chunk_loaded_callbacks.clear()
             self.chunk_unloaded_callbacks.clear()
             self.world_updated_callbacks.clear()
+            self.location_entered_callbacks.clear()
+            self.location_left_callbacks.clear()
             
             self._logger.info("Менеджер мира уничтожен")
             return True
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Тесты генерации ландшафта в пуле процессов и передачи результата в WorldManager"""
+
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.chunk_generation_pool import ChunkGenerationPool, ChunkPoolSettings, ChunkTerrain
+from src.systems.world.world_manager import WorldManager
+
+
+class ChunkGenerationPoolTest(unittest.TestCase):
+    """Генерация в рабочих процессах"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ChunkGenerationPool(ChunkPoolSettings(world_seed=1234, workers=1))
+        assert cls.pool.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown(wait=True)
+
+    def test_generation_is_deterministic(self):
+        first = self.pool.submit(2, -1, 16).result(timeout=120)
+        second = self.pool.submit(2, -1, 16).result(timeout=120)
+
+        self.assertEqual(first.seed, second.seed)
+        np.testing.assert_array_equal(first.height_map, second.height_map)
+        np.testing.assert_array_equal(first.biome_map, second.biome_map)
+
+    def test_arrays_are_copied_out_of_shared_memory(self):
+        terrain = self.pool.submit(0, 0, 16).result(timeout=120)
+
+        for array in (terrain.height_map, terrain.biome_map, terrain.temperature_map, terrain.humidity_map):
+            self.assertTrue(array.flags.writeable)
+            self.assertTrue(np.all(np.isfinite(array)))
+        # Массив остается доступным после освобождения разделяемой памяти
+        terrain.height_map[0, 0] += 1.0
+
+
+class TerrainCallbackHandoffTest(unittest.TestCase):
+    """Колбэк пула процессов только передает работу в пул потоков"""
+
+    def setUp(self):
+        self.manager = WorldManager()
+        self.manager.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="world-test")
+        self.calls = []
+        self.finished = threading.Event()
+
+        def generate(chunk_id, terrain=None):
+            self.calls.append(("generate", threading.current_thread().name, terrain))
+            return True
+
+        def finish(chunk_id, success):
+            self.calls.append(("finish", threading.current_thread().name, success))
+            self.finished.set()
+
+        self.manager._generate_chunk_content = generate
+        self.manager._finish_chunk_generation = finish
+
+    def tearDown(self):
+        self.manager.executor.shutdown(wait=True)
+
+    def _terrain(self) -> ChunkTerrain:
+        zeros = np.zeros((4, 4), dtype=np.float32)
+        return ChunkTerrain(0, 0, 4, 1, zeros, zeros.astype(np.int32), zeros, zeros)
+
+    def test_content_generation_runs_on_executor(self):
+        future = Future()
+        terrain = self._terrain()
+        future.set_result(terrain)
+
+        self.manager._on_chunk_terrain_generated("chunk_0_0", future)
+
+        self.assertTrue(self.finished.wait(timeout=5))
+        generate, finish = self.calls
+        self.assertTrue(generate[1].startswith("world-test"))
+        self.assertIs(generate[2], terrain)
+        self.assertEqual(finish[0], "finish")
+        self.assertTrue(finish[2])
+
+    def test_worker_failure_finishes_chunk(self):
+        future = Future()
+        future.set_exception(RuntimeError("worker crashed"))
+
+        self.manager._on_chunk_terrain_generated("chunk_0_0", future)
+
+        self.assertEqual(self.calls, [("finish", threading.current_thread().name, False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Тесты жизненного цикла чанков WorldManager и уведомлений подписчиков"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.world_manager import ChunkState, WorldManager
+
+
+class ChunkUnloadNotificationTest(unittest.TestCase):
+
+    def setUp(self):
+        # Без executor чанк создается, но не генерируется: данные задает тест
+        self.manager = WorldManager()
+        self.unloaded = []
+        self.manager.add_chunk_unloaded_callback(lambda chunk: self.unloaded.append(chunk.chunk_id))
+
+        self.chunk = self.manager.load_chunk(0, 0)
+        self.chunk.height_map = np.zeros((4, 4), dtype=np.float32)
+        self.manager._set_chunk_state(self.chunk, ChunkState.LOADED)
+
+    def test_cancelled_unload_does_not_notify(self):
+        self.assertTrue(self.manager.unload_chunk(0, 0))
+        self.assertIs(self.manager.load_chunk(0, 0), self.chunk)
+        self.assertEqual(self.chunk.state, ChunkState.ACTIVE)
+
+        self.manager._process_unload_queue()
+
+        self.assertEqual(self.unloaded, [])
+        self.assertIn(self.chunk.chunk_id, self.manager.chunks)
+
+    def test_unload_notifies_when_chunk_is_removed(self):
+        self.manager.unload_chunk(0, 0)
+        self.assertEqual(self.unloaded, [])
+
+        self.manager._process_unload_queue()
+
+        self.assertEqual(self.unloaded, [self.chunk.chunk_id])
+        self.assertNotIn(self.chunk.chunk_id, self.manager.chunks)
+
+
+if __name__ == "__main__":
+    unittest.main()
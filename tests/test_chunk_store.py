@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Тесты постоянного хранилища чанков"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.chunk_store import ChunkStore
+
+
+def _layers(size: int = 8):
+    rng = np.random.default_rng(7)
+    return {
+        "height_map": rng.random((size, size), dtype=np.float32),
+        "biome_map": rng.integers(0, 5, (size, size), dtype=np.int32),
+        "temperature_map": rng.random((size, size), dtype=np.float32),
+        "humidity_map": rng.random((size, size), dtype=np.float32),
+    }
+
+
+class ChunkStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ChunkStore(self.temp_dir.name, world_seed=42, generator_version="4")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        layers = _layers()
+        structures = [{"structure_id": "dungeon_0", "x": 1.0}]
+
+        self.assertTrue(self.store.save_chunk(3, -2, layers, structures))
+        self.assertTrue(self.store.contains(3, -2))
+
+        stored = self.store.load(3, -2)
+        self.assertIsNotNone(stored)
+        self.assertEqual(stored.structures, structures)
+        for name, array in layers.items():
+            np.testing.assert_array_equal(stored.layers[name], array)
+
+    def test_terrain_without_metadata_is_not_indexed(self):
+        # Сбой между записью ландшафта и метаданных
+        self.assertTrue(self.store.save_terrain(0, 0, _layers()))
+
+        self.assertFalse(self.store.contains(0, 0))
+        self.assertIsNone(self.store.load(0, 0))
+
+        # Повторное сохранение дописывает запись индекса
+        self.assertTrue(self.store.save_chunk(0, 0, _layers(), []))
+        self.assertTrue(self.store.contains(0, 0))
+
+    def test_failed_terrain_write_leaves_no_entry(self):
+        with mock.patch("src.systems.world.chunk_store.os.replace", side_effect=OSError("disk full")):
+            self.assertFalse(self.store.save_chunk(1, 1, _layers(), [{"structure_id": "tower_0"}]))
+
+        self.assertFalse(self.store.contains(1, 1))
+        self.assertEqual(os.listdir(self.store.directory), [])
+
+    def test_metadata_rewrite_keeps_terrain(self):
+        self.assertTrue(self.store.save_chunk(5, 5, _layers(), []))
+        self.assertTrue(self.store.save_chunk(5, 5, None, [{"structure_id": "city_0"}]))
+
+        stored = self.store.load(5, 5)
+        self.assertEqual(stored.structures, [{"structure_id": "city_0"}])
+        self.assertIn("height_map", stored.layers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Тесты планировщика потоковой загрузки чанков"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.chunk_streaming import ChunkStreamScheduler, StreamingSettings
+
+
+class FakeWorld:
+    """Минимальный менеджер мира для планировщика"""
+
+    def __init__(self, chunk_size: int = 16, view_distance: int = 1):
+        self.settings = SimpleNamespace(chunk_size=chunk_size, view_distance=view_distance)
+        self.chunks = {}
+        self.loaded = []
+        self.unloaded = []
+
+    def add_chunk(self, x: int, y: int):
+        self.chunks[f"chunk_{x}_{y}"] = SimpleNamespace(chunk_x=x, chunk_y=y)
+
+    def is_chunk_resident(self, x: int, y: int) -> bool:
+        return f"chunk_{x}_{y}" in self.chunks
+
+    def load_chunk(self, x: int, y: int, priority: bool = False):
+        self.loaded.append((x, y))
+        self.add_chunk(x, y)
+        return f"chunk_{x}_{y}"
+
+    def unload_chunk(self, x: int, y: int) -> bool:
+        self.unloaded.append((x, y))
+        return self.chunks.pop(f"chunk_{x}_{y}", None) is not None
+
+
+class ChunkStreamSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.world = FakeWorld()
+        self.scheduler = ChunkStreamScheduler(
+            self.world, StreamingSettings(unload_hysteresis=1, unload_scan_interval=1.0)
+        )
+        self.clock = 100.0
+        patcher = mock.patch("src.systems.world.chunk_streaming.time.time", lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_view_chunks_nearest_first(self):
+        view = self.scheduler.update((8.0, 8.0))
+        self.assertEqual(len(view), 9)
+
+        self.scheduler.dispatch()
+        self.assertEqual(self.world.loaded[0], (0, 0))
+
+    def test_far_chunk_unloads_on_timer_without_player_moving(self):
+        self.scheduler.update((8.0, 8.0))
+        self.assertEqual(self.scheduler.process_unloads(), 0)
+
+        # Чанк появился после сбора кандидатов (например, упреждающая загрузка)
+        self.world.add_chunk(6, 0)
+        self.scheduler.update((9.0, 9.0))
+        self.assertEqual(self.scheduler.process_unloads(), 0)
+
+        self.clock += 1.5
+        self.assertEqual(self.scheduler.process_unloads(), 1)
+        self.assertEqual(self.world.unloaded, [(6, 0)])
+
+    def test_chunks_inside_hysteresis_are_kept(self):
+        self.world.add_chunk(2, 0)
+        self.scheduler.update((8.0, 8.0))
+        self.clock += 5.0
+
+        self.assertEqual(self.scheduler.process_unloads(), 0)
+        self.assertTrue(self.world.is_chunk_resident(2, 0))
+
+    def test_prefetched_chunks_survive_rescan(self):
+        # Быстрое движение: прогноз уходит дальше полосы гистерезиса
+        velocity = (40.0, 0.0)
+        self.scheduler.update((8.0, 8.0), velocity)
+        while self.scheduler.dispatch():
+            pass
+        self.assertTrue(self.world.is_chunk_resident(5, 0))
+
+        for _ in range(3):
+            self.clock += 1.5
+            self.scheduler.update((8.0, 8.0), velocity)
+            self.scheduler.process_unloads()
+
+        self.assertEqual(self.world.unloaded, [])
+        self.assertTrue(self.world.is_chunk_resident(5, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Тесты предгенерации контента локаций"""
+
+import os
+import sys
+import unittest
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.content_pregeneration import (
+    ContentKind, ContentPregenerationService, PregenerationSettings, location_key
+)
+from src.systems.world.structure_generator import StructureType
+from src.systems.world.world_manager import WorldChunk, WorldManager
+
+
+def _structure(structure_id: str, structure_type: StructureType, x: float, y: float):
+    return SimpleNamespace(structure_id=structure_id, position=(x, y, 0.0),
+                           template=SimpleNamespace(structure_type=structure_type))
+
+
+class PregenerationKeysTest(unittest.TestCase):
+
+    def setUp(self):
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.content_pregeneration.shutdown(wait=True)
+
+    def _manager(self, world_seed: int) -> WorldManager:
+        manager = WorldManager()
+        manager.content_pregeneration = ContentPregenerationService(PregenerationSettings(world_seed=world_seed))
+        self.managers.append(manager)
+        return manager
+
+    def _register(self, manager: WorldManager, suffix: str):
+        chunk = WorldChunk(chunk_id="chunk_3_-2", chunk_x=3, chunk_y=-2, chunk_size=64)
+        structures = [
+            _structure(f"dungeon_{suffix}", StructureType.DUNGEON, 200.0, -100.0),
+            _structure(f"ruins_{suffix}", StructureType.RUINS, 210.0, -110.0),
+            _structure(f"tower_{suffix}", StructureType.TOWER, 220.0, -120.0),
+        ]
+        manager._register_content_locations(chunk, structures)
+        return structures
+
+    def test_keys_and_seeds_do_not_depend_on_structure_ids(self):
+        first, second = self._manager(1234), self._manager(1234)
+        first_structures = self._register(first, "1700000000000_1111")
+        second_structures = self._register(second, "1700000005000_2222")
+
+        self.assertEqual(list(first.location_keys.values()), [location_key(3, -2, 0), location_key(3, -2, 2)])
+        self.assertEqual(list(first.location_keys.values()), list(second.location_keys.values()))
+
+        for key in first.location_keys.values():
+            a = first.content_pregeneration.locations[key]
+            b = second.content_pregeneration.locations[key]
+            self.assertEqual((a.kind, a.seed, a.content_type), (b.kind, b.seed, b.content_type))
+
+        # Вход в локацию по structure_id находит ее ключ
+        self.assertEqual(first.location_keys[first_structures[0].structure_id],
+                         second.location_keys[second_structures[0].structure_id])
+
+    def test_world_seed_changes_location_seed(self):
+        first, second = self._manager(1), self._manager(2)
+        self._register(first, "a")
+        self._register(second, "a")
+
+        key = location_key(3, -2, 0)
+        self.assertNotEqual(first.content_pregeneration.locations[key].seed,
+                            second.content_pregeneration.locations[key].seed)
+
+
+class AcquireTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = ContentPregenerationService(PregenerationSettings(world_seed=77))
+        self.service.register_location("0_0_0", ContentKind.SETTLEMENT, (10.0, 10.0))
+
+    def tearDown(self):
+        self.service.shutdown(wait=True)
+
+    def test_unfinished_generation_is_not_awaited(self):
+        # Фоновая задача, которая никогда не завершится
+        self.service.pending["0_0_0"] = Future()
+
+        content = self.service.acquire("0_0_0")
+
+        self.assertIsNotNone(content)
+        self.assertEqual(self.service.stats["misses"], 1)
+        self.assertEqual(self.service.stats["waited"], 0)
+        self.assertTrue(self.service.pending["0_0_0"].cancelled())
+
+    def test_finished_generation_is_used(self):
+        future = Future()
+        payload = self.service._generate_local(self.service.locations["0_0_0"])
+        future.set_result(payload)
+        self.service.pending["0_0_0"] = future
+
+        self.assertIs(self.service.acquire("0_0_0"), payload)
+        self.assertEqual(self.service.stats["waited"], 1)
+
+        # Повторный вход берет контент из пула готовых
+        self.assertIs(self.service.acquire("0_0_0"), payload)
+        self.assertEqual(self.service.stats["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
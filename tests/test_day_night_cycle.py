@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Тесты таблицы освещения DayNightCycle"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.day_night_cycle import DayNightCycle, LightingData, MoonPhase
+
+MINUTE = 1.0 / 60.0
+
+
+class LightingTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cycle = DayNightCycle()
+        self.assertTrue(self.cycle._on_initialize())
+        # Полнолуние: наибольший вклад луны в окружающий свет
+        self.day = next(day for day in range(1, 366)
+                        if self.cycle._calculate_moon_phase(day) == MoonPhase.FULL_MOON)
+
+    def _assert_matches_formulas(self, current_time: float) -> LightingData:
+        cycle = self.cycle
+        time_data = cycle._create_initial_time()
+        time_data.current_time = current_time
+        time_data.day_of_year = self.day
+        lighting = LightingData()
+
+        cycle._get_lighting_table().apply(time_data, lighting)
+
+        moon_illumination = cycle._calculate_moon_illumination(cycle._calculate_moon_phase(self.day))
+        night = current_time < 6.0 or current_time > 18.0
+        message = f"{current_time * 60.0:.2f} мин"
+        self.assertEqual(time_data.time_of_day, cycle._get_time_of_day(current_time), message)
+        self.assertAlmostEqual(time_data.ambient_light,
+                               cycle._calculate_ambient_light(current_time, moon_illumination),
+                               places=9, msg=message)
+        self.assertAlmostEqual(lighting.sun_intensity, cycle._calculate_sun_intensity(current_time),
+                               places=9, msg=message)
+        self.assertAlmostEqual(lighting.moon_intensity, moon_illumination * 0.3 if night else 0.0,
+                               places=9, msg=message)
+        self.assertEqual(lighting.shadow_strength, 0.8 if night else 0.5, message)
+        self.assertEqual(time_data.sky_color, cycle._calculate_sky_color(current_time, 0.0), message)
+        return lighting
+
+    def test_boundary_minutes(self):
+        for hour in (4.0, 5.0, 6.0, 7.0, 8.0, 12.0, 14.0, 16.0, 17.0, 18.0, 19.0, 20.0, 22.0):
+            for offset in (-MINUTE, -0.5 * MINUTE, -1e-6, 0.0, 1e-6, 0.5 * MINUTE, MINUTE):
+                self._assert_matches_formulas(hour + offset)
+
+    def test_dusk_moonlight_starts_right_after_six_pm(self):
+        for current_time in (18.0 + 1e-6, 18.0 + 0.5 * MINUTE):
+            lighting = self._assert_matches_formulas(current_time)
+            self.assertGreater(lighting.moon_intensity, 0.0)
+
+    def test_random_times(self):
+        for current_time in np.random.default_rng(11).uniform(0.0, 24.0, 500).tolist():
+            self._assert_matches_formulas(current_time)
+
+    def test_settings_boundaries_off_the_minute_grid(self):
+        self.cycle.settings.dawn_start_hour = 5.0 + 0.25 * MINUTE
+        for offset in (-1e-6, 0.0, 1e-6):
+            self._assert_matches_formulas(self.cycle.settings.dawn_start_hour + offset)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Тесты исследования и видимости карт подземелий"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.dungeon_map_system import DungeonMapSettings, DungeonMapSystem, DungeonMapType
+
+
+class DungeonExplorationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.system = DungeonMapSystem()
+        settings = DungeonMapSettings(map_type=DungeonMapType.FLOOR_PLAN, grid_size=16)
+        self.map_id = self.system.create_dungeon_map("crypt", {}, settings).map_id
+
+    def test_explored_cell_does_not_stay_visible(self):
+        self.assertTrue(self.system.explore_cell(self.map_id, "hero", 1, 1))
+        self.system.reveal_area(self.map_id, "hero", 10, 10, radius=2, line_of_sight=False)
+
+        exploration = self.system.get_exploration_data(self.map_id, "hero")
+        self.assertTrue(exploration.explored[1, 1])
+        self.assertFalse(exploration.visible[1, 1])
+        self.assertTrue(exploration.visible[10, 10])
+
+    def test_moving_view_replaces_visible_area(self):
+        self.system.reveal_area(self.map_id, "hero", 3, 3, radius=2, line_of_sight=False)
+        visible = self.system.reveal_area(self.map_id, "hero", 12, 12, radius=2, line_of_sight=False)
+
+        exploration = self.system.get_exploration_data(self.map_id, "hero")
+        self.assertEqual(int(np.count_nonzero(exploration.visible)), visible)
+        self.assertFalse(exploration.visible[3, 3])
+        self.assertTrue(exploration.explored[3, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
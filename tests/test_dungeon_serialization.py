@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Тесты двоичной сериализации подземелий и карт подземелий"""
+
+import os
+import struct
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.content_pregeneration import ContentGenerators, ContentKind
+from src.systems.world.dungeon_map_system import DungeonMapSettings, DungeonMapSystem, DungeonMapType
+from src.systems.world.dungeon_serialization import (
+    DUNGEON_MAGIC, FORMAT_VERSION, GRID_ENCODING_RAW, decode_dungeon, decode_dungeon_map,
+    decode_runs, encode_dungeon, encode_dungeon_map, encode_runs
+)
+
+
+def _corridor_paths(dungeon):
+    return {corridor_id: [tuple(point) for point in corridor.path]
+            for corridor_id, corridor in dungeon.corridors.items()}
+
+
+class DungeonSerializationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dungeon = ContentGenerators().generate(ContentKind.DUNGEON, "crypt", 11)
+
+    def _assert_same_dungeon(self, decoded):
+        dungeon = self.dungeon
+        self.assertEqual(decoded.dungeon_id, dungeon.dungeon_id)
+        self.assertEqual(decoded.dungeon_type, dungeon.dungeon_type)
+        self.assertEqual(decoded.settings, dungeon.settings)
+        self.assertEqual(decoded.rooms, dungeon.rooms)
+        self.assertEqual(_corridor_paths(decoded), _corridor_paths(dungeon))
+        for corridor_id, corridor in dungeon.corridors.items():
+            restored = decoded.corridors[corridor_id]
+            self.assertEqual((restored.start_room, restored.end_room, restored.traps, restored.width),
+                             (corridor.start_room, corridor.end_room, corridor.traps, corridor.width))
+        np.testing.assert_array_equal(decoded.grid, dungeon.grid)
+        self.assertEqual((decoded.entrance_room, decoded.exit_room, decoded.boss_room),
+                         (dungeon.entrance_room or "", dungeon.exit_room or "", dungeon.boss_room or ""))
+        self.assertEqual(decoded.treasure_rooms, dungeon.treasure_rooms)
+        self.assertEqual(decoded.trap_rooms, dungeon.trap_rooms)
+        self.assertEqual(decoded.generation_time, dungeon.generation_time)
+
+    def test_rle_round_trip(self):
+        data = encode_dungeon(self.dungeon)
+        self._assert_same_dungeon(decode_dungeon(data))
+        self.assertLess(len(data), len(encode_dungeon(self.dungeon, GRID_ENCODING_RAW)))
+
+    def test_raw_round_trip(self):
+        self._assert_same_dungeon(decode_dungeon(encode_dungeon(self.dungeon, GRID_ENCODING_RAW)))
+
+    def test_raw_grid_is_read_only_view(self):
+        data = encode_dungeon(self.dungeon, GRID_ENCODING_RAW)
+        grid = decode_dungeon(data).grid
+        self.assertFalse(grid.flags.writeable)
+
+        copy = decode_dungeon(data, copy_grid=True).grid
+        self.assertTrue(copy.flags.writeable)
+        np.testing.assert_array_equal(copy, self.dungeon.grid)
+
+        # Представление над изменяемым буфером видит его изменения: данные не копировались
+        buffer = bytearray(data)
+        view = decode_dungeon(buffer).grid
+        offset = bytes(buffer).find(self.dungeon.grid.astype(np.int8).tobytes())
+        buffer[offset] = (buffer[offset] + 1) % 128
+        self.assertNotEqual(int(view[0, 0]), int(self.dungeon.grid[0, 0]))
+
+    def test_rejects_foreign_magic_and_version(self):
+        data = encode_dungeon(self.dungeon)
+        with self.assertRaises(ValueError):
+            decode_dungeon(b"XXXX" + data[4:])
+        with self.assertRaises(ValueError):
+            decode_dungeon(struct.pack("<4sHH", DUNGEON_MAGIC, FORMAT_VERSION + 1, 0) + data[8:])
+
+        dungeon_map = DungeonMapSystem().create_dungeon_map(
+            "crypt", {}, DungeonMapSettings(map_type=DungeonMapType.FLOOR_PLAN, grid_size=4)
+        )
+        with self.assertRaises(ValueError):
+            decode_dungeon(encode_dungeon_map(dungeon_map))
+        with self.assertRaises(ValueError):
+            decode_dungeon_map(data)
+
+    def test_runs_round_trip(self):
+        grid = np.array([[0, 0, 1, 1], [1, 2, 2, 0]], dtype=np.int8)
+        values, lengths = encode_runs(grid.ravel())
+        self.assertEqual(values.tolist(), [0, 1, 2, 0])
+        self.assertEqual(lengths.tolist(), [2, 3, 2, 1])
+        np.testing.assert_array_equal(decode_runs(values, lengths, grid.shape), grid)
+
+
+class DungeonMapSerializationTest(unittest.TestCase):
+
+    def setUp(self):
+        system = DungeonMapSystem()
+        dungeon_data = {
+            "rooms": [{"x": 2, "y": 2, "width": 4, "height": 3, "id": "hall", "type": "boss"}],
+            "corridors": [{"x": 7, "y": 3, "width": 5, "height": 0, "id": "passage", "type": "narrow"}],
+        }
+        settings = DungeonMapSettings(map_type=DungeonMapType.ROOM_LAYOUT, grid_size=16, show_secrets=True)
+        self.dungeon_map = system.create_dungeon_map("crypt", dungeon_data, settings)
+        self.dungeon_map.secret_areas = {(1, 2), (9, 3)}
+        system.reveal_area(self.dungeon_map.map_id, "hero", 3, 3, radius=4)
+
+    def test_round_trip(self):
+        for encoding in ("rle", GRID_ENCODING_RAW):
+            decoded = decode_dungeon_map(encode_dungeon_map(self.dungeon_map, encoding))
+            original = self.dungeon_map
+
+            self.assertEqual((decoded.dungeon_id, decoded.map_id), (original.dungeon_id, original.map_id))
+            self.assertEqual(decoded.settings, original.settings)
+            self.assertEqual((decoded.grid_width, decoded.grid_height), (original.grid_width, original.grid_height))
+            self.assertEqual((decoded.created_at, decoded.last_updated), (original.created_at, original.last_updated))
+            self.assertEqual(decoded.secret_areas, original.secret_areas)
+            for name in ("explored", "discovered", "opaque"):
+                np.testing.assert_array_equal(getattr(decoded, name), getattr(original, name))
+
+            self.assertEqual(list(decoded.layers), list(original.layers))
+            for layer_id, layer in original.layers.items():
+                restored = decoded.layers[layer_id]
+                self.assertEqual((restored.layer_type, restored.visible, restored.z_order),
+                                 (layer.layer_type, layer.visible, layer.z_order))
+                self.assertAlmostEqual(restored.opacity, layer.opacity, places=6)
+                np.testing.assert_array_equal(restored.area_codes, layer.area_codes)
+                self.assertEqual({position: cell.metadata for position, cell in restored.cells.items()},
+                                 {position: cell.metadata for position, cell in layer.cells.items()})
+                self.assertEqual({position: cell.area_type for position, cell in restored.cells.items()},
+                                 {position: cell.area_type for position, cell in layer.cells.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()
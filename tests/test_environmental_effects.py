@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Тесты агрегатов модификаторов экологических эффектов"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.environmental_effects import EnvironmentalEffects, ModifierAggregate
+
+TOLERANCE = 1e-12
+MODIFIER_NAMES = ("speed", "accuracy", "fear", "stamina", "visibility")
+
+
+def _brute_force(terms, clock):
+    """Сумма modifiers * (anchor - clock) прямым перебором: (интенсивность, модификаторы)"""
+    total = 0.0
+    modifiers = {}
+    for anchor, values in terms:
+        total += anchor - clock
+        for name, value in values.items():
+            modifiers[name] = modifiers.get(name, 0.0) + value * (anchor - clock)
+    return total, modifiers
+
+
+class _BruteForceAssertions:
+
+    def assert_matches(self, total, modifiers, expected_total, expected_modifiers):
+        self.assertAlmostEqual(total, expected_total, delta=TOLERANCE)
+        self.assertEqual(set(modifiers), set(expected_modifiers))
+        for name, value in expected_modifiers.items():
+            self.assertAlmostEqual(modifiers[name], value, delta=TOLERANCE, msg=name)
+
+
+class ModifierAggregateFuzzTest(_BruteForceAssertions, unittest.TestCase):
+
+    def test_random_operations_match_brute_force(self):
+        rng = random.Random(1234)
+        aggregate = ModifierAggregate()
+        terms = []
+        clock = 0.0
+
+        for _ in range(2000):
+            operation = rng.random()
+            if operation < 0.45 or not terms:
+                names = rng.sample(MODIFIER_NAMES, rng.randint(1, len(MODIFIER_NAMES)))
+                values = {name: rng.uniform(-1.0, 1.0) for name in names}
+                anchor = clock + rng.uniform(0.0, 1.0)
+                aggregate.add(values, anchor)
+                terms.append((anchor, values))
+            elif operation < 0.85:
+                anchor, values = terms.pop(rng.randrange(len(terms)))
+                aggregate.subtract(values, anchor)
+            elif operation < 0.97:
+                clock += rng.uniform(0.0, 0.05)
+            else:
+                aggregate.clear()
+                terms.clear()
+
+            expected_total, expected_modifiers = _brute_force(terms, clock)
+            self.assertEqual(aggregate.count, len(terms))
+            self.assert_matches(aggregate.total_intensity(clock), aggregate.modifiers(clock),
+                                expected_total, expected_modifiers)
+
+
+class EffectStackFuzzTest(_BruteForceAssertions, unittest.TestCase):
+
+    def _run(self, stacking_enabled: bool, seed: int):
+        system = EnvironmentalEffects()
+        system._on_initialize()
+        system.settings.stacking_enabled = stacking_enabled
+        system.settings.max_effects = 12
+        rng = random.Random(seed)
+        templates = sorted(system.effect_templates)
+
+        # Независимая запись: effect_id -> (anchor, модификаторы, цель, тип)
+        applied = {}
+        stack_members = {effect_type: [] for effect_type in system.effect_stacks}
+
+        for _ in range(400):
+            operation = rng.random()
+            if operation < 0.5 or not system.active_effects:
+                template = rng.choice(templates)
+                intensity = rng.uniform(0.1, 1.0)
+                target = rng.choice(("player", "npc"))
+                effect_id = system.apply_environmental_effect(template, intensity, duration=1e6,
+                                                              target_type=target)
+                effect_type = system.effect_templates[template]["effect_type"]
+                applied[effect_id] = (intensity + system.decay_clock,
+                                      system.effect_templates[template]["modifiers"], target, effect_type)
+                # Без наложения новый эффект вытесняет стек своего типа
+                if not stacking_enabled:
+                    stack_members[effect_type].clear()
+                stack_members[effect_type].append(effect_id)
+            elif operation < 0.8:
+                system.remove_effect(rng.choice(sorted(system.active_effects)))
+            else:
+                system.update_effects(rng.uniform(0.0, 0.5))
+
+            clock = system.decay_clock
+            active = [applied[effect_id] for effect_id in system.active_effects]
+            for target in ("player", "npc"):
+                _, expected = _brute_force([(anchor, values) for anchor, values, effect_target, _ in active
+                                            if effect_target == target], clock)
+                self.assert_matches(0.0, system.get_effect_modifiers(target), 0.0, expected)
+
+            for effect_type, members in stack_members.items():
+                members[:] = [effect_id for effect_id in members if effect_id in system.active_effects]
+                stack = system.get_effect_stack(effect_type)
+                self.assertEqual(set(stack.effects), set(members))
+                expected_total, expected = _brute_force([applied[effect_id][:2] for effect_id in members], clock)
+                self.assert_matches(stack.total_intensity, stack.combined_modifiers, expected_total, expected)
+
+    def test_stacking_effects_match_brute_force(self):
+        self._run(stacking_enabled=True, seed=5)
+
+    def test_replacing_effects_match_brute_force(self):
+        self._run(stacking_enabled=False, seed=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Тесты гидравлической эрозии генератора высот"""
+
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.height_map_generator import HeightMapGenerator
+
+
+class ErosionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = HeightMapGenerator()
+        self.generator.random_generator = random.Random(11)
+
+    def _assert_stable(self, height_map: np.ndarray, eroded: np.ndarray):
+        self.assertEqual(eroded.shape, height_map.shape)
+        self.assertTrue(np.all(np.isfinite(eroded)))
+        # Эрозия только перераспределяет материал в пределах исходного рельефа
+        self.assertGreaterEqual(eroded.min(), height_map.min() - 1e-3)
+        self.assertLessEqual(eroded.max(), height_map.max() + 1e-3)
+        # Граница чанка общая с соседями и не меняется
+        np.testing.assert_array_equal(eroded[0], height_map[0])
+        np.testing.assert_array_equal(eroded[-1], height_map[-1])
+        np.testing.assert_array_equal(eroded[:, 0], height_map[:, 0])
+        np.testing.assert_array_equal(eroded[:, -1], height_map[:, -1])
+
+    def test_rough_terrain_stays_finite(self):
+        rng = np.random.default_rng(3)
+        height_map = (rng.random((33, 33)) * 800.0 - 100.0).astype(np.float32)
+
+        eroded = self.generator._apply_erosion(height_map, iterations=20000)
+
+        self._assert_stable(height_map, eroded)
+
+    def test_crowded_droplets_on_spike_stay_finite(self):
+        # Много капель на маленькой карте сходятся в одни и те же клетки
+        height_map = np.zeros((5, 5), dtype=np.float32)
+        height_map[2, 2] = 1000.0
+
+        eroded = self.generator._apply_erosion(height_map, iterations=5000)
+
+        self._assert_stable(height_map, eroded)
+
+    def test_flat_and_tiny_maps_are_unchanged(self):
+        flat = np.full((16, 16), 5.0, dtype=np.float32)
+        np.testing.assert_array_equal(self.generator._apply_erosion(flat, iterations=1000), flat)
+
+        tiny = np.arange(4, dtype=np.float32).reshape(2, 2)
+        self.assertIs(self.generator._apply_erosion(tiny), tiny)
+
+
+if __name__ == "__main__":
+    unittest.main()
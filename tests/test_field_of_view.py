@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Тесты поля зрения и раскрытия области карты подземелья"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.dungeon_map_system import DungeonMapSettings, DungeonMapSystem, DungeonMapType
+from src.systems.world.field_of_view import compute_disk, compute_field_of_view
+
+
+def _visible_cells(fov):
+    ys, xs = np.nonzero(fov.mask)
+    return set(zip((xs + fov.min_x).tolist(), (ys + fov.min_y).tolist()))
+
+
+class FieldOfViewTest(unittest.TestCase):
+
+    def test_open_field_matches_disk(self):
+        opaque = np.zeros((20, 24), dtype=bool)
+        for origin in ((10, 10), (1, 2), (23, 19)):
+            fov = compute_field_of_view(opaque, origin[0], origin[1], 5)
+            disk = compute_disk(24, 20, origin[0], origin[1], 5)
+            self.assertEqual(fov.bounds, disk.bounds)
+            np.testing.assert_array_equal(fov.mask, disk.mask)
+
+    def test_wall_column_blocks_vision(self):
+        opaque = np.zeros((21, 21), dtype=bool)
+        opaque[:, 12] = True
+
+        cells = _visible_cells(compute_field_of_view(opaque, 10, 10, 6))
+
+        self.assertIn((12, 10), cells)
+        self.assertIn((11, 12), cells)
+        self.assertFalse(any(x > 12 for x, _ in cells))
+        self.assertIn((4, 10), cells)
+
+    def test_corners_are_clipped(self):
+        fov = compute_field_of_view(np.zeros((21, 21), dtype=bool), 10, 10, 4)
+        cells = _visible_cells(fov)
+
+        self.assertEqual(fov.bounds, (6, 6, 15, 15))
+        for x, y in ((14, 10), (10, 6), (12, 13)):
+            self.assertIn((x, y), cells)
+        for x, y in ((14, 14), (6, 6), (13, 13), (14, 7)):
+            self.assertNotIn((x, y), cells)
+
+    def test_walled_in_origin_sees_only_neighbours(self):
+        opaque = np.ones((9, 9), dtype=bool)
+        opaque[4, 4] = False
+
+        fov = compute_field_of_view(opaque, 4, 4, 4)
+
+        self.assertEqual(fov.visible_count, 9)
+        self.assertEqual(_visible_cells(fov), {(x, y) for x in range(3, 6) for y in range(3, 6)})
+
+
+class RevealAreaEventTest(unittest.TestCase):
+
+    def setUp(self):
+        self.system = DungeonMapSystem()
+        settings = DungeonMapSettings(map_type=DungeonMapType.FLOOR_PLAN, grid_size=16)
+        self.map_id = self.system.create_dungeon_map("crypt", {}, settings).map_id
+        self.system.set_map_opacity(self.map_id, np.zeros((16, 16), dtype=bool))
+
+        self.events = []
+        self.system.add_cells_revealed_callback(
+            lambda map_id, character_id, cells: self.events.append((map_id, character_id, cells))
+        )
+
+    def test_reveal_sends_one_event_with_new_cells(self):
+        visible = self.system.reveal_area(self.map_id, "hero", 5, 5, radius=3)
+
+        self.assertEqual(len(self.events), 1)
+        map_id, character_id, cells = self.events[0]
+        self.assertEqual((map_id, character_id), (self.map_id, "hero"))
+        self.assertEqual(cells.dtype, np.int32)
+        self.assertEqual(cells.shape, (visible, 2))
+        expected = _visible_cells(compute_disk(16, 16, 5, 5, 3))
+        self.assertEqual({tuple(cell) for cell in cells.tolist()}, expected)
+
+        # Повторный обзор не дает событий, сдвиг - только новые ячейки
+        self.system.reveal_area(self.map_id, "hero", 5, 5, radius=3)
+        self.assertEqual(len(self.events), 1)
+
+        self.system.reveal_area(self.map_id, "hero", 6, 5, radius=3)
+        self.assertEqual(len(self.events), 2)
+        shifted = {tuple(cell) for cell in self.events[1][2].tolist()}
+        self.assertEqual(shifted, _visible_cells(compute_disk(16, 16, 6, 5, 3)) - expected)
+
+        exploration = self.system.get_exploration_data(self.map_id, "hero")
+        self.assertEqual(exploration.explored_count, len(expected | shifted))
+
+
+if __name__ == "__main__":
+    unittest.main()
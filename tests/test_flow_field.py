@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Тесты полей потока и их подключения к AI системе"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.flow_field import FlowFieldService
+from src.systems.world.pathfinding import GridMap, PathfindingService
+
+try:
+    from src.systems.ai.ai_system import AISystem, AIType
+    AI_AVAILABLE = True
+except ImportError:
+    # Пакет AI без PyTorch не импортируется
+    AI_AVAILABLE = False
+
+
+def _arena_service() -> FlowFieldService:
+    pathfinding = PathfindingService()
+    pathfinding.register_map(GridMap.from_walkable("arena", np.ones((16, 16), dtype=bool)))
+    return FlowFieldService(pathfinding)
+
+
+class FlowFieldServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = _arena_service()
+
+    def tearDown(self):
+        self.service.pathfinding.shutdown()
+
+    def test_direction_points_to_goal(self):
+        self.service.set_goal("player", "arena", 2.0, 2.0)
+
+        dx, dy = self.service.get_direction("player", 12.0, 12.0)
+
+        self.assertLess(dx, 0.0)
+        self.assertLess(dy, 0.0)
+        self.assertEqual(self.service.get_distance("player", 2.0, 2.0), 0.0)
+
+    def test_moving_goal_updates_field(self):
+        self.service.set_goal("player", "arena", 2.0, 2.0)
+        self.service.set_goal("player", "arena", 3.0, 2.0)
+
+        self.assertEqual(self.service.stats["incremental_updates"], 1)
+        self.assertEqual(self.service.get_distance("player", 3.0, 2.0), 0.0)
+
+        self.service.set_goal("player", "arena", 14.0, 2.0)
+        dx, dy = self.service.get_direction("player", 12.0, 12.0)
+        self.assertGreaterEqual(dx, 0.0)
+        self.assertLess(dy, 0.0)
+
+
+@unittest.skipUnless(AI_AVAILABLE, "AI система недоступна без PyTorch")
+class AIFlowFieldTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = _arena_service()
+        self.ai_system = AISystem()
+        self.ai_system.set_flow_field_service(self.service)
+        self.ai_system.update_entity_position("player", (2.0, 2.0, 0.0), entity_type="player")
+        self.assertTrue(self.ai_system.track_flow_target("player", "arena"))
+        self.ai_system.register_entity("wolf", AIType.STATE_MACHINE, (12.0, 12.0, 0.0))
+        self.wolf = self.ai_system.ai_entities["wolf"]
+        self.wolf.target_entity = "player"
+
+    def tearDown(self):
+        self.service.pathfinding.shutdown()
+
+    def test_chaser_follows_moving_target(self):
+        dx, dy = self.ai_system.get_movement_direction(self.wolf)
+        self.assertLess(dx, 0.0)
+        self.assertLess(dy, 0.0)
+
+        self.ai_system.update_entity_position("player", (14.0, 2.0, 0.0))
+
+        self.assertEqual(self.service.fields["player"].goal, (14, 2))
+        dx, dy = self.ai_system.get_movement_direction(self.wolf)
+        self.assertGreaterEqual(dx, 0.0)
+        self.assertLess(dy, 0.0)
+
+    def test_untracked_target_drops_field(self):
+        self.ai_system.unregister_entity("player")
+
+        self.assertFalse(self.service.has_goal("player"))
+        self.assertIsNone(self.ai_system.get_movement_direction(self.wolf))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Тесты таблицы сумм сеток генераторов"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.grid_utils import free_window_positions, occupancy_table, window_occupancy
+
+
+class GridUtilsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = np.random.default_rng(5).choice([0, 0, 0, 1, 2], size=(13, 17))
+
+    def test_window_counts_match_brute_force(self):
+        table = occupancy_table(self.grid)
+
+        for width, height in ((1, 1), (3, 2), (17, 13), (4, 7)):
+            counts = window_occupancy(table, width, height)
+            for y in range(counts.shape[0]):
+                for x in range(counts.shape[1]):
+                    window = self.grid[y:y + height, x:x + width]
+                    self.assertEqual(counts[y, x], np.count_nonzero(window))
+
+    def test_free_positions_are_empty_windows(self):
+        positions = free_window_positions(self.grid, 2, 2)
+
+        for x, y in positions:
+            self.assertFalse(self.grid[y:y + 2, x:x + 2].any())
+        self.assertEqual(len(free_window_positions(self.grid, 18, 1)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
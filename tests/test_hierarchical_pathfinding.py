@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Тесты иерархического поиска пути и препятствий навигации"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.hierarchical_pathfinding import HierarchicalPathfinder
+from src.systems.world.pathfinding import GridMap
+from src.systems.world.unified_building_system import UnifiedBuildingSystem
+
+CELLS = 8
+
+
+def _open_grid(key) -> GridMap:
+    return GridMap.from_walkable(f"chunk_{key[0]}_{key[1]}", np.ones((CELLS + 1, CELLS + 1), dtype=bool))
+
+
+class ObstacleOverlayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = HierarchicalPathfinder(chunk_size=CELLS)
+        for key in ((0, 0), (1, 0)):
+            self.assertTrue(self.graph.register_chunk(*key, _open_grid(key)))
+
+    def tearDown(self):
+        self.graph.shutdown()
+
+    def _reload_chunks(self):
+        for key in ((0, 0), (1, 0)):
+            self.graph.unregister_chunk(*key)
+        for key in ((0, 0), (1, 0)):
+            self.graph.register_chunk(*key, _open_grid(key))
+
+    def _route_found(self) -> bool:
+        result = self.graph.find_path((2.0, 4.0), (14.0, 4.0))
+        return result is not None and result.found
+
+    def test_obstacle_survives_chunk_reregistration(self):
+        self.assertTrue(self._route_found())
+
+        # Стена вдоль общей границы чанков
+        affected = self.graph.add_obstacle("wall", 7.0, 0.0, 9.0, 8.0)
+        self.assertEqual(sorted(affected), [(0, 0), (1, 0)])
+        self.assertFalse(self._route_found())
+
+        self._reload_chunks()
+        self.assertFalse(self._route_found())
+
+    def test_remove_obstacle_reopens_route(self):
+        self.graph.add_obstacle("wall", 7.0, 0.0, 9.0, 8.0)
+        self.assertFalse(self._route_found())
+
+        self.assertEqual(sorted(self.graph.remove_obstacle("wall")), [(0, 0), (1, 0)])
+        self.assertTrue(self._route_found())
+        self.assertEqual(self.graph.remove_obstacle("wall"), [])
+
+        # После перезагрузки снятое препятствие не возвращается
+        self._reload_chunks()
+        self.assertTrue(self._route_found())
+
+    def test_removing_one_of_overlapping_obstacles_keeps_other(self):
+        self.graph.add_obstacle("wall", 7.0, 0.0, 9.0, 8.0)
+        self.graph.add_obstacle("gate", 7.0, 3.0, 9.0, 5.0)
+
+        self.graph.remove_obstacle("gate")
+
+        self.assertFalse(self._route_found())
+        self.assertTrue(self.graph.has_obstacle("wall"))
+
+    def test_obstacle_added_before_chunk_load(self):
+        self.graph.unregister_chunk(1, 0)
+        self.graph.add_obstacle("wall", 10.0, 0.0, 12.0, 8.0)
+
+        self.graph.register_chunk(1, 0, _open_grid((1, 0)))
+
+        self.assertFalse(self._route_found())
+
+
+class BuildingNavigationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = HierarchicalPathfinder(chunk_size=CELLS)
+        self.graph.register_chunk(0, 0, _open_grid((0, 0)))
+        self.system = UnifiedBuildingSystem()
+        self.system._load_building_templates()
+        self.system.world_manager = SimpleNamespace(navigation_graph=self.graph)
+
+    def tearDown(self):
+        self.graph.shutdown()
+
+    def test_building_footprint_blocks_until_removed(self):
+        building_id = self.system.create_building("house", (4.0, 4.0, 0.0))
+        self.assertTrue(self.graph.has_obstacle(building_id))
+
+        self.graph.unregister_chunk(0, 0)
+        grid_map = _open_grid((0, 0))
+        self.graph.register_chunk(0, 0, grid_map)
+        self.assertFalse(grid_map.is_walkable((4, 4)))
+
+        self.assertTrue(self.system.remove_building(building_id))
+        self.assertFalse(self.graph.has_obstacle(building_id))
+        self.assertTrue(grid_map.is_walkable((4, 4)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Тесты регистрации карт чанков и подземелий в поиске пути навигации"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.content_pregeneration import ContentPregenerationService, PregenerationSettings
+from src.systems.world.navigation_system import NavigationSystem
+from src.systems.world.structure_generator import StructureType
+from src.systems.world.world_manager import ChunkState, WorldManager
+
+try:
+    from src.systems.ai.ai_system import PLAYER_ENTITY_ID, AISystem
+    from src.systems.world.flow_field import FlowFieldService
+    AI_AVAILABLE = True
+except ImportError:
+    # Пакет AI без PyTorch не импортируется
+    AI_AVAILABLE = False
+
+
+def _dungeon_structures(count: int):
+    return [
+        SimpleNamespace(structure_id=f"dungeon_{index}", position=(10.0 * index, 0.0, 0.0),
+                        template=SimpleNamespace(structure_type=StructureType.DUNGEON))
+        for index in range(count)
+    ]
+
+
+class NavigationMapsTest(unittest.TestCase):
+
+    def setUp(self):
+        # Без executor чанк создается, но не генерируется: данные задает тест
+        self.manager = WorldManager()
+        self.navigation = NavigationSystem()
+        self.pathfinding = self.navigation.pathfinding
+
+    def tearDown(self):
+        self.pathfinding.shutdown()
+        if self.manager.content_pregeneration is not None:
+            self.manager.content_pregeneration.shutdown(wait=True)
+
+    def _generate_chunk(self, chunk_x: int, chunk_y: int, lod: int = 0):
+        chunk = self.manager.load_chunk(chunk_x, chunk_y)
+        size = (chunk.chunk_size >> lod) + 1
+        chunk.height_map = np.zeros((size, size), dtype=np.float32)
+        chunk.biome_map = np.zeros((size, size), dtype=np.uint8)
+        chunk.lod = lod
+        self.manager._set_chunk_state(chunk, ChunkState.LOADED)
+        self.manager._finish_chunk_generation(chunk.chunk_id, True)
+        return chunk
+
+    def test_terrain_maps_follow_chunk_lifecycle(self):
+        resident = self._generate_chunk(0, 0)
+        self.assertTrue(self.navigation.attach_world(self.manager))
+        self.assertIsNotNone(self.pathfinding.get_map(resident.chunk_id))
+
+        chunk = self._generate_chunk(1, 0)
+        grid_map = self.pathfinding.get_map(chunk.chunk_id)
+        self.assertIsNotNone(grid_map)
+        self.assertEqual(grid_map.world_to_cell(chunk.chunk_size + 1.0, 1.0), (1, 1))
+
+        coarse = self._generate_chunk(2, 0, lod=2)
+        self.assertIsNone(self.pathfinding.get_map(coarse.chunk_id))
+
+        self.manager.unload_chunk(1, 0)
+        self.manager._process_unload_queue()
+        self.assertIsNone(self.pathfinding.get_map(chunk.chunk_id))
+        self.assertIsNotNone(self.pathfinding.get_map(resident.chunk_id))
+
+    def test_entered_dungeon_replaces_previous_location_map(self):
+        self.manager.content_pregeneration = ContentPregenerationService(PregenerationSettings(world_seed=5))
+        self.navigation.attach_world(self.manager)
+        self.manager._register_content_locations(self.manager.load_chunk(0, 0), _dungeon_structures(2))
+
+        first = self.manager.enter_location("dungeon_0")
+        grid_map = self.pathfinding.get_map(first.dungeon_id)
+        self.assertIsNotNone(grid_map)
+        self.assertTrue(np.isfinite(grid_map.costs).any())
+
+        second = self.manager.enter_location("dungeon_1")
+        self.assertIsNotNone(self.pathfinding.get_map(second.dungeon_id))
+        self.assertIsNone(self.pathfinding.get_map(first.dungeon_id))
+        self.assertEqual(self.navigation.location_map_id, second.dungeon_id)
+
+    def test_player_map_follows_chunks_and_locations(self):
+        self.manager.content_pregeneration = ContentPregenerationService(PregenerationSettings(world_seed=5))
+        self.navigation.attach_world(self.manager)
+        changes = []
+        self.navigation.add_player_map_callback(changes.append)
+
+        first = self._generate_chunk(0, 0)
+        second = self._generate_chunk(1, 0)
+        self.navigation.update_player_position(10.0, 10.0)
+        self.navigation.update_player_position(20.0, 10.0)
+        self.navigation.update_player_position(second.chunk_size + 10.0, 10.0)
+
+        self.manager._register_content_locations(first, _dungeon_structures(1))
+        dungeon = self.manager.enter_location("dungeon_0")
+        self.manager.leave_location("dungeon_0")
+
+        self.manager.unload_chunk(1, 0)
+        self.manager._process_unload_queue()
+
+        self.assertEqual(changes, [first.chunk_id, second.chunk_id, dungeon.dungeon_id, second.chunk_id, None])
+        self.assertIsNone(self.pathfinding.get_map(dungeon.dungeon_id))
+
+
+@unittest.skipUnless(AI_AVAILABLE, "AI система недоступна без PyTorch")
+class PlayerFlowTargetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = WorldManager()
+        self.navigation = NavigationSystem()
+        self.navigation.attach_world(self.manager)
+        self.ai_system = AISystem()
+        self.ai_system.set_flow_field_service(FlowFieldService(self.navigation.pathfinding))
+        self.navigation.add_player_moved_callback(self.ai_system.update_player_position)
+        self.navigation.add_player_map_callback(self.ai_system.set_player_map)
+
+    def tearDown(self):
+        self.navigation.pathfinding.shutdown()
+
+    def test_player_field_moves_between_chunk_maps(self):
+        for chunk_x in range(2):
+            chunk = self.manager.load_chunk(chunk_x, 0)
+            chunk.height_map = np.zeros((chunk.chunk_size + 1, chunk.chunk_size + 1), dtype=np.float32)
+            chunk.biome_map = np.zeros_like(chunk.height_map, dtype=np.uint8)
+            self.manager._finish_chunk_generation(chunk.chunk_id, True)
+
+        self.navigation.update_player_position(10.0, 10.0)
+        self.assertEqual(self.ai_system.flow_targets[PLAYER_ENTITY_ID], "0_0")
+        self.assertEqual(self.ai_system.flow_fields.fields[PLAYER_ENTITY_ID].goal, (10, 10))
+
+        self.navigation.update_player_position(70.0, 10.0)
+        self.assertEqual(self.ai_system.flow_targets[PLAYER_ENTITY_ID], "1_0")
+        self.assertEqual(self.ai_system.flow_fields.fields[PLAYER_ENTITY_ID].goal, (6, 10))
+
+        self.manager.unload_chunk(1, 0)
+        self.manager._process_unload_queue()
+        self.assertNotIn(PLAYER_ENTITY_ID, self.ai_system.flow_targets)
+        self.assertFalse(self.ai_system.flow_fields.has_goal(PLAYER_ENTITY_ID))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Тесты сервиса поиска пути"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.pathfinding import GridMap, PathfindingService
+
+
+class PathfindingServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = PathfindingService()
+        walkable = np.ones((8, 8), dtype=bool)
+        walkable[1:7, 4] = False
+        self.grid_map = self.service.register_map(GridMap.from_walkable("room", walkable))
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_path_goes_around_wall(self):
+        result = self.service.find_path("room", (0, 3), (7, 3))
+
+        self.assertTrue(result.found)
+        self.assertEqual(result.path[0], (0, 3))
+        self.assertEqual(result.path[-1], (7, 3))
+        self.assertTrue(all(self.grid_map.is_walkable(cell) for cell in result.path))
+
+    def test_request_path_hits_cache_for_any_cell_type(self):
+        first = self.service.find_path("room", (0, 0), (7, 7))
+        searches = self.service.stats["searches"]
+
+        for start, goal in (([0, 0], [7, 7]), ((np.int64(0), np.int64(0)), np.array([7, 7]))):
+            future = self.service.request_path("room", start, goal)
+            self.assertTrue(future.done())
+            self.assertIs(future.result(), first)
+
+        self.assertEqual(self.service.stats["searches"], searches)
+        self.assertEqual(self.service.stats["async_requests"], 0)
+
+    def test_map_change_invalidates_cached_path(self):
+        first = self.service.find_path("room", (0, 0), (7, 7))
+        self.grid_map.set_walkable(5, 5, False)
+
+        second = self.service.request_path("room", (0, 0), (7, 7)).result(timeout=10)
+
+        self.assertIsNot(second, first)
+        self.assertNotIn((5, 5), second.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
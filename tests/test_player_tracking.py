@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Тесты передачи позиций игрока и сущностей в восприятие AI"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.navigation_system import NavigationSystem
+
+try:
+    from src.systems.ai.ai_system import PLAYER_ENTITY_ID, AISystem, AIType
+    AI_AVAILABLE = True
+except ImportError:
+    # Пакет AI без PyTorch не импортируется
+    AI_AVAILABLE = False
+
+
+class PlayerMovedCallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.navigation = NavigationSystem()
+
+    def tearDown(self):
+        self.navigation.pathfinding.shutdown()
+
+    def test_callback_receives_player_position(self):
+        moves = []
+        self.navigation.add_player_moved_callback(lambda x, y, z: moves.append((x, y, z)))
+
+        self.navigation.update_player_position(3.0, 4.0, 1.0)
+
+        self.assertEqual(moves, [(3.0, 4.0, 1.0)])
+
+
+@unittest.skipUnless(AI_AVAILABLE, "AI система недоступна без PyTorch")
+class AIPerceptionTrackingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.navigation = NavigationSystem()
+        self.ai_system = AISystem()
+        self.navigation.add_player_moved_callback(self.ai_system.update_player_position)
+        self.navigation.update_player_position(0.0, 0.0)
+
+        self.ai_system.register_entity("wolf", AIType.STATE_MACHINE, (50.0, 50.0, 0.0),
+                                       target_types=["player"], detection_range=10.0)
+        self.wolf = self.ai_system.ai_entities["wolf"]
+
+    def tearDown(self):
+        self.navigation.pathfinding.shutdown()
+
+    def test_wolf_acquires_moving_player(self):
+        self.ai_system._update_perception(self.wolf)
+        self.assertIsNone(self.wolf.target_entity)
+
+        self.navigation.update_player_position(45.0, 45.0)
+        self.ai_system._update_perception(self.wolf)
+
+        self.assertEqual(self.wolf.target_entity, PLAYER_ENTITY_ID)
+        self.assertEqual(self.wolf.target_position, (45.0, 45.0, 0.0))
+
+    def test_directly_moved_entity_is_resynced(self):
+        self.wolf.position = (1.0, 1.0, 0.0)
+
+        self.ai_system._update_perception(self.wolf)
+
+        self.assertIn("wolf", self.ai_system.get_entities_in_range((0.0, 0.0), 5.0))
+        self.assertEqual(self.wolf.target_entity, PLAYER_ENTITY_ID)
+
+
+if __name__ == "__main__":
+    unittest.main()
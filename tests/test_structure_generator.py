@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Тесты учета структур генератора при вытеснении и выгрузке чанков"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.structure_generator import StructureGenerator
+
+CHUNK_SIZE = 256
+SEED = 4242
+
+
+class StructureRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = StructureGenerator()
+        self.generator.generation_cache.max_entries = 1
+
+    def tearDown(self):
+        self.generator._on_destroy()
+
+    def _generate(self, chunk_x: int, chunk_y: int):
+        return self.generator.generate_structures_for_chunk(chunk_x, chunk_y, CHUNK_SIZE, SEED)
+
+    @staticmethod
+    def _positions(structures):
+        return [structure.position for structure in structures]
+
+    def test_evicted_chunk_regenerates_same_structures(self):
+        first = self._generate(0, 0)
+        self.assertGreater(len(first), 0)
+
+        self._generate(4, 4)  # вытесняет запись чанка (0, 0)
+        for structure in first:
+            self.assertNotIn(structure.structure_id, self.generator.generated_structures)
+        self.assertEqual(self.generator.get_structures_in_area((128.0, 128.0, 0.0), 200.0), [])
+
+        self.assertEqual(self._positions(self._generate(0, 0)), self._positions(first))
+
+    def test_retained_chunk_survives_eviction(self):
+        first = self._generate(0, 0)
+        self.generator.retain_chunk(0, 0)
+
+        self._generate(4, 4)
+
+        for structure in first:
+            self.assertIn(structure.structure_id, self.generator.generated_structures)
+
+    def test_released_chunk_is_restored_from_cache(self):
+        first = self._generate(0, 0)
+        self.generator.retain_chunk(0, 0)
+
+        self.generator.release_chunk(0, 0)
+        self.assertEqual(self.generator.generated_structures, {})
+        self.assertEqual(len(self.generator.spatial_index), 0)
+
+        again = self._generate(0, 0)
+        self.assertEqual(self._positions(again), self._positions(first))
+        self.assertEqual(len(self.generator.generated_structures), len(first))
+
+
+if __name__ == "__main__":
+    unittest.main()
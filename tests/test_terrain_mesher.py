@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Тесты построения вершин и индексов ландшафта (часть на NumPy)"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.rendering.terrain_mesher import TerrainMesher, build_terrain_indices
+
+
+class TerrainMesherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mesher = TerrainMesher()
+
+    def test_flat_map_has_vertical_normals(self):
+        heights = np.zeros((5, 5), dtype=np.float32)
+        biomes = np.zeros((5, 5), dtype=np.int32)
+
+        vertices = self.mesher.build_vertex_array(heights, biomes, chunk_size=16.0)
+
+        np.testing.assert_allclose(vertices["normal"], np.tile([0.0, 0.0, 1.0], (25, 1)))
+        self.assertAlmostEqual(float(vertices["vertex"][-1, 0]), 16.0)
+        self.assertAlmostEqual(float(vertices["vertex"][-1, 1]), 16.0)
+
+    def test_single_node_maps_do_not_raise(self):
+        # Самый грубый LOD может дать карту из одного узла по оси
+        for shape in ((1, 1), (1, 4), (4, 1)):
+            heights = np.arange(np.prod(shape), dtype=np.float32).reshape(shape) * 100.0
+            biomes = np.zeros(shape, dtype=np.int32)
+
+            vertices = self.mesher.build_vertex_array(heights, biomes, chunk_size=16.0)
+
+            self.assertEqual(vertices.shape, (heights.size,))
+            self.assertTrue(np.all(np.isfinite(vertices["normal"])))
+            np.testing.assert_allclose(np.linalg.norm(vertices["normal"], axis=1), 1.0, rtol=1e-5)
+
+    def test_indices_cover_grid(self):
+        indices = build_terrain_indices(3)
+
+        self.assertEqual(indices.size, 2 * 2 * 6)
+        self.assertEqual(indices.dtype, np.uint16)
+        self.assertEqual(int(indices.max()), 8)
+        self.assertEqual(build_terrain_indices(1).size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
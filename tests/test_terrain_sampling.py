@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Тесты пакетной выборки ландшафта WorldManager"""
+
+import os
+import sys
+import threading
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.world_manager import ChunkState, WorldManager
+
+
+class TerrainSamplingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = WorldManager()
+        settings = self.manager.settings
+        settings.world_seed = 99
+        settings.chunk_size = 16
+        settings.use_process_pool = False
+        settings.use_chunk_store = False
+        settings.pregeneration_workers = 0
+        self.assertTrue(self.manager._on_initialize())
+
+        # Генерация ландшафта ждет разрешения теста
+        self.gate = threading.Event()
+        generate = self.manager._generate_terrain_local
+
+        def gated_generate(*args, **kwargs):
+            self.gate.wait(timeout=10)
+            return generate(*args, **kwargs)
+
+        self.manager._generate_terrain_local = gated_generate
+
+    def tearDown(self):
+        self.gate.set()
+        self.manager.executor.shutdown(wait=True)
+        self.manager.content_pregeneration.shutdown(wait=True)
+
+    def _wait_for_requests(self):
+        requests = list(self.manager._sampling_requests.values())
+        for future in requests:
+            future.result(timeout=30)
+
+    def test_missing_chunk_is_pending_without_blocking(self):
+        sample = self.manager.sample_terrain([4.0, 20.0], [4.0, 4.0])
+
+        self.assertTrue(np.all(np.isnan(sample.heights)))
+        self.assertTrue(np.all(sample.biomes == -1))
+        self.assertEqual(sorted(sample.pending), [(0, 0), (1, 0)])
+
+        self.gate.set()
+        self._wait_for_requests()
+
+        sample = self.manager.sample_terrain([4.0, 20.0], [4.0, 4.0])
+        self.assertEqual(sample.pending, [])
+        self.assertTrue(np.all(np.isfinite(sample.heights)))
+        self.assertTrue(np.all(sample.biomes >= 0))
+
+    def test_repeated_queries_share_one_request(self):
+        self.manager.sample_terrain([1.0], [1.0])
+        first = self.manager._sampling_requests[(0, 0)]
+        sample = self.manager.sample_terrain([2.0], [2.0])
+
+        self.assertIs(self.manager._sampling_requests[(0, 0)], first)
+        self.assertEqual(sample.pending, [(0, 0)])
+
+    def test_loading_chunk_is_pending_without_second_request(self):
+        chunk = self.manager.load_chunk(0, 0)
+        self.assertEqual(chunk.state, ChunkState.LOADING)
+
+        sample = self.manager.sample_terrain([1.0], [1.0])
+
+        self.assertEqual(sample.pending, [(0, 0)])
+        self.assertEqual(self.manager._sampling_requests, {})
+
+    def test_generate_missing_false_does_not_request(self):
+        sample = self.manager.sample_terrain([1.0], [1.0], generate_missing=False)
+
+        self.assertEqual(sample.pending, [])
+        self.assertEqual(self.manager._sampling_requests, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
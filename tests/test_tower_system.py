@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Тесты раскладки этажей башен и их генерации из сида"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.tower_system import BOSS_LEVEL_INTERVAL, TowerSystem, TowerType
+
+
+def _eager_layout(settings):
+    """Раскладка как при полной генерации башни: уровень -> (этажи, этаж босса)
+
+    Этажи нумеруются подряд, босс уровня занимает следующий номер, обычные
+    этажи обрываются на max_floors."""
+    layout = {}
+    floor_number = 1
+    for level_number in range(1, settings.max_floors // settings.floors_per_level + 1):
+        floors = []
+        for _ in range(settings.floors_per_level):
+            if floor_number > settings.max_floors:
+                break
+            floors.append(floor_number)
+            floor_number += 1
+
+        boss_floor = None
+        if floors and level_number % BOSS_LEVEL_INTERVAL == 0:
+            boss_floor = floor_number
+            floor_number += 1
+        layout[level_number] = (floors, boss_floor)
+    return layout
+
+
+class TowerLayoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.system = TowerSystem()
+        self.system.initialize()
+
+    def test_layout_matches_eager_generation(self):
+        for tower_type, settings in self.system.tower_templates.items():
+            with self.subTest(tower_type=tower_type):
+                tower = self.system.generate_tower(tower_type, world_seed=3)
+                layout = _eager_layout(settings)
+                self.assertEqual(tower.level_count, len(layout))
+
+                locations = {}
+                for level_number, (floors, boss_floor) in layout.items():
+                    numbers, boss_number = self.system._level_floor_numbers(tower, level_number)
+                    self.assertEqual((list(numbers), boss_number), (floors, boss_floor))
+                    locations.update((number, (level_number, False)) for number in floors)
+                    if boss_floor is not None:
+                        locations[boss_floor] = (level_number, True)
+
+                last_floor = max(locations)
+                for floor_number in range(-1, last_floor + settings.floors_per_level + 2):
+                    self.assertEqual(self.system._locate_floor(tower, floor_number),
+                                     locations.get(floor_number), floor_number)
+
+    def test_truncated_last_level_keeps_its_boss(self):
+        tower = self.system.generate_tower(TowerType.TRIAL, world_seed=3)
+        numbers, boss_number = self.system._level_floor_numbers(tower, tower.level_count)
+
+        self.assertLess(len(numbers), tower.settings.floors_per_level)
+        self.assertEqual(numbers[-1], tower.settings.max_floors)
+        self.assertEqual(boss_number, tower.settings.max_floors + 1)
+        self.assertEqual(self.system._locate_floor(tower, boss_number), (tower.level_count, True))
+
+
+class TowerFloorSeedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.system = TowerSystem()
+        self.system.initialize()
+        self.tower = self.system.generate_tower(TowerType.CHALLENGE, world_seed=42)
+
+    def test_floor_is_regenerated_after_eviction(self):
+        floor_numbers = [1, 7, 51, 52]
+        first = {number: self.system._get_floor(self.tower, number) for number in floor_numbers}
+
+        # Кэш вытесняет нетронутые этажи: они строятся заново из сида
+        while self.system.floor_cache.evict_oldest():
+            pass
+        for number in floor_numbers:
+            floor = self.system._get_floor(self.tower, number)
+            self.assertIsNot(floor, first[number])
+            self.assertEqual(floor, first[number])
+
+    def test_same_seed_gives_same_floor_in_another_system(self):
+        other = TowerSystem()
+        other.initialize()
+        tower = other.generate_tower(TowerType.CHALLENGE, world_seed=42)
+
+        for number in (3, 17, 51):
+            self.assertEqual(other._get_floor(tower, number), self.system._get_floor(self.tower, number))
+
+
+if __name__ == "__main__":
+    unittest.main()
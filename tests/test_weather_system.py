@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Тесты системы погоды"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.systems.world.weather_system import WeatherSystem
+
+
+def _weather_system(seed) -> WeatherSystem:
+    system = WeatherSystem(seed=seed)
+    system._on_initialize()
+    system.create_weather_zone("north", 0.0, 0.0, 100.0, biome_type="tundra", season="winter")
+    system.create_weather_zone("south", 500.0, 0.0, 100.0, biome_type="desert", season="summer")
+    return system
+
+
+def _snapshot(system: WeatherSystem):
+    return [system.global_weather] + [zone.current_weather for zone in system.weather_zones.values()]
+
+
+class WeatherSeedTest(unittest.TestCase):
+
+    def _run(self, system: WeatherSystem):
+        for _ in range(50):
+            system.update_weather(1.0)
+        return _snapshot(system), system.get_weather_forecast("north", 12)
+
+    def test_same_seed_reproduces_weather(self):
+        self.assertEqual(self._run(_weather_system(42)), self._run(_weather_system(42)))
+
+    def test_set_seed_reproduces_weather(self):
+        first, second = _weather_system(None), _weather_system(None)
+        for system in (first, second):
+            system.set_seed(7)
+            system.create_weather_zone("north", 0.0, 0.0, 100.0)
+
+        self.assertEqual(self._run(first), self._run(second))
+
+    def test_different_seeds_differ(self):
+        self.assertNotEqual(self._run(_weather_system(1)), self._run(_weather_system(2)))
+
+
+class WeatherForecastCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.system = _weather_system(3)
+
+    def test_forecast_entries_are_copies(self):
+        forecast = self.system.get_weather_forecast("north", 6)
+        expected = forecast[0].temperature
+        forecast[0].temperature = 1000.0
+        forecast.clear()
+
+        again = self.system.get_weather_forecast("north", 6)
+        self.assertEqual(again[0].temperature, expected)
+        self.assertIsNot(self.system.get_weather_forecasts(6)["north"][0], again[0])
+
+    def test_zone_parameter_changes_invalidate(self):
+        changes = (
+            lambda: self.system.set_zone_conditions("north", biome_type="desert"),
+            lambda: self.system.set_season("autumn"),
+            lambda: self.system.set_season_modifiers("autumn", {"temperature_modifier": 0.5}),
+            lambda: setattr(self.system.weather_zones["north"], "biome_type", "forest"),
+            lambda: self.system.biome_weather_modifiers.setdefault("forest", {}).update(humidity_modifier=2.0),
+            lambda: setattr(self.system.settings, "weather_change_rate", 0.5),
+        )
+        for change in changes:
+            self.system.get_weather_forecast("north", 6)
+            computed = self.system.weather_stats["forecast_hours_computed"]
+
+            change()
+            self.system.get_weather_forecast("north", 6)
+
+            self.assertEqual(self.system.weather_stats["forecast_hours_computed"], computed + 6)
+
+    def test_forecasts_leave_live_weather_unchanged(self):
+        quiet, forecasting = _weather_system(7), _weather_system(7)
+        for tick in range(50):
+            if tick % 10 == 0:
+                forecasting.get_weather_forecast("north", 24)
+                forecasting.get_weather_forecasts(48)
+            quiet.update_weather(1.0)
+            forecasting.update_weather(1.0)
+
+        self.assertEqual(_snapshot(forecasting), _snapshot(quiet))
+
+    def test_forecast_depends_only_on_seed_and_hour(self):
+        first, second = _weather_system(7), _weather_system(7)
+        for _ in range(5):
+            second.update_weather(1.0)  # Тот же час игрового времени, другое состояние генераторов
+        second.weather_zones["north"].current_weather = first.weather_zones["north"].current_weather
+
+        self.assertEqual(first.get_weather_forecast("north", 24), second.get_weather_forecast("north", 24))
+
+    def test_unchanged_zone_reuses_cache(self):
+        self.system.get_weather_forecast("north", 6)
+        computed = self.system.weather_stats["forecast_hours_computed"]
+
+        self.system.get_weather_forecast("north", 6)
+
+        self.assertEqual(self.system.weather_stats["forecast_hours_computed"], computed)
+
+
+if __name__ == "__main__":
+    unittest.main()